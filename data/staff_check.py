@@ -1,10 +1,16 @@
 import json
+import sys
 from pathlib import Path
 from collections import defaultdict
 
+# ロール分類エンジンは db/staff_roles.py を共用する
+sys.path.append(str(Path(__file__).parent.parent / 'db'))
+from staff_roles import RoleClassifier, count_roles, match_target_roles
 
-def analyze_staff_roles(json_file, is_anime=True):
+
+def analyze_staff_roles(json_file, is_anime=True, classifier=None):
     """JSONファイルからスタッフロールを分析"""
+    classifier = classifier or RoleClassifier()
     print(f"\n{'='*70}")
     print(f"ファイル: {json_file.name}")
     print(f"{'='*70}")
@@ -15,47 +21,20 @@ def analyze_staff_roles(json_file, is_anime=True):
         
         # 対象ロールの定義（アニメとマンガで異なる）
         if is_anime:
-            target_roles = {
-                'Director': {'partial': 0, 'exact': 0, 'ids': set()},
-                'Character Design': {'partial': 0, 'exact': 0, 'ids': set()},
-                'Theme Song': {'partial': 0, 'exact': 0, 'ids': set()},
-                'Music': {'partial': 0, 'exact': 0, 'ids': set()}
-            }
+            target_names = ['Director', 'Character Design', 'Theme Song', 'Music']
         else:  # manga
-            target_roles = {
-                'Story & Art': {'partial': 0, 'exact': 0, 'ids': set()},
-                'Assistant': {'partial': 0, 'exact': 0, 'ids': set()},
-                'Story': {'partial': 0, 'exact': 0, 'ids': set()},
-                'Art': {'partial': 0, 'exact': 0, 'ids': set()},
-                'Illustration': {'partial': 0, 'exact': 0, 'ids': set()}
-            }
+            target_names = ['Story & Art', 'Assistant', 'Story', 'Art', 'Illustration']
+        
+        # 全ロールのカウント（ロール文字列ごとに件数と作品IDをまとめる）
+        all_roles, role_item_ids = count_roles(data)
         
-        # 全ロールのカウント
-        all_roles = defaultdict(int)
+        # 対象ロールとの照合（異なるロール文字列ごとに1回だけ判定）
+        target_roles = match_target_roles(all_roles, role_item_ids, target_names)
         
-        # データを走査
-        for item in data:
-            if isinstance(item, dict):
-                item_id = item.get('id')
-                staff_data = item.get('staff', {})
-                
-                if isinstance(staff_data, dict) and 'edges' in staff_data:
-                    for edge in staff_data['edges']:
-                        if isinstance(edge, dict) and 'role' in edge:
-                            role = edge['role']
-                            if role:
-                                all_roles[role] += 1
-                                
-                                # 対象ロールとの照合
-                                for target_role in target_roles:
-                                    # 完全一致
-                                    if role == target_role:
-                                        target_roles[target_role]['exact'] += 1
-                                        target_roles[target_role]['ids'].add(item_id)
-                                    # 部分一致
-                                    elif target_role.lower() in role.lower():
-                                        target_roles[target_role]['partial'] += 1
-                                        target_roles[target_role]['ids'].add(item_id)
+        # 全ロールの分類
+        role_classes = defaultdict(int)
+        for role, count in all_roles.items():
+            role_classes[classifier.classify(role)[1]] += count
         
         # 結果表示
         media_type = "アニメ" if is_anime else "マンガ"
@@ -75,6 +54,12 @@ def analyze_staff_roles(json_file, is_anime=True):
             print(f"  合計:     {counts['exact'] + counts['partial']:5d} 件")
             print(f"  関連{media_type}数: {item_count} 作品")
         
+        print(f"\n{'='*70}")
+        print(f"全ロールの分類結果")
+        print(f"{'='*70}")
+        for role_class, count in sorted(role_classes.items(), key=lambda x: x[1], reverse=True):
+            print(f"  {role_class:<25} {count:>10} 件")
+        
         return target_roles, all_roles
         
     except FileNotFoundError:
@@ -0,0 +1,332 @@
+import argparse
+import bisect
+import itertools
+import json
+import random
+from pathlib import Path
+
+
+# 1倍スケールの作品数（10倍・100倍はこの件数を掛ける）
+BASE_COUNTS = {
+    'anime': 1000,
+    'manga': 1000
+}
+
+# 人物・スタジオのプールサイズ（作品1件あたり）
+POOL_RATIOS = {
+    'studios': 0.15,
+    'voiceactors': 1.2,
+    'anime_staff': 3.0,
+    'manga_staff': 1.5
+}
+
+# べき乗分布の指数（大きいほど一部の人物・スタジオに出演が集中する）
+ZIPF_EXPONENT = 1.1
+
+GENRES = [
+    'Action', 'Adventure', 'Comedy', 'Drama', 'Ecchi', 'Fantasy', 'Horror',
+    'Mahou Shoujo', 'Mecha', 'Music', 'Mystery', 'Psychological', 'Romance',
+    'Sci-Fi', 'Slice of Life', 'Sports', 'Supernatural', 'Thriller', 'Hentai'
+]
+GENRE_WEIGHTS = [18, 12, 20, 14, 4, 12, 3, 2, 4, 3, 5, 3, 10, 7, 8, 3, 6, 2, 1]
+
+ANIME_FORMATS = [('TV', 55), ('MOVIE', 12), ('OVA', 10), ('ONA', 10), ('SPECIAL', 8), ('TV_SHORT', 4), ('MUSIC', 1)]
+MANGA_FORMATS = [('MANGA', 85), ('ONE_SHOT', 10), ('NOVEL', 5)]
+ANIME_SOURCES = [('MANGA', 35), ('ORIGINAL', 20), ('LIGHT_NOVEL', 15), ('VIDEO_GAME', 7), ('NOVEL', 6),
+                 ('WEB_NOVEL', 5), ('VISUAL_NOVEL', 4), ('OTHER', 4), (None, 2)]
+MANGA_SOURCES = [('ORIGINAL', 70), ('LIGHT_NOVEL', 10), ('WEB_NOVEL', 8), ('NOVEL', 6), ('VIDEO_GAME', 3), (None, 3)]
+COUNTRIES = [('JP', 80), ('KR', 8), ('CN', 8), ('TW', 2), ('US', 2)]
+SEASONS = ['WINTER', 'SPRING', 'SUMMER', 'FALL']
+
+# スタッフロール（AniListの表記に合わせて話数や補足付きの表記も含める）
+ANIME_STAFF_ROLES = [
+    ('Director', 8), ('Episode Director (eps 1-3)', 6), ('Chief Animation Director', 3),
+    ('Animation Director (ep 5)', 10), ('Character Design', 6), ('Original Character Design', 2),
+    ('Music', 6), ('Theme Song Performance (OP)', 6), ('Theme Song Performance (ED)', 6),
+    ('Theme Song Lyrics (OP)', 3), ('Theme Song Composition (ED)', 3), ('Original Creator', 6),
+    ('Series Composition', 5), ('Script (ep 2)', 6), ('Storyboard (ep 1)', 8),
+    ('Key Animation (ep 4)', 14), ('Sound Director', 4), ('Art Director', 4),
+    ('Director of Photography', 3), ('Assistant Director', 2)
+]
+MANGA_STAFF_ROLES = [
+    ('Story & Art', 40), ('Story', 18), ('Art', 18), ('Original Story', 6),
+    ('Illustration', 6), ('Assistant', 6), ('Translator (English)', 4), ('Lettering (English)', 2)
+]
+
+# AniListのネストしたconnectionは1ページ25件まで
+MAX_EDGES = 25
+
+
+class ZipfSampler:
+    """IDプールからべき乗分布（Zipf）でサンプリングするクラス
+
+    ランクの小さいIDほど選ばれやすく、一部の人物・スタジオに出演が集中する
+    実データの偏りを再現する。
+    """
+
+    def __init__(self, rng, ids, exponent=ZIPF_EXPONENT):
+        self.rng = rng
+        self.ids = list(ids)
+        weights = [1.0 / (rank ** exponent) for rank in range(1, len(self.ids) + 1)]
+        self.cum_weights = list(itertools.accumulate(weights))
+        self.total = self.cum_weights[-1]
+
+    def sample(self):
+        index = bisect.bisect(self.cum_weights, self.rng.random() * self.total)
+        return self.ids[min(index, len(self.ids) - 1)]
+
+    def sample_unique(self, count):
+        """重複なしでcount件サンプリング（プールが小さい場合は件数を切り詰める）"""
+        count = min(count, len(self.ids))
+        selected = []
+        seen = set()
+        attempts = 0
+        while len(selected) < count and attempts < count * 20:
+            value = self.sample()
+            attempts += 1
+            if value not in seen:
+                seen.add(value)
+                selected.append(value)
+        return selected
+
+
+class SyntheticAniListGenerator:
+    """fetcher（anime_data.py / manga_data.py）と同じスキーマの合成データを生成するクラス"""
+
+    def __init__(self, scale=1, seed=42):
+        self.scale = scale
+        self.seed = seed
+        self.rng = random.Random(seed)
+
+        anime_count = BASE_COUNTS['anime'] * scale
+        manga_count = BASE_COUNTS['manga'] * scale
+        self.counts = {'anime': anime_count, 'manga': manga_count}
+
+        # ID帯を分けてアニメ・マンガ間で衝突しないようにする（人物IDは両方で共有）
+        self.studios = self._make_people(100000, int(anime_count * POOL_RATIOS['studios']) + 1, 'Studio')
+        self.voiceactors = self._make_people(200000, int(anime_count * POOL_RATIOS['voiceactors']) + 1, 'Seiyuu')
+        self.anime_staff = self._make_people(300000, int(anime_count * POOL_RATIOS['anime_staff']) + 1, 'Staff')
+        self.manga_staff = self._make_people(400000, int(manga_count * POOL_RATIOS['manga_staff']) + 1, 'Mangaka')
+
+        self.voiceactors_by_id = dict(self.voiceactors)
+
+        self.studio_sampler = ZipfSampler(self.rng, [person_id for person_id, _ in self.studios])
+        self.voiceactor_sampler = ZipfSampler(self.rng, [person_id for person_id, _ in self.voiceactors])
+        # 原作者などはアニメとマンガの両方に登場するため、アニメ側のプールにもマンガ家を混ぜる
+        crossover = self.manga_staff[:len(self.manga_staff) // 4]
+        self.anime_staff_sampler = ZipfSampler(self.rng, [person_id for person_id, _ in self.anime_staff + crossover])
+        self.manga_staff_sampler = ZipfSampler(self.rng, [person_id for person_id, _ in self.manga_staff])
+
+        self._next_character_id = 1000000
+        self._next_media_id = {'anime': 1, 'manga': 5000000}
+
+    def _make_people(self, start_id, count, prefix):
+        """人物・スタジオのプールを作成（お気に入り数もべき乗分布）"""
+        people = []
+        for rank in range(count):
+            person_id = start_id + rank
+            people.append((person_id, {
+                'name': f"{prefix} {person_id}",
+                'native': f"{prefix}{person_id}",
+                'favourites': int(50000 / (rank + 1) ** 0.9 * self.rng.uniform(0.5, 1.5))
+            }))
+        return people
+
+    def _weighted(self, choices):
+        values, weights = zip(*choices)
+        return self.rng.choices(values, weights=weights)[0]
+
+    def _fan_out(self, minimum, maximum, alpha):
+        """パレート分布でエッジ数を決める（大半は少なく、一部の作品だけ多い）"""
+        value = int(minimum * self.rng.paretovariate(alpha))
+        return max(minimum, min(maximum, value))
+
+    def _popularity_curve(self, count):
+        """人気順に並んだ popularity / favourites を生成"""
+        popularity = []
+        for rank in range(count):
+            base = 900000 / (rank + 1) ** 0.75
+            popularity.append(max(1, int(base * self.rng.uniform(0.85, 1.15))))
+        popularity.sort(reverse=True)
+        return popularity
+
+    def _mean_score(self):
+        if self.rng.random() < 0.05:
+            return None
+        return max(10, min(95, int(self.rng.gauss(66, 9))))
+
+    def _year(self):
+        # 近年ほど作品数が多い
+        return int(2025 - min(65, self.rng.expovariate(1 / 12)))
+
+    def _genres(self):
+        count = self._fan_out(1, 6, 2.0)
+        genres = set()
+        while len(genres) < count:
+            genres.add(self.rng.choices(GENRES, weights=GENRE_WEIGHTS)[0])
+        return sorted(genres)
+
+    def _character_edges(self, with_voiceactors):
+        edges = []
+        for _ in range(self._fan_out(2, MAX_EDGES, 1.2)):
+            chara_id = self._next_character_id
+            self._next_character_id += 1
+            edge = {
+                'node': {
+                    'id': chara_id,
+                    'name': {'userPreferred': f"Character {chara_id}", 'native': f"キャラ{chara_id}"},
+                    'favourites': int(self.rng.paretovariate(1.1) * 10) - 10
+                }
+            }
+            if with_voiceactors:
+                voice_actors = []
+                for va_id in self.voiceactor_sampler.sample_unique(self._fan_out(1, 3, 3.0)):
+                    va_info = self.voiceactors_by_id[va_id]
+                    voice_actors.append({
+                        'id': va_id,
+                        'name': {'userPreferred': va_info['name'], 'native': va_info['native']},
+                        'favourites': va_info['favourites']
+                    })
+                edge['voiceActors'] = voice_actors
+            edges.append(edge)
+        return {'edges': edges}
+
+    def _staff_edges(self, sampler, roles, people_by_id, minimum):
+        edges = []
+        staff_ids = sampler.sample_unique(self._fan_out(minimum, MAX_EDGES, 1.1))
+        for staff_id in staff_ids:
+            info = people_by_id[staff_id]
+            edges.append({
+                'role': self._weighted(roles),
+                'node': {
+                    'id': staff_id,
+                    'name': {'userPreferred': info['name'], 'native': info['native']},
+                    'favourites': info['favourites']
+                }
+            })
+        return {'edges': edges}
+
+    def generate_anime(self):
+        """アニメデータ（anime_data.py の出力形式）を生成"""
+        people_by_id = dict(self.anime_staff)
+        people_by_id.update(self.manga_staff)
+        studios_by_id = dict(self.studios)
+
+        anime_list = []
+        popularity = self._popularity_curve(self.counts['anime'])
+        for rank in range(self.counts['anime']):
+            media_id = self._next_media_id['anime']
+            self._next_media_id['anime'] += 1
+
+            format_value = self._weighted(ANIME_FORMATS)
+            studio_edges = []
+            for studio_id in self.studio_sampler.sample_unique(self._fan_out(1, 4, 2.5)):
+                studio_edges.append({
+                    'node': {
+                        'id': studio_id,
+                        'name': studios_by_id[studio_id]['name'],
+                        # 制作委員会などアニメーションスタジオでないものも混ぜる
+                        'isAnimationStudio': self.rng.random() < 0.7
+                    }
+                })
+
+            anime_list.append({
+                'id': media_id,
+                'title': {'romaji': f"Synthetic Anime {media_id}", 'native': f"合成アニメ{media_id}"},
+                'format': format_value,
+                'season': self.rng.choice(SEASONS) if self.rng.random() < 0.95 else None,
+                'seasonYear': self._year() if self.rng.random() < 0.97 else None,
+                'favourites': int(popularity[rank] * self.rng.uniform(0.005, 0.08)),
+                'meanScore': self._mean_score(),
+                'popularity': popularity[rank],
+                'genres': self._genres(),
+                'source': self._weighted(ANIME_SOURCES),
+                'episodes': 1 if format_value == 'MOVIE' else self._fan_out(1, 200, 1.5) * 6,
+                'description': '',
+                'countryOfOrigin': self._weighted(COUNTRIES),
+                'studios': {'edges': studio_edges},
+                'characters': self._character_edges(with_voiceactors=True),
+                'staff': self._staff_edges(self.anime_staff_sampler, ANIME_STAFF_ROLES, people_by_id, 3)
+            })
+        return anime_list
+
+    def generate_manga(self):
+        """マンガデータ（manga_data.py の出力形式）を生成"""
+        people_by_id = dict(self.manga_staff)
+
+        manga_list = []
+        popularity = self._popularity_curve(self.counts['manga'])
+        for rank in range(self.counts['manga']):
+            media_id = self._next_media_id['manga']
+            self._next_media_id['manga'] += 1
+
+            has_date = self.rng.random() < 0.95
+            manga_list.append({
+                'id': media_id,
+                'title': {'romaji': f"Synthetic Manga {media_id}", 'native': f"合成マンガ{media_id}"},
+                'format': self._weighted(MANGA_FORMATS),
+                'startDate': {
+                    'year': self._year() if has_date else None,
+                    'month': self.rng.randint(1, 12) if has_date and self.rng.random() < 0.9 else None,
+                    'day': self.rng.randint(1, 28) if has_date and self.rng.random() < 0.8 else None
+                },
+                'favourites': int(popularity[rank] * self.rng.uniform(0.01, 0.1)),
+                'meanScore': self._mean_score(),
+                'popularity': popularity[rank],
+                'countryOfOrigin': self._weighted(COUNTRIES),
+                'genres': self._genres(),
+                'source': self._weighted(MANGA_SOURCES),
+                'description': '',
+                'characters': self._character_edges(with_voiceactors=False),
+                'staff': self._staff_edges(self.manga_staff_sampler, MANGA_STAFF_ROLES, people_by_id, 1)
+            })
+        return manga_list
+
+
+def generate_dataset(output_dir, scale=1, seed=42, indent=None):
+    """合成データをfetcherと同じファイル名で書き出す
+
+    Returns:
+        dict: 'anime' / 'manga' → 出力ファイルのパス
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    generator = SyntheticAniListGenerator(scale=scale, seed=seed)
+
+    outputs = {}
+    for media_type, generate in (('anime', generator.generate_anime), ('manga', generator.generate_manga)):
+        output_file = output_dir / f"anilist_rank_data_analysis_popular_all_{media_type}.json"
+        with open(output_file, 'w', encoding='utf-8') as f:
+            json.dump(generate(), f, ensure_ascii=False, indent=indent)
+        outputs[media_type] = output_file
+    return outputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description='AniList形式の合成データ生成ツール')
+    parser.add_argument('--scale', type=int, default=1, choices=[1, 10, 100],
+                        help=f"データ量の倍率（1倍 = アニメ{BASE_COUNTS['anime']}件・マンガ{BASE_COUNTS['manga']}件）")
+    parser.add_argument('--seed', type=int, default=42, help='乱数シード（同じ値なら同じデータを生成）')
+    parser.add_argument('--output-dir', required=True,
+                        help='出力先ディレクトリ（実データを上書きしないよう明示的に指定する）')
+    parser.add_argument('--indent', type=int, default=None, help='JSONのインデント幅')
+    args = parser.parse_args()
+
+    print("="*70)
+    print("AniList形式 合成データ生成ツール")
+    print("="*70)
+    print(f"倍率: {args.scale}x / シード: {args.seed}")
+
+    outputs = generate_dataset(args.output_dir, scale=args.scale, seed=args.seed, indent=args.indent)
+    for media_type, output_file in outputs.items():
+        size_mb = output_file.stat().st_size / (1024 * 1024)
+        print(f"  {media_type}: {output_file} ({size_mb:.1f} MB)")
+
+    print("\n" + "="*70)
+    print("完了しました！")
+    print("="*70)
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
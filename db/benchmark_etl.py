@@ -0,0 +1,232 @@
+import argparse
+import contextlib
+import io
+import json
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+
+BASE_DIR = Path(__file__).parent
+PROJECT_DIR = BASE_DIR.parent
+GENERATOR_SCRIPT = PROJECT_DIR / 'data' / 'synthetic_data.py'
+DEFAULT_HISTORY_FILE = BASE_DIR / 'reports' / 'benchmark_history.jsonl'
+
+# 履歴比較で表示する主要ステージ（ステージ全体の値）
+SUMMARY_STAGES = [
+    'anime_base', 'manga_base', 'anime_unique', 'manga_unique',
+    'voiceactor_stats', 'studios_staff_stats', 'anime_staff_enhanced', 'manga_staff_enhanced',
+    'anime_dashboard_stats', 'manga_dashboard_stats', 'anime_stats_cube', 'manga_stats_cube',
+    'studios_sketch', 'anime_genre_bits', 'manga_genre_bits', 'anime_ranks', 'manga_ranks',
+    'anime_search_index', 'manga_search_index', 'snapshots', 'column_stores'
+]
+
+
+def git_revision():
+    """現在のコミットID（未コミットの変更があれば '-dirty' 付き）"""
+    try:
+        revision = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=PROJECT_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        status = subprocess.run(
+            ['git', 'status', '--porcelain', '--untracked-files=no'],
+            cwd=PROJECT_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        return f"{revision}-dirty" if status else revision
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_worker(work_dir, result_file, verbose=False):
+    """作業ディレクトリの合成データでパイプライン全体を実行し、計測結果をJSONで書き出す
+
+    ピークRSSをスケールごとに測れるよう、別プロセスとして呼び出される。
+    """
+    from etl_profiler import ETLProfiler
+    from pipeline import PipelineContext, run_pipeline
+
+    work_dir = Path(work_dir)
+    profiler = ETLProfiler()
+    ctx = PipelineContext(base_dir=work_dir / 'db', data_dir=work_dir / 'data', profiler=profiler)
+
+    output = io.StringIO()
+    redirect = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(output)
+    with redirect:
+        run_pipeline(ctx, force=True)
+
+    result = profiler.to_dict()
+    result['db_size_mb'] = {
+        db_key: db_file.stat().st_size / (1024 * 1024)
+        for db_key, db_file in ctx.db_files.items() if db_file.exists()
+    }
+    with open(result_file, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False)
+    return 0
+
+
+def run_scale(scale, seed, verbose=False):
+    """指定倍率で合成データを生成し、別プロセスでETLを実行して結果を返す"""
+    with tempfile.TemporaryDirectory(prefix=f"anilist_bench_{scale}x_") as tmp:
+        work_dir = Path(tmp)
+        (work_dir / 'db').mkdir()
+
+        print(f"  合成データを生成中（{scale}x）...")
+        subprocess.run(
+            [sys.executable, str(GENERATOR_SCRIPT), '--scale', str(scale), '--seed', str(seed),
+             '--output-dir', str(work_dir / 'data')],
+            check=True, stdout=subprocess.DEVNULL
+        )
+        input_size_mb = sum(
+            f.stat().st_size for f in (work_dir / 'data').glob('*.json')
+        ) / (1024 * 1024)
+
+        print(f"  ETLを実行中（{scale}x）...")
+        result_file = work_dir / 'result.json'
+        command = [sys.executable, str(Path(__file__).resolve()), '--worker', str(work_dir),
+                   '--result-file', str(result_file)]
+        if verbose:
+            command.append('--verbose')
+        subprocess.run(command, check=True)
+
+        with open(result_file, 'r', encoding='utf-8') as f:
+            result = json.load(f)
+
+    stages = {stage['name']: stage for stage in result['stages']}
+    total_time = sum(stages[name]['wall_time'] for name in SUMMARY_STAGES if name in stages)
+    media_count = sum((stages.get(name, {}).get('rows_out') or 0) for name in ('anime_base', 'manga_base'))
+    peak_values = [stage['peak_rss_mb'] for stage in result['stages'] if stage['peak_rss_mb'] is not None]
+
+    return {
+        'scale': scale,
+        'seed': seed,
+        'media_count': media_count,
+        'input_size_mb': round(input_size_mb, 2),
+        'db_size_mb': {key: round(value, 2) for key, value in result['db_size_mb'].items()},
+        'total_time': round(total_time, 4),
+        'media_per_sec': round(media_count / total_time, 1) if total_time else None,
+        'peak_rss_mb': round(max(peak_values), 1) if peak_values else None,
+        'stages': {
+            name: {
+                'wall_time': round(stage['wall_time'], 4),
+                'rows_per_sec': round(stage['rows_per_sec'], 1) if stage['rows_per_sec'] is not None else None
+            }
+            for name, stage in stages.items()
+        }
+    }
+
+
+def load_history(history_file):
+    """ベンチマーク履歴を読み込み"""
+    history = []
+    if history_file.exists():
+        with open(history_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    history.append(json.loads(line))
+    return history
+
+
+def find_previous(history, scale, seed):
+    """同じ倍率・シードの直近の結果を取得"""
+    for entry in reversed(history):
+        if entry.get('scale') == scale and entry.get('seed') == seed:
+            return entry
+    return None
+
+
+def format_change(current, previous):
+    """前回比（%）の表示用文字列"""
+    if current is None or not previous:
+        return '-'
+    return f"{(current - previous) / previous * 100:+.1f}%"
+
+
+def print_result(result, previous):
+    """1スケール分の結果を前回比付きで表示"""
+    print(f"\n【{result['scale']}x】作品数: {result['media_count']:,} / 入力: {result['input_size_mb']:.1f} MB"
+          f" / DB: {sum(result['db_size_mb'].values()):.1f} MB")
+    if previous:
+        print(f"  比較対象: {previous.get('revision') or '不明'} ({previous.get('timestamp')})")
+
+    print(f"  {'ステージ':<24} {'実時間(s)':>10} {'前回比':>9} {'行/秒':>12}")
+    print("  " + "-" * 60)
+    for name in SUMMARY_STAGES:
+        stage = result['stages'].get(name)
+        if not stage:
+            continue
+        previous_stage = (previous or {}).get('stages', {}).get(name, {})
+        rate_text = f"{stage['rows_per_sec']:,.0f}" if stage['rows_per_sec'] is not None else '-'
+        print(f"  {name:<24} {stage['wall_time']:>10.3f} "
+              f"{format_change(stage['wall_time'], previous_stage.get('wall_time')):>9} {rate_text:>12}")
+
+    previous = previous or {}
+    print("  " + "-" * 60)
+    print(f"  {'合計':<24} {result['total_time']:>10.3f} "
+          f"{format_change(result['total_time'], previous.get('total_time')):>9}")
+    print(f"  スループット: {result['media_per_sec']:,.1f} 作品/秒 "
+          f"({format_change(result['media_per_sec'], previous.get('media_per_sec'))})")
+    if result['peak_rss_mb'] is not None:
+        print(f"  ピークRSS: {result['peak_rss_mb']:.1f} MB "
+              f"({format_change(result['peak_rss_mb'], previous.get('peak_rss_mb'))})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='合成データによるETLベンチマークツール')
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10], choices=[1, 10, 100],
+                        help='計測する倍率（100倍は数GBのメモリと数十分を要する）')
+    parser.add_argument('--seed', type=int, default=42, help='合成データの乱数シード')
+    parser.add_argument('--history-file', default=None,
+                        help=f"結果を追記する履歴ファイル（デフォルト: {DEFAULT_HISTORY_FILE}）")
+    parser.add_argument('--no-save', action='store_true', help='履歴ファイルに結果を保存しない')
+    parser.add_argument('--verbose', action='store_true', help='ETLの出力をそのまま表示')
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    parser.add_argument('--result-file', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        return run_worker(args.worker, args.result_file, verbose=args.verbose)
+
+    print("="*70)
+    print("ETLベンチマーク（合成データ）")
+    print("="*70)
+
+    history_file = Path(args.history_file) if args.history_file else DEFAULT_HISTORY_FILE
+    history = load_history(history_file)
+    revision = git_revision()
+    timestamp = datetime.now().isoformat(timespec='seconds')
+    print(f"リビジョン: {revision or '不明'}")
+
+    results = []
+    try:
+        for scale in args.scales:
+            print(f"\n{'='*50}")
+            print(f"【{scale}x】")
+            print(f"{'='*50}")
+            result = run_scale(scale, args.seed, verbose=args.verbose)
+            result['revision'] = revision
+            result['timestamp'] = timestamp
+            results.append(result)
+            print_result(result, find_previous(history, scale, args.seed))
+    except subprocess.CalledProcessError as e:
+        print(f"エラーが発生しました: {e}")
+        return 1
+
+    if not args.no_save:
+        history_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(history_file, 'a', encoding='utf-8') as f:
+            for result in results:
+                f.write(json.dumps(result, ensure_ascii=False) + '\n')
+        print(f"\n履歴に保存しました: {history_file}")
+
+    print(f"\n{'='*70}")
+    print("完了しました！")
+    print(f"{'='*70}")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
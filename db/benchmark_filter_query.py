@@ -0,0 +1,126 @@
+import argparse
+import sqlite3
+import time
+from pathlib import Path
+
+from db_builds import current_db_dir
+from filter_query import ANIME_COLUMNS, FILTER_FACETS, MATCH_ALL, build_filter_query
+
+
+BASE_DIR = Path(__file__).parent
+
+# 従来のクエリで各項目に使っていた LEFT JOIN の別名
+LEGACY_ALIASES = {
+    'voiceactors': 'v',
+    'studios': 's',
+    'genres': 'g',
+    'staff': 'st',
+    'characters': 'c'
+}
+
+
+def legacy_filter_query(facet_names):
+    """従来の get_filtered_anime_data() と同じ LEFT JOIN + DISTINCT のクエリ
+
+    Returns:
+        tuple: (SQL, パラメータ, DISTINCT前の行数を数えるSQL)
+    """
+    joins = []
+    conditions = ['a.title_romaji IS NOT NULL']
+    params = []
+    for facet, names in facet_names.items():
+        table_name, _, name_column = FILTER_FACETS[facet]
+        alias = LEGACY_ALIASES[facet]
+        joins.append(f"LEFT JOIN {table_name} {alias} ON a.anilist_id = {alias}.anilist_id")
+        conditions.append(f"{alias}.{name_column} IN ({','.join('?' for _ in names)})")
+        params.extend(names)
+    from_where = f"FROM anime a {' '.join(joins)} WHERE {' AND '.join(conditions)}"
+    query = f"SELECT DISTINCT {ANIME_COLUMNS} {from_where} ORDER BY a.meanScore DESC NULLS LAST"
+    return query, params, f"SELECT COUNT(*) {from_where}"
+
+
+def top_names(conn, facet, count):
+    """作品数の多い名前（最悪ケースの選択）を取得"""
+    table_name, _, name_column = FILTER_FACETS[facet]
+    rows = conn.execute(f'''
+        SELECT {name_column}
+        FROM {table_name}
+        WHERE {name_column} IS NOT NULL
+        GROUP BY {name_column}
+        ORDER BY COUNT(DISTINCT anilist_id) DESC, {name_column}
+        LIMIT ?
+    ''', (count,)).fetchall()
+    return [row[0] for row in rows]
+
+
+def time_query(conn, query, params, repeat):
+    """クエリの平均実行時間（秒）と結果の作品IDを取得"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        rows = conn.execute(query, params).fetchall()
+    return (time.perf_counter() - start) / repeat, [row[0] for row in rows]
+
+
+def build_cases(conn, selection_size):
+    """計測する選択の組み合わせ（作品数の多い名前を複数項目で選択）"""
+    names = {facet: top_names(conn, facet, selection_size) for facet in FILTER_FACETS}
+    return [
+        ('声優+ジャンル', {'voiceactors': names['voiceactors'], 'genres': names['genres']}),
+        ('声優+スタッフ+キャラクター', {'voiceactors': names['voiceactors'], 'staff': names['staff'],
+                                'characters': names['characters']}),
+        ('全項目', names)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='フィルタークエリのベンチマークツール')
+    parser.add_argument('--db', default=None, help='対象のanime_data.db（デフォルト: 公開中のビルド）')
+    parser.add_argument('--selection-size', type=int, default=10, help='各項目で選択する名前の数')
+    parser.add_argument('--repeat', type=int, default=3, help='時間計測の繰り返し回数')
+    args = parser.parse_args()
+
+    print("="*70)
+    print("フィルタークエリ ベンチマーク（LEFT JOIN + DISTINCT と準結合の比較）")
+    print("="*70)
+
+    db_file = Path(args.db) if args.db else current_db_dir(BASE_DIR) / 'anime_data.db'
+    if not db_file.exists():
+        print(f"エラー: データベースが見つかりません: {db_file}")
+        return 1
+    print(f"データベース: {db_file} / 各項目の選択数: {args.selection_size}")
+
+    conn = sqlite3.connect(db_file)
+    try:
+        for label, facet_names in build_cases(conn, args.selection_size):
+            print(f"\n【{label}】")
+            legacy_query, legacy_params, count_query = legacy_filter_query(facet_names)
+            join_rows = conn.execute(count_query, legacy_params).fetchone()[0]
+            legacy_time, legacy_ids = time_query(conn, legacy_query, legacy_params, args.repeat)
+
+            start = time.perf_counter()
+            query, params = build_filter_query(conn, facet_names=facet_names)
+            build_time = time.perf_counter() - start
+            semi_time, semi_ids = time_query(conn, query, params, args.repeat)
+
+            match_modes = {facet: MATCH_ALL for facet in facet_names}
+            all_query, all_params = build_filter_query(conn, facet_names=facet_names, match_modes=match_modes)
+            all_time, all_ids = time_query(conn, all_query, all_params, args.repeat)
+
+            same = sorted(legacy_ids) == sorted(semi_ids)
+            print(f"  LEFT JOIN + DISTINCT: {legacy_time * 1000:9.2f} ms（DISTINCT前 {join_rows:,}行 → {len(legacy_ids):,}件）")
+            print(f"  準結合（いずれか）    : {semi_time * 1000:9.2f} ms（{len(semi_ids):,}件 / 名前→ID変換 {build_time * 1000:.2f} ms）")
+            print(f"  準結合（すべて）      : {all_time * 1000:9.2f} ms（{len(all_ids):,}件）")
+            print(f"  結果の一致: {'✓' if same else '✗ 不一致'}")
+            if not same:
+                return 1
+    finally:
+        conn.close()
+
+    print(f"\n{'='*70}")
+    print("完了しました！")
+    print(f"{'='*70}")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
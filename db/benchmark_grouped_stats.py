@@ -0,0 +1,204 @@
+import argparse
+import sqlite3
+import time
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+from db_builds import current_db_dir
+from grouped_stats import STAT_COLUMNS, grouped_statistics, period_statistics
+
+
+BASE_DIR = Path(__file__).parent
+
+# 合成データのジャンル・原作・フォーマット（AniListの値）
+GENRES = ['Action', 'Adventure', 'Comedy', 'Drama', 'Ecchi', 'Fantasy', 'Horror', 'Mahou Shoujo', 'Mecha',
+          'Music', 'Mystery', 'Psychological', 'Romance', 'Sci-Fi', 'Slice of Life', 'Sports',
+          'Supernatural', 'Thriller', 'Hentai']
+SOURCES = ['ORIGINAL', 'MANGA', 'LIGHT_NOVEL', 'VISUAL_NOVEL', 'VIDEO_GAME', 'NOVEL', 'WEB_NOVEL', 'OTHER']
+FORMATS = ['TV', 'MOVIE', 'OVA', 'ONA', 'SPECIAL', 'TV_SHORT', 'MUSIC']
+
+# 基礎統計タブの指標と年代（streamlit/stats_app.py と同じ）
+METRICS = ['meanScore', 'favorites', 'popularity']
+DECADE_RANGES = {
+    "1900年代": (1900, 1999),
+    "2000年代": (2000, 2009),
+    "2010年代": (2010, 2019),
+    "2020年代": (2020, 2029)
+}
+
+
+def load_genre_rows(db_file):
+    """stats_app の load_genre_data() と同じ形（作品 × ジャンルの行）のデータを取得"""
+    conn = sqlite3.connect(db_file)
+    try:
+        return pd.read_sql_query('''
+            SELECT g.genre_name, a.anilist_id, a.format, a.source, a.seasonYear,
+                   a.favorites, a.meanScore, a.popularity
+            FROM genres g
+            JOIN anime a ON g.anilist_id = a.anilist_id
+            WHERE a.title_romaji IS NOT NULL
+        ''', conn)
+    finally:
+        conn.close()
+
+
+def generate_genre_rows(size, seed):
+    """作品数 size の合成データ（1作品あたり1〜4ジャンル、指標は対数正規・正規分布）"""
+    rng = np.random.default_rng(seed)
+    media = pd.DataFrame({
+        'anilist_id': np.arange(size),
+        'format': rng.choice(FORMATS, size),
+        'source': rng.choice(SOURCES, size),
+        'seasonYear': rng.integers(1960, 2026, size).astype(float),
+        'favorites': np.floor(rng.lognormal(mean=3.0, sigma=2.0, size=size)),
+        'meanScore': np.clip(np.round(rng.normal(65, 10, size)), 10, 100),
+        'popularity': np.floor(rng.lognormal(mean=8.0, sigma=1.5, size=size))
+    })
+    genre_counts = rng.integers(1, 5, size)
+    media_index = np.repeat(np.arange(size), genre_counts)
+    rows = media.iloc[media_index].reset_index(drop=True)
+    rows.insert(0, 'genre_name', rng.choice(GENRES, len(rows)))
+    return rows.drop_duplicates(['anilist_id', 'genre_name']).reset_index(drop=True)
+
+
+def legacy_statistics(data, value_col, group_cols):
+    """従来の実装（グループ・年度ごとにデータ全体をマスクで切り出して1つずつ計算）"""
+    records = []
+    group_values = [sorted(data[col].dropna().unique()) for col in group_cols]
+
+    def visit(subset, depth, keys):
+        if depth == len(group_cols):
+            values = pd.to_numeric(subset[value_col], errors='coerce').dropna()
+            if len(values) == 0:
+                return
+            records.append({
+                **dict(zip(group_cols, keys)),
+                '合計': values.sum(), 'カウント': len(values), '最大': values.max(), '最小': values.min(),
+                '平均': values.mean(), '中央値': values.median(), '1/4分位': values.quantile(0.25),
+                '3/4分位': values.quantile(0.75), '標準偏差': values.std(), '分散': values.var()
+            })
+            return
+        for value in group_values[depth]:
+            part = subset[subset[group_cols[depth]] == value]
+            if not part.empty:
+                visit(part, depth + 1, keys + [value])
+
+    visit(data, 0, [])
+    return pd.DataFrame(records, columns=group_cols + STAT_COLUMNS)
+
+
+def legacy_period_statistics(data, value_cols):
+    """従来の期間別統計（指標ごとに、年度・年代ごとのマスクで切り出して計算）"""
+    result = {}
+    for value_col in value_cols:
+        decade_data = data.assign(年代=np.select(
+            [data['seasonYear'].between(start_year, end_year) for start_year, end_year in DECADE_RANGES.values()],
+            list(DECADE_RANGES), default=None
+        ))
+        result[value_col] = {
+            'yearly': legacy_statistics(data, value_col, ['seasonYear']),
+            'decade': legacy_statistics(decade_data, value_col, ['年代'])
+        }
+    return result
+
+
+def same_period_statistics(expected, actual):
+    """期間別統計（年度別・年代別の表）が全指標で一致するか"""
+    return all(
+        same_statistics(expected[metric][table], actual[metric][table])
+        for metric in expected for table in ('yearly', 'decade')
+    )
+
+
+def time_call(function, repeat):
+    """関数の平均実行時間（秒）と最後の結果を取得"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = function()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def same_statistics(expected, actual):
+    """2つの統計表が一致するか（浮動小数点の誤差は許容）"""
+    if len(expected) != len(actual):
+        return False
+    expected = expected.reset_index(drop=True)
+    actual = actual.reset_index(drop=True)
+    return all(
+        np.allclose(expected[col].astype(float), actual[col].astype(float), rtol=1e-9, equal_nan=True)
+        for col in STAT_COLUMNS
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='グループ別基礎統計のベンチマークツール')
+    parser.add_argument('--db', default=None, help='対象のanime_data.db（デフォルト: 公開中のビルド）')
+    parser.add_argument('--metric', choices=['favorites', 'meanScore', 'popularity'], default='favorites',
+                        help='統計を計算する指標')
+    parser.add_argument('--synthetic-size', type=int, default=None,
+                        help='DBの代わりに指定作品数の合成データで計測（全作品規模なら 20000 程度）')
+    parser.add_argument('--repeat', type=int, default=3, help='時間計測の繰り返し回数')
+    parser.add_argument('--seed', type=int, default=42, help='合成データの乱数シード')
+    args = parser.parse_args()
+
+    print("="*70)
+    print("グループ別基礎統計 ベンチマーク（グループごとのループと1回の groupby の比較）")
+    print("="*70)
+
+    if args.synthetic_size:
+        print(f"合成データ: {args.synthetic_size:,}作品（seed={args.seed}）")
+        data = generate_genre_rows(args.synthetic_size, args.seed)
+    else:
+        db_file = Path(args.db) if args.db else current_db_dir(BASE_DIR) / 'anime_data.db'
+        if not db_file.exists():
+            print(f"エラー: データベースが見つかりません: {db_file}")
+            return 1
+        print(f"データベース: {db_file}")
+        data = load_genre_rows(db_file)
+
+    if data.empty:
+        print("エラー: 対象のデータがありません")
+        return 1
+    print(f"行数: {len(data):,}（作品 × ジャンル）/ 指標: {args.metric}")
+
+    cases = [
+        ('ジャンル別', ['genre_name']),
+        ('年度 × ジャンル別', ['seasonYear', 'genre_name']),
+        ('原作別', ['source']),
+        ('年度 × 原作別', ['seasonYear', 'source'])
+    ]
+    print(f"\n  {'集計':<16} {'グループ数':>10} {'ループ':>12} {'groupby':>12} {'高速化':>8}  一致")
+    all_same = True
+    for label, group_cols in cases:
+        # 原作別は作品単位（ジャンルの行の重複を除く）
+        case_data = data.drop_duplicates('anilist_id') if 'genre_name' not in group_cols else data
+        legacy_time, expected = time_call(lambda: legacy_statistics(case_data, args.metric, group_cols),
+                                          args.repeat)
+        kernel_time, actual = time_call(lambda: grouped_statistics(case_data, args.metric, group_cols),
+                                        args.repeat)
+        same = same_statistics(expected, actual)
+        all_same = all_same and same
+        print(f"  {label:<16} {len(actual):>10,} {legacy_time * 1000:>9.1f} ms {kernel_time * 1000:>9.1f} ms "
+              f"{legacy_time / kernel_time:>7.1f}x  {'✓' if same else '✗ 不一致'}")
+
+    # 基礎統計タブの期間別統計（全指標の年度別・年代別の表）
+    media_data = data.drop_duplicates('anilist_id')
+    legacy_time, expected = time_call(lambda: legacy_period_statistics(media_data, METRICS), args.repeat)
+    kernel_time, actual = time_call(
+        lambda: period_statistics(media_data, METRICS, 'seasonYear', DECADE_RANGES), args.repeat
+    )
+    same = same_period_statistics(expected, actual)
+    all_same = all_same and same
+    groups = sum(len(actual[metric]['yearly']) + len(actual[metric]['decade']) for metric in actual)
+    print(f"  {'期間別（全指標）':<16} {groups:>10,} {legacy_time * 1000:>9.1f} ms {kernel_time * 1000:>9.1f} ms "
+          f"{legacy_time / kernel_time:>7.1f}x  {'✓' if same else '✗ 不一致'}")
+
+    print(f"\n{'='*70}")
+    print("完了しました！" if all_same else "エラー: 結果が一致しません")
+    print(f"{'='*70}")
+    return 0 if all_same else 1
+
+
+if __name__ == "__main__":
+    exit(main())
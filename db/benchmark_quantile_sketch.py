@@ -0,0 +1,174 @@
+import argparse
+import sqlite3
+import time
+from pathlib import Path
+import numpy as np
+
+from db_builds import current_db_dir
+from quantile_sketch import DEFAULT_COMPRESSION, QuantileSketch
+
+
+BASE_DIR = Path(__file__).parent
+
+# 比較する分位点
+QUANTILES = [0.01, 0.25, 0.5, 0.75, 0.99]
+
+# 年代の範囲（streamlit/stats_app.py の DECADE_RANGES と同じ）
+DECADE_RANGES = {
+    "1900年代": (1900, 1999),
+    "2000年代": (2000, 2009),
+    "2010年代": (2010, 2019),
+    "2020年代": (2020, 2029)
+}
+
+
+def load_yearly_values(db_file, metric):
+    """作品の指標を年度ごとにまとめて取得（統計キューブと同じくタイトルのある作品のみ）"""
+    conn = sqlite3.connect(db_file)
+    try:
+        rows = conn.execute(f'''
+            SELECT seasonYear, {metric}
+            FROM anime
+            WHERE title_romaji IS NOT NULL AND seasonYear IS NOT NULL AND {metric} IS NOT NULL
+        ''').fetchall()
+    finally:
+        conn.close()
+    yearly = {}
+    for year, value in rows:
+        yearly.setdefault(int(year), []).append(value)
+    return {year: np.array(values, dtype=np.float64) for year, values in yearly.items()}
+
+
+def generate_yearly_values(size, seed):
+    """お気に入り数に近い裾の重い分布（対数正規）の合成データを年度ごとに作成"""
+    rng = np.random.default_rng(seed)
+    years = rng.integers(1960, 2026, size)
+    values = np.floor(rng.lognormal(mean=3.0, sigma=2.0, size=size))
+    return {int(year): values[years == year] for year in np.unique(years)}
+
+
+def rank_error(sorted_values, estimate, q):
+    """推定値の順位誤差（推定値の順位 / 件数 と q の差）"""
+    n = len(sorted_values)
+    low = np.searchsorted(sorted_values, estimate, side='left') / n
+    high = np.searchsorted(sorted_values, estimate, side='right') / n
+    # 同じ値が並ぶ範囲に q があれば誤差なし
+    if low <= q <= high:
+        return 0.0
+    return min(abs(low - q), abs(high - q))
+
+
+def compare_level(label, groups, sketches):
+    """グループごとの厳密な分位点とスケッチの分位点を比較して最大誤差を返す"""
+    max_value_error = {q: 0.0 for q in QUANTILES}
+    max_rank_error = {q: 0.0 for q in QUANTILES}
+    for key, values in groups.items():
+        sorted_values = np.sort(values)
+        spread = sorted_values[-1] - sorted_values[0]
+        for q in QUANTILES:
+            exact = float(np.quantile(sorted_values, q))
+            estimate = sketches[key].quantile(q)
+            value_error = abs(estimate - exact) / spread if spread > 0 else 0.0
+            max_value_error[q] = max(max_value_error[q], value_error)
+            max_rank_error[q] = max(max_rank_error[q], rank_error(sorted_values, estimate, q))
+
+    print(f"\n【{label}】{len(groups)}グループ")
+    print(f"  {'分位点':>8} {'最大順位誤差':>12} {'最大値誤差(範囲比)':>18}")
+    for q in QUANTILES:
+        print(f"  {q:>8.2f} {max_rank_error[q]:>12.4%} {max_value_error[q]:>18.4%}")
+    return max_rank_error
+
+
+def run_benchmark(yearly, compression, repeat):
+    """年別 → 年代別 → 全期間のロールアップを厳密計算とスケッチの結合で比較"""
+    decades = {}
+    for decade_name, (start_year, end_year) in DECADE_RANGES.items():
+        years = [year for year in yearly if start_year <= year <= end_year]
+        if years:
+            decades[decade_name] = years
+    total_count = sum(len(values) for values in yearly.values())
+    print(f"データ: {total_count:,}件 / {len(yearly)}年度 / compression={compression}")
+
+    # ETLで行う処理: 年度ごとのスケッチ作成
+    start = time.perf_counter()
+    yearly_sketches = {year: QuantileSketch.from_values(values, compression) for year, values in yearly.items()}
+    build_time = time.perf_counter() - start
+    storage_bytes = sum(len(sketch.to_bytes()) for sketch in yearly_sketches.values())
+    raw_bytes = total_count * 8
+
+    # 画面で行う処理: 厳密計算（生データの切り出し）とスケッチの結合
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for years in decades.values():
+            np.quantile(np.concatenate([yearly[year] for year in years]), QUANTILES)
+        np.quantile(np.concatenate(list(yearly.values())), QUANTILES)
+    exact_time = (time.perf_counter() - start) / repeat
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        decade_sketches = {
+            name: QuantileSketch.merge_all([yearly_sketches[year] for year in years], compression)
+            for name, years in decades.items()
+        }
+        overall_sketch = QuantileSketch.merge_all(list(decade_sketches.values()), compression)
+        for sketch in list(decade_sketches.values()) + [overall_sketch]:
+            [sketch.quantile(q) for q in QUANTILES]
+    merge_time = (time.perf_counter() - start) / repeat
+
+    compare_level("年別（スケッチ作成直後）", yearly, yearly_sketches)
+    compare_level("年代別（年別スケッチの結合）",
+                  {name: np.concatenate([yearly[year] for year in years]) for name, years in decades.items()},
+                  decade_sketches)
+    max_rank_error = compare_level("全期間（年代別スケッチの結合）",
+                                   {'全期間': np.concatenate(list(yearly.values()))},
+                                   {'全期間': overall_sketch})
+
+    print("\n【時間・容量】")
+    print(f"  スケッチ作成（ETL）: {build_time * 1000:.1f} ms")
+    print(f"  年代別+全期間の分位点 厳密計算: {exact_time * 1000:.2f} ms")
+    print(f"  年代別+全期間の分位点 スケッチ結合: {merge_time * 1000:.2f} ms")
+    print(f"  保存容量: スケッチ {storage_bytes / 1024:.1f} KB / 生データ {raw_bytes / 1024:.1f} KB")
+    return max(max_rank_error.values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description='分位点スケッチのベンチマークツール')
+    parser.add_argument('--db', default=None, help='対象のanime_data.db（デフォルト: 公開中のビルド）')
+    parser.add_argument('--metric', choices=['favorites', 'meanScore', 'popularity'], default='favorites',
+                        help='比較する指標')
+    parser.add_argument('--synthetic-size', type=int, default=None,
+                        help='DBの代わりに指定件数の合成データ（対数正規分布）で計測')
+    parser.add_argument('--compression', type=int, default=DEFAULT_COMPRESSION, help='スケッチの圧縮パラメータ')
+    parser.add_argument('--repeat', type=int, default=5, help='時間計測の繰り返し回数')
+    parser.add_argument('--seed', type=int, default=42, help='合成データの乱数シード')
+    args = parser.parse_args()
+
+    print("="*70)
+    print("分位点スケッチ ベンチマーク（厳密計算との比較）")
+    print("="*70)
+
+    if args.synthetic_size:
+        print(f"合成データ: {args.synthetic_size:,}件（seed={args.seed}）")
+        yearly = generate_yearly_values(args.synthetic_size, args.seed)
+    else:
+        db_file = Path(args.db) if args.db else current_db_dir(BASE_DIR) / 'anime_data.db'
+        if not db_file.exists():
+            print(f"エラー: データベースが見つかりません: {db_file}")
+            return 1
+        print(f"データベース: {db_file} / 指標: {args.metric}")
+        yearly = load_yearly_values(db_file, args.metric)
+
+    if not yearly:
+        print("エラー: 対象のデータがありません")
+        return 1
+
+    max_rank_error = run_benchmark(yearly, args.compression, args.repeat)
+
+    print(f"\n{'='*70}")
+    print(f"完了しました！（全期間の最大順位誤差: {max_rank_error:.4%}）")
+    print(f"{'='*70}")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
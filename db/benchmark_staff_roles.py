@@ -0,0 +1,197 @@
+import argparse
+import json
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from run_all_processes import AnimeDataProcessor
+from staff_roles import RoleClassifier, count_roles, extract_staff_role_class_data, match_target_roles
+
+# 合成データの生成は data/synthetic_data.py を共用する
+sys.path.append(str(Path(__file__).parent.parent / 'data'))
+from synthetic_data import SyntheticAniListGenerator
+
+
+ANIME_TARGET_ROLES = ['Director', 'Character Design', 'Theme Song', 'Music']
+MANGA_TARGET_ROLES = ['Story & Art', 'Assistant', 'Story', 'Art', 'Illustration']
+
+
+def legacy_analyze_roles(json_data, target_names):
+    """従来の analyze_staff_roles()（data/staff_check.py）の照合部分
+
+    全エッジに対して全対象ロールを .lower() して照合する（エッジ数 × 対象ロール数）。
+
+    Returns:
+        (target_roles, all_roles): 対象ロールごとの集計と、ロール文字列ごとの件数
+    """
+    target_roles = {target: {'partial': 0, 'exact': 0, 'ids': set()} for target in target_names}
+    all_roles = defaultdict(int)
+    for item in json_data:
+        if isinstance(item, dict):
+            item_id = item.get('id')
+            staff_data = item.get('staff', {})
+            if isinstance(staff_data, dict) and 'edges' in staff_data:
+                for edge in staff_data['edges']:
+                    if isinstance(edge, dict) and 'role' in edge:
+                        role = edge['role']
+                        if role:
+                            all_roles[role] += 1
+                            for target_role in target_roles:
+                                if role == target_role:
+                                    target_roles[target_role]['exact'] += 1
+                                    target_roles[target_role]['ids'].add(item_id)
+                                elif target_role.lower() in role.lower():
+                                    target_roles[target_role]['partial'] += 1
+                                    target_roles[target_role]['ids'].add(item_id)
+    return target_roles, all_roles
+
+
+def analyze_roles(json_data, target_names):
+    """現在の analyze_staff_roles() の集計（ロール文字列ごとに集計してから1回だけ照合）"""
+    role_counts, role_item_ids = count_roles(json_data)
+    return match_target_roles(role_counts, role_item_ids, target_names), role_counts
+
+
+def legacy_extract_staff_data(json_data):
+    """従来の AnimeDataProcessor.extract_staff_data()（エッジごとに .lower() と部分一致の連鎖）"""
+    staff_records = []
+    for item in json_data:
+        anilist_id = item.get('id')
+        staff_data = item.get('staff', {})
+        if isinstance(staff_data, dict) and 'edges' in staff_data:
+            for edge in staff_data['edges']:
+                if isinstance(edge, dict):
+                    role = edge.get('role')
+                    node = edge.get('node')
+                    if role and isinstance(node, dict):
+                        unified_role = None
+                        role_lower = role.lower()
+                        if 'director' in role_lower:
+                            unified_role = 'Director'
+                        elif 'character design' in role_lower:
+                            unified_role = 'Character Design'
+                        elif 'theme song' in role_lower or 'music' in role_lower:
+                            unified_role = 'Music'
+                        if unified_role:
+                            name_data = node.get('name', {})
+                            staff_name = None
+                            if isinstance(name_data, dict):
+                                staff_name = name_data.get('full') or name_data.get('native')
+                            staff_records.append({
+                                'staff_id': node.get('id'),
+                                'role': unified_role,
+                                'staff_name': staff_name,
+                                'favorites': node.get('favourites'),
+                                'anilist_id': anilist_id
+                            })
+    return staff_records
+
+
+def edge_count(json_data):
+    return sum(len((item.get('staff') or {}).get('edges') or []) for item in json_data)
+
+
+def walk_edges(json_data):
+    """全スタッフエッジのロールを読むだけの走査（JSONのエッジを1件ずつ扱う方式の下限）"""
+    count = 0
+    for item in json_data:
+        for edge in (item.get('staff') or {}).get('edges') or []:
+            if edge.get('role'):
+                count += 1
+    return count
+
+
+def best_time(func, repeat):
+    """最速の実行時間（秒）と最後の結果"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def print_comparison(label, legacy_time, new_time, walk_time, same):
+    """全体の時間と、エッジの走査（下限）を除いた照合・集計部分の時間を表示"""
+    legacy_work = max(legacy_time - walk_time, 1e-9)
+    new_work = max(new_time - walk_time, 1e-9)
+    print(f"\n【{label}】")
+    print(f"  従来          : {legacy_time * 1000:10.1f} ms（走査を除く {legacy_work * 1000:8.1f} ms）")
+    print(f"  新方式        : {new_time * 1000:10.1f} ms（走査を除く {new_work * 1000:8.1f} ms）")
+    print(f"  エッジの走査のみ: {walk_time * 1000:10.1f} ms（どの方式でも必要な下限）")
+    print(f"  全体 {legacy_time / new_time:.1f}倍 / 走査を除く部分 {legacy_work / new_work:.1f}倍")
+    print(f"  結果の一致: {'✓' if same else '✗ 不一致'}")
+
+
+def load_data(args):
+    """アニメ・マンガのJSONデータ（--data-dir 指定時はファイル、それ以外は合成データ）"""
+    if args.data_dir:
+        data = {}
+        for media_type in ('anime', 'manga'):
+            json_file = Path(args.data_dir) / f"anilist_rank_data_analysis_popular_all_{media_type}.json"
+            with open(json_file, 'r', encoding='utf-8') as f:
+                data[media_type] = json.load(f)
+        return data
+    generator = SyntheticAniListGenerator(scale=args.scale, seed=args.seed)
+    return {'anime': generator.generate_anime(), 'manga': generator.generate_manga()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='スタッフロール分類のベンチマークツール')
+    parser.add_argument('--scale', type=int, default=100, choices=[1, 10, 100], help='合成データのスケール')
+    parser.add_argument('--seed', type=int, default=42, help='合成データの乱数シード')
+    parser.add_argument('--data-dir', default=None, help='AniList形式のJSONのディレクトリ（指定時は合成データを使わない）')
+    parser.add_argument('--repeat', type=int, default=3, help='時間計測の繰り返し回数（最速値を表示）')
+    args = parser.parse_args()
+
+    print("="*70)
+    print("スタッフロール分類 ベンチマーク（エッジごとの照合とロール文字列ごとのメモ化の比較）")
+    print("="*70)
+
+    start = time.perf_counter()
+    data = load_data(args)
+    print(f"データ: {args.data_dir or f'合成データ {args.scale}倍'}（準備 {time.perf_counter() - start:.1f}秒）")
+    for media_type, json_data in data.items():
+        print(f"  {media_type}: {len(json_data):,}件 / スタッフエッジ {edge_count(json_data):,}件")
+
+    walk_times = {
+        media_type: best_time(lambda: walk_edges(json_data), args.repeat)[0]
+        for media_type, json_data in data.items()
+    }
+
+    all_same = True
+    for media_type, target_names in (('anime', ANIME_TARGET_ROLES), ('manga', MANGA_TARGET_ROLES)):
+        json_data = data[media_type]
+        legacy_time, legacy_result = best_time(lambda: legacy_analyze_roles(json_data, target_names), args.repeat)
+        new_time, new_result = best_time(lambda: analyze_roles(json_data, target_names), args.repeat)
+        same = legacy_result[0] == new_result[0] and dict(legacy_result[1]) == dict(new_result[1])
+        all_same &= same
+        print_comparison(f"対象ロールの集計 analyze_staff_roles（{media_type}）",
+                         legacy_time, new_time, walk_times[media_type], same)
+
+    anime_data = data['anime']
+    legacy_time, legacy_records = best_time(lambda: legacy_extract_staff_data(anime_data), args.repeat)
+    new_time, new_records = best_time(
+        lambda: AnimeDataProcessor(None).extract_staff_data(anime_data), args.repeat
+    )
+    same = legacy_records == new_records
+    all_same &= same
+    print_comparison("staffテーブル用の抽出 extract_staff_data（anime）", legacy_time, new_time, walk_times['anime'], same)
+
+    print("\n【全ロールの分類 staff_role_class（従来は対象外）】")
+    for media_type, json_data in data.items():
+        classifier = RoleClassifier()
+        classify_time, records = best_time(lambda: extract_staff_role_class_data(json_data, classifier), 1)
+        print(f"  {media_type}: {len(records):,}行 / 異なるロール {classifier.cache_size():,}種類 / "
+              f"{classify_time * 1000:.1f} ms（{len(records) / classify_time:,.0f}行/秒）")
+
+    print(f"\n{'='*70}")
+    print("完了しました！" if all_same else "結果が一致しません")
+    print(f"{'='*70}")
+    return 0 if all_same else 1
+
+
+if __name__ == "__main__":
+    exit(main())
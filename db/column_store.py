@@ -0,0 +1,153 @@
+import argparse
+import os
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from db_builds import is_published_build_dir, read_json_file, source_fingerprint, write_json_atomic
+
+
+# ビルドのディレクトリ内の列ストアの置き場所（columns/<メディア>/<列>.npy）とマニフェスト
+COLUMN_STORE_DIR_NAME = 'columns'
+COLUMN_STORE_MANIFEST_FILE_NAME = 'manifest.json'
+
+# ファイルの形式・列の定義を変更した場合はこの値を上げる（古い形式の列ストアは使わない）
+COLUMN_STORE_FORMAT_VERSION = 1
+
+# 行の索引（全ての列はこの作品IDの昇順に並ぶ）
+ROW_INDEX_COLUMN = 'anilist_id'
+
+# 数値の列の型（NULL は NaN。ダッシュボードの float32 の列と同じ値になる）
+METRIC_DTYPE = np.float32
+
+# メディア → {
+#     'db': 元のデータベース,
+#     'table': 作品のテーブル,
+#     'columns': 書き出す数値の列（相関分析・ヒストグラム・基礎統計で使う列）
+# }
+# 行はダッシュボードの作品データと同じく title_romaji のある作品
+COLUMN_STORES = {
+    'anime': {
+        'db': 'anime_data.db',
+        'table': 'anime',
+        'columns': ['favorites', 'meanScore', 'popularity', 'episode', 'seasonYear']
+    },
+    'manga': {
+        'db': 'manga_data.db',
+        'table': 'manga',
+        'columns': ['favorites', 'meanScore', 'popularity', 'episode', 'seasonYear']
+    }
+}
+
+
+def column_store_dir(db_dir, media):
+    return Path(db_dir) / COLUMN_STORE_DIR_NAME / media
+
+
+def column_path(db_dir, media, column):
+    return column_store_dir(db_dir, media) / f"{column}.npy"
+
+
+def read_column_store_manifest(db_dir, media):
+    """列ストアのマニフェストを取得（ない・読めない場合は空）"""
+    return read_json_file(column_store_dir(db_dir, media) / COLUMN_STORE_MANIFEST_FILE_NAME)
+
+
+def write_array(array, path):
+    """1列を .npy で書き出す（一時ファイルに書いてから置き換える）"""
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'wb') as f:
+        np.save(f, array, allow_pickle=False)
+    os.replace(tmp_path, path)
+
+
+def export_column_store(db_dir, media):
+    """1メディアの数値の列を作品ID順の .npy に書き出してマニフェストを更新
+
+    Returns:
+        int: 書き出した行数（元のデータベースがない場合は0）
+    """
+    definition = COLUMN_STORES[media]
+    db_file = Path(db_dir) / definition['db']
+    if not db_file.exists():
+        print(f"   スキップ: {media}（{definition['db']} がありません）")
+        return 0
+
+    columns = definition['columns']
+    conn = sqlite3.connect(f"{Path(db_file).resolve().as_uri()}?mode=ro", uri=True)
+    try:
+        rows = conn.execute(f'''
+            SELECT {ROW_INDEX_COLUMN}, {', '.join(columns)}
+            FROM {definition['table']}
+            WHERE title_romaji IS NOT NULL
+            ORDER BY {ROW_INDEX_COLUMN}
+        ''').fetchall()
+    finally:
+        conn.close()
+
+    store_dir = column_store_dir(db_dir, media)
+    store_dir.mkdir(parents=True, exist_ok=True)
+
+    write_array(np.array([row[0] for row in rows], dtype=np.int64), column_path(db_dir, media, ROW_INDEX_COLUMN))
+    for position, column in enumerate(columns, start=1):
+        values = np.array([row[position] for row in rows], dtype=np.float64)  # None → NaN
+        write_array(values.astype(METRIC_DTYPE), column_path(db_dir, media, column))
+
+    write_json_atomic(store_dir / COLUMN_STORE_MANIFEST_FILE_NAME, {
+        'format_version': COLUMN_STORE_FORMAT_VERSION,
+        'db': definition['db'],
+        'source': source_fingerprint(db_file),
+        'rows': len(rows),
+        'index': ROW_INDEX_COLUMN,
+        'columns': {column: np.dtype(METRIC_DTYPE).name for column in columns},
+        'created_at': datetime.now().isoformat(timespec='seconds')
+    })
+    print(f"   {media}: {len(rows):,}行 / {len(columns)}列")
+    return len(rows)
+
+
+def export_column_stores(db_dir, media_list=None):
+    """全メディア（または指定したメディア）の列ストアを書き出す
+
+    Returns:
+        int: 書き出した行数の合計
+    """
+    return sum(export_column_store(db_dir, media) for media in media_list or list(COLUMN_STORES))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='数値列の列ストア作成ツール')
+    parser.add_argument('--db-dir', default=None, help='データベースのディレクトリ（デフォルト: db/）')
+    parser.add_argument('--media', nargs='+', choices=list(COLUMN_STORES), help='作成するメディア')
+    parser.add_argument('--force', action='store_true',
+                        help='公開済みのビルドにも書き出す（アプリが読み込み中のファイルを書き換える）')
+    args = parser.parse_args()
+
+    base_dir = Path(__file__).parent
+    db_dir = Path(args.db_dir) if args.db_dir else base_dir
+    if is_published_build_dir(base_dir, db_dir) and not args.force:
+        print(f"エラー: {db_dir} は公開済みのビルドです。"
+              "公開中のビルドを作り直す場合は pipeline.py --only column_stores を実行してください（書き換える場合は --force）")
+        return 1
+
+    print("="*70)
+    print("数値列の列ストア作成ツール")
+    print("="*70)
+    print(f"データベースのディレクトリ: {db_dir}")
+
+    try:
+        total_rows = export_column_stores(db_dir, args.media)
+    except sqlite3.Error as e:
+        print(f"エラー: {e}")
+        return 1
+
+    print("\n" + "="*70)
+    print(f"完了しました！（合計 {total_rows:,}行）")
+    print("="*70)
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
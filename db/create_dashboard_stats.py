@@ -0,0 +1,195 @@
+import argparse
+import sqlite3
+from pathlib import Path
+
+
+# ダッシュボード用の集計テーブル定義
+# key: 集計キーの列名 / count_column: 作品数の列名 / from_clause: 集計対象（{media} はanime/manga）
+#
+# ランキング画面のジャンル・原作タブは、年度・季節・フォーマットのフィルターを作品ごとに適用し、
+# 条件に合う作品のうちお気に入り数が最も多い作品をキーの代表として表示するため、
+# 作品（×ジャンル）ごとの行は引き続き読み込む。このテーブルはキーごとの集計値
+# （従来は読み込みのたびに全作品×ジャンルの結合をCTEで集計していた部分）だけを置き換える。
+DASHBOARD_STATS_TABLES = {
+    'genre_stats': {
+        'key': 'genre_name',
+        'count_column': 'genre_count',
+        'key_expr': 'g.genre_name',
+        'from_clause': 'genres g JOIN {media} m ON g.anilist_id = m.anilist_id'
+    },
+    'source_stats': {
+        'key': 'source',
+        'count_column': 'source_count',
+        'key_expr': 'm.source',
+        'from_clause': '{media} m'
+    }
+}
+
+# 以前のバージョンで作成していた、画面から読まれない集計テーブル（再作成時に削除する）
+OBSOLETE_DASHBOARD_STATS_TABLES = ['format_stats', 'season_stats']
+
+# 指標ごとの列名の接尾辞（total_favorites, avg_mean_score など）
+METRICS = [
+    ('favorites', 'favorites'),
+    ('popularity', 'popularity'),
+    ('meanScore', 'mean_score')
+]
+
+STAT_PREFIXES = ['total', 'avg']
+
+
+def stats_columns(table_name):
+    """集計テーブルの全列名（定義順）"""
+    spec = DASHBOARD_STATS_TABLES[table_name]
+    columns = [spec['key'], spec['count_column'], 'first_year', 'last_year', 'year_range', 'count_per_year']
+    for _, suffix in METRICS:
+        columns.extend(f"{prefix}_{suffix}" for prefix in STAT_PREFIXES)
+    return columns
+
+
+def create_dashboard_stats_table(cursor, table_name):
+    """ダッシュボード用の集計テーブルを作成（列の定義が変わっても作り直せるよう既存のテーブルは削除）"""
+    columns = stats_columns(table_name)
+    column_defs = [f"{columns[0]} TEXT PRIMARY KEY", f"{columns[1]} INTEGER",
+                   'first_year INTEGER', 'last_year INTEGER', 'year_range INTEGER', 'count_per_year REAL']
+    # お気に入り数・人気度の合計は整数のまま保持する（従来のCTEの結果と同じ型）
+    integer_columns = {'total_favorites', 'total_popularity'}
+    column_defs.extend(
+        f"{column} {'INTEGER' if column in integer_columns else 'REAL'}" for column in columns[6:]
+    )
+    cursor.execute(f'DROP TABLE IF EXISTS {table_name}')
+    cursor.execute(f'''
+        CREATE TABLE {table_name} (
+            {', '.join(column_defs)}
+        )
+    ''')
+
+
+def create_dashboard_stats_tables(cursor):
+    """全てのダッシュボード用集計テーブルを作成"""
+    for table_name in OBSOLETE_DASHBOARD_STATS_TABLES:
+        cursor.execute(f'DROP TABLE IF EXISTS {table_name}')
+    for table_name in DASHBOARD_STATS_TABLES:
+        create_dashboard_stats_table(cursor, table_name)
+
+
+def extract_dashboard_stats_data(cursor, table_name, media_table='anime'):
+    """集計キーごとの作品数・年範囲・指標の合計と平均を計算
+
+    ランキング画面の従来のCTEと同じく、放送（出版）年のある作品のみを対象にする。
+    """
+    spec = DASHBOARD_STATS_TABLES[table_name]
+    from_clause = spec['from_clause'].format(media=media_table)
+    key_expr = spec['key_expr']
+    print(f"{table_name}を計算中...")
+
+    cursor.execute(f'''
+        SELECT
+            {key_expr},
+            COUNT(DISTINCT m.anilist_id),
+            MIN(m.seasonYear),
+            MAX(m.seasonYear),
+            MAX(m.seasonYear) - MIN(m.seasonYear) + 1,
+            CAST(COUNT(DISTINCT m.anilist_id) AS FLOAT) /
+                NULLIF(MAX(m.seasonYear) - MIN(m.seasonYear) + 1, 0),
+            SUM(m.favorites), AVG(m.favorites),
+            SUM(m.popularity), AVG(m.popularity),
+            SUM(m.meanScore), AVG(m.meanScore)
+        FROM {from_clause}
+        WHERE {key_expr} IS NOT NULL AND m.seasonYear IS NOT NULL
+        GROUP BY {key_expr}
+    ''')
+
+    stats_data = []
+    for row in cursor.fetchall():
+        key, count, first_year, last_year, year_range, count_per_year = row[:6]
+        record = {
+            spec['key']: key,
+            spec['count_column']: count,
+            'first_year': first_year,
+            'last_year': last_year,
+            'year_range': year_range,
+            'count_per_year': count_per_year
+        }
+        for (_, suffix), (total, avg) in zip(METRICS, zip(row[6::2], row[7::2])):
+            record[f"total_{suffix}"] = total
+            record[f"avg_{suffix}"] = avg
+        stats_data.append(record)
+
+    print(f"   処理完了: {len(stats_data)}件")
+    return stats_data
+
+
+def insert_dashboard_stats_data(cursor, table_name, stats_data):
+    """集計データを挿入（既存データは置き換え）"""
+    columns = stats_columns(table_name)
+    cursor.execute(f'DELETE FROM {table_name}')
+    cursor.executemany(f'''
+        INSERT INTO {table_name} ({', '.join(columns)})
+        VALUES ({', '.join(':' + column for column in columns)})
+    ''', stats_data)
+
+
+def build_dashboard_stats(cursor, media_table='anime'):
+    """全てのダッシュボード用集計テーブルを作成・更新
+
+    Returns:
+        dict: テーブル名 → 件数
+    """
+    create_dashboard_stats_tables(cursor)
+    counts = {}
+    for table_name in DASHBOARD_STATS_TABLES:
+        stats_data = extract_dashboard_stats_data(cursor, table_name, media_table)
+        insert_dashboard_stats_data(cursor, table_name, stats_data)
+        counts[table_name] = len(stats_data)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description='ダッシュボード用集計テーブル作成ツール')
+    parser.add_argument('--media', choices=['anime', 'manga'], default='anime', help='対象のデータベース')
+    args = parser.parse_args()
+
+    db_file = Path(__file__).parent / f"{args.media}_data.db"
+
+    print("="*70)
+    print("ダッシュボード用集計テーブル作成ツール")
+    print("="*70)
+
+    if not db_file.exists():
+        print(f"エラー: データベースが見つかりません: {db_file}")
+        return
+
+    print(f"\nデータベースに接続中: {db_file}")
+    conn = sqlite3.connect(db_file)
+    cursor = conn.cursor()
+
+    counts = build_dashboard_stats(cursor, args.media)
+    conn.commit()
+
+    print("\n" + "="*70)
+    print("【統計情報】")
+    print("="*70)
+    for table_name, count in counts.items():
+        spec = DASHBOARD_STATS_TABLES[table_name]
+        print(f"\n【{table_name}】{count}件（作品数上位5件）:")
+        cursor.execute(f'''
+            SELECT {spec['key']}, {spec['count_column']}, avg_mean_score, avg_favorites
+            FROM {table_name}
+            ORDER BY {spec['count_column']} DESC
+            LIMIT 5
+        ''')
+        for key, media_count, avg_score, avg_favorites in cursor.fetchall():
+            avg_score_text = f"{avg_score:.1f}" if avg_score is not None else '-'
+            favorites_text = f"{avg_favorites:.0f}" if avg_favorites is not None else '-'
+            print(f"  {key}: {media_count}作品, 平均スコア {avg_score_text}, お気に入り平均 {favorites_text}")
+
+    conn.close()
+
+    print("\n" + "="*70)
+    print("完了しました！")
+    print("="*70)
+
+
+if __name__ == "__main__":
+    main()
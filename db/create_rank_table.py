@@ -0,0 +1,202 @@
+import argparse
+import sqlite3
+from pathlib import Path
+
+
+# 順位の範囲 → 範囲を決める作品の列（'all' は全体）
+RANK_SCOPES = {
+    'all': [],
+    'year': ['seasonYear'],
+    'year_season': ['seasonYear', 'season'],
+    'format': ['format'],
+    'year_format': ['seasonYear', 'format']
+}
+
+# 順位を付ける対象 → (対応表（作品自体は None）, ID列, 指標 → 値の集計式, 対象のDB)
+# 人物・スタジオは範囲内の作品に関わったものを対象にする（別名 e: 対応表, a: 作品）
+RANK_ENTITIES = {
+    'media': (None, 'anilist_id', {
+        'favorites': 'MAX(a.favorites)',
+        'meanScore': 'MAX(a.meanScore)',
+        'popularity': 'MAX(a.popularity)'
+    }, ('anime', 'manga')),
+    'characters': ('characters', 'chara_id', {'favorites': 'MAX(e.favorites)'}, ('anime', 'manga')),
+    'voiceactors': ('voiceactors', 'voiceactor_id', {'favorites': 'MAX(e.favorites)'}, ('anime',)),
+    'staff': ('staff', 'staff_id', {'favorites': 'MAX(e.favorites)'}, ('anime', 'manga')),
+    'studios': ('studios', 'studios_id', {
+        'works': 'COUNT(DISTINCT a.anilist_id)',
+        'anime_favorites': 'SUM(a.favorites)'
+    }, ('anime',))
+}
+
+
+def create_rank_table(cursor):
+    """順位テーブルを作成
+
+    対象・指標・範囲（scope と範囲の値 scope_key）ごとに、値の降順の RANK / DENSE_RANK /
+    PERCENT_RANK（先頭が0）を保持する。scope_key は範囲の列の値を '|' でつないだもの
+    （例: year_format の 2023年TV → '2023|TV'、全体は ''）。
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS ranks (
+            entity TEXT,
+            entity_id INTEGER,
+            metric TEXT,
+            scope TEXT,
+            scope_key TEXT,
+            value REAL,
+            rank INTEGER,
+            dense_rank INTEGER,
+            percent_rank REAL,
+            PRIMARY KEY (entity, metric, scope, scope_key, entity_id)
+        )
+    ''')
+    # 「2023年TVの n 位から」のような範囲内の順位の検索用
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_ranks_position
+        ON ranks(entity, metric, scope, scope_key, rank)
+    ''')
+
+
+def scope_key_expression(scope):
+    """範囲の値を1つの文字列にするSQL式（作品の別名は a）"""
+    columns = RANK_SCOPES[scope]
+    if not columns:
+        return "''"
+    return " || '|' || ".join(f"CAST(a.{column} AS TEXT)" for column in columns)
+
+
+def format_scope_key(values):
+    """範囲の列の値を scope_key の形式にする（年度は整数にそろえる）"""
+    return '|'.join(str(int(value)) if isinstance(value, float) else str(value) for value in values)
+
+
+def scope_for_filters(filters):
+    """画面のフィルター（列 → 選択値）に対応する順位の範囲
+
+    年度・季節・フォーマットのうち指定された列の組み合わせが RANK_SCOPES のいずれかと
+    一致する場合はその範囲を返す（例: 年度2023・TV → ('year_format', '2023|TV')）。
+
+    Returns:
+        tuple: (scope, scope_key)。対応する範囲がない場合は None
+    """
+    scope_columns = {column for columns in RANK_SCOPES.values() for column in columns}
+    selected = {column for column in scope_columns if filters.get(column) is not None}
+    if not selected:
+        return None
+    for scope, columns in RANK_SCOPES.items():
+        if set(columns) == selected:
+            return scope, format_scope_key(filters[column] for column in columns)
+    return None
+
+
+def build_rank_table(cursor, media_table='anime'):
+    """全ての対象・指標・範囲の順位を窓関数で計算して挿入（既存データは置き換え）
+
+    範囲ごとに対象の値を1回だけ集計し（人物は範囲内の作品に関わったものの値）、
+    RANK() などの窓関数で順位を付けた結果を INSERT ... SELECT でそのまま挿入する
+    （行をPythonに読み込まない）。値が NULL の対象・範囲の列が NULL の作品は含めない。
+    対象はランキング画面と同じくタイトルのある作品。
+
+    Returns:
+        int: 作成した行数
+    """
+    print("順位を計算中...")
+
+    cursor.execute('DELETE FROM ranks')
+    for entity, (table_name, id_column, metrics, media_tables) in RANK_ENTITIES.items():
+        if media_table not in media_tables:
+            continue
+        if table_name is None:
+            source = f'{media_table} a'
+            entity_id = f'a.{id_column}'
+        else:
+            source = f'{table_name} e JOIN {media_table} a ON e.anilist_id = a.anilist_id'
+            entity_id = f'e.{id_column}'
+
+        for scope, columns in RANK_SCOPES.items():
+            conditions = ['a.title_romaji IS NOT NULL', f'{entity_id} IS NOT NULL']
+            conditions += [f'a.{column} IS NOT NULL' for column in columns]
+            for metric, aggregate in metrics.items():
+                cursor.execute(f'''
+                    INSERT INTO ranks (
+                        entity, entity_id, metric, scope, scope_key, value, rank, dense_rank, percent_rank
+                    )
+                    SELECT ?, entity_id, ?, ?, scope_key, value,
+                           RANK() OVER w, DENSE_RANK() OVER w, PERCENT_RANK() OVER w
+                    FROM (
+                        SELECT {entity_id} AS entity_id, {scope_key_expression(scope)} AS scope_key,
+                               {aggregate} AS value
+                        FROM {source}
+                        WHERE {' AND '.join(conditions)}
+                        GROUP BY {entity_id}, scope_key
+                    )
+                    WHERE value IS NOT NULL
+                    WINDOW w AS (PARTITION BY scope_key ORDER BY value DESC)
+                ''', (entity, metric, scope))
+
+    cursor.execute('SELECT COUNT(*) FROM ranks')
+    rank_count = cursor.fetchone()[0]
+    print(f"   処理完了: {rank_count}件")
+    return rank_count
+
+
+def build_rank_lookup_query(entity, metric, entity_ids, scope='all', scope_key=''):
+    """指定した対象の順位を取得するクエリを作成（主キーの検索になる）
+
+    Returns:
+        tuple: (SQL, パラメータ)
+    """
+    placeholders = ','.join('?' for _ in entity_ids)
+    query = f'''
+        SELECT entity_id, rank, dense_rank, percent_rank
+        FROM ranks
+        WHERE entity = ? AND metric = ? AND scope = ? AND scope_key = ?
+          AND entity_id IN ({placeholders})
+    '''
+    return query, [entity, metric, scope, scope_key] + list(entity_ids)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='順位テーブル作成ツール')
+    parser.add_argument('--media', choices=['anime', 'manga'], default='anime', help='対象のデータベース')
+    args = parser.parse_args()
+
+    db_file = Path(__file__).parent / f"{args.media}_data.db"
+
+    print("="*70)
+    print("順位テーブル作成ツール")
+    print("="*70)
+
+    if not db_file.exists():
+        print(f"エラー: データベースが見つかりません: {db_file}")
+        return
+
+    print(f"\nデータベースに接続中: {db_file}")
+    conn = sqlite3.connect(db_file)
+    cursor = conn.cursor()
+
+    create_rank_table(cursor)
+    build_rank_table(cursor, args.media)
+    conn.commit()
+
+    print("\n" + "="*70)
+    print("【統計情報】")
+    print("="*70)
+    cursor.execute('''
+        SELECT entity, metric, scope, COUNT(DISTINCT scope_key), COUNT(*)
+        FROM ranks
+        GROUP BY entity, metric, scope
+    ''')
+    for entity, metric, scope, partition_count, row_count in cursor.fetchall():
+        print(f"  {entity}.{metric} [{scope}]: {partition_count}範囲 / {row_count}件")
+
+    conn.close()
+
+    print("\n" + "="*70)
+    print("完了しました！")
+    print("="*70)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+import argparse
+import sqlite3
+from collections import defaultdict
+from pathlib import Path
+import numpy as np
+
+from quantile_sketch import QuantileSketch
+
+
+# キューブの次元（genre_name 以外は作品テーブルの列）
+CUBE_DIMENSIONS = ['seasonYear', 'season', 'format', 'source', 'genre_name']
+
+# 集計する指標
+CUBE_METRICS = ['favorites', 'meanScore', 'popularity']
+
+
+def create_stats_cube_table(cursor):
+    """統計キューブテーブルを作成
+
+    1作品は所属する各ジャンルのセルと、genre_name が NULL のセル（ジャンルを
+    問わない集計）の両方に入る。ジャンルをまたいで合計すると作品が重複するため、
+    ジャンル以外の集計には genre_name IS NULL のセルを使う。
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS stats_cube (
+            seasonYear INTEGER,
+            season TEXT,
+            format TEXT,
+            source TEXT,
+            genre_name TEXT,
+            metric TEXT,
+            count INTEGER,
+            total REAL,
+            m2 REAL,
+            min_value REAL,
+            max_value REAL,
+            sketch BLOB
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_stats_cube_metric ON stats_cube(metric, genre_name)')
+
+
+def summarize_values(values):
+    """値の一覧を結合可能な要約（件数・合計・偏差平方和・最小・最大・分位点スケッチ）にする"""
+    arr = np.array(values, dtype=np.float64)
+    mean = arr.mean()
+    return {
+        'count': len(arr),
+        'total': float(arr.sum()),
+        'm2': float(((arr - mean) ** 2).sum()),
+        'min_value': float(arr.min()),
+        'max_value': float(arr.max()),
+        'sketch': QuantileSketch.from_values(values).to_bytes()
+    }
+
+
+def extract_stats_cube_data(cursor, media_table='anime'):
+    """全作品の指標をキューブのセルごとに集計
+
+    セルには結合可能な要約（件数・合計・偏差平方和・最小・最大・分位点スケッチ）を
+    保持する。偏差平方和 m2 は平方和より桁落ちしにくく、セル同士の結合も
+    Chanの式で行える。対象は基礎統計画面と同じくタイトルのある作品。
+    """
+    print("統計キューブを計算中...")
+
+    cursor.execute('SELECT anilist_id, genre_name FROM genres WHERE genre_name IS NOT NULL')
+    genres_by_media = defaultdict(list)
+    for anilist_id, genre_name in cursor.fetchall():
+        genres_by_media[anilist_id].append(genre_name)
+
+    cursor.execute(f'''
+        SELECT anilist_id, seasonYear, season, format, source, favorites, meanScore, popularity
+        FROM {media_table}
+        WHERE title_romaji IS NOT NULL
+    ''')
+
+    cells = defaultdict(list)
+    media_count = 0
+    for row in cursor.fetchall():
+        anilist_id, season_year, season, media_format, source = row[:5]
+        media_count += 1
+        for metric, value in zip(CUBE_METRICS, row[5:]):
+            if value is None:
+                continue
+            cells[(season_year, season, media_format, source, None, metric)].append(value)
+            for genre_name in genres_by_media.get(anilist_id, []):
+                cells[(season_year, season, media_format, source, genre_name, metric)].append(value)
+
+    cube_data = []
+    for key, values in cells.items():
+        record = dict(zip(CUBE_DIMENSIONS + ['metric'], key))
+        record.update(summarize_values(values))
+        cube_data.append(record)
+
+    print(f"   処理完了: {media_count}作品 → {len(cube_data)}セル")
+    return cube_data
+
+
+def insert_stats_cube_data(cursor, cube_data):
+    """統計キューブを挿入（既存データは置き換え）"""
+    cursor.execute('DELETE FROM stats_cube')
+    cursor.executemany('''
+        INSERT INTO stats_cube (
+            seasonYear, season, format, source, genre_name, metric,
+            count, total, m2, min_value, max_value, sketch
+        ) VALUES (
+            :seasonYear, :season, :format, :source, :genre_name, :metric,
+            :count, :total, :m2, :min_value, :max_value, :sketch
+        )
+    ''', cube_data)
+
+
+def create_studios_sketch_table(cursor):
+    """スタジオ×年度の指標要約テーブルを作成（年代・全期間はセルの結合で求める）"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS studios_sketch (
+            studios_id INTEGER,
+            studios_name TEXT,
+            seasonYear INTEGER,
+            metric TEXT,
+            count INTEGER,
+            total REAL,
+            m2 REAL,
+            min_value REAL,
+            max_value REAL,
+            sketch BLOB
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_studios_sketch_metric ON studios_sketch(metric, seasonYear)')
+
+
+def extract_studios_sketch_data(cursor):
+    """スタジオ×年度ごとに作品の指標を要約"""
+    print("スタジオ別の指標要約を計算中...")
+
+    cursor.execute('''
+        SELECT s.studios_id, s.studios_name, a.seasonYear, a.favorites, a.meanScore, a.popularity
+        FROM studios s
+        JOIN anime a ON s.anilist_id = a.anilist_id
+        WHERE s.studios_name IS NOT NULL AND a.title_romaji IS NOT NULL
+    ''')
+
+    cells = defaultdict(list)
+    for row in cursor.fetchall():
+        studios_id, studios_name, season_year = row[:3]
+        for metric, value in zip(CUBE_METRICS, row[3:]):
+            if value is not None:
+                cells[(studios_id, studios_name, season_year, metric)].append(value)
+
+    sketch_data = []
+    for (studios_id, studios_name, season_year, metric), values in cells.items():
+        record = {
+            'studios_id': studios_id,
+            'studios_name': studios_name,
+            'seasonYear': season_year,
+            'metric': metric
+        }
+        record.update(summarize_values(values))
+        sketch_data.append(record)
+
+    print(f"   処理完了: {len(sketch_data)}セル")
+    return sketch_data
+
+
+def insert_studios_sketch_data(cursor, sketch_data):
+    """スタジオ別の指標要約を挿入（既存データは置き換え）"""
+    cursor.execute('DELETE FROM studios_sketch')
+    cursor.executemany('''
+        INSERT INTO studios_sketch (
+            studios_id, studios_name, seasonYear, metric,
+            count, total, m2, min_value, max_value, sketch
+        ) VALUES (
+            :studios_id, :studios_name, :seasonYear, :metric,
+            :count, :total, :m2, :min_value, :max_value, :sketch
+        )
+    ''', sketch_data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='統計キューブ作成ツール')
+    parser.add_argument('--media', choices=['anime', 'manga'], default='anime', help='対象のデータベース')
+    args = parser.parse_args()
+
+    db_file = Path(__file__).parent / f"{args.media}_data.db"
+
+    print("="*70)
+    print("統計キューブ作成ツール")
+    print("="*70)
+
+    if not db_file.exists():
+        print(f"エラー: データベースが見つかりません: {db_file}")
+        return
+
+    print(f"\nデータベースに接続中: {db_file}")
+    conn = sqlite3.connect(db_file)
+    cursor = conn.cursor()
+
+    create_stats_cube_table(cursor)
+    cube_data = extract_stats_cube_data(cursor, args.media)
+    insert_stats_cube_data(cursor, cube_data)
+    if args.media == 'anime':
+        create_studios_sketch_table(cursor)
+        sketch_data = extract_studios_sketch_data(cursor)
+        insert_studios_sketch_data(cursor, sketch_data)
+    conn.commit()
+
+    print("\n" + "="*70)
+    print("【統計情報】")
+    print("="*70)
+    cursor.execute('''
+        SELECT metric, COUNT(*), SUM(count), SUM(LENGTH(sketch))
+        FROM stats_cube
+        WHERE genre_name IS NULL
+        GROUP BY metric
+    ''')
+    for metric, cell_count, value_count, sketch_bytes in cursor.fetchall():
+        print(f"  {metric}: {cell_count}セル / {value_count}作品 / スケッチ {sketch_bytes / 1024:.1f} KB")
+
+    conn.close()
+
+    print("\n" + "="*70)
+    print("完了しました！")
+    print("="*70)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,330 @@
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+
+BUILDS_DIR_NAME = 'builds'
+MANIFEST_FILE_NAME = 'current_build.json'
+BUILD_MANIFEST_FILE_NAME = 'manifest.json'
+
+# 公開中のビルドに加えて保持するビルド数（ダッシュボードが直前のビルドを参照中でも消さない）
+KEEP_PREVIOUS_BUILDS = 2
+
+DB_FILE_NAMES = ['anime_data.db', 'manga_data.db']
+
+# 公開前に存在と件数を確認するテーブル
+REQUIRED_TABLES = {
+    'anime_data.db': ['anime', 'studios', 'characters', 'voiceactors', 'genres', 'staff'],
+    'manga_data.db': ['manga', 'genres', 'characters', 'staff']
+}
+
+# 1件以上のデータが必要なテーブル
+NON_EMPTY_TABLES = {
+    'anime_data.db': ['anime'],
+    'manga_data.db': ['manga']
+}
+
+
+def builds_dir(base_dir):
+    return Path(base_dir) / BUILDS_DIR_NAME
+
+
+def manifest_path(base_dir):
+    return Path(base_dir) / MANIFEST_FILE_NAME
+
+
+def write_json_atomic(path, data):
+    """一時ファイルに書き出してから置き換える（読み手が書きかけのJSONを見ないように）"""
+    path = Path(path)
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def read_json_file(path):
+    """JSONファイルを読み込む（ない・読めない場合は空の辞書）"""
+    path = Path(path)
+    if not path.exists():
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (json.JSONDecodeError, OSError):
+        return {}
+
+
+def source_fingerprint(db_file):
+    """データベースのサイズ・更新時刻（派生ファイルの作成後に変更されていないかの判定用）"""
+    stat = Path(db_file).stat()
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def read_current_manifest(base_dir):
+    """公開中のビルドのマニフェストを取得（未公開ならNone）"""
+    path = manifest_path(base_dir)
+    if not path.exists():
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (json.JSONDecodeError, OSError):
+        return None
+
+
+def current_db_dir(base_dir):
+    """公開中のビルドのディレクトリ（未公開なら従来の db/ ディレクトリ）"""
+    manifest = read_current_manifest(base_dir)
+    if manifest:
+        build_dir = builds_dir(base_dir) / manifest['build_id']
+        if build_dir.exists():
+            return build_dir
+    return Path(base_dir)
+
+
+def is_published_build_dir(base_dir, directory):
+    """公開済み（ビルド内のマニフェストがある）ビルドのディレクトリか"""
+    directory = Path(directory).resolve()
+    return (directory.parent == builds_dir(base_dir).resolve()
+            and (directory / BUILD_MANIFEST_FILE_NAME).exists())
+
+
+def create_build_dir(base_dir):
+    """新しいビルドディレクトリを作成
+
+    Returns:
+        (build_id, build_dir)
+    """
+    build_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
+    build_dir = builds_dir(base_dir) / build_id
+    build_dir.mkdir(parents=True)
+    return build_id, build_dir
+
+
+def copy_database(source, destination):
+    """SQLiteのバックアップAPIでコピー（コピー元が他プロセスで開かれていても整合性を保つ）"""
+    source_conn = sqlite3.connect(f"{Path(source).resolve().as_uri()}?mode=ro", uri=True)
+    destination_conn = sqlite3.connect(destination)
+    try:
+        source_conn.backup(destination_conn)
+    finally:
+        destination_conn.close()
+        source_conn.close()
+
+
+def seed_build(base_dir, build_dir, state_file_name=None):
+    """公開中のデータベース（とパイプラインの状態ファイル）を新しいビルドにコピー
+
+    差分実行（pipeline.py）で変更のないステージを再利用するために使う。
+    """
+    source_dir = current_db_dir(base_dir)
+    copied = []
+    for db_name in DB_FILE_NAMES:
+        source = source_dir / db_name
+        if source.exists():
+            copy_database(source, build_dir / db_name)
+            copied.append(db_name)
+
+    if state_file_name and (source_dir / state_file_name).exists():
+        shutil.copy2(source_dir / state_file_name, build_dir / state_file_name)
+
+    return source_dir, copied
+
+
+def validate_build(build_dir, required_tables=None, non_empty_tables=None):
+    """ビルドを検証
+
+    Returns:
+        (errors, table_counts): エラーメッセージのリストと、DBごとのテーブル件数
+    """
+    required_tables = REQUIRED_TABLES if required_tables is None else required_tables
+    non_empty_tables = NON_EMPTY_TABLES if non_empty_tables is None else non_empty_tables
+
+    errors = []
+    table_counts = {}
+    for db_name in DB_FILE_NAMES:
+        db_file = Path(build_dir) / db_name
+        if not db_file.exists():
+            errors.append(f"{db_name} がありません")
+            continue
+
+        conn = sqlite3.connect(f"{Path(db_file).resolve().as_uri()}?mode=ro", uri=True)
+        try:
+            result = conn.execute('PRAGMA quick_check').fetchone()[0]
+            if result != 'ok':
+                errors.append(f"{db_name}: quick_check に失敗しました ({result})")
+
+            tables = [row[0] for row in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' ORDER BY name"
+            )]
+            counts = {}
+            for table in tables:
+                counts[table] = conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+            table_counts[db_name] = counts
+
+            for table in required_tables.get(db_name, []):
+                if table not in counts:
+                    errors.append(f"{db_name}: {table} テーブルがありません")
+            for table in non_empty_tables.get(db_name, []):
+                if counts.get(table, 0) == 0:
+                    errors.append(f"{db_name}: {table} テーブルが空です")
+        except sqlite3.Error as e:
+            errors.append(f"{db_name}: {e}")
+        finally:
+            conn.close()
+
+    return errors, table_counts
+
+
+def publish_build(base_dir, build_id, table_counts, builder=None, input_files=None):
+    """検証済みのビルドを公開（current_build.json をアトミックに差し替える）"""
+    build_dir = builds_dir(base_dir) / build_id
+    previous = read_current_manifest(base_dir)
+
+    manifest = {
+        'build_id': build_id,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'builder': builder,
+        'previous_build_id': previous['build_id'] if previous else None,
+        'databases': {
+            db_name: f"{BUILDS_DIR_NAME}/{build_id}/{db_name}"
+            for db_name in DB_FILE_NAMES if (build_dir / db_name).exists()
+        },
+        'inputs': {
+            name: {'path': str(path), 'size': path.stat().st_size, 'mtime': path.stat().st_mtime}
+            for name, path in (input_files or {}).items() if Path(path).exists()
+        },
+        'tables': table_counts
+    }
+
+    # ビルド内にもマニフェストを残しておく（ロールバック時に使う）
+    write_json_atomic(build_dir / BUILD_MANIFEST_FILE_NAME, manifest)
+    write_json_atomic(manifest_path(base_dir), manifest)
+    return manifest
+
+
+def discard_build(build_dir):
+    """失敗したビルドを削除"""
+    shutil.rmtree(build_dir, ignore_errors=True)
+
+
+def list_builds(base_dir):
+    """ビルド一覧（新しい順）"""
+    directory = builds_dir(base_dir)
+    if not directory.exists():
+        return []
+    return sorted((path for path in directory.iterdir() if path.is_dir()), key=lambda p: p.name, reverse=True)
+
+
+def prune_builds(base_dir, keep=KEEP_PREVIOUS_BUILDS, include_incomplete=False):
+    """公開中のビルドと直近の keep 件を残して古いビルドを削除
+
+    未完了のビルド（別プロセスで作成中の可能性がある）は include_incomplete=True の
+    場合のみ削除する。
+    """
+    manifest = read_current_manifest(base_dir)
+    current_id = manifest['build_id'] if manifest else None
+
+    removed = []
+    kept = 0
+    for build_dir in list_builds(base_dir):
+        if build_dir.name == current_id:
+            continue
+        if not (build_dir / BUILD_MANIFEST_FILE_NAME).exists():
+            if not include_incomplete:
+                continue
+        elif kept < keep:
+            kept += 1
+            continue
+        shutil.rmtree(build_dir, ignore_errors=True)
+        removed.append(build_dir.name)
+    return removed
+
+
+def rollback(base_dir, build_id):
+    """過去の検証済みビルドを再公開"""
+    build_manifest_file = builds_dir(base_dir) / build_id / BUILD_MANIFEST_FILE_NAME
+    if not build_manifest_file.exists():
+        raise ValueError(f"検証済みのビルドが見つかりません: {build_id}")
+
+    with open(build_manifest_file, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    previous = read_current_manifest(base_dir)
+    manifest['previous_build_id'] = previous['build_id'] if previous else None
+    manifest['rolled_back_at'] = datetime.now().isoformat(timespec='seconds')
+    write_json_atomic(manifest_path(base_dir), manifest)
+    return manifest
+
+
+def finalize_build(base_dir, build_id, build_dir, builder, input_files=None):
+    """ビルドを検証して公開（失敗時はビルドを削除）
+
+    Returns:
+        bool: 公開できた場合True
+    """
+    print(f"\n{'='*50}")
+    print("【ビルド検証】")
+    print(f"{'='*50}")
+    errors, table_counts = validate_build(build_dir)
+    if errors:
+        print("検証に失敗したため公開しません:")
+        for error in errors:
+            print(f"  - {error}")
+        discard_build(build_dir)
+        return False
+
+    manifest = publish_build(base_dir, build_id, table_counts, builder=builder, input_files=input_files)
+    print(f"✓ ビルドを公開しました: {manifest['build_id']}")
+    if manifest['previous_build_id']:
+        print(f"  前回のビルド: {manifest['previous_build_id']}")
+
+    removed = prune_builds(base_dir)
+    if removed:
+        print(f"  古いビルドを削除: {', '.join(removed)}")
+    return True
+
+
+def main():
+    """ビルドの一覧表示・ロールバック"""
+    parser = argparse.ArgumentParser(description='データベースビルド管理ツール')
+    parser.add_argument('--rollback', metavar='BUILD_ID', help='指定ビルドを再公開')
+    parser.add_argument('--prune', action='store_true', help='古いビルドを削除')
+    args = parser.parse_args()
+
+    base_dir = Path(__file__).parent
+
+    print("="*70)
+    print("データベースビルド管理ツール")
+    print("="*70)
+
+    try:
+        if args.rollback:
+            manifest = rollback(base_dir, args.rollback)
+            print(f"✓ ビルド {manifest['build_id']} を再公開しました")
+        if args.prune:
+            removed = prune_builds(base_dir, include_incomplete=True)
+            print(f"削除したビルド: {len(removed)}件")
+    except ValueError as e:
+        print(f"エラー: {e}")
+        return 1
+
+    manifest = read_current_manifest(base_dir)
+    current_id = manifest['build_id'] if manifest else None
+    print(f"\n公開中のビルド: {current_id or '（なし: db/ 直下のデータベースを使用）'}")
+    for build_dir in list_builds(base_dir):
+        marker = '*' if build_dir.name == current_id else ' '
+        status = '検証済み' if (build_dir / BUILD_MANIFEST_FILE_NAME).exists() else '未完了'
+        print(f"  {marker} {build_dir.name}  {status}")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
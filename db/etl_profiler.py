@@ -0,0 +1,330 @@
+import cProfile
+import ctypes
+import io
+import json
+import pstats
+import sqlite3
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+# sqlite3_db_status() の操作コード
+SQLITE_DBSTATUS_CACHE_HIT = 7
+SQLITE_DBSTATUS_CACHE_MISS = 8
+
+# 接続オブジェクト（pysqlite_Connection）の先頭が sqlite3* ハンドルであることを確認したCPythonのバージョン
+SQLITE_HANDLE_TESTED_VERSIONS = ((3, 8), (3, 13))
+
+_db_status_func = None
+_db_filename_func = None
+
+
+def _load_db_status_func():
+    """sqlite3_db_status() をctypes経由で取得（取得できない環境ではNone）"""
+    global _db_status_func, _db_filename_func
+    if _db_status_func is not None:
+        return _db_status_func or None
+
+    candidates = []
+    try:
+        import _sqlite3
+        candidates.append(_sqlite3.__file__)
+    except (ImportError, AttributeError):
+        pass
+    candidates.extend(['sqlite3', 'libsqlite3.so.0', 'libsqlite3.dylib'])
+
+    for candidate in candidates:
+        try:
+            library = ctypes.CDLL(candidate)
+            func = library.sqlite3_db_status
+            filename_func = library.sqlite3_db_filename
+        except (OSError, AttributeError):
+            continue
+        func.argtypes = [ctypes.c_void_p, ctypes.c_int,
+                         ctypes.POINTER(ctypes.c_int), ctypes.POINTER(ctypes.c_int), ctypes.c_int]
+        func.restype = ctypes.c_int
+        filename_func.argtypes = [ctypes.c_void_p, ctypes.c_char_p]
+        filename_func.restype = ctypes.c_char_p
+        _db_status_func = func
+        _db_filename_func = filename_func
+        return func
+
+    _db_status_func = False
+    return None
+
+
+def sqlite_cache_stats(conn):
+    """接続のページキャッシュのヒット数・ミス数を取得
+
+    Python標準のsqlite3モジュールは sqlite3_db_status() を公開していないため、
+    CPythonの接続オブジェクト先頭の sqlite3* ハンドルをctypesで参照する。
+    構造体の配置はCPythonの内部実装のため、確認済みのバージョンだけで使い、
+    さらにハンドルのファイル名（sqlite3_db_filename）が接続のファイルと一致する場合だけ呼び出す。
+    取得できない環境では None を返す。
+
+    Returns:
+        (hit, miss) または None
+    """
+    if sys.implementation.name != 'cpython':
+        return None
+    oldest, newest = SQLITE_HANDLE_TESTED_VERSIONS
+    if not oldest <= sys.version_info[:2] <= newest:
+        return None
+    func = _load_db_status_func()
+    if func is None:
+        return None
+
+    try:
+        handle = ctypes.c_void_p.from_address(id(conn) + object.__basicsize__).value
+        if not handle:
+            return None
+        main_file = next((row[2] for row in conn.execute("PRAGMA database_list") if row[1] == 'main'), None)
+        if main_file is None or (_db_filename_func(handle, b'main') or b'').decode('utf-8') != main_file:
+            return None
+
+        values = []
+        for op in (SQLITE_DBSTATUS_CACHE_HIT, SQLITE_DBSTATUS_CACHE_MISS):
+            current = ctypes.c_int()
+            highwater = ctypes.c_int()
+            if func(handle, op, ctypes.byref(current), ctypes.byref(highwater), 0) != 0:
+                return None
+            values.append(current.value)
+        return values[0], values[1]
+    except (ValueError, OSError, UnicodeDecodeError, sqlite3.Error):
+        return None
+
+
+def peak_rss_mb():
+    """プロセスのピークRSS（MB）。取得できない環境ではNone"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linuxはキロバイト、macOSはバイト単位
+    if sys.platform == 'darwin':
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+
+class StageRecord:
+    """1ステージ分の計測結果"""
+
+    def __init__(self, name, rows_in=None):
+        self.name = name
+        self.rows_in = rows_in
+        self.rows_out = None
+        self.wall_time = None
+        self.cpu_time = None
+        self.peak_rss_mb = None
+        self.cache_hit = None
+        self.cache_miss = None
+        self.error = None
+
+    @property
+    def rows_per_sec(self):
+        """処理行数/秒（出力行数、なければ入力行数で計算）"""
+        rows = self.rows_out if self.rows_out is not None else self.rows_in
+        if rows is None or not self.wall_time:
+            return None
+        return rows / self.wall_time
+
+    @property
+    def cache_hit_ratio(self):
+        """ページキャッシュのヒット率"""
+        if self.cache_hit is None or self.cache_miss is None:
+            return None
+        total = self.cache_hit + self.cache_miss
+        return self.cache_hit / total if total else None
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'wall_time': self.wall_time,
+            'cpu_time': self.cpu_time,
+            'rows_in': self.rows_in,
+            'rows_out': self.rows_out,
+            'rows_per_sec': self.rows_per_sec,
+            'peak_rss_mb': self.peak_rss_mb,
+            'cache_hit': self.cache_hit,
+            'cache_miss': self.cache_miss,
+            'cache_hit_ratio': self.cache_hit_ratio,
+            'error': self.error
+        }
+
+
+class _NullRecord:
+    """計測しない場合のダミーレコード（rows_outの代入を受け付けるだけ）"""
+
+    def __init__(self):
+        self.rows_in = None
+        self.rows_out = None
+
+
+@contextmanager
+def _null_stage():
+    yield _NullRecord()
+
+
+class ETLProfiler:
+    """ETLの各ステージの実行時間・行数・メモリ・キャッシュ統計を記録するクラス"""
+
+    def __init__(self, cprofile_stage=None):
+        self.records = []
+        self.connections = []
+        self.cprofile_stage = cprofile_stage
+        self.cprofile_stats = {}
+        self.started_at = datetime.now()
+        self._stack = []
+
+    def attach_connection(self, conn):
+        """ページキャッシュ統計を取得する接続を登録"""
+        if conn is not None and conn not in self.connections:
+            self.connections.append(conn)
+
+    def _cache_totals(self):
+        hit_total = 0
+        miss_total = 0
+        available = False
+        for conn in self.connections:
+            try:
+                stats = sqlite_cache_stats(conn)
+            except sqlite3.ProgrammingError:
+                stats = None
+            if stats:
+                available = True
+                hit_total += stats[0]
+                miss_total += stats[1]
+        return (hit_total, miss_total) if available else None
+
+    @contextmanager
+    def stage(self, name, rows_in=None):
+        """ステージを計測するコンテキストマネージャ
+
+        入れ子にした場合は 'parent/child' の名前で記録される。
+        with ブロック内で record.rows_out に出力行数を設定する。
+        """
+        full_name = '/'.join(self._stack + [name])
+        record = StageRecord(full_name, rows_in)
+        self._stack.append(name)
+
+        profiler = None
+        if self.cprofile_stage and name == self.cprofile_stage:
+            profiler = cProfile.Profile()
+
+        cache_before = self._cache_totals()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        if profiler:
+            profiler.enable()
+
+        try:
+            yield record
+        except Exception as e:
+            record.error = str(e)
+            raise
+        finally:
+            if profiler:
+                profiler.disable()
+                self.cprofile_stats[full_name] = profiler
+
+            record.wall_time = time.perf_counter() - wall_start
+            record.cpu_time = time.process_time() - cpu_start
+            record.peak_rss_mb = peak_rss_mb()
+
+            cache_after = self._cache_totals()
+            if cache_before and cache_after:
+                record.cache_hit = cache_after[0] - cache_before[0]
+                record.cache_miss = cache_after[1] - cache_before[1]
+
+            self._stack.pop()
+            self.records.append(record)
+
+    def print_summary(self):
+        """計測結果をコンソールに表示"""
+        print(f"\n{'='*70}")
+        print("【ETLプロファイル】")
+        print(f"{'='*70}")
+        print(f"{'ステージ':<45} {'実時間(s)':>10} {'CPU(s)':>8} {'行数':>10} {'行/秒':>10}")
+        print("-" * 90)
+        for record in self.records:
+            rows = record.rows_out if record.rows_out is not None else record.rows_in
+            rows_text = f"{rows:,}" if rows is not None else '-'
+            rate_text = f"{record.rows_per_sec:,.0f}" if record.rows_per_sec is not None else '-'
+            print(f"{record.name:<45} {record.wall_time:>10.3f} {record.cpu_time:>8.3f} "
+                  f"{rows_text:>10} {rate_text:>10}")
+
+    def to_dict(self):
+        return {
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'python': sys.version.split()[0],
+            'sqlite': sqlite3.sqlite_version,
+            'stages': [record.to_dict() for record in self.records]
+        }
+
+    def to_markdown(self):
+        """計測結果をMarkdown表に変換"""
+        def fmt(value, spec):
+            return format(value, spec) if value is not None else '-'
+
+        lines = [
+            f"# ETLプロファイルレポート ({self.started_at.strftime('%Y-%m-%d %H:%M:%S')})",
+            '',
+            f"- Python: {sys.version.split()[0]}",
+            f"- SQLite: {sqlite3.sqlite_version}",
+            '',
+            '| ステージ | 実時間(s) | CPU(s) | 入力行数 | 出力行数 | 行/秒 | ピークRSS(MB) | キャッシュヒット | キャッシュミス | ヒット率 |',
+            '|---|---:|---:|---:|---:|---:|---:|---:|---:|---:|'
+        ]
+        for r in self.records:
+            name = r.name if r.error is None else f"{r.name} (エラー)"
+            lines.append(
+                f"| {name} | {fmt(r.wall_time, '.3f')} | {fmt(r.cpu_time, '.3f')} "
+                f"| {fmt(r.rows_in, ',')} | {fmt(r.rows_out, ',')} | {fmt(r.rows_per_sec, ',.0f')} "
+                f"| {fmt(r.peak_rss_mb, '.1f')} | {fmt(r.cache_hit, ',')} | {fmt(r.cache_miss, ',')} "
+                f"| {fmt(r.cache_hit_ratio, '.1%')} |"
+            )
+
+        for stage_name, profiler in self.cprofile_stats.items():
+            stream = io.StringIO()
+            pstats.Stats(profiler, stream=stream).sort_stats('cumulative').print_stats(30)
+            lines.extend(['', f"## cProfile: {stage_name}", '', '```', stream.getvalue().rstrip(), '```'])
+
+        return '\n'.join(lines) + '\n'
+
+    def write_report(self, report_dir):
+        """JSON・Markdownレポート（とcProfileの.prof）を書き出す
+
+        Returns:
+            (json_path, markdown_path)
+        """
+        report_dir = Path(report_dir)
+        report_dir.mkdir(parents=True, exist_ok=True)
+        run_id = self.started_at.strftime('%Y%m%d_%H%M%S')
+
+        json_path = report_dir / f"etl_profile_{run_id}.json"
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+
+        markdown_path = report_dir / f"etl_profile_{run_id}.md"
+        with open(markdown_path, 'w', encoding='utf-8') as f:
+            f.write(self.to_markdown())
+
+        for stage_name, profiler in self.cprofile_stats.items():
+            safe_name = stage_name.replace('/', '__')
+            profiler.dump_stats(str(report_dir / f"etl_profile_{run_id}_{safe_name}.prof"))
+
+        return json_path, markdown_path
+
+
+def measure(profiler, name, rows_in=None):
+    """profilerがNoneなら何もしない計測コンテキストを返す"""
+    if profiler is None:
+        return _null_stage()
+    return profiler.stage(name, rows_in)
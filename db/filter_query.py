@@ -0,0 +1,137 @@
+# 項目 → (対応表, ID列, 名前列)
+FILTER_FACETS = {
+    'voiceactors': ('voiceactors', 'voiceactor_id', 'voiceactor_name'),
+    'studios': ('studios', 'studios_id', 'studios_name'),
+    'genres': ('genres', 'genre_name', 'genre_name'),
+    'staff': ('staff', 'staff_id', 'staff_name'),
+    'characters': ('characters', 'chara_id', 'chara_name')
+}
+
+# 同じ項目内で複数選択したときの条件
+MATCH_ANY = 'any'  # いずれかを含む（OR）
+MATCH_ALL = 'all'  # すべてを含む（AND）
+
+ANIME_COLUMNS = '''
+    a.anilist_id, a.title_romaji, a.title_native, a.format,
+    a.season, a.seasonYear, a.favorites, a.meanScore,
+    a.popularity, a.source, a.episode
+'''
+
+
+def _placeholders(values):
+    return ','.join('?' for _ in values)
+
+
+def resolve_filter_ids(conn, facet, names):
+    """選択された名前をIDに変換（同名の別人物は全て含む）
+
+    Returns:
+        list: 名前ごとのIDのリスト（名前の選択順）。該当IDがない名前は空リスト
+    """
+    table_name, id_column, name_column = FILTER_FACETS[facet]
+    if id_column == name_column:
+        return [[name] for name in names]
+    rows = conn.execute(f'''
+        SELECT DISTINCT {name_column}, {id_column}
+        FROM {table_name}
+        WHERE {name_column} IN ({_placeholders(names)}) AND {id_column} IS NOT NULL
+    ''', list(names)).fetchall()
+    ids_by_name = {}
+    for name, entity_id in rows:
+        ids_by_name.setdefault(name, []).append(entity_id)
+    return [sorted(ids_by_name.get(name, [])) for name in names]
+
+
+def build_facet_condition(facet, id_groups, mode=MATCH_ANY):
+    """1項目の条件を作品IDの準結合として作成
+
+    Args:
+        facet: FILTER_FACETS のキー
+        id_groups: resolve_filter_ids() の結果（選択ごとのIDのリスト）
+        mode: MATCH_ANY（いずれかを含む）または MATCH_ALL（すべてを含む）
+
+    Returns:
+        tuple: (条件式, パラメータ)
+    """
+    table_name, id_column, _ = FILTER_FACETS[facet]
+    all_ids = sorted({entity_id for ids in id_groups for entity_id in ids})
+    if not all_ids or (mode == MATCH_ALL and not all(id_groups)):
+        # 該当しない名前がある場合は結果なし
+        return '0', []
+
+    if mode == MATCH_ALL and len(id_groups) > 1:
+        if all(len(ids) == 1 for ids in id_groups):
+            # 選択ごとにIDが1つなら、含まれるIDの種類数で判定できる
+            return (f'''a.anilist_id IN (
+                SELECT anilist_id FROM {table_name}
+                WHERE {id_column} IN ({_placeholders(all_ids)})
+                GROUP BY anilist_id
+                HAVING COUNT(DISTINCT {id_column}) = ?
+            )''', all_ids + [len(id_groups)])
+        # 同名の別人物がいる選択は、選択ごとの準結合を重ねる
+        conditions = []
+        params = []
+        for ids in id_groups:
+            conditions.append(f'a.anilist_id IN (SELECT anilist_id FROM {table_name} '
+                              f'WHERE {id_column} IN ({_placeholders(ids)}))')
+            params.extend(ids)
+        return ' AND '.join(conditions), params
+
+    return (f'a.anilist_id IN (SELECT anilist_id FROM {table_name} '
+            f'WHERE {id_column} IN ({_placeholders(all_ids)}))', all_ids)
+
+
+def build_filter_query(conn, selected_titles=None, facet_names=None, match_modes=None):
+    """フィルター条件から作品一覧のクエリを作成
+
+    選択された声優・スタジオ等は LEFT JOIN ではなく作品IDへの準結合
+    （anilist_id IN (SELECT anilist_id ...)）にする。JOIN では選択数の積で中間結果が
+    増えてから DISTINCT で重複を除くことになるが、準結合では重複が生じない。
+
+    Args:
+        conn: アニメDBの接続（名前 → IDの変換に使用）
+        selected_titles: 選択されたタイトル（いずれかに一致）
+        facet_names: 項目（FILTER_FACETS のキー） → 選択された名前のリスト
+        match_modes: 項目 → MATCH_ANY / MATCH_ALL（省略時は MATCH_ANY）
+
+    Returns:
+        tuple: (SQL, パラメータ)
+    """
+    facet_names = facet_names or {}
+    match_modes = match_modes or {}
+
+    conditions = ['a.title_romaji IS NOT NULL']
+    params = []
+    if selected_titles:
+        conditions.append(f'a.title_romaji IN ({_placeholders(selected_titles)})')
+        params.extend(selected_titles)
+
+    for facet in FILTER_FACETS:
+        names = facet_names.get(facet)
+        if not names:
+            continue
+        id_groups = resolve_filter_ids(conn, facet, names)
+        condition, condition_params = build_facet_condition(facet, id_groups, match_modes.get(facet, MATCH_ANY))
+        conditions.append(condition)
+        params.extend(condition_params)
+
+    query = f'''
+        SELECT {ANIME_COLUMNS}
+        FROM anime a
+        WHERE {' AND '.join(conditions)}
+        ORDER BY a.meanScore DESC NULLS LAST
+    '''
+    return query, params
+
+
+def create_filter_indexes(cursor):
+    """準結合・名前の変換で使うインデックスを作成
+
+    各対応表の主キーはID列が先頭のため、ID → 作品の検索は主キーで行える。
+    ジャンルは主キーが (anilist_id, genre_name) のため名前から引くインデックスを追加する。
+    """
+    for table_name, id_column, name_column in FILTER_FACETS.values():
+        cursor.execute(f'''
+            CREATE INDEX IF NOT EXISTS idx_{table_name}_{name_column}
+            ON {table_name}({name_column}, {'anilist_id' if id_column == name_column else id_column})
+        ''')
@@ -0,0 +1,129 @@
+import argparse
+import sqlite3
+from pathlib import Path
+
+
+# SQLiteの INTEGER（符号付き64bit）に収まるジャンル数の上限
+MAX_GENRE_BITS = 63
+
+
+def create_genre_bits_tables(cursor):
+    """ジャンルのコード表と作品ごとのジャンルのビット集合のテーブルを作成
+
+    genre_codes はジャンル名 → ビット位置（genre_id、名前順に0から）、
+    media_genre_bits は作品ごとに持つジャンルのビットを立てた整数。
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS genre_codes (
+            genre_id INTEGER PRIMARY KEY,
+            genre_name TEXT UNIQUE,
+            media_count INTEGER
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS media_genre_bits (
+            anilist_id INTEGER PRIMARY KEY,
+            genre_bits INTEGER NOT NULL
+        )
+    ''')
+
+
+def extract_genre_bits_data(cursor):
+    """genres テーブルからジャンルのコードと作品ごとのビット集合を作成
+
+    Returns:
+        dict: {'genre_codes': コード表の行のリスト, 'media_genre_bits': 作品ごとの行のリスト}
+    """
+    print("ジャンルのビット集合を作成中...")
+
+    cursor.execute('''
+        SELECT DISTINCT anilist_id, genre_name
+        FROM genres
+        WHERE anilist_id IS NOT NULL AND genre_name IS NOT NULL
+    ''')
+    rows = cursor.fetchall()
+
+    genre_names = sorted({genre_name for _, genre_name in rows})
+    if len(genre_names) > MAX_GENRE_BITS:
+        raise ValueError(f"ジャンル数が多すぎます: {len(genre_names)}（上限 {MAX_GENRE_BITS}）")
+    genre_ids = {genre_name: genre_id for genre_id, genre_name in enumerate(genre_names)}
+
+    media_bits = {}
+    media_counts = dict.fromkeys(genre_names, 0)
+    for anilist_id, genre_name in rows:
+        media_bits[anilist_id] = media_bits.get(anilist_id, 0) | (1 << genre_ids[genre_name])
+        media_counts[genre_name] += 1
+
+    genre_codes = [
+        {'genre_id': genre_id, 'genre_name': genre_name, 'media_count': media_counts[genre_name]}
+        for genre_name, genre_id in genre_ids.items()
+    ]
+    media_genre_bits = [
+        {'anilist_id': anilist_id, 'genre_bits': genre_bits}
+        for anilist_id, genre_bits in sorted(media_bits.items())
+    ]
+    print(f"   処理完了: {len(genre_codes)}ジャンル / {len(media_genre_bits)}作品")
+    return {'genre_codes': genre_codes, 'media_genre_bits': media_genre_bits}
+
+
+def insert_genre_bits_data(cursor, data):
+    """ジャンルのコード表とビット集合を挿入（既存データは置き換え）"""
+    cursor.execute('DELETE FROM genre_codes')
+    cursor.execute('DELETE FROM media_genre_bits')
+    cursor.executemany('''
+        INSERT INTO genre_codes (genre_id, genre_name, media_count)
+        VALUES (:genre_id, :genre_name, :media_count)
+    ''', data['genre_codes'])
+    cursor.executemany('''
+        INSERT INTO media_genre_bits (anilist_id, genre_bits)
+        VALUES (:anilist_id, :genre_bits)
+    ''', data['media_genre_bits'])
+
+
+def genre_bits_mask(genre_ids):
+    """ジャンルのビット位置のリストを1つの整数のマスクにする"""
+    mask = 0
+    for genre_id in genre_ids:
+        mask |= 1 << genre_id
+    return mask
+
+
+def main():
+    parser = argparse.ArgumentParser(description='ジャンルのビット集合作成ツール')
+    parser.add_argument('--media', choices=['anime', 'manga'], default='anime', help='対象のデータベース')
+    args = parser.parse_args()
+
+    db_file = Path(__file__).parent / f"{args.media}_data.db"
+
+    print("="*70)
+    print("ジャンルのビット集合作成ツール")
+    print("="*70)
+
+    if not db_file.exists():
+        print(f"エラー: データベースが見つかりません: {db_file}")
+        return
+
+    print(f"\nデータベースに接続中: {db_file}")
+    conn = sqlite3.connect(db_file)
+    cursor = conn.cursor()
+
+    create_genre_bits_tables(cursor)
+    data = extract_genre_bits_data(cursor)
+    insert_genre_bits_data(cursor, data)
+    conn.commit()
+
+    print("\n" + "="*70)
+    print("【統計情報】")
+    print("="*70)
+    for row in data['genre_codes']:
+        print(f"  {row['genre_id']:>2}: {row['genre_name']}（{row['media_count']}作品）")
+
+    conn.close()
+
+    print("\n" + "="*70)
+    print("完了しました！")
+    print("="*70)
+
+
+if __name__ == "__main__":
+    main()
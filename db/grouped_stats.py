@@ -0,0 +1,195 @@
+import numpy as np
+import pandas as pd
+
+
+# 基礎統計表の列（streamlit/stats_app.py の表と同じ順序）
+STAT_COLUMNS = ['合計', 'カウント', '最大', '最小', '平均', '中央値', '1/4分位', '3/4分位', '標準偏差', '分散']
+
+
+def grouped_statistics(data, value_col, group_cols):
+    """グループごとの基礎統計（STAT_COLUMNS）を1回の groupby で計算
+
+    グループ × 年度の表も group_cols に年度の列を加えるだけで同じ1回の集計になり、
+    グループや年度ごとにデータ全体をマスクで切り出す必要がない。
+
+    Args:
+        data: データフレーム
+        value_col: 統計を計算する列（数値に変換できない値は除く）
+        group_cols: グループの列名のリスト（値が欠損している行は除く）
+
+    Returns:
+        pd.DataFrame: group_cols + STAT_COLUMNS（グループの昇順。有効な値がないグループは含まない）
+    """
+    group_cols = list(group_cols)
+    values = pd.to_numeric(data[value_col], errors='coerce').astype(np.float64)
+    frame = data[group_cols].assign(_value=values).dropna()
+    if frame.empty:
+        return pd.DataFrame(columns=group_cols + STAT_COLUMNS)
+
+    grouped = frame.groupby(group_cols, observed=True, sort=True)['_value']
+    aggregated = grouped.agg(['sum', 'count', 'max', 'min', 'mean', 'median', 'std', 'var'])
+    quartiles = grouped.quantile([0.25, 0.75]).unstack()
+
+    stats_df = pd.DataFrame({
+        '合計': aggregated['sum'],
+        'カウント': aggregated['count'].astype(int),
+        '最大': aggregated['max'],
+        '最小': aggregated['min'],
+        '平均': aggregated['mean'],
+        '中央値': aggregated['median'],
+        '1/4分位': quartiles[0.25],
+        '3/4分位': quartiles[0.75],
+        '標準偏差': aggregated['std'],
+        '分散': aggregated['var']
+    })
+    return stats_df.reset_index()
+
+
+
+def _code_statistics(codes, values):
+    """整数のグループコードごとの基礎統計（STAT_COLUMNS）を計算
+
+    値の昇順に並んだ配列をコードで安定ソートすると、各グループの値が連続した昇順の区間になる。
+    合計・分散は区間ごとの reduceat、最大・最小・分位点は区間内の位置から直接求まる
+    （分位点は pandas と同じ線形補間）。
+
+    Args:
+        codes: グループのコード（整数の配列）
+        values: 値（codes と同じ長さ、昇順。欠損は含まない）
+
+    Returns:
+        tuple: (グループのコードの配列（昇順）, 列名 → 値の配列)
+    """
+    if len(values) == 0:
+        return codes, {col: np.empty(0) for col in STAT_COLUMNS}
+    # コードの種類が少なければ16bit整数にすると安定ソートが基数ソートになる
+    sort_codes = codes.astype(np.int16) if 0 <= codes.min() and codes.max() < 2 ** 15 else codes
+    order = np.argsort(sort_codes, kind='stable')
+    codes = codes[order]
+    values = values[order]
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    counts = np.diff(np.r_[starts, len(codes)])
+    ends = starts + counts - 1
+
+    sums = np.add.reduceat(values, starts)
+    means = sums / counts
+    squares = np.add.reduceat((values - np.repeat(means, counts)) ** 2, starts)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        variances = np.where(counts > 1, squares / (counts - 1), np.nan)
+
+    def quantile(q):
+        position = starts + (counts - 1) * q
+        lower = np.floor(position).astype(np.int64)
+        upper = np.minimum(lower + 1, ends)
+        return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+    return codes[starts], {
+        '合計': sums,
+        'カウント': counts,
+        '最大': values[ends],
+        '最小': values[starts],
+        '平均': means,
+        '中央値': quantile(0.5),
+        '1/4分位': quantile(0.25),
+        '3/4分位': quantile(0.75),
+        '標準偏差': np.sqrt(variances),
+        '分散': variances
+    }
+
+
+def period_statistics(data, value_cols, year_column, decade_ranges):
+    """複数の指標の期間別統計（全期間・年度別・年代別）をまとめて計算
+
+    指標 × 年度（年代）を1つの整数コードにして、全ての指標の表をそれぞれ1回のソートで求める。
+    年度・年代・指標ごとにデータを切り出し直さないため、年度数や指標数が増えても
+    処理はほぼ行数だけで決まる。
+
+    Args:
+        data: データフレーム
+        value_cols: 統計を計算する列名のリスト（data にない列は除く）
+        year_column: 年度の列名
+        decade_ranges: 年代名 → (開始年, 終了年)（両端を含む。表の行はこの順序）
+
+    Returns:
+        dict: 指標名 → {
+            'overall': 全期間の統計（年度不明の行も含む。STAT_COLUMNS の1行）,
+            'yearly': 年度別の統計（year_column + STAT_COLUMNS、年度の昇順）,
+            'decade': 年代別の統計（'年代' + STAT_COLUMNS、decade_ranges の順序）
+        }（値のない指標は含まない）
+    """
+    value_cols = [col for col in value_cols if col in data.columns]
+    columns = {
+        col: pd.to_numeric(data[col], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+        for col in value_cols
+    }
+    years = pd.to_numeric(data[year_column], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+    return period_statistics_arrays(columns, years, year_column, decade_ranges)
+
+
+def period_statistics_arrays(columns, years, year_column, decade_ranges, positions=None):
+    """period_statistics() の配列版（列ストアのメモリマップの配列を直接読む）
+
+    Args:
+        columns: 指標名 → 値の配列（NaN は欠損）
+        years: 年度の配列（NaN は年度不明）
+        year_column: 年度別の表の年度の列名
+        decade_ranges: period_statistics() を参照
+        positions: 集計する行の位置の配列（None は全行）。columns・years をこの位置で読み、
+            指標ごとの値を連結先の配列に書き込む（データフレームへの変換を経ない）
+
+    Returns:
+        dict: period_statistics() と同じ
+    """
+    value_cols = list(columns)
+    rows = len(years) if positions is None else len(positions)
+    # 指標ごとに列を縦に並べた配列（指標のコードは value_cols の位置）
+    values = np.empty(rows * len(value_cols), dtype=np.float64)
+    for index, col in enumerate(value_cols):
+        values[index * rows:(index + 1) * rows] = columns[col] if positions is None else columns[col][positions]
+    metrics = np.repeat(np.arange(len(value_cols)), rows)
+    years = np.asarray(years if positions is None else years[positions], dtype=np.float64)
+    years = np.tile(years, len(value_cols))
+
+    # 欠損を除いて値の昇順に1回だけ並べ替える（各表はこの順序をコードで安定ソートして使う）
+    valid = np.flatnonzero(~np.isnan(values))
+    order = valid[np.argsort(values[valid], kind='stable')]
+    values, metrics, years = values[order], metrics[order], years[order]
+
+    def tables(codes, mask):
+        """(指標, 期間) のコードごとの統計を指標ごとの DataFrame に分ける"""
+        groups, stats = _code_statistics(codes[mask], values[mask])
+        return groups, pd.DataFrame(stats, columns=STAT_COLUMNS)
+
+    overall_groups, overall = tables(metrics, np.ones(len(values), dtype=bool))
+
+    # (指標, 期間) のコード = 指標の位置 × 期間数 + 期間の位置
+    known = ~np.isnan(years)
+    year_values, year_index = np.unique(years[known], return_inverse=True)
+    year_count = max(len(year_values), 1)
+    year_codes = np.zeros(len(values), dtype=np.int64)
+    year_codes[known] = metrics[known] * year_count + year_index
+    yearly_groups, yearly = tables(year_codes, known)
+
+    decade_index = np.select(
+        [(years >= start_year) & (years <= end_year) for start_year, end_year in decade_ranges.values()],
+        np.arange(len(decade_ranges)), default=-1
+    )
+    decade_names = np.array(list(decade_ranges), dtype=object)
+    decade_count = len(decade_names)
+    decade_groups, decade = tables(metrics * decade_count + decade_index, decade_index >= 0)
+
+    result = {}
+    for position, metric_group in enumerate(overall_groups):
+        metric = value_cols[metric_group]
+        in_year = yearly_groups // year_count == metric_group
+        yearly_table = yearly[in_year].reset_index(drop=True)
+        yearly_table.insert(0, year_column, year_values[yearly_groups[in_year] % year_count])
+        in_decade = decade_groups // decade_count == metric_group
+        decade_table = decade[in_decade].reset_index(drop=True)
+        decade_table.insert(0, '年代', decade_names[decade_groups[in_decade] % decade_count])
+        result[metric] = {
+            'overall': overall.iloc[[position]].reset_index(drop=True),
+            'yearly': yearly_table,
+            'decade': decade_table
+        }
+    return result
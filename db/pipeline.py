@@ -0,0 +1,842 @@
+import argparse
+import hashlib
+import json
+import sqlite3
+from pathlib import Path
+
+from run_all_processes import DatabaseManager, AnimeDataProcessor, MangaDataProcessor, StatsProcessor
+from etl_profiler import ETLProfiler, measure
+from db_builds import create_build_dir, current_db_dir, discard_build, finalize_build, seed_build
+import create_voiceactor_stats
+import create_studios_staff_stats
+import create_enhanced_staff_with_manga
+import create_enhanced_staff_basic_manga
+import create_dashboard_stats
+import create_stats_cube
+import create_rank_table
+import genre_bits
+import search_index
+import column_store
+import snapshot_export
+
+
+# ステージのコードを変更した場合はこの値を上げると全ステージが再実行される
+PIPELINE_VERSION = '1'
+
+STATE_FILE_NAME = 'pipeline_state.json'
+
+
+class Stage:
+    """パイプラインの1ステージ
+
+    入力・出力は以下の形式のリソース名で宣言する:
+        - 'file:anime_json' / 'file:manga_json' : 入力JSONファイル
+        - 'anime.<table>' / 'manga.<table>'     : 各データベースのテーブル
+        - 'snapshot:<name>'                     : ダッシュボード用スナップショット（snapshots/<name>.parquet）
+        - 'columns:<media>'                     : 数値の列ストア（columns/<media>/）
+    """
+
+    def __init__(self, name, description, inputs, outputs, run, optional_inputs=None, version='1'):
+        self.name = name
+        self.description = description
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.optional_inputs = list(optional_inputs or [])
+        self.run = run
+        self.version = version
+
+    def all_inputs(self):
+        """必須・任意を含む全入力リソース"""
+        return self.inputs + self.optional_inputs
+
+
+class PipelineContext:
+    """ステージ実行時に共有するパス・接続を管理するクラス"""
+
+    def __init__(self, base_dir=None, data_dir=None, profiler=None):
+        self.profiler = profiler
+        self.base_dir = Path(base_dir) if base_dir else Path(__file__).parent
+        self.data_dir = Path(data_dir) if data_dir else self.base_dir.parent / 'data'
+        self.db_files = {
+            'anime': self.base_dir / 'anime_data.db',
+            'manga': self.base_dir / 'manga_data.db'
+        }
+        self.input_files = {
+            'anime_json': self.data_dir / 'anilist_rank_data_analysis_popular_all_anime.json',
+            'manga_json': self.data_dir / 'anilist_rank_data_analysis_popular_all_manga.json'
+        }
+        self._databases = {}
+
+    def cursor(self, db_key):
+        """データベースのカーソルを取得（未接続なら接続）"""
+        if db_key not in self._databases:
+            db = DatabaseManager(self.db_files[db_key])
+            db.connect()
+            if self.profiler:
+                self.profiler.attach_connection(db.conn)
+            self._databases[db_key] = db
+        return self._databases[db_key].cursor
+
+    def commit(self):
+        """接続中の全データベースをコミット"""
+        for db in self._databases.values():
+            db.commit()
+
+    def close(self):
+        """接続中の全データベースを閉じる"""
+        for db in self._databases.values():
+            db.close()
+        self._databases = {}
+
+
+# ==================== ステージ実行関数 ====================
+
+def run_anime_base(ctx):
+    """アニメJSONから基本テーブルを作成"""
+    processor = AnimeDataProcessor(ctx.cursor('anime'), ctx.profiler)
+    return processor.process_anime_data(ctx.input_files['anime_json'])
+
+
+def run_manga_base(ctx):
+    """マンガJSONから基本テーブルを作成"""
+    processor = MangaDataProcessor(ctx.cursor('manga'), ctx.profiler)
+    return processor.process_manga_data(ctx.input_files['manga_json'])
+
+
+def run_anime_unique(ctx):
+    """アニメDBのユニークマスターテーブルを作成"""
+    stats_processor = StatsProcessor(ctx.cursor('anime'), ctx.profiler)
+    stats_processor.create_unique_tables()
+    stats_processor.populate_unique_tables('anime')
+
+
+def run_manga_unique(ctx):
+    """マンガDBのユニークマスターテーブルを作成"""
+    stats_processor = StatsProcessor(ctx.cursor('manga'), ctx.profiler)
+    stats_processor.create_unique_tables()
+    stats_processor.populate_unique_tables('manga')
+
+
+def _extract(ctx, name, func, *args):
+    """抽出・計算処理を計測付きで実行"""
+    with measure(ctx.profiler, name) as record:
+        data = func(*args)
+        record.rows_out = len(data)
+    return data
+
+
+def _insert(ctx, name, func, cursor, data):
+    """挿入処理を計測付きで実行"""
+    with measure(ctx.profiler, name, len(data)) as record:
+        func(cursor, data)
+        record.rows_out = len(data)
+
+
+def run_voiceactor_stats(ctx):
+    """声優基本統計・詳細統計を作成"""
+    cursor = ctx.cursor('anime')
+    create_voiceactor_stats.create_voiceactor_basic_table(cursor)
+    create_voiceactor_stats.create_voiceactor_stats_table(cursor)
+    basic_data = _extract(ctx, 'extract_voiceactor_basic',
+                          create_voiceactor_stats.extract_voiceactor_basic_data, cursor)
+    stats_data = _extract(ctx, 'extract_voiceactor_stats',
+                          create_voiceactor_stats.extract_voiceactor_stats_data, cursor)
+    _insert(ctx, 'insert_voiceactor_basic', create_voiceactor_stats.insert_voiceactor_basic_data, cursor, basic_data)
+    _insert(ctx, 'insert_voiceactor_stats', create_voiceactor_stats.insert_voiceactor_stats_data, cursor, stats_data)
+    return len(basic_data)
+
+
+def run_studios_staff_stats(ctx):
+    """スタジオ・スタッフ統計を作成"""
+    cursor = ctx.cursor('anime')
+    create_studios_staff_stats.create_studios_basic_table(cursor)
+    create_studios_staff_stats.create_studios_stats_table(cursor)
+    create_studios_staff_stats.create_staff_basic_table(cursor)
+    create_studios_staff_stats.create_staff_stats_table(cursor)
+    create_studios_staff_stats.create_staff_role_table(cursor)
+
+    studios_basic_data = _extract(ctx, 'extract_studios_basic',
+                                  create_studios_staff_stats.extract_studios_basic_data, cursor)
+    studios_stats_data = _extract(ctx, 'extract_studios_stats',
+                                  create_studios_staff_stats.extract_studios_stats_data, cursor)
+    staff_basic_data = _extract(ctx, 'extract_staff_basic',
+                                create_studios_staff_stats.extract_staff_basic_data, cursor)
+    staff_stats_data = _extract(ctx, 'extract_staff_stats',
+                                create_studios_staff_stats.extract_staff_stats_data, cursor)
+    staff_role_data = _extract(ctx, 'extract_staff_role',
+                               create_studios_staff_stats.extract_staff_role_data, cursor)
+
+    _insert(ctx, 'insert_studios_basic', create_studios_staff_stats.insert_studios_basic_data, cursor, studios_basic_data)
+    _insert(ctx, 'insert_studios_stats', create_studios_staff_stats.insert_studios_stats_data, cursor, studios_stats_data)
+    _insert(ctx, 'insert_staff_basic', create_studios_staff_stats.insert_staff_basic_data, cursor, staff_basic_data)
+    _insert(ctx, 'insert_staff_stats', create_studios_staff_stats.insert_staff_stats_data, cursor, staff_stats_data)
+    _insert(ctx, 'insert_staff_role', create_studios_staff_stats.insert_staff_role_data, cursor, staff_role_data)
+    return len(studios_basic_data) + len(staff_basic_data)
+
+
+def run_anime_staff_enhanced(ctx):
+    """拡張スタッフ統計（アニメ+マンガ）をアニメDBに作成"""
+    anime_cursor = ctx.cursor('anime')
+    manga_cursor = ctx.cursor('manga') if ctx.db_files['manga'].exists() else None
+    create_enhanced_staff_with_manga.create_enhanced_staff_basic_table(anime_cursor)
+    enhanced_data = _extract(ctx, 'extract_staff_basic_enhanced',
+                             create_enhanced_staff_with_manga.extract_enhanced_staff_basic_data,
+                             anime_cursor, manga_cursor)
+    _insert(ctx, 'insert_staff_basic_enhanced',
+            create_enhanced_staff_with_manga.insert_enhanced_staff_basic_data, anime_cursor, enhanced_data)
+    return len(enhanced_data)
+
+
+def run_manga_staff_enhanced(ctx):
+    """マンガDBの拡張スタッフ統計・スタッフロールを作成"""
+    cursor = ctx.cursor('manga')
+    create_enhanced_staff_basic_manga.create_enhanced_staff_basic_table(cursor)
+    enhanced_data = _extract(ctx, 'extract_staff_basic_enhanced',
+                             create_enhanced_staff_basic_manga.extract_enhanced_staff_basic_data, cursor)
+    _insert(ctx, 'insert_staff_basic_enhanced',
+            create_enhanced_staff_basic_manga.insert_enhanced_staff_basic_data, cursor, enhanced_data)
+    create_enhanced_staff_basic_manga.create_staff_role_table(cursor)
+    with measure(ctx.profiler, 'populate_staff_role'):
+        create_enhanced_staff_basic_manga.populate_staff_role_table(cursor)
+    return len(enhanced_data)
+
+
+def _run_dashboard_stats(ctx, media_table):
+    """ダッシュボード用の集計テーブル（ジャンル・原作）を作成"""
+    cursor = ctx.cursor(media_table)
+    create_dashboard_stats.create_dashboard_stats_tables(cursor)
+    total = 0
+    for table_name in create_dashboard_stats.DASHBOARD_STATS_TABLES:
+        stats_data = _extract(ctx, f'extract_{table_name}',
+                              create_dashboard_stats.extract_dashboard_stats_data, cursor, table_name, media_table)
+        _insert(ctx, f'insert_{table_name}',
+                lambda cur, data: create_dashboard_stats.insert_dashboard_stats_data(cur, table_name, data),
+                cursor, stats_data)
+        total += len(stats_data)
+    return total
+
+
+def run_anime_dashboard_stats(ctx):
+    """アニメDBのダッシュボード用集計テーブルを作成"""
+    return _run_dashboard_stats(ctx, 'anime')
+
+
+def run_manga_dashboard_stats(ctx):
+    """マンガDBのダッシュボード用集計テーブルを作成"""
+    return _run_dashboard_stats(ctx, 'manga')
+
+
+def _run_stats_cube(ctx, media_table):
+    """基礎統計画面用の統計キューブを作成"""
+    cursor = ctx.cursor(media_table)
+    create_stats_cube.create_stats_cube_table(cursor)
+    cube_data = _extract(ctx, 'extract_stats_cube', create_stats_cube.extract_stats_cube_data, cursor, media_table)
+    _insert(ctx, 'insert_stats_cube', create_stats_cube.insert_stats_cube_data, cursor, cube_data)
+    return len(cube_data)
+
+
+def run_anime_stats_cube(ctx):
+    """アニメDBの統計キューブを作成"""
+    return _run_stats_cube(ctx, 'anime')
+
+
+def run_manga_stats_cube(ctx):
+    """マンガDBの統計キューブを作成"""
+    return _run_stats_cube(ctx, 'manga')
+
+
+def run_studios_sketch(ctx):
+    """スタジオ×年度の指標要約（分位点スケッチ）を作成"""
+    cursor = ctx.cursor('anime')
+    create_stats_cube.create_studios_sketch_table(cursor)
+    sketch_data = _extract(ctx, 'extract_studios_sketch', create_stats_cube.extract_studios_sketch_data, cursor)
+    _insert(ctx, 'insert_studios_sketch', create_stats_cube.insert_studios_sketch_data, cursor, sketch_data)
+    return len(sketch_data)
+
+
+def _run_genre_bits(ctx, media_table):
+    """ジャンルのコード表と作品ごとのジャンルのビット集合を作成"""
+    cursor = ctx.cursor(media_table)
+    genre_bits.create_genre_bits_tables(cursor)
+    data = _extract(ctx, 'extract_genre_bits', genre_bits.extract_genre_bits_data, cursor)
+    _insert(ctx, 'insert_genre_bits', genre_bits.insert_genre_bits_data, cursor, data)
+    return len(data['media_genre_bits'])
+
+
+def run_anime_genre_bits(ctx):
+    """アニメDBのジャンルのビット集合を作成"""
+    return _run_genre_bits(ctx, 'anime')
+
+
+def run_manga_genre_bits(ctx):
+    """マンガDBのジャンルのビット集合を作成"""
+    return _run_genre_bits(ctx, 'manga')
+
+
+def _run_ranks(ctx, media_table):
+    """作品・人物・スタジオの順位テーブルを作成"""
+    cursor = ctx.cursor(media_table)
+    create_rank_table.create_rank_table(cursor)
+    with measure(ctx.profiler, 'build_ranks') as record:
+        rank_count = create_rank_table.build_rank_table(cursor, media_table)
+        record.rows_out = rank_count
+    return rank_count
+
+
+def run_anime_ranks(ctx):
+    """アニメDBの順位テーブルを作成"""
+    return _run_ranks(ctx, 'anime')
+
+
+def run_manga_ranks(ctx):
+    """マンガDBの順位テーブルを作成"""
+    return _run_ranks(ctx, 'manga')
+
+
+def _run_search_index(ctx, media_table):
+    """タイトル・説明文・人物名などの全文検索インデックスを作成"""
+    cursor = ctx.cursor(media_table)
+    tokenizer = search_index.create_search_index_table(cursor)
+    print(f"   トークナイザ: {tokenizer}")
+    descriptions = _extract(ctx, 'load_descriptions', search_index.load_descriptions,
+                            ctx.input_files[f"{media_table}_json"])
+    index_data = _extract(ctx, 'extract_search_index', search_index.extract_search_index_data,
+                          cursor, media_table, descriptions)
+    _insert(ctx, 'insert_search_index', search_index.insert_search_index_data, cursor, index_data)
+    return len(index_data)
+
+
+def run_anime_search_index(ctx):
+    """アニメDBの全文検索インデックスを作成"""
+    return _run_search_index(ctx, 'anime')
+
+
+def run_manga_search_index(ctx):
+    """マンガDBの全文検索インデックスを作成"""
+    return _run_search_index(ctx, 'manga')
+
+
+def run_snapshots(ctx):
+    """ダッシュボード用のスナップショット（Parquet）を書き出す"""
+    return snapshot_export.export_snapshots(ctx.base_dir)
+
+
+def snapshot_inputs():
+    """スナップショットが参照するテーブル（'anime_data.db' → 'anime.<table>'）"""
+    return sorted({
+        f"{definition['db'].replace('_data.db', '')}.{table}"
+        for definition in snapshot_export.SNAPSHOTS.values() for table in definition['tables']
+    })
+
+
+def run_column_stores(ctx):
+    """数値の列ストア（作品ID順の .npy）を書き出す"""
+    return column_store.export_column_stores(ctx.base_dir)
+
+
+def build_stages():
+    """パイプラインの全ステージを定義"""
+    return [
+        Stage(
+            'anime_base', 'アニメ基本テーブル',
+            inputs=['file:anime_json'],
+            outputs=['anime.anime', 'anime.studios', 'anime.characters',
+                     'anime.voiceactors', 'anime.genres', 'anime.staff', 'anime.staff_role_class',
+                     'anime.staff_roles_agg'],
+            run=run_anime_base,
+            version='6'
+        ),
+        Stage(
+            'manga_base', 'マンガ基本テーブル',
+            inputs=['file:manga_json'],
+            outputs=['manga.manga', 'manga.genres', 'manga.characters', 'manga.staff',
+                     'manga.staff_role_class', 'manga.staff_roles_agg'],
+            run=run_manga_base,
+            version='5'
+        ),
+        Stage(
+            'anime_unique', 'アニメユニークマスターテーブル',
+            inputs=['anime.anime', 'anime.genres'],
+            outputs=['anime.unique_genres', 'anime.unique_seasons', 'anime.unique_season_years'],
+            run=run_anime_unique
+        ),
+        Stage(
+            'manga_unique', 'マンガユニークマスターテーブル',
+            inputs=['manga.manga', 'manga.genres'],
+            outputs=['manga.unique_genres', 'manga.unique_seasons', 'manga.unique_season_years'],
+            run=run_manga_unique
+        ),
+        Stage(
+            'voiceactor_stats', '声優統計',
+            inputs=['anime.anime', 'anime.voiceactors'],
+            outputs=['anime.voiceactor_basic', 'anime.voiceactor_stats'],
+            run=run_voiceactor_stats
+        ),
+        Stage(
+            'studios_staff_stats', 'スタジオ・スタッフ統計',
+            inputs=['anime.anime', 'anime.studios', 'anime.staff'],
+            outputs=['anime.studios_basic', 'anime.studios_stats', 'anime.staff_basic',
+                     'anime.staff_stats', 'anime.staff_role'],
+            run=run_studios_staff_stats
+        ),
+        Stage(
+            'anime_staff_enhanced', '拡張スタッフ統計（アニメ+マンガ）',
+            inputs=['anime.anime', 'anime.staff'],
+            optional_inputs=['manga.manga', 'manga.staff'],
+            outputs=['anime.staff_basic_enhanced'],
+            run=run_anime_staff_enhanced
+        ),
+        Stage(
+            'manga_staff_enhanced', 'マンガ拡張スタッフ統計',
+            inputs=['manga.manga', 'manga.staff'],
+            outputs=['manga.staff_basic_enhanced', 'manga.staff_role'],
+            run=run_manga_staff_enhanced
+        ),
+        Stage(
+            'anime_dashboard_stats', 'アニメ ダッシュボード集計',
+            inputs=['anime.anime', 'anime.genres'],
+            outputs=[f"anime.{table_name}" for table_name in create_dashboard_stats.DASHBOARD_STATS_TABLES],
+            run=run_anime_dashboard_stats,
+            version='2'
+        ),
+        Stage(
+            'manga_dashboard_stats', 'マンガ ダッシュボード集計',
+            inputs=['manga.manga', 'manga.genres'],
+            outputs=[f"manga.{table_name}" for table_name in create_dashboard_stats.DASHBOARD_STATS_TABLES],
+            run=run_manga_dashboard_stats,
+            version='2'
+        ),
+        Stage(
+            'anime_stats_cube', 'アニメ 統計キューブ',
+            inputs=['anime.anime', 'anime.genres'],
+            outputs=['anime.stats_cube'],
+            run=run_anime_stats_cube
+        ),
+        Stage(
+            'manga_stats_cube', 'マンガ 統計キューブ',
+            inputs=['manga.manga', 'manga.genres'],
+            outputs=['manga.stats_cube'],
+            run=run_manga_stats_cube
+        ),
+        Stage(
+            'studios_sketch', 'スタジオ別 指標要約',
+            inputs=['anime.anime', 'anime.studios'],
+            outputs=['anime.studios_sketch'],
+            run=run_studios_sketch
+        ),
+        Stage(
+            'anime_genre_bits', 'アニメ ジャンルのビット集合',
+            inputs=['anime.genres'],
+            outputs=['anime.genre_codes', 'anime.media_genre_bits'],
+            run=run_anime_genre_bits
+        ),
+        Stage(
+            'manga_genre_bits', 'マンガ ジャンルのビット集合',
+            inputs=['manga.genres'],
+            outputs=['manga.genre_codes', 'manga.media_genre_bits'],
+            run=run_manga_genre_bits
+        ),
+        Stage(
+            'anime_ranks', 'アニメ 順位',
+            inputs=['anime.anime', 'anime.characters', 'anime.voiceactors', 'anime.staff', 'anime.studios'],
+            outputs=['anime.ranks'],
+            run=run_anime_ranks
+        ),
+        Stage(
+            'manga_ranks', 'マンガ 順位',
+            inputs=['manga.manga', 'manga.characters', 'manga.staff'],
+            outputs=['manga.ranks'],
+            run=run_manga_ranks
+        ),
+        Stage(
+            'anime_search_index', 'アニメ 全文検索インデックス',
+            inputs=['file:anime_json', 'anime.anime', 'anime.characters', 'anime.staff',
+                    'anime.voiceactors', 'anime.studios'],
+            outputs=['anime.search_index'],
+            run=run_anime_search_index
+        ),
+        Stage(
+            'manga_search_index', 'マンガ 全文検索インデックス',
+            inputs=['file:manga_json', 'manga.manga', 'manga.characters', 'manga.staff'],
+            outputs=['manga.search_index'],
+            run=run_manga_search_index
+        ),
+        Stage(
+            'snapshots', 'ダッシュボード用スナップショット',
+            inputs=snapshot_inputs(),
+            outputs=[f'snapshot:{name}' for name in snapshot_export.SNAPSHOTS],
+            run=run_snapshots
+        ),
+        Stage(
+            'column_stores', '数値の列ストア',
+            inputs=sorted({
+                f"{media}.{definition['table']}" for media, definition in column_store.COLUMN_STORES.items()
+            }),
+            outputs=[f'columns:{media}' for media in column_store.COLUMN_STORES],
+            run=run_column_stores
+        ),
+    ]
+
+
+# ==================== 依存関係・フィンガープリント ====================
+
+def topological_sort(stages):
+    """出力→入力の対応からステージを依存順に並べる"""
+    producers = {}
+    for stage in stages:
+        for output in stage.outputs:
+            if output in producers:
+                raise ValueError(f"リソース {output} が複数のステージから出力されています: "
+                                 f"{producers[output]}, {stage.name}")
+            producers[output] = stage.name
+
+    stage_map = {stage.name: stage for stage in stages}
+    dependencies = {
+        stage.name: sorted({producers[r] for r in stage.all_inputs() if r in producers} - {stage.name})
+        for stage in stages
+    }
+
+    ordered = []
+    visiting = set()
+    visited = set()
+
+    def visit(name):
+        if name in visited:
+            return
+        if name in visiting:
+            raise ValueError(f"ステージの依存関係が循環しています: {name}")
+        visiting.add(name)
+        for dep in dependencies[name]:
+            visit(dep)
+        visiting.discard(name)
+        visited.add(name)
+        ordered.append(stage_map[name])
+
+    # 定義順をできるだけ保つ
+    for stage in stages:
+        visit(stage.name)
+
+    return ordered, dependencies
+
+
+def downstream_stages(start_names, dependencies):
+    """指定ステージとそれに依存する全ステージ名を取得"""
+    result = set(start_names)
+    changed = True
+    while changed:
+        changed = False
+        for name, deps in dependencies.items():
+            if name not in result and result.intersection(deps):
+                result.add(name)
+                changed = True
+    return result
+
+
+def load_state(state_file):
+    """前回実行時のフィンガープリントを読み込み"""
+    if not state_file.exists():
+        return {'files': {}, 'resources': {}, 'stages': {}}
+    try:
+        with open(state_file, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        print(f"警告: 状態ファイルを読み込めませんでした。全ステージを再実行します: {state_file}")
+        return {'files': {}, 'resources': {}, 'stages': {}}
+    state.setdefault('files', {})
+    state.setdefault('resources', {})
+    state.setdefault('stages', {})
+    return state
+
+
+def save_state(state_file, state):
+    """フィンガープリントを保存"""
+    tmp_file = state_file.with_suffix('.tmp')
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    tmp_file.replace(state_file)
+
+
+def file_fingerprint(path, state):
+    """ファイルのSHA-256（サイズ・更新時刻が同じなら前回値を再利用）"""
+    if not path.exists():
+        return None
+
+    stat = path.stat()
+    cached = state['files'].get(str(path))
+    if cached and cached['size'] == stat.st_size and cached['mtime_ns'] == stat.st_mtime_ns:
+        return cached['sha256']
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+
+    state['files'][str(path)] = {
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'sha256': digest.hexdigest()
+    }
+    return digest.hexdigest()
+
+
+def table_exists(db_file, table_name):
+    """テーブルが存在するか確認"""
+    if not db_file.exists():
+        return False
+    conn = sqlite3.connect(db_file)
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name=?", (table_name,))
+        return cursor.fetchone() is not None
+    finally:
+        conn.close()
+
+
+def resource_fingerprint(resource, ctx, state):
+    """リソースの現在のフィンガープリント（存在しない場合はNone）"""
+    if resource.startswith('file:'):
+        return file_fingerprint(ctx.input_files[resource[len('file:'):]], state)
+
+    if resource.startswith('snapshot:'):
+        if not snapshot_export.snapshot_path(ctx.base_dir, resource[len('snapshot:'):]).exists():
+            return None
+        return state['resources'].get(resource, 'external')
+
+    if resource.startswith('columns:'):
+        media = resource[len('columns:'):]
+        if not column_store.read_column_store_manifest(ctx.base_dir, media):
+            return None
+        return state['resources'].get(resource, 'external')
+
+    db_key, table_name = resource.split('.', 1)
+    if not table_exists(ctx.db_files[db_key], table_name):
+        return None
+    # 生成ステージが記録したバージョン（パイプライン外で作られたテーブルは'external'）
+    return state['resources'].get(resource, 'external')
+
+
+def stage_key(stage, ctx, state):
+    """入力フィンガープリントからステージのキャッシュキーを計算"""
+    digest = hashlib.sha256()
+    digest.update(f"{PIPELINE_VERSION}:{stage.name}:{stage.version}".encode('utf-8'))
+    for resource in sorted(stage.all_inputs()):
+        digest.update(f"|{resource}={resource_fingerprint(resource, ctx, state)}".encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+# ==================== 実行計画・実行 ====================
+
+def plan_stages(stages, ctx, state, only=None, start_from=None, force=False):
+    """各ステージを実行するかどうかを判定
+
+    Returns:
+        list: (stage, action, reason) のリスト。actionは 'run' / 'skip' / 'blocked'
+    """
+    ordered, dependencies = topological_sort(stages)
+    names = {stage.name for stage in ordered}
+
+    for name in (only or []) + ([start_from] if start_from else []):
+        if name not in names:
+            raise ValueError(f"不明なステージです: {name}（利用可能: {', '.join(sorted(names))}）")
+
+    forced = set()
+    selected = names
+    if only:
+        forced = set(only)
+        selected = set(only)
+    elif start_from:
+        forced = downstream_stages([start_from], dependencies)
+        selected = forced
+    elif force:
+        forced = names
+
+    producers = {output: stage.name for stage in ordered for output in stage.outputs}
+    planned_runs = set()
+    plan = []
+
+    for stage in ordered:
+        if stage.name not in selected:
+            plan.append((stage, 'skip', '選択対象外'))
+            continue
+
+        # 必須入力が存在し、かつ今回の実行で作られる予定もない場合は実行不可
+        missing = [
+            r for r in stage.inputs
+            if resource_fingerprint(r, ctx, state) is None and producers.get(r) not in planned_runs
+        ]
+        if missing:
+            plan.append((stage, 'blocked', f"入力がありません: {', '.join(missing)}"))
+            continue
+
+        if stage.name in forced:
+            reason = '強制実行'
+        elif any(producers.get(r) in planned_runs for r in stage.all_inputs()):
+            reason = '上流ステージを再実行'
+        elif any(resource_fingerprint(r, ctx, state) is None for r in stage.outputs):
+            reason = '出力テーブルがありません'
+        elif state['stages'].get(stage.name, {}).get('key') != stage_key(stage, ctx, state):
+            reason = '入力が変更されました'
+        else:
+            plan.append((stage, 'skip', '入力に変更なし'))
+            continue
+
+        planned_runs.add(stage.name)
+        plan.append((stage, 'run', reason))
+
+    return plan
+
+
+def print_plan(plan):
+    """実行計画を表示"""
+    labels = {'run': '実行', 'skip': 'スキップ', 'blocked': '実行不可'}
+    print(f"{'ステージ':<24} {'判定':<8} 理由")
+    print("-" * 70)
+    for stage, action, reason in plan:
+        print(f"{stage.name:<24} {labels[action]:<8} {reason}")
+
+
+def run_pipeline(ctx, only=None, start_from=None, force=False, dry_run=False, state_file=None):
+    """パイプラインを実行
+
+    Returns:
+        dict: ステージ名 → 'run' / 'skip' / 'blocked'
+    """
+    state_file = Path(state_file) if state_file else ctx.base_dir / STATE_FILE_NAME
+    state = load_state(state_file)
+    stages = build_stages()
+
+    plan = plan_stages(stages, ctx, state, only=only, start_from=start_from, force=force)
+
+    print(f"\n{'='*50}")
+    print("【実行計画】")
+    print(f"{'='*50}")
+    print_plan(plan)
+
+    if dry_run:
+        print("\n--dry-run が指定されたため実行しません。")
+        return {stage.name: action for stage, action, _ in plan}
+
+    try:
+        for stage, action, reason in plan:
+            if action != 'run':
+                continue
+
+            print(f"\n{'='*50}")
+            print(f"【{stage.name}】{stage.description}（{reason}）")
+            print(f"{'='*50}")
+
+            with measure(ctx.profiler, stage.name) as record:
+                result = stage.run(ctx)
+                ctx.commit()
+                if isinstance(result, int):
+                    record.rows_out = result
+
+            # 出力のバージョンを記録（下流ステージのキャッシュキーに使われる）
+            key = stage_key(stage, ctx, state)
+            state['stages'][stage.name] = {'key': key}
+            for output in stage.outputs:
+                state['resources'][output] = key
+            save_state(state_file, state)
+    finally:
+        ctx.close()
+
+    return {stage.name: action for stage, action, _ in plan}
+
+
+def main(argv=None):
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description='依存関係に基づくETLパイプライン実行ツール')
+    parser.add_argument('--from', dest='start_from', metavar='STAGE',
+                        help='指定ステージとその下流ステージを再実行')
+    parser.add_argument('--only', nargs='+', metavar='STAGE',
+                        help='指定ステージのみ実行（下流ステージは実行しない）')
+    parser.add_argument('--force', action='store_true',
+                        help='入力に変更がなくても全ステージを実行')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='実行計画のみ表示')
+    parser.add_argument('--data-dir', help='入力JSONファイルのディレクトリ')
+    parser.add_argument('--cprofile', metavar='STAGE',
+                        help='指定ステージ（例: voiceactor_stats, extract_staff）をcProfileで計測')
+    parser.add_argument('--report-dir', help='プロファイルレポートの出力先（既定: db/reports）')
+    parser.add_argument('--atomic', action='store_true',
+                        help='公開中のビルドをコピーした新しいビルドで実行し、検証後にアトミックに公開する')
+    args = parser.parse_args(argv)
+
+    if args.only and args.start_from:
+        parser.error('--from と --only は同時に指定できません')
+
+    print("="*70)
+    print("ETLパイプライン実行ツール")
+    print("="*70)
+
+    profiler = ETLProfiler(cprofile_stage=args.cprofile)
+    base_dir = Path(__file__).parent
+    data_dir = Path(args.data_dir) if args.data_dir else base_dir.parent / 'data'
+
+    # アトミックモードでは公開中のビルドをコピーして差分実行し、検証後に公開する
+    build_id = None
+    build_dir = base_dir
+    if args.atomic:
+        if args.dry_run:
+            build_dir = current_db_dir(base_dir)
+        else:
+            build_id, build_dir = create_build_dir(base_dir)
+            source_dir, copied = seed_build(base_dir, build_dir, STATE_FILE_NAME)
+            print(f"ビルド作成先: {build_dir}")
+            print(f"コピー元: {source_dir}（{', '.join(copied) if copied else 'なし'}）")
+
+    ctx = PipelineContext(base_dir=build_dir, data_dir=data_dir, profiler=profiler)
+
+    exit_code = 0
+    results = {}
+    try:
+        results = run_pipeline(
+            ctx,
+            only=args.only,
+            start_from=args.start_from,
+            force=args.force,
+            dry_run=args.dry_run
+        )
+    except ValueError as e:
+        print(f"エラー: {e}")
+        exit_code = 1
+    except Exception as e:
+        print(f"エラーが発生しました: {e}")
+        exit_code = 1
+
+    # 失敗時も途中までの計測結果をレポートに残す
+    if not args.dry_run and profiler.records:
+        profiler.print_summary()
+        report_dir = Path(args.report_dir) if args.report_dir else base_dir / 'reports'
+        json_report, markdown_report = profiler.write_report(report_dir)
+        print(f"\nプロファイルレポート: {json_report}")
+        print(f"                      {markdown_report}")
+
+    if exit_code:
+        if build_id:
+            discard_build(build_dir)
+        return exit_code
+
+    run_count = sum(1 for action in results.values() if action == 'run')
+
+    if args.dry_run:
+        print(f"\n{'='*70}")
+        print(f"実行計画のみ表示しました（実行予定: {run_count}ステージ / 全{len(results)}ステージ）")
+        print(f"{'='*70}")
+        return 0
+
+    if build_id:
+        if run_count == 0:
+            print("\n実行したステージがないため、新しいビルドは公開しません。")
+            discard_build(build_dir)
+        elif not finalize_build(base_dir, build_id, build_dir, 'pipeline.py', ctx.input_files):
+            return 1
+    print(f"\n{'='*70}")
+    print(f"完了しました！（実行: {run_count}ステージ / 全{len(results)}ステージ）")
+    print(f"{'='*70}")
+    return 0
+
+
+if __name__ == "__main__":
+    exit_code = main()
+    exit(exit_code)
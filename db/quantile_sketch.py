@@ -0,0 +1,132 @@
+import numpy as np
+
+
+# セントロイド数の上限の目安（異なる値がこれ以下なら全ての値をそのまま保持するため分位点は厳密値）
+DEFAULT_COMPRESSION = 200
+
+
+class QuantileSketch:
+    """マージ可能な分位点スケッチ（t-digest方式）
+
+    値を (平均, 重み) のセントロイドで近似して保持する。セントロイドの大きさは
+    分布の両端ほど小さくなるよう制限するため、中央値付近だけでなく裾の分位点も
+    少ない誤差で求められる。別々に作ったスケッチを結合しても同じ精度が保たれる
+    ので、年ごとのスケッチから年代・全期間の分位点を計算できる。
+
+    同じ値は1つのセントロイドにまとめる（情報は失われない）。異なる値の数が
+    compression 以下の間は近似を行わず（exact=True）、分位点は pandas の
+    quantile()（線形補間）と同じ値になる。
+    """
+
+    def __init__(self, means=None, weights=None, min_value=None, max_value=None,
+                 compression=DEFAULT_COMPRESSION, exact=True):
+        self.compression = compression
+        self.means = np.asarray(means if means is not None else [], dtype=np.float64)
+        self.weights = np.asarray(weights if weights is not None else [], dtype=np.float64)
+        self.min_value = min_value
+        self.max_value = max_value
+        self.exact = exact
+
+    @classmethod
+    def from_values(cls, values, compression=DEFAULT_COMPRESSION):
+        """値の一覧からスケッチを作成（Noneは除外）"""
+        arr = np.array([v for v in values if v is not None], dtype=np.float64)
+        if len(arr) == 0:
+            return cls(compression=compression)
+        sketch = cls(arr, np.ones(len(arr)), float(arr.min()), float(arr.max()), compression)
+        sketch._compress()
+        return sketch
+
+    @classmethod
+    def merge_all(cls, sketches, compression=DEFAULT_COMPRESSION):
+        """複数のスケッチを結合した新しいスケッチを作成"""
+        sketches = [s for s in sketches if s is not None and s.count > 0]
+        if not sketches:
+            return cls(compression=compression)
+        merged = cls(
+            np.concatenate([s.means for s in sketches]),
+            np.concatenate([s.weights for s in sketches]),
+            min(s.min_value for s in sketches),
+            max(s.max_value for s in sketches),
+            compression,
+            all(s.exact for s in sketches)
+        )
+        merged._compress()
+        return merged
+
+    def merge(self, other):
+        """別のスケッチと結合した新しいスケッチを返す"""
+        return QuantileSketch.merge_all([self, other], self.compression)
+
+    @property
+    def count(self):
+        return float(self.weights.sum())
+
+    def _compress(self):
+        """同じ値のセントロイドをまとめ、上限を超えていれば隣接するものを統合"""
+        means, inverse = np.unique(self.means, return_inverse=True)
+        weights = np.bincount(inverse.ravel(), weights=self.weights, minlength=len(means))
+
+        if len(means) > self.compression:
+            total = weights.sum()
+            # 各セントロイド中心の累積分位をスケール関数 k(q) = δ/(2π) · asin(2q-1) で区間に割り当てる
+            # （両端ほど区間が細かい）。区間数はおよそ δ/2+1 個に収まる
+            cumulative = np.cumsum(weights) - weights / 2
+            q = np.clip(cumulative / total, 0.0, 1.0)
+            bins = np.floor(self.compression / (2 * np.pi) * np.arcsin(2 * q - 1)).astype(np.int64)
+            bins -= bins.min()
+            merged_weights = np.bincount(bins, weights=weights)
+            merged_sums = np.bincount(bins, weights=means * weights)
+            nonzero = merged_weights > 0
+            weights = merged_weights[nonzero]
+            means = merged_sums[nonzero] / weights
+            self.exact = False
+
+        self.means = means
+        self.weights = weights
+
+    def quantile(self, q):
+        """分位点を推定（q: 0〜1）"""
+        n = self.count
+        if n == 0:
+            return None
+        if n == 1:
+            return float(self.means[0])
+
+        rank = q * (n - 1)
+        if self.exact:
+            # 全ての値を保持しているので、前後の順位の値を線形補間する（pandasと同じ）
+            cumulative = np.cumsum(self.weights)
+            lower, upper = self.means[np.searchsorted(cumulative, [np.floor(rank), np.ceil(rank)], side='right')]
+            return float(lower + (upper - lower) * (rank - np.floor(rank)))
+
+        # 各セントロイドが占める順位の中心（重み1ならその値の順位そのもの）
+        positions = np.cumsum(self.weights) - self.weights + (self.weights - 1) / 2
+        values = self.means
+        # 最小値・最大値を両端の順位に固定して補間する
+        if positions[0] > 0:
+            positions = np.concatenate([[0.0], positions])
+            values = np.concatenate([[self.min_value], values])
+        if positions[-1] < n - 1:
+            positions = np.concatenate([positions, [n - 1]])
+            values = np.concatenate([values, [self.max_value]])
+        return float(np.interp(rank, positions, values))
+
+    def to_bytes(self):
+        """SQLiteのBLOB列に保存する形式に変換"""
+        header = np.array([
+            self.min_value if self.min_value is not None else np.nan,
+            self.max_value if self.max_value is not None else np.nan,
+            1.0 if self.exact else 0.0
+        ], dtype=np.float64)
+        body = np.column_stack([self.means, self.weights]).ravel()
+        return np.concatenate([header, body]).astype('<f8').tobytes()
+
+    @classmethod
+    def from_bytes(cls, data, compression=DEFAULT_COMPRESSION):
+        """to_bytes() で保存したスケッチを復元"""
+        arr = np.frombuffer(data, dtype='<f8')
+        min_value = None if np.isnan(arr[0]) else float(arr[0])
+        max_value = None if np.isnan(arr[1]) else float(arr[1])
+        body = arr[3:].reshape(-1, 2)
+        return cls(body[:, 0].copy(), body[:, 1].copy(), min_value, max_value, compression, bool(arr[2]))
@@ -0,0 +1,161 @@
+from filter_query import MATCH_ANY, build_facet_condition
+
+
+# 作品テーブル（別名 a）の列で絞り込めるフィルター
+MEDIA_FILTER_COLUMNS = ('seasonYear', 'season', 'format', 'source')
+
+# ランキングの並び替えに使う作品の指標（インデックスを作成する列）
+RANKING_METRICS = ('favorites', 'meanScore', 'popularity')
+
+# 1ページの件数の選択肢
+PAGE_SIZES = [50, 100, 200, 500]
+
+# ページ取得クエリの作業用の列（表示前に除く）
+HELPER_COLUMNS = ['_sort', '_row']
+
+
+def build_ranking_conditions(source, filters):
+    """ランキングの絞り込み条件を作成
+
+    Args:
+        source: ランキングの取得元 {
+            'from': FROM句（作品テーブルの別名は a）,
+            'where': 常に適用する条件,
+            'columns': 取得する列,
+            'entity_id': 人物などのID列（作品のランキングでは None）,
+            'sort': 並び替えの式（作品のランキングでは省略可）,
+            'media_sort': 人物ごとに代表とする作品を決める式（例: 'a.favorites'）,
+            'roles_table': 役割を集約する対応表（例: 'staff'。省略可）
+            'roles_agg_table': ETLで役割を集約済みのテーブル（例: 'staff_roles_agg'。
+                               あれば roles_table の代わりに使う。省略可）
+        }
+        filters: create_filter_ui() の条件（作品の列・'genre'・'genre_match'）
+
+    Returns:
+        tuple: (条件式, パラメータ)
+    """
+    conditions = [source['where']] if source.get('where') else []
+    params = []
+    for column in MEDIA_FILTER_COLUMNS:
+        value = filters.get(column)
+        if value is None:
+            continue
+        conditions.append(f'a.{column} = ?')
+        params.append(value)
+
+    genres = filters.get('genre')
+    if genres:
+        condition, condition_params = build_facet_condition(
+            'genres', [[genre] for genre in genres], filters.get('genre_match', MATCH_ANY)
+        )
+        conditions.append(condition)
+        params.extend(condition_params)
+
+    return ' AND '.join(conditions) or '1', params
+
+
+def build_ranking_count_query(source, filters):
+    """絞り込み後の件数（人物のランキングでは人数）を数えるクエリを作成"""
+    where, params = build_ranking_conditions(source, filters)
+    counted = f"DISTINCT {source['entity_id']}" if source.get('entity_id') else '*'
+    return f"SELECT COUNT({counted}) FROM {source['from']} WHERE {where}", params
+
+
+def build_ranking_page_query(source, filters, limit, offset, sort=None):
+    """ランキングの1ページ分を取得するクエリを作成
+
+    並び替え・件数の制限をSQLで行い、表示するページの行だけを取り出す。
+    人物のランキングでは、先に人物ごとの並び替えの値でページの人物を決めてから、
+    その人物の中で media_sort が最大の作品を1件ずつ選ぶ（窓関数は該当ページの人物だけに使う）。
+
+    Args:
+        source: build_ranking_conditions() を参照
+        filters: 絞り込み条件
+        limit: 1ページの件数
+        offset: 先頭から読み飛ばす件数
+        sort: 並び替えの式（省略時は source['sort']）。降順・NULLは最後
+
+    Returns:
+        tuple: (SQL, パラメータ)
+    """
+    sort = sort or source['sort']
+    where, params = build_ranking_conditions(source, filters)
+    entity_id = source.get('entity_id')
+
+    if not entity_id:
+        query = f'''
+            SELECT {source['columns']}
+            FROM {source['from']}
+            WHERE {where}
+            ORDER BY {sort} DESC NULLS LAST, a.anilist_id
+            LIMIT ? OFFSET ?
+        '''
+        return query, params + [limit, offset]
+
+    entity_column = entity_id.split('.')[-1]
+    roles_cte = ''
+    roles_select = ''
+    roles_join = ''
+    if source.get('roles_agg_table'):
+        # 人物×作品ごとの集約済みの役割を主キーで引くだけ（GROUP_CONCAT はETLで実行済み）
+        roles_select = ', roles.roles'
+        roles_join = (f"LEFT JOIN {source['roles_agg_table']} roles "
+                      f"ON roles.{entity_column} = ranked.{entity_column} "
+                      f"AND roles.anilist_id = ranked.anilist_id")
+    elif source.get('roles_table'):
+        # 人物×作品ごとの役割（重複を除き名前順にまとめる）
+        roles_cte = f''',
+            roles AS (
+                SELECT {entity_column}, anilist_id, GROUP_CONCAT(role, ', ') AS roles
+                FROM (
+                    SELECT DISTINCT r.{entity_column}, r.anilist_id, r.role
+                    FROM {source['roles_table']} r
+                    JOIN page ON r.{entity_column} = page.entity_id
+                    WHERE r.role IS NOT NULL
+                    ORDER BY r.{entity_column}, r.anilist_id, r.role
+                )
+                GROUP BY {entity_column}, anilist_id
+            )'''
+        roles_select = ', roles.roles'
+        roles_join = (f'LEFT JOIN roles ON roles.{entity_column} = ranked.{entity_column} '
+                      f'AND roles.anilist_id = ranked.anilist_id')
+
+    query = f'''
+        WITH page AS (
+            SELECT {entity_id} AS entity_id, MAX({sort}) AS sort_value
+            FROM {source['from']}
+            WHERE {where}
+            GROUP BY {entity_id}
+            ORDER BY sort_value DESC NULLS LAST, entity_id
+            LIMIT ? OFFSET ?
+        ),
+        ranked AS (
+            SELECT {source['columns']}, page.sort_value AS _sort,
+                   ROW_NUMBER() OVER (
+                       PARTITION BY {entity_id}
+                       ORDER BY {source['media_sort']} DESC NULLS LAST, a.anilist_id
+                   ) AS _row
+            FROM {source['from']}
+            JOIN page ON {entity_id} = page.entity_id
+            WHERE {where}
+        ){roles_cte}
+        SELECT ranked.*{roles_select}
+        FROM ranked
+        {roles_join}
+        WHERE ranked._row = 1
+        ORDER BY ranked._sort DESC NULLS LAST, ranked.{entity_column}
+    '''
+    return query, params + [limit, offset] + params
+
+
+def create_ranking_indexes(cursor, media_table):
+    """ランキングの並び替え・年度の絞り込みで使うインデックスを作成
+
+    作品の指標のインデックスがあれば、絞り込みのない作品ランキングは
+    インデックスを降順にたどって先頭のページだけを読める。
+    """
+    for column in RANKING_METRICS + ('seasonYear',):
+        cursor.execute(f'''
+            CREATE INDEX IF NOT EXISTS idx_{media_table}_{column}
+            ON {media_table}({column})
+        ''')
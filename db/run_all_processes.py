@@ -1,8 +1,29 @@
+import argparse
 import sqlite3
 from pathlib import Path
 import numpy as np
 import json
 
+from etl_profiler import ETLProfiler, measure
+from db_builds import create_build_dir, finalize_build, discard_build
+from create_dashboard_stats import build_dashboard_stats
+from create_stats_cube import (
+    create_stats_cube_table, extract_stats_cube_data, insert_stats_cube_data,
+    create_studios_sketch_table, extract_studios_sketch_data, insert_studios_sketch_data
+)
+from create_rank_table import build_rank_table, create_rank_table
+from genre_bits import create_genre_bits_tables, extract_genre_bits_data, insert_genre_bits_data
+from column_store import export_column_stores
+from snapshot_export import export_snapshots
+from filter_query import create_filter_indexes
+from ranking_query import create_ranking_indexes
+from search_index import build_search_index
+from staff_roles import (
+    RoleClassifier, extract_staff_role_class_data,
+    create_staff_role_class_table, insert_staff_role_class_data,
+    create_staff_roles_agg_table, build_staff_roles_agg
+)
+
 
 def month_to_season(month):
     """月を季節に変換"""
@@ -69,8 +90,10 @@ class DatabaseManager:
 class AnimeDataProcessor:
     """アニメデータの処理クラス"""
     
-    def __init__(self, cursor):
+    def __init__(self, cursor, profiler=None, role_classifier=None):
         self.cursor = cursor
+        self.profiler = profiler
+        self.role_classifier = role_classifier or RoleClassifier()
     
     def create_anime_table(self):
         """アニメデータ用のテーブルを作成"""
@@ -171,16 +194,8 @@ class AnimeDataProcessor:
                         node = edge.get('node')
                         
                         if role and isinstance(node, dict):
-                            # ロールの統一処理
-                            unified_role = None
-                            role_lower = role.lower()
-                            
-                            if 'director' in role_lower:
-                                unified_role = 'Director'
-                            elif 'character design' in role_lower:
-                                unified_role = 'Character Design'
-                            elif 'theme song' in role_lower or 'music' in role_lower:
-                                unified_role = 'Music'
+                            # ロールの統一処理（ロール文字列ごとにメモ化）
+                            unified_role = self.role_classifier.legacy_role(role)
                             
                             if unified_role:
                                 name_data = node.get('name', {})
@@ -323,8 +338,10 @@ class AnimeDataProcessor:
         """アニメデータを処理"""
         print(f"アニメJSONファイルを読み込み中: {json_file_path}")
         
-        with open(json_file_path, 'r', encoding='utf-8') as f:
-            json_data = json.load(f)
+        with measure(self.profiler, 'load_json') as record:
+            with open(json_file_path, 'r', encoding='utf-8') as f:
+                json_data = json.load(f)
+            record.rows_out = len(json_data)
         
         print(f"読み込んだレコード数: {len(json_data)}")
         
@@ -336,107 +353,161 @@ class AnimeDataProcessor:
         self.create_voiceactors_table()
         self.create_genres_table()
         self.create_staff_table()
+        create_staff_role_class_table(self.cursor)
+        create_staff_roles_agg_table(self.cursor)
         
         # データ変換
         print("\n=== データを変換中 ===")
         print("1. アニメデータを変換中...")
-        anime_records = self.transform_anime_data(json_data)
+        with measure(self.profiler, 'transform_anime', len(json_data)) as record:
+            anime_records = self.transform_anime_data(json_data)
+            record.rows_out = len(anime_records)
         print(f"   変換完了: {len(anime_records)}件")
         
         print("2. スタジオデータを抽出中...")
-        studios_records = self.extract_studios_data(json_data)
+        with measure(self.profiler, 'extract_studios', len(json_data)) as record:
+            studios_records = self.extract_studios_data(json_data)
+            record.rows_out = len(studios_records)
         print(f"   抽出完了: {len(studios_records)}件")
         
         print("3. キャラクターデータを抽出中...")
-        characters_records = self.extract_characters_data(json_data)
+        with measure(self.profiler, 'extract_characters', len(json_data)) as record:
+            characters_records = self.extract_characters_data(json_data)
+            record.rows_out = len(characters_records)
         print(f"   抽出完了: {len(characters_records)}件")
         
         print("4. 声優データを抽出中...")
-        voiceactors_records = self.extract_voiceactors_data(json_data)
+        with measure(self.profiler, 'extract_voiceactors', len(json_data)) as record:
+            voiceactors_records = self.extract_voiceactors_data(json_data)
+            record.rows_out = len(voiceactors_records)
         print(f"   抽出完了: {len(voiceactors_records)}件")
         
         print("5. ジャンルデータを抽出中...")
-        genres_records = self.extract_genres_data(json_data)
+        with measure(self.profiler, 'extract_genres', len(json_data)) as record:
+            genres_records = self.extract_genres_data(json_data)
+            record.rows_out = len(genres_records)
         print(f"   抽出完了: {len(genres_records)}件")
         
         print("6. スタッフデータを抽出中...")
-        staff_records = self.extract_staff_data(json_data)
+        with measure(self.profiler, 'extract_staff', len(json_data)) as record:
+            staff_records = self.extract_staff_data(json_data)
+            record.rows_out = len(staff_records)
         print(f"   抽出完了: {len(staff_records)}件")
         
+        print("7. スタッフロールを分類中...")
+        with measure(self.profiler, 'classify_staff_roles', len(json_data)) as record:
+            role_class_records = extract_staff_role_class_data(json_data, self.role_classifier)
+            record.rows_out = len(role_class_records)
+        print(f"   分類完了: {len(role_class_records)}件（ロール{self.role_classifier.cache_size()}種類）")
+        
         # データ挿入
         print("\n=== データを挿入中 ===")
         print("1. アニメデータを挿入中...")
-        self.cursor.executemany('''
-            INSERT OR REPLACE INTO anime (
-                anilist_id, title_romaji, title_native, format, season, 
-                seasonYear, favorites, meanScore, popularity, source, 
-                episode, contry
-            ) VALUES (
-                :anilist_id, :title_romaji, :title_native, :format, :season,
-                :seasonYear, :favorites, :meanScore, :popularity, :source,
-                :episode, :contry
-            )
-        ''', anime_records)
+        with measure(self.profiler, 'insert_anime', len(anime_records)) as record:
+            self.cursor.executemany('''
+                INSERT OR REPLACE INTO anime (
+                    anilist_id, title_romaji, title_native, format, season, 
+                    seasonYear, favorites, meanScore, popularity, source, 
+                    episode, contry
+                ) VALUES (
+                    :anilist_id, :title_romaji, :title_native, :format, :season,
+                    :seasonYear, :favorites, :meanScore, :popularity, :source,
+                    :episode, :contry
+                )
+            ''', anime_records)
+            record.rows_out = len(anime_records)
         print(f"   挿入完了: {len(anime_records)}件")
         
         print("2. スタジオデータを挿入中...")
-        self.cursor.executemany('''
-            INSERT OR REPLACE INTO studios (
-                studios_id, studios_name, anilist_id
-            ) VALUES (
-                :studios_id, :studios_name, :anilist_id
-            )
-        ''', studios_records)
+        with measure(self.profiler, 'insert_studios', len(studios_records)) as record:
+            self.cursor.executemany('''
+                INSERT OR REPLACE INTO studios (
+                    studios_id, studios_name, anilist_id
+                ) VALUES (
+                    :studios_id, :studios_name, :anilist_id
+                )
+            ''', studios_records)
+            record.rows_out = len(studios_records)
         print(f"   挿入完了: {len(studios_records)}件")
         
         print("3. キャラクターデータを挿入中...")
-        self.cursor.executemany('''
-            INSERT OR REPLACE INTO characters (
-                chara_id, chara_name, favorites, anilist_id
-            ) VALUES (
-                :chara_id, :chara_name, :favorites, :anilist_id
-            )
-        ''', characters_records)
+        with measure(self.profiler, 'insert_characters', len(characters_records)) as record:
+            self.cursor.executemany('''
+                INSERT OR REPLACE INTO characters (
+                    chara_id, chara_name, favorites, anilist_id
+                ) VALUES (
+                    :chara_id, :chara_name, :favorites, :anilist_id
+                )
+            ''', characters_records)
+            record.rows_out = len(characters_records)
         print(f"   挿入完了: {len(characters_records)}件")
         
         print("4. 声優データを挿入中...")
-        self.cursor.executemany('''
-            INSERT OR REPLACE INTO voiceactors (
-                voiceactor_id, voiceactor_name, favorites, anilist_id, chara_id
-            ) VALUES (
-                :voiceactor_id, :voiceactor_name, :favorites, :anilist_id, :chara_id
-            )
-        ''', voiceactors_records)
+        with measure(self.profiler, 'insert_voiceactors', len(voiceactors_records)) as record:
+            self.cursor.executemany('''
+                INSERT OR REPLACE INTO voiceactors (
+                    voiceactor_id, voiceactor_name, favorites, anilist_id, chara_id
+                ) VALUES (
+                    :voiceactor_id, :voiceactor_name, :favorites, :anilist_id, :chara_id
+                )
+            ''', voiceactors_records)
+            record.rows_out = len(voiceactors_records)
         print(f"   挿入完了: {len(voiceactors_records)}件")
         
         print("5. ジャンルデータを挿入中...")
-        self.cursor.executemany('''
-            INSERT OR REPLACE INTO genres (
-                anilist_id, genre_name
-            ) VALUES (
-                :anilist_id, :genre_name
-            )
-        ''', genres_records)
+        with measure(self.profiler, 'insert_genres', len(genres_records)) as record:
+            self.cursor.executemany('''
+                INSERT OR REPLACE INTO genres (
+                    anilist_id, genre_name
+                ) VALUES (
+                    :anilist_id, :genre_name
+                )
+            ''', genres_records)
+            record.rows_out = len(genres_records)
         print(f"   挿入完了: {len(genres_records)}件")
         
         print("6. スタッフデータを挿入中...")
-        self.cursor.executemany('''
-            INSERT OR REPLACE INTO staff (
-                staff_id, role, staff_name, favorites, anilist_id
-            ) VALUES (
-                :staff_id, :role, :staff_name, :favorites, :anilist_id
-            )
-        ''', staff_records)
+        with measure(self.profiler, 'insert_staff', len(staff_records)) as record:
+            self.cursor.executemany('''
+                INSERT OR REPLACE INTO staff (
+                    staff_id, role, staff_name, favorites, anilist_id
+                ) VALUES (
+                    :staff_id, :role, :staff_name, :favorites, :anilist_id
+                )
+            ''', staff_records)
+            record.rows_out = len(staff_records)
         print(f"   挿入完了: {len(staff_records)}件")
         
+        print("7. スタッフロール分類を挿入中...")
+        with measure(self.profiler, 'insert_staff_role_class', len(role_class_records)) as record:
+            insert_staff_role_class_data(self.cursor, role_class_records)
+            record.rows_out = len(role_class_records)
+        print(f"   挿入完了: {len(role_class_records)}件")
+        
+        print("8. スタッフ役割の集約を作成中...")
+        with measure(self.profiler, 'build_staff_roles_agg') as record:
+            roles_agg_count = build_staff_roles_agg(self.cursor)
+            record.rows_out = roles_agg_count
+        print(f"   作成完了: {roles_agg_count}件")
+        
+        print("9. フィルター用インデックスを作成中...")
+        with measure(self.profiler, 'create_filter_indexes'):
+            create_filter_indexes(self.cursor)
+        
+        print("10. ランキング用インデックスを作成中...")
+        with measure(self.profiler, 'create_ranking_indexes'):
+            create_ranking_indexes(self.cursor, 'anime')
+        
         return len(json_data)
 
 
 class MangaDataProcessor:
     """マンガデータの処理クラス"""
     
-    def __init__(self, cursor):
+    def __init__(self, cursor, profiler=None, role_classifier=None):
         self.cursor = cursor
+        self.profiler = profiler
+        self.role_classifier = role_classifier or RoleClassifier()
     
     def create_manga_table(self):
         """マンガデータ用のテーブルを作成"""
@@ -547,6 +618,7 @@ class MangaDataProcessor:
         """スタッフデータを抽出（Director, Character Design, Theme Song, Musicの部分一致のみ）"""
         staff_records = []
         target_roles = ['Director', 'Character Design', 'Theme Song', 'Music']
+        role_matches = {}
         
         for item in json_data:
             anilist_id = item.get('id')
@@ -568,8 +640,12 @@ class MangaDataProcessor:
                         if not role:
                             continue
                         
-                        # 対象ロールの部分一致チェック
-                        if not any(target in role for target in target_roles):
+                        # 対象ロールの部分一致チェック（同じロール文字列は再判定しない）
+                        matched = role_matches.get(role)
+                        if matched is None:
+                            matched = any(target in role for target in target_roles)
+                            role_matches[role] = matched
+                        if not matched:
                             continue
                         
                         node = edge.get('node', {})
@@ -592,25 +668,8 @@ class MangaDataProcessor:
         
         return staff_records
     
-    def process_manga_data(self, json_file_path):
-        """マンガデータを処理"""
-        print(f"マンガJSONファイルを読み込み中: {json_file_path}")
-        
-        with open(json_file_path, 'r', encoding='utf-8') as f:
-            json_data = json.load(f)
-        
-        print(f"読み込んだレコード数: {len(json_data)}")
-        
-        # テーブル作成
-        print("マンガテーブルを作成中...")
-        self.create_manga_table()
-        self.create_genres_table()
-        self.create_characters_table()
-        self.create_staff_table()
-        
-        # データ変換
-        print("\n=== データを変換中 ===")
-        print("1. マンガデータを変換中...")
+    def transform_manga_data(self, json_data):
+        """JSONデータをデータベース用に変換（startDateから年度・季節を算出）"""
         transformed = []
         for item in json_data:
             start_date = item.get('startDate', {})
@@ -638,74 +697,140 @@ class MangaDataProcessor:
             }
             transformed.append(manga_record)
         
+        return transformed
+    
+    def process_manga_data(self, json_file_path):
+        """マンガデータを処理"""
+        print(f"マンガJSONファイルを読み込み中: {json_file_path}")
+        
+        with measure(self.profiler, 'load_json') as record:
+            with open(json_file_path, 'r', encoding='utf-8') as f:
+                json_data = json.load(f)
+            record.rows_out = len(json_data)
+        
+        print(f"読み込んだレコード数: {len(json_data)}")
+        
+        # テーブル作成
+        print("マンガテーブルを作成中...")
+        self.create_manga_table()
+        self.create_genres_table()
+        self.create_characters_table()
+        self.create_staff_table()
+        create_staff_role_class_table(self.cursor)
+        create_staff_roles_agg_table(self.cursor)
+        
+        # データ変換
+        print("\n=== データを変換中 ===")
+        print("1. マンガデータを変換中...")
+        with measure(self.profiler, 'transform_manga', len(json_data)) as record:
+            transformed = self.transform_manga_data(json_data)
+            record.rows_out = len(transformed)
+        
         print(f"   変換完了: {len(transformed)}件")
         
         print("2. ジャンルデータを抽出中...")
-        genres_records = self.extract_genres_data(json_data)
+        with measure(self.profiler, 'extract_genres', len(json_data)) as record:
+            genres_records = self.extract_genres_data(json_data)
+            record.rows_out = len(genres_records)
         print(f"   抽出完了: {len(genres_records)}件")
         
         print("3. キャラクターデータを抽出中...")
-        characters_records = self.extract_characters_data(json_data)
+        with measure(self.profiler, 'extract_characters', len(json_data)) as record:
+            characters_records = self.extract_characters_data(json_data)
+            record.rows_out = len(characters_records)
         print(f"   抽出完了: {len(characters_records)}件")
         
         print("4. スタッフデータを抽出中...")
-        staff_records = self.extract_staff_data(json_data)
+        with measure(self.profiler, 'extract_staff', len(json_data)) as record:
+            staff_records = self.extract_staff_data(json_data)
+            record.rows_out = len(staff_records)
         print(f"   抽出完了: {len(staff_records)}件")
         
+        print("5. スタッフロールを分類中...")
+        with measure(self.profiler, 'classify_staff_roles', len(json_data)) as record:
+            role_class_records = extract_staff_role_class_data(json_data, self.role_classifier)
+            record.rows_out = len(role_class_records)
+        print(f"   分類完了: {len(role_class_records)}件（ロール{self.role_classifier.cache_size()}種類）")
+        
         # データ挿入
         print("\n=== データを挿入中 ===")
         print("1. マンガデータを挿入中...")
-        self.cursor.executemany('''
-            INSERT OR REPLACE INTO manga (
-                anilist_id, title_romaji, title_native, format, season, 
-                seasonYear, favorites, meanScore, popularity, source, 
-                episode, contry
-            ) VALUES (
-                :anilist_id, :title_romaji, :title_native, :format, :season,
-                :seasonYear, :favorites, :meanScore, :popularity, :source,
-                :episode, :contry
-            )
-        ''', transformed)
+        with measure(self.profiler, 'insert_manga', len(transformed)) as record:
+            self.cursor.executemany('''
+                INSERT OR REPLACE INTO manga (
+                    anilist_id, title_romaji, title_native, format, season, 
+                    seasonYear, favorites, meanScore, popularity, source, 
+                    episode, contry
+                ) VALUES (
+                    :anilist_id, :title_romaji, :title_native, :format, :season,
+                    :seasonYear, :favorites, :meanScore, :popularity, :source,
+                    :episode, :contry
+                )
+            ''', transformed)
+            record.rows_out = len(transformed)
         print(f"   挿入完了: {len(transformed)}件")
         
         print("2. ジャンルデータを挿入中...")
-        self.cursor.executemany('''
-            INSERT OR REPLACE INTO genres (
-                anilist_id, genre_name
-            ) VALUES (
-                :anilist_id, :genre_name
-            )
-        ''', genres_records)
+        with measure(self.profiler, 'insert_genres', len(genres_records)) as record:
+            self.cursor.executemany('''
+                INSERT OR REPLACE INTO genres (
+                    anilist_id, genre_name
+                ) VALUES (
+                    :anilist_id, :genre_name
+                )
+            ''', genres_records)
+            record.rows_out = len(genres_records)
         print(f"   挿入完了: {len(genres_records)}件")
         
         print("3. キャラクターデータを挿入中...")
-        self.cursor.executemany('''
-            INSERT OR REPLACE INTO characters (
-                chara_id, chara_name, favorites, anilist_id
-            ) VALUES (
-                :chara_id, :chara_name, :favorites, :anilist_id
-            )
-        ''', characters_records)
+        with measure(self.profiler, 'insert_characters', len(characters_records)) as record:
+            self.cursor.executemany('''
+                INSERT OR REPLACE INTO characters (
+                    chara_id, chara_name, favorites, anilist_id
+                ) VALUES (
+                    :chara_id, :chara_name, :favorites, :anilist_id
+                )
+            ''', characters_records)
+            record.rows_out = len(characters_records)
         print(f"   挿入完了: {len(characters_records)}件")
         
         print("4. スタッフデータを挿入中...")
-        self.cursor.executemany('''
-            INSERT OR REPLACE INTO staff (
-                staff_id, role, staff_name, favorites, anilist_id
-            ) VALUES (
-                :staff_id, :role, :staff_name, :favorites, :anilist_id
-            )
-        ''', staff_records)
+        with measure(self.profiler, 'insert_staff', len(staff_records)) as record:
+            self.cursor.executemany('''
+                INSERT OR REPLACE INTO staff (
+                    staff_id, role, staff_name, favorites, anilist_id
+                ) VALUES (
+                    :staff_id, :role, :staff_name, :favorites, :anilist_id
+                )
+            ''', staff_records)
+            record.rows_out = len(staff_records)
         print(f"   挿入完了: {len(staff_records)}件")
         
+        print("5. スタッフロール分類を挿入中...")
+        with measure(self.profiler, 'insert_staff_role_class', len(role_class_records)) as record:
+            insert_staff_role_class_data(self.cursor, role_class_records)
+            record.rows_out = len(role_class_records)
+        print(f"   挿入完了: {len(role_class_records)}件")
+        
+        print("6. スタッフ役割の集約を作成中...")
+        with measure(self.profiler, 'build_staff_roles_agg') as record:
+            roles_agg_count = build_staff_roles_agg(self.cursor)
+            record.rows_out = roles_agg_count
+        print(f"   作成完了: {roles_agg_count}件")
+        
+        print("7. ランキング用インデックスを作成中...")
+        with measure(self.profiler, 'create_ranking_indexes'):
+            create_ranking_indexes(self.cursor, 'manga')
+        
         return len(transformed)
 
 
 class StatsProcessor:
     """統計処理クラス"""
     
-    def __init__(self, cursor):
+    def __init__(self, cursor, profiler=None):
         self.cursor = cursor
+        self.profiler = profiler
     
     def create_unique_tables(self):
         """ユニークテーブルを作成"""
@@ -885,21 +1010,25 @@ class StatsProcessor:
             )
         ''')
     
-    def populate_unique_tables(self):
-        """ユニークテーブルにデータを投入"""
+    def populate_unique_tables(self, media_table='anime'):
+        """ユニークテーブルにデータを投入
+        
+        Args:
+            media_table: 作品テーブル名（'anime' or 'manga'）
+        """
         self.cursor.execute('''
             INSERT OR IGNORE INTO unique_genres (genre_name)
             SELECT DISTINCT genre_name FROM genres WHERE genre_name IS NOT NULL
         ''')
         
-        self.cursor.execute('''
+        self.cursor.execute(f'''
             INSERT OR IGNORE INTO unique_seasons (season_name)
-            SELECT DISTINCT season FROM anime WHERE season IS NOT NULL
+            SELECT DISTINCT season FROM {media_table} WHERE season IS NOT NULL
         ''')
         
-        self.cursor.execute('''
+        self.cursor.execute(f'''
             INSERT OR IGNORE INTO unique_season_years (season_year)
-            SELECT DISTINCT seasonYear FROM anime WHERE seasonYear IS NOT NULL
+            SELECT DISTINCT seasonYear FROM {media_table} WHERE seasonYear IS NOT NULL
         ''')
     
     def populate_voiceactor_stats(self):
@@ -1057,8 +1186,13 @@ class StatsProcessor:
         return len(enhanced_records)
 
 
-def main():
+def main(argv=None):
     """メイン処理"""
+    parser = argparse.ArgumentParser(description='統合データベース作成・分析ツール')
+    parser.add_argument('--atomic', action='store_true',
+                        help='db/builds/ 以下の新しいビルドに作成し、検証後にアトミックに公開する')
+    args = parser.parse_args(argv)
+    
     print("="*70)
     print("統合データベース作成・分析ツール")
     print("="*70)
@@ -1070,8 +1204,17 @@ def main():
     anime_json_file = data_dir / 'anilist_rank_data_analysis_popular_all_anime.json'
     manga_json_file = data_dir / 'anilist_rank_data_analysis_popular_all_manga.json'
     
-    anime_db_file = base_dir / 'anime_data.db'
-    manga_db_file = base_dir / 'manga_data.db'
+    # アトミックモードでは公開中のデータベースに触れず、新しいビルドに作成する
+    db_dir = base_dir
+    build_id = None
+    if args.atomic:
+        build_id, db_dir = create_build_dir(base_dir)
+        print(f"ビルド作成先: {db_dir}")
+    
+    anime_db_file = db_dir / 'anime_data.db'
+    manga_db_file = db_dir / 'manga_data.db'
+    
+    profiler = ETLProfiler()
     
     try:
         # アニメデータベースの処理
@@ -1082,12 +1225,15 @@ def main():
             
             anime_db = DatabaseManager(anime_db_file)
             anime_cursor = anime_db.connect()
+            profiler.attach_connection(anime_db.conn)
             
-            anime_processor = AnimeDataProcessor(anime_cursor)
-            anime_count = anime_processor.process_anime_data(anime_json_file)
+            with profiler.stage('anime_base') as record:
+                anime_processor = AnimeDataProcessor(anime_cursor, profiler)
+                anime_count = anime_processor.process_anime_data(anime_json_file)
+                record.rows_out = anime_count
             
             # 統計テーブル作成
-            stats_processor = StatsProcessor(anime_cursor)
+            stats_processor = StatsProcessor(anime_cursor, profiler)
             print("統計テーブルを作成中...")
             stats_processor.create_unique_tables()
             stats_processor.create_voiceactor_tables()
@@ -1095,7 +1241,8 @@ def main():
             stats_processor.create_staff_tables()
             stats_processor.create_enhanced_staff_table()
             
-            anime_db.commit()
+            with profiler.stage('anime_commit'):
+                anime_db.commit()
             anime_db.close()
             
             print(f"アニメデータベース処理完了: {anime_count}件")
@@ -1110,31 +1257,52 @@ def main():
             
             manga_db = DatabaseManager(manga_db_file)
             manga_cursor = manga_db.connect()
+            profiler.attach_connection(manga_db.conn)
             
-            manga_processor = MangaDataProcessor(manga_cursor)
-            manga_count = manga_processor.process_manga_data(manga_json_file)
+            with profiler.stage('manga_base') as record:
+                manga_processor = MangaDataProcessor(manga_cursor, profiler)
+                manga_count = manga_processor.process_manga_data(manga_json_file)
+                record.rows_out = manga_count
             
             # 統計テーブル作成
-            stats_processor = StatsProcessor(manga_cursor)
+            stats_processor = StatsProcessor(manga_cursor, profiler)
             print("統計テーブルを作成中...")
             stats_processor.create_unique_tables()
             
             # ユニークテーブルにデータを投入
             print("ユニークテーブルにデータを投入中...")
-            manga_cursor.execute('''
-                INSERT OR IGNORE INTO unique_genres (genre_name)
-                SELECT DISTINCT genre_name FROM genres WHERE genre_name IS NOT NULL
-            ''')
-            manga_cursor.execute('''
-                INSERT OR IGNORE INTO unique_seasons (season_name)
-                SELECT DISTINCT season FROM manga WHERE season IS NOT NULL
-            ''')
-            manga_cursor.execute('''
-                INSERT OR IGNORE INTO unique_season_years (season_year)
-                SELECT DISTINCT seasonYear FROM manga WHERE seasonYear IS NOT NULL
-            ''')
+            with profiler.stage('manga_unique'):
+                stats_processor.populate_unique_tables('manga')
+            
+            # ダッシュボード用集計テーブルを作成
+            with profiler.stage('manga_dashboard_stats'):
+                build_dashboard_stats(manga_cursor, 'manga')
             
-            manga_db.commit()
+            # 基礎統計画面用の統計キューブを作成
+            with profiler.stage('manga_stats_cube') as record:
+                create_stats_cube_table(manga_cursor)
+                cube_data = extract_stats_cube_data(manga_cursor, 'manga')
+                insert_stats_cube_data(manga_cursor, cube_data)
+                record.rows_out = len(cube_data)
+            
+            # ジャンルでの絞り込み用のビット集合を作成
+            with profiler.stage('manga_genre_bits') as record:
+                create_genre_bits_tables(manga_cursor)
+                genre_bits_data = extract_genre_bits_data(manga_cursor)
+                insert_genre_bits_data(manga_cursor, genre_bits_data)
+                record.rows_out = len(genre_bits_data['media_genre_bits'])
+            
+            # ランキング画面用の順位テーブルを作成
+            with profiler.stage('manga_ranks') as record:
+                create_rank_table(manga_cursor)
+                record.rows_out = build_rank_table(manga_cursor, 'manga')
+            
+            # 全文検索インデックスを作成
+            with profiler.stage('manga_search_index') as record:
+                record.rows_out = build_search_index(manga_cursor, 'manga', manga_json_file)
+            
+            with profiler.stage('manga_commit'):
+                manga_db.commit()
             manga_db.close()
             
             print(f"マンガデータベース処理完了: {manga_count}件")
@@ -1160,28 +1328,69 @@ def main():
             
             anime_db = DatabaseManager(anime_db_file)
             anime_cursor = anime_db.connect()
+            profiler.attach_connection(anime_db.conn)
             
             manga_cursor = None
             if manga_db_file.exists():
                 manga_db = DatabaseManager(manga_db_file)
                 manga_cursor = manga_db.connect()
+                profiler.attach_connection(manga_db.conn)
             
-            stats_processor = StatsProcessor(anime_cursor)
+            stats_processor = StatsProcessor(anime_cursor, profiler)
             
             # ユニークテーブルにデータを投入
             print("ユニークテーブルにデータを投入中...")
-            stats_processor.populate_unique_tables()
+            with profiler.stage('anime_unique'):
+                stats_processor.populate_unique_tables()
             
             # 統計データを生成
-            stats_processor.populate_voiceactor_stats()
-            stats_processor.populate_studios_stats()
-            stats_processor.populate_staff_stats()
+            with profiler.stage('voiceactor_stats'):
+                stats_processor.populate_voiceactor_stats()
+            with profiler.stage('studios_stats'):
+                stats_processor.populate_studios_stats()
+            with profiler.stage('staff_stats'):
+                stats_processor.populate_staff_stats()
             
             # 拡張スタッフ統計を生成
-            enhanced_count = stats_processor.populate_enhanced_staff_stats(anime_cursor, manga_cursor)
+            with profiler.stage('staff_enhanced') as record:
+                enhanced_count = stats_processor.populate_enhanced_staff_stats(anime_cursor, manga_cursor)
+                record.rows_out = enhanced_count
             print(f"拡張スタッフ統計完了: {enhanced_count}件")
             
-            anime_db.commit()
+            # ダッシュボード用集計テーブルを作成
+            with profiler.stage('anime_dashboard_stats'):
+                build_dashboard_stats(anime_cursor, 'anime')
+            
+            # 基礎統計画面用の統計キューブを作成
+            with profiler.stage('anime_stats_cube') as record:
+                create_stats_cube_table(anime_cursor)
+                cube_data = extract_stats_cube_data(anime_cursor, 'anime')
+                insert_stats_cube_data(anime_cursor, cube_data)
+                record.rows_out = len(cube_data)
+            with profiler.stage('studios_sketch') as record:
+                create_studios_sketch_table(anime_cursor)
+                sketch_data = extract_studios_sketch_data(anime_cursor)
+                insert_studios_sketch_data(anime_cursor, sketch_data)
+                record.rows_out = len(sketch_data)
+            
+            # ジャンルでの絞り込み用のビット集合を作成
+            with profiler.stage('anime_genre_bits') as record:
+                create_genre_bits_tables(anime_cursor)
+                genre_bits_data = extract_genre_bits_data(anime_cursor)
+                insert_genre_bits_data(anime_cursor, genre_bits_data)
+                record.rows_out = len(genre_bits_data['media_genre_bits'])
+            
+            # ランキング画面用の順位テーブルを作成
+            with profiler.stage('anime_ranks') as record:
+                create_rank_table(anime_cursor)
+                record.rows_out = build_rank_table(anime_cursor, 'anime')
+            
+            # 全文検索インデックスを作成
+            with profiler.stage('anime_search_index') as record:
+                record.rows_out = build_search_index(anime_cursor, 'anime', anime_json_file)
+            
+            with profiler.stage('stats_commit'):
+                anime_db.commit()
             anime_db.close()
             
             if manga_cursor:
@@ -1189,23 +1398,53 @@ def main():
             
             print("統計処理完了！")
         
+        # ダッシュボード用のスナップショット（Parquet）を書き出す（コミット・切断後のデータベースから）
+        with profiler.stage('snapshots') as record:
+            print("\nダッシュボード用スナップショットを作成中...")
+            record.rows_out = export_snapshots(db_dir)
+        
+        # 相関分析・基礎統計で使う数値の列を作品ID順の .npy に書き出す（メモリマップで共有して読む）
+        with profiler.stage('column_stores') as record:
+            print("\n数値の列ストアを作成中...")
+            record.rows_out = export_column_stores(db_dir)
+        
         print("\n各データベースには以下のテーブルが作成されています:")
         print("  - 基本データテーブル (anime/manga, studios, characters, etc.)")
         print("  - ユニークマスターテーブル (genres, seasons, years)")
         print("  - 統計テーブル (voiceactor_*, studios_*, staff_*)")
         print("  - 拡張統計テーブル (staff_basic_enhanced)")
-        
-        print(f"\n個別の処理を実行する場合は、以下のスクリプトを使用してください:")
-        print(f"  - アニメDB作成: python json_to_db_anime.py")
-        print(f"  - マンガDB作成: python json_to_db_manga.py")
-        print(f"  - ユニークテーブル: python create_unique_tables.py")
-        print(f"  - 声優統計: python create_voiceactor_stats.py")
-        print(f"  - スタジオ・スタッフ統計: python create_studios_staff_stats.py")
-        print(f"  - 拡張スタッフ統計: python create_enhanced_staff_with_manga.py")
+        print("  - ダッシュボード集計テーブル (genre_stats, source_stats)")
+        print("  - 統計キューブ・分位点スケッチ (stats_cube, studios_sketch)")
+        print("  - ジャンルのビット集合 (genre_codes, media_genre_bits)")
+        print("  - 順位テーブル (ranks)")
+        print("  - 全文検索インデックス (search_index)")
+        print("  - ダッシュボード用スナップショット (snapshots/*.parquet)")
+        print("  - 数値の列ストア (columns/<media>/*.npy)")
+        
+        print(f"\n個別の処理を実行する場合は、パイプライン実行ツールを使用してください:")
+        print(f"  - 変更のあったステージのみ実行: python pipeline.py")
+        print(f"  - 指定ステージ以降を再実行: python pipeline.py --from voiceactor_stats")
+        print(f"  - 指定ステージのみ実行: python pipeline.py --only studios_staff_stats")
+        print(f"  - 実行計画の確認のみ: python pipeline.py --dry-run")
+        print(f"  - 新しいビルドに作成して検証後に公開: python pipeline.py --atomic")
         
     except Exception as e:
         print(f"エラーが発生しました: {e}")
+        if build_id:
+            discard_build(db_dir)
         return 1
+    finally:
+        # 失敗時も途中までの計測結果をレポートに残す
+        if profiler.records:
+            profiler.print_summary()
+            json_report, markdown_report = profiler.write_report(base_dir / 'reports')
+            print(f"\nプロファイルレポート: {json_report}")
+            print(f"                      {markdown_report}")
+    
+    if build_id:
+        input_files = {'anime_json': anime_json_file, 'manga_json': manga_json_file}
+        if not finalize_build(base_dir, build_id, db_dir, 'run_all_processes.py', input_files):
+            return 1
     
     print(f"\n{'='*70}")
     print("すべての処理が完了しました！")
@@ -0,0 +1,314 @@
+import argparse
+import json
+import re
+import sqlite3
+from pathlib import Path
+
+
+# 検索対象の種類 → 表示名
+SEARCH_KINDS = {
+    'title': 'タイトル',
+    'character': 'キャラクター',
+    'staff': 'スタッフ',
+    'voiceactor': '声優',
+    'studio': 'スタジオ'
+}
+
+# 種類ごとの索引元（作品との対応表, ID列, 名前列, 並び替え用の指標）
+# title は作品テーブル自体を使うため含めない
+SEARCH_SOURCES = {
+    'character': ('characters', 'chara_id', 'chara_name', 'MAX(favorites)'),
+    'staff': ('staff', 'staff_id', 'staff_name', 'MAX(favorites)'),
+    'voiceactor': ('voiceactors', 'voiceactor_id', 'voiceactor_name', 'MAX(favorites)'),
+    'studio': ('studios', 'studios_id', 'studios_name', 'COUNT(DISTINCT anilist_id)')
+}
+
+# 日本語は単語区切りがないため3文字単位（trigram）で索引する。未対応のSQLiteではunicode61を使う
+TOKENIZERS = ['trigram', 'unicode61 remove_diacritics 2']
+
+# trigram で MATCH できる最短の語の長さ（これより短い語は LIKE で絞り込む）
+MIN_MATCH_LENGTH = 3
+
+# bm25 の列ごとの重み（name, name_native, description）: 名前の一致を説明文より優先する
+BM25_WEIGHTS = (10.0, 10.0, 1.0)
+
+HTML_TAG_PATTERN = re.compile(r'<[^>]+>')
+
+
+def create_search_index_table(cursor):
+    """全文検索用のFTS5テーブルを作成
+
+    Returns:
+        str: 使用したトークナイザ
+    """
+    cursor.execute('DROP TABLE IF EXISTS search_index')
+    for tokenizer in TOKENIZERS:
+        try:
+            cursor.execute(f'''
+                CREATE VIRTUAL TABLE search_index USING fts5(
+                    name,
+                    name_native,
+                    description,
+                    kind UNINDEXED,
+                    entity_id UNINDEXED,
+                    weight UNINDEXED,
+                    tokenize = '{tokenizer}'
+                )
+            ''')
+            return tokenizer
+        except sqlite3.OperationalError:
+            continue
+    raise sqlite3.OperationalError('FTS5が利用できないSQLiteです')
+
+
+def load_descriptions(json_file):
+    """入力JSONから作品の説明文を取得（HTMLタグは除去）"""
+    json_file = Path(json_file)
+    if not json_file.exists():
+        return {}
+    with open(json_file, 'r', encoding='utf-8') as f:
+        json_data = json.load(f)
+
+    descriptions = {}
+    for item in json_data:
+        description = item.get('description')
+        if item.get('id') is not None and description:
+            description = HTML_TAG_PATTERN.sub('', description).strip()
+            if description:
+                descriptions[item['id']] = description
+    return descriptions
+
+
+def extract_search_index_data(cursor, media_table='anime', descriptions=None):
+    """作品タイトル・説明文と、キャラクター・スタッフ・声優・スタジオ名の索引データを作成
+
+    キャラクター等は作品ごとではなくIDごとに1行とし、作品への対応は元のテーブルで引く。
+    """
+    print("検索インデックスのデータを作成中...")
+    descriptions = descriptions or {}
+
+    cursor.execute(f'''
+        SELECT anilist_id, title_romaji, title_native, popularity
+        FROM {media_table}
+        WHERE title_romaji IS NOT NULL
+    ''')
+    index_data = [
+        {
+            'name': title_romaji,
+            'name_native': title_native,
+            'description': descriptions.get(anilist_id),
+            'kind': 'title',
+            'entity_id': anilist_id,
+            'weight': popularity or 0
+        }
+        for anilist_id, title_romaji, title_native, popularity in cursor.fetchall()
+    ]
+
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+    existing_tables = {row[0] for row in cursor.fetchall()}
+    for kind, (table_name, id_column, name_column, weight_expr) in SEARCH_SOURCES.items():
+        if table_name not in existing_tables:
+            continue
+        cursor.execute(f'''
+            SELECT {id_column}, MAX({name_column}), {weight_expr}
+            FROM {table_name}
+            WHERE {id_column} IS NOT NULL AND {name_column} IS NOT NULL
+            GROUP BY {id_column}
+        ''')
+        index_data.extend(
+            {
+                'name': name,
+                'name_native': None,
+                'description': None,
+                'kind': kind,
+                'entity_id': entity_id,
+                'weight': weight or 0
+            }
+            for entity_id, name, weight in cursor.fetchall()
+        )
+
+    print(f"   処理完了: {len(index_data)}件（説明文 {len(descriptions)}件）")
+    return index_data
+
+
+def insert_search_index_data(cursor, index_data):
+    """検索インデックスにデータを挿入して最適化"""
+    cursor.execute('DELETE FROM search_index')
+    cursor.executemany('''
+        INSERT INTO search_index (name, name_native, description, kind, entity_id, weight)
+        VALUES (:name, :name_native, :description, :kind, :entity_id, :weight)
+    ''', index_data)
+    cursor.execute("INSERT INTO search_index(search_index) VALUES ('optimize')")
+
+
+def build_search_index(cursor, media_table='anime', json_file=None):
+    """検索インデックスを作成・更新
+
+    Returns:
+        int: 索引した件数
+    """
+    tokenizer = create_search_index_table(cursor)
+    print(f"   トークナイザ: {tokenizer}")
+    descriptions = load_descriptions(json_file) if json_file else {}
+    index_data = extract_search_index_data(cursor, media_table, descriptions)
+    insert_search_index_data(cursor, index_data)
+    return len(index_data)
+
+
+# ==================== 検索 ====================
+
+def _quote_term(term):
+    """FTS5のフレーズとして扱えるように語を引用符で囲む"""
+    return '"' + term.replace('"', '""') + '"'
+
+
+def build_search_condition(query, kinds=None):
+    """検索語から WHERE 句とパラメータを作成
+
+    空白区切りの語は全て含むもの（AND）を返す。trigram で索引できない短い語は
+    LIKE の部分一致で絞り込む。
+
+    Returns:
+        tuple: (WHERE句, パラメータ, MATCHを使うか)。検索語がなければ None
+    """
+    terms = [term for term in (query or '').split() if term]
+    if not terms:
+        return None
+
+    conditions = []
+    params = []
+    match_terms = [term for term in terms if len(term) >= MIN_MATCH_LENGTH]
+    if match_terms:
+        conditions.append('search_index MATCH ?')
+        params.append(' AND '.join(_quote_term(term) for term in match_terms))
+    for term in terms:
+        if len(term) < MIN_MATCH_LENGTH:
+            conditions.append('(name LIKE ? OR name_native LIKE ? OR description LIKE ?)')
+            params.extend([f'%{term}%'] * 3)
+    if kinds:
+        conditions.append(f"kind IN ({','.join('?' for _ in kinds)})")
+        params.extend(kinds)
+    return ' AND '.join(conditions), params, bool(match_terms)
+
+
+def search(conn, query, kinds=None, limit=20, offset=0):
+    """検索インデックスを検索し、関連度順の1ページ分と総件数を返す
+
+    Args:
+        conn: search_index を持つデータベースの接続
+        query: 検索語（空白区切りで AND）
+        kinds: 対象の種類（SEARCH_KINDS のキー）のリスト。None なら全て
+        limit: 1ページの件数
+        offset: 先頭からの件数
+
+    Returns:
+        tuple: (結果のdictのリスト, 総件数)
+    """
+    condition = build_search_condition(query, kinds)
+    if condition is None:
+        return [], 0
+    where_clause, params, use_match = condition
+
+    total = conn.execute(f'SELECT COUNT(*) FROM search_index WHERE {where_clause}', params).fetchone()[0]
+    if total == 0:
+        return [], 0
+
+    if use_match:
+        score = f"bm25(search_index, {', '.join(str(w) for w in BM25_WEIGHTS)})"
+        snippet = "snippet(search_index, 2, '【', '】', '…', 16)"
+    else:
+        score = '0.0'
+        snippet = 'substr(description, 1, 80)'
+    rows = conn.execute(f'''
+        SELECT kind, entity_id, name, name_native, {snippet}, weight, {score} AS score
+        FROM search_index
+        WHERE {where_clause}
+        ORDER BY score, weight DESC
+        LIMIT ? OFFSET ?
+    ''', params + [limit, offset]).fetchall()
+
+    results = [
+        {
+            'kind': kind,
+            'entity_id': entity_id,
+            'name': name,
+            'name_native': name_native,
+            'snippet': snippet_text,
+            'weight': weight,
+            'score': -score if use_match else 0.0
+        }
+        for kind, entity_id, name, name_native, snippet_text, weight, score in rows
+    ]
+    return results, total
+
+
+def search_media_ids(conn, query, kinds=None):
+    """検索語に一致する作品のIDを返す（キャラクター・スタッフ等の一致は出演・参加作品に展開）"""
+    condition = build_search_condition(query, kinds)
+    if condition is None:
+        return set()
+    where_clause, params, _ = condition
+
+    existing_tables = {
+        row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+    }
+    matched_ids = f'SELECT entity_id FROM search_index WHERE {where_clause} AND kind = ?'
+    queries = [matched_ids]
+    query_params = params + ['title']
+    for kind, (table_name, id_column, _, _) in SEARCH_SOURCES.items():
+        if table_name in existing_tables and (not kinds or kind in kinds):
+            queries.append(f'SELECT anilist_id FROM {table_name} WHERE {id_column} IN ({matched_ids})')
+            query_params.extend(params + [kind])
+
+    rows = conn.execute(' UNION '.join(queries), query_params).fetchall()
+    return {row[0] for row in rows}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='全文検索インデックス作成ツール')
+    parser.add_argument('--media', choices=['anime', 'manga'], default='anime', help='対象のデータベース')
+    parser.add_argument('--query', help='インデックス作成後に検索して結果を表示する')
+    args = parser.parse_args()
+
+    base_dir = Path(__file__).parent
+    db_file = base_dir / f"{args.media}_data.db"
+    json_file = base_dir.parent / 'data' / f"anilist_rank_data_analysis_popular_all_{args.media}.json"
+
+    print("="*70)
+    print("全文検索インデックス作成ツール")
+    print("="*70)
+
+    if not db_file.exists():
+        print(f"エラー: データベースが見つかりません: {db_file}")
+        return
+
+    print(f"\nデータベースに接続中: {db_file}")
+    conn = sqlite3.connect(db_file)
+    cursor = conn.cursor()
+
+    count = build_search_index(cursor, args.media, json_file)
+    conn.commit()
+
+    print("\n" + "="*70)
+    print("【統計情報】")
+    print("="*70)
+    print(f"  索引件数: {count}件")
+    cursor.execute('SELECT kind, COUNT(*) FROM search_index GROUP BY kind')
+    for kind, kind_count in cursor.fetchall():
+        print(f"  {SEARCH_KINDS.get(kind, kind)}: {kind_count}件")
+
+    if args.query:
+        results, total = search(conn, args.query)
+        print(f"\n【検索結果】'{args.query}': {total}件（上位{len(results)}件）")
+        for result in results:
+            print(f"  [{SEARCH_KINDS[result['kind']]}] {result['name']} (score {result['score']:.2f})")
+
+    conn.close()
+
+    print("\n" + "="*70)
+    print("完了しました！")
+    print("="*70)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+import argparse
+import os
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from db_builds import is_published_build_dir, read_json_file, source_fingerprint, write_json_atomic
+
+
+# ビルドのディレクトリ内のスナップショットの置き場所とマニフェスト
+SNAPSHOT_DIR_NAME = 'snapshots'
+SNAPSHOT_MANIFEST_FILE_NAME = 'manifest.json'
+
+# ファイルの形式・列の定義を変更した場合はこの値を上げる（古い形式のスナップショットは使わない）
+SNAPSHOT_FORMAT_VERSION = 1
+
+# 1行グループの行数（行グループごとに列の最小・最大の統計が記録される）
+ROW_GROUP_SIZE = 64 * 1024
+
+# ダッシュボードが読み込む非正規化データ → {
+#     'db': 元のデータベース,
+#     'tables': 参照するテーブル（パイプラインの入力）,
+#     'dictionary': 辞書エンコードする列（値の種類が少ない文字列。読み込み時はカテゴリ型）,
+#     'query': データを取得するSQL（行の順序は主な読み込み関数と同じ）
+# }
+# 画面ごとの列の違いは読み込み時の列の選択・名前の変更で吸収する（1つのデータを複数の画面で共有する）
+SNAPSHOTS = {
+    'anime_characters': {
+        'db': 'anime_data.db',
+        'tables': ['characters', 'anime'],
+        'dictionary': ['season', 'format', 'source'],
+        'query': '''
+            SELECT
+                c.chara_id, c.chara_name, c.favorites as char_favorites,
+                a.anilist_id, a.title_romaji, a.title_native,
+                a.season, a.seasonYear, a.favorites, a.popularity,
+                a.meanScore, a.format, a.source
+            FROM characters c
+            JOIN anime a ON c.anilist_id = a.anilist_id
+            WHERE c.chara_name IS NOT NULL
+            ORDER BY c.favorites DESC NULLS LAST
+        '''
+    },
+    'anime_voiceactors': {
+        'db': 'anime_data.db',
+        'tables': ['voiceactors', 'anime', 'voiceactor_basic'],
+        'dictionary': ['season', 'format', 'source'],
+        'query': '''
+            SELECT
+                v.voiceactor_id, v.voiceactor_name, v.favorites as va_favorites,
+                a.anilist_id, a.title_romaji, a.title_native,
+                a.season, a.seasonYear, a.favorites, a.popularity,
+                a.meanScore, a.format, a.source,
+                vb.voiceactor_count, vb.count_per_year
+            FROM voiceactors v
+            JOIN anime a ON v.anilist_id = a.anilist_id
+            LEFT JOIN voiceactor_basic vb ON v.voiceactor_id = vb.voiceactor_id
+            WHERE v.voiceactor_name IS NOT NULL
+            ORDER BY v.favorites DESC NULLS LAST
+        '''
+    },
+    'anime_staff': {
+        'db': 'anime_data.db',
+        'tables': ['staff', 'anime', 'staff_basic', 'staff_roles_agg'],
+        'dictionary': ['role', 'roles', 'season', 'format', 'source'],
+        'query': '''
+            SELECT
+                s.staff_id, s.staff_name, s.role, s.favorites as staff_favorites,
+                a.anilist_id, a.title_romaji, a.title_native,
+                a.season, a.seasonYear, a.favorites, a.popularity,
+                a.meanScore, a.format, a.source,
+                sb.staff_count, sb.count_per_year,
+                COALESCE(ra.roles, '') as roles
+            FROM staff s
+            JOIN anime a ON s.anilist_id = a.anilist_id
+            LEFT JOIN staff_basic sb ON s.staff_id = sb.staff_id
+            LEFT JOIN staff_roles_agg ra ON ra.staff_id = s.staff_id AND ra.anilist_id = s.anilist_id
+            WHERE s.staff_name IS NOT NULL
+            ORDER BY s.favorites DESC NULLS LAST
+        '''
+    },
+    'anime_studios': {
+        'db': 'anime_data.db',
+        'tables': ['studios', 'anime', 'studios_basic', 'media_genre_bits'],
+        'dictionary': ['studios_name', 'season', 'format', 'source'],
+        'query': '''
+            SELECT
+                s.studios_id, s.studios_name,
+                a.anilist_id, a.title_romaji, a.title_native,
+                a.season, a.seasonYear, a.favorites, a.popularity,
+                a.meanScore, a.format, a.source,
+                sb.studios_count, sb.count_per_year,
+                COALESCE(gb.genre_bits, 0) as genre_bits
+            FROM studios s
+            JOIN anime a ON s.anilist_id = a.anilist_id
+            LEFT JOIN studios_basic sb ON s.studios_id = sb.studios_id
+            LEFT JOIN media_genre_bits gb ON gb.anilist_id = a.anilist_id
+            WHERE s.studios_name IS NOT NULL
+            ORDER BY sb.studios_count DESC NULLS LAST
+        '''
+    },
+    'anime_genres': {
+        'db': 'anime_data.db',
+        'tables': ['genres', 'anime'],
+        'dictionary': ['genre_name', 'season', 'format', 'source'],
+        'query': '''
+            SELECT
+                g.genre_name,
+                a.anilist_id, a.title_romaji, a.title_native,
+                a.season, a.seasonYear, a.favorites,
+                a.meanScore, a.popularity, a.format, a.source
+            FROM genres g
+            JOIN anime a ON g.anilist_id = a.anilist_id
+            WHERE g.genre_name IS NOT NULL AND a.title_romaji IS NOT NULL
+            ORDER BY a.favorites DESC NULLS LAST
+        '''
+    }
+}
+
+
+def snapshot_dir(db_dir):
+    return Path(db_dir) / SNAPSHOT_DIR_NAME
+
+
+def snapshot_path(db_dir, name):
+    return snapshot_dir(db_dir) / f"{name}.parquet"
+
+
+def read_snapshot_manifest(db_dir):
+    """スナップショットのマニフェストを取得（ない・読めない場合は空）"""
+    return read_json_file(snapshot_dir(db_dir) / SNAPSHOT_MANIFEST_FILE_NAME)
+
+
+def write_snapshot(conn, definition, path):
+    """1つのスナップショットを Parquet で書き出す（一時ファイルに書いてから置き換える）
+
+    Returns:
+        pa.Table: 書き出したデータ
+    """
+    table = pa.Table.from_pandas(pd.read_sql_query(definition['query'], conn), preserve_index=False)
+    tmp_path = path.with_name(path.name + '.tmp')
+    pq.write_table(
+        table, tmp_path,
+        row_group_size=ROW_GROUP_SIZE,
+        use_dictionary=[column for column in definition['dictionary'] if column in table.column_names],
+        write_statistics=True,
+        compression='zstd'
+    )
+    os.replace(tmp_path, path)
+    return table
+
+
+def export_snapshots(db_dir, names=None):
+    """ダッシュボード用のスナップショットを書き出してマニフェストを更新
+
+    元のデータベースがないスナップショットは作成しない。マニフェストには形式のバージョン・
+    元のデータベースのサイズと更新時刻を記録し、読み込み側はこれが一致する場合だけ使う。
+
+    Args:
+        db_dir: データベースのディレクトリ（ビルドのディレクトリ）
+        names: 書き出すスナップショット名のリスト（省略時は全て）
+
+    Returns:
+        int: 書き出した行数の合計
+    """
+    db_dir = Path(db_dir)
+    snapshot_dir(db_dir).mkdir(exist_ok=True)
+    manifest = read_snapshot_manifest(db_dir)
+    if manifest.get('format_version') != SNAPSHOT_FORMAT_VERSION:
+        manifest = {'format_version': SNAPSHOT_FORMAT_VERSION, 'snapshots': {}}
+
+    total_rows = 0
+    for name in names or list(SNAPSHOTS):
+        definition = SNAPSHOTS[name]
+        db_file = db_dir / definition['db']
+        if not db_file.exists():
+            print(f"   スキップ: {name}（{definition['db']} がありません）")
+            continue
+
+        conn = sqlite3.connect(f"{Path(db_file).resolve().as_uri()}?mode=ro", uri=True)
+        try:
+            table = write_snapshot(conn, definition, snapshot_path(db_dir, name))
+        finally:
+            conn.close()
+
+        manifest['snapshots'][name] = {
+            'file': snapshot_path(db_dir, name).name,
+            'db': definition['db'],
+            'source': source_fingerprint(db_file),
+            'rows': table.num_rows,
+            'columns': table.column_names,
+            'created_at': datetime.now().isoformat(timespec='seconds')
+        }
+        total_rows += table.num_rows
+        print(f"   {name}: {table.num_rows:,}行 / {len(table.column_names)}列")
+
+    write_json_atomic(snapshot_dir(db_dir) / SNAPSHOT_MANIFEST_FILE_NAME, manifest)
+    return total_rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='ダッシュボード用スナップショット作成ツール')
+    parser.add_argument('--db-dir', default=None, help='データベースのディレクトリ（デフォルト: db/）')
+    parser.add_argument('--only', nargs='+', choices=list(SNAPSHOTS), help='作成するスナップショット')
+    parser.add_argument('--force', action='store_true',
+                        help='公開済みのビルドにも書き出す（アプリが読み込み中のファイルを書き換える）')
+    args = parser.parse_args()
+
+    base_dir = Path(__file__).parent
+    db_dir = Path(args.db_dir) if args.db_dir else base_dir
+    if is_published_build_dir(base_dir, db_dir) and not args.force:
+        print(f"エラー: {db_dir} は公開済みのビルドです。"
+              "公開中のビルドを作り直す場合は pipeline.py --only snapshots を実行してください（書き換える場合は --force）")
+        return 1
+
+    print("="*70)
+    print("ダッシュボード用スナップショット作成ツール")
+    print("="*70)
+    print(f"データベースのディレクトリ: {db_dir}")
+
+    try:
+        total_rows = export_snapshots(db_dir, args.only)
+    except sqlite3.Error as e:
+        print(f"エラー: {e}")
+        return 1
+
+    print("\n" + "="*70)
+    print(f"完了しました！（合計 {total_rows:,}行）")
+    print("="*70)
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,261 @@
+import re
+from collections import Counter, defaultdict
+
+
+# ロール分類の定義（上から順に評価し、最初に一致した分類を採用する）
+# パターンは大文字小文字を区別せず、単語境界で一致判定する
+ROLE_TAXONOMY = [
+    ('Original Creator', ['original creator', 'original story', 'original work']),
+    ('Animation Director', ['animation director', 'animation supervisor']),
+    ('Episode Director', ['episode director', 'unit director', 'assistant director']),
+    ('Sound Director', ['sound director', 'sound effects', 'sound design']),
+    ('Photography', ['director of photography', 'photography', 'compositing', '3d director', 'cg director']),
+    ('Art Director', ['art director', 'background art', 'art design', 'art setting']),
+    ('Director', ['director']),
+    ('Character Design', ['character design']),
+    ('Music', ['theme song', 'music', 'insert song', 'composer']),
+    ('Script', ['series composition', 'script', 'screenplay']),
+    ('Storyboard', ['storyboard']),
+    ('Story & Art', ['story & art']),
+    ('Story', ['story']),
+    ('Art', ['art', 'illustration', 'cover art']),
+    ('Assistant', ['assistant']),
+    ('Animation', ['key animation', 'in-between', 'in-betweens', 'animation']),
+    ('Design', ['mechanical design', 'prop design', 'color design', 'design']),
+    ('Production', ['producer', 'production', 'planning']),
+    ('Localization', ['translator', 'translation', 'lettering', 'touch-up', 'editing']),
+]
+
+OTHER_ROLE_CLASS = 'Other'
+
+# staffテーブル（アニメ）用の従来の統一ロール（部分一致・上から順に評価）
+LEGACY_ANIME_ROLES = [
+    ('Director', ['director']),
+    ('Character Design', ['character design']),
+    ('Music', ['theme song', 'music']),
+]
+
+# "(ep 3)" "(OP)" などの補足表記
+_ROLE_DETAIL_PATTERN = re.compile(r'\s*\([^)]*\)')
+
+
+class RoleClassifier:
+    """スタッフロール文字列の分類エンジン
+
+    分類ごとのパターンを1つの正規表現にまとめて照合し、結果を生のロール文字列
+    単位でメモ化する。同じロール（"Key Animation (ep 4)" など）は大量に重複する
+    ため、照合は異なるロール文字列の数だけで済む。
+    """
+
+    def __init__(self, taxonomy=None, legacy_roles=None):
+        self.taxonomy = taxonomy or ROLE_TAXONOMY
+        self.legacy_roles = legacy_roles or LEGACY_ANIME_ROLES
+        self._class_matchers = [
+            (role_class, re.compile(
+                r'\b(?:' + '|'.join(re.escape(p) for p in sorted(patterns, key=len, reverse=True)) + r')\b',
+                re.IGNORECASE
+            ))
+            for role_class, patterns in self.taxonomy
+        ]
+        self._legacy_matchers = [
+            (legacy_role, re.compile('|'.join(re.escape(p) for p in patterns), re.IGNORECASE))
+            for legacy_role, patterns in self.legacy_roles
+        ]
+        self._cache = {}
+        self._legacy_cache = {}
+
+    def classify(self, role):
+        """ロールを分類
+
+        Returns:
+            (base_role, role_class): 補足表記を除いたロール名と分類名
+        """
+        result = self._cache.get(role)
+        if result is None:
+            base_role = _ROLE_DETAIL_PATTERN.sub('', role).strip() or role
+            role_class = OTHER_ROLE_CLASS
+            for candidate, matcher in self._class_matchers:
+                if matcher.search(base_role):
+                    role_class = candidate
+                    break
+            result = (base_role, role_class)
+            self._cache[role] = result
+        return result
+
+    def legacy_role(self, role):
+        """staffテーブル用の統一ロール（Director / Character Design / Music 以外はNone）"""
+        if role in self._legacy_cache:
+            return self._legacy_cache[role]
+        result = None
+        for legacy_role, matcher in self._legacy_matchers:
+            if matcher.search(role):
+                result = legacy_role
+                break
+        self._legacy_cache[role] = result
+        return result
+
+    def cache_size(self):
+        return len(self._cache)
+
+
+def extract_staff_role_class_data(json_data, classifier=None):
+    """JSONの全スタッフエッジのロールを分類
+
+    Returns:
+        list[dict]: anilist_id, staff_id, role, base_role, role_class
+    """
+    classifier = classifier or RoleClassifier()
+    records = []
+    seen = set()
+
+    for item in json_data:
+        anilist_id = item.get('id')
+        staff = item.get('staff')
+        if not anilist_id or not isinstance(staff, dict):
+            continue
+
+        for edge in staff.get('edges') or []:
+            if not isinstance(edge, dict):
+                continue
+            role = edge.get('role')
+            node = edge.get('node')
+            if not role or not isinstance(node, dict) or not node.get('id'):
+                continue
+
+            key = (anilist_id, node['id'], role)
+            if key in seen:
+                continue
+            seen.add(key)
+
+            base_role, role_class = classifier.classify(role)
+            records.append({
+                'anilist_id': anilist_id,
+                'staff_id': node['id'],
+                'role': role,
+                'base_role': base_role,
+                'role_class': role_class
+            })
+
+    return records
+
+
+def create_staff_role_class_table(cursor):
+    """スタッフロール分類テーブルを作成"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS staff_role_class (
+            anilist_id INTEGER,
+            staff_id INTEGER,
+            role TEXT,
+            base_role TEXT,
+            role_class TEXT,
+            PRIMARY KEY (anilist_id, staff_id, role)
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_staff_role_class_class ON staff_role_class(role_class)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_staff_role_class_staff ON staff_role_class(staff_id)')
+
+
+def insert_staff_role_class_data(cursor, records):
+    """スタッフロール分類データを挿入（既存データは置き換え）"""
+    cursor.execute('DELETE FROM staff_role_class')
+    cursor.executemany('''
+        INSERT OR REPLACE INTO staff_role_class (anilist_id, staff_id, role, base_role, role_class)
+        VALUES (:anilist_id, :staff_id, :role, :base_role, :role_class)
+    ''', records)
+
+
+def count_roles(json_data):
+    """JSONの全スタッフエッジをロール文字列ごとに集計
+
+    Returns:
+        (role_counts, role_item_ids): ロール文字列 → 件数、ロール文字列 → 作品IDの集合
+    """
+    role_counts = defaultdict(int)
+    role_item_ids = defaultdict(set)
+    for item in json_data:
+        if not isinstance(item, dict):
+            continue
+        item_id = item.get('id')
+        staff_data = item.get('staff', {})
+        if not isinstance(staff_data, dict) or 'edges' not in staff_data:
+            continue
+        for edge in staff_data['edges']:
+            if isinstance(edge, dict) and 'role' in edge:
+                role = edge['role']
+                if role:
+                    role_counts[role] += 1
+                    role_item_ids[role].add(item_id)
+    return role_counts, role_item_ids
+
+
+def match_target_roles(role_counts, role_item_ids, target_names):
+    """対象ロールごとの完全一致・部分一致（大文字小文字を区別しない）の件数と作品IDを集計
+
+    照合は異なるロール文字列ごとに1回だけ行い、件数はロール文字列の件数でまとめて加える。
+
+    Returns:
+        dict: 対象ロール → {'partial': 件数, 'exact': 件数, 'ids': 作品IDの集合}
+    """
+    target_roles = {target: {'partial': 0, 'exact': 0, 'ids': set()} for target in target_names}
+    lowered_targets = [(target, target.lower()) for target in target_names]
+    for role, count in role_counts.items():
+        role_lower = role.lower()
+        for target, target_lower in lowered_targets:
+            if role == target:
+                target_roles[target]['exact'] += count
+                target_roles[target]['ids'].update(role_item_ids[role])
+            elif target_lower in role_lower:
+                target_roles[target]['partial'] += count
+                target_roles[target]['ids'].update(role_item_ids[role])
+    return target_roles
+
+
+def summarize_role_classes(records):
+    """分類ごとの件数を集計（件数の多い順）"""
+    return Counter(record['role_class'] for record in records).most_common()
+
+
+def create_staff_roles_agg_table(cursor):
+    """スタッフの役割集約テーブルを作成
+
+    スタッフ×作品ごとの行に、重複を除いて名前順にまとめた役割（', ' 区切り）を持つ。
+    読み込み側は (staff_id, anilist_id) で結合するため、この組み合わせで一意にする。
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS staff_roles_agg (
+            staff_id INTEGER,
+            anilist_id INTEGER,
+            roles TEXT,
+            role_count INTEGER
+        )
+    ''')
+    # 以前のバージョンの一意でないインデックスは作り直す
+    cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'index' AND name = 'idx_staff_roles_agg'")
+    row = cursor.fetchone()
+    if row is not None and not row[0].upper().startswith('CREATE UNIQUE'):
+        cursor.execute('DROP INDEX idx_staff_roles_agg')
+    cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_staff_roles_agg ON staff_roles_agg(staff_id, anilist_id)')
+
+
+def build_staff_roles_agg(cursor):
+    """staffテーブルから役割集約テーブルを作成（既存データは置き換え）
+
+    集約は GROUP_CONCAT でDB内だけで行い、行をPythonに読み込まない。
+
+    Returns:
+        int: 作成した行数
+    """
+    cursor.execute('DELETE FROM staff_roles_agg')
+    cursor.execute('''
+        INSERT INTO staff_roles_agg (staff_id, anilist_id, roles, role_count)
+        SELECT staff_id, anilist_id, GROUP_CONCAT(role, ', '), COUNT(*)
+        FROM (
+            SELECT DISTINCT staff_id, anilist_id, role
+            FROM staff
+            WHERE staff_id IS NOT NULL AND anilist_id IS NOT NULL AND role IS NOT NULL
+            ORDER BY staff_id, anilist_id, role
+        )
+        GROUP BY staff_id, anilist_id
+    ''')
+    cursor.execute('SELECT COUNT(*) FROM staff_roles_agg')
+    return cursor.fetchone()[0]
@@ -1,11 +1,18 @@
 import streamlit as st
-import sqlite3
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from pathlib import Path
 import numpy as np
 
+from build_cache import build_cache, start_build_watcher
+from db_connection import read_connection_for_path
+from db_snapshot import ensure_db_import_path, get_build_id, get_db_path, show_build_status
+from media_search import SEARCH_KINDS, has_search_index, search_entities, search_media_ids
+
+# フィルターのクエリ作成はETL（db/）と共通の実装を使う
+ensure_db_import_path()
+from filter_query import MATCH_ALL, MATCH_ANY, build_filter_query
+
 # ページ設定
 st.set_page_config(
     page_title="AniList ランキング分析",
@@ -14,13 +21,25 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# 複数選択できるフィルター項目と条件の表示名
+FACET_LABELS = {
+    'voiceactors': '声優',
+    'studios': 'スタジオ',
+    'genres': 'ジャンル',
+    'staff': 'スタッフ',
+    'characters': 'キャラクター'
+}
+MATCH_MODE_LABELS = {
+    MATCH_ANY: 'いずれかを含む',
+    MATCH_ALL: 'すべてを含む'
+}
+
 # データベース接続関数
-@st.cache_data
-def get_database_connection():
+@build_cache
+def get_database_connection(build_id=None):
     """データベースに接続してデータを取得"""
-    base_dir = Path(__file__).parent.parent
-    anime_db = base_dir / 'db' / 'anime_data.db'
-    manga_db = base_dir / 'db' / 'manga_data.db'
+    anime_db = get_db_path('anime_data.db', build_id)
+    manga_db = get_db_path('manga_data.db', build_id)
     
     connections = {}
     
@@ -32,35 +51,32 @@ def get_database_connection():
     return connections
 
 # データ取得関数
-@st.cache_data
-def load_anime_data():
+@build_cache(refresh=True)
+def load_anime_data(build_id=None):
     """アニメデータを読み込み"""
-    dbs = get_database_connection()
+    dbs = get_database_connection(build_id)
     if 'anime' not in dbs:
         return None, {}, {}, {}, {}, {}, {}
     
-    conn = sqlite3.connect(dbs['anime'])
-    
-    # メインのアニメデータ
-    anime_df = pd.read_sql_query("""
-        SELECT 
-            a.anilist_id, a.title_romaji, a.title_native, a.format, 
-            a.season, a.seasonYear, a.favorites, a.meanScore, 
-            a.popularity, a.source, a.episode
-        FROM anime a
-        WHERE a.title_romaji IS NOT NULL
-        ORDER BY a.meanScore DESC NULLS LAST
-    """, conn)
-    
-    # 選択肢用のリスト取得
-    titles = pd.read_sql_query("SELECT DISTINCT title_romaji FROM anime WHERE title_romaji IS NOT NULL ORDER BY title_romaji", conn)
-    voiceactors = pd.read_sql_query("SELECT DISTINCT voiceactor_name FROM voiceactors WHERE voiceactor_name IS NOT NULL ORDER BY voiceactor_name", conn)
-    studios = pd.read_sql_query("SELECT DISTINCT studios_name FROM studios WHERE studios_name IS NOT NULL ORDER BY studios_name", conn)
-    genres = pd.read_sql_query("SELECT DISTINCT genre_name FROM genres WHERE genre_name IS NOT NULL ORDER BY genre_name", conn)
-    staff = pd.read_sql_query("SELECT DISTINCT staff_name FROM staff WHERE staff_name IS NOT NULL ORDER BY staff_name", conn)
-    characters = pd.read_sql_query("SELECT DISTINCT chara_name FROM characters WHERE chara_name IS NOT NULL ORDER BY chara_name", conn)
-    
-    conn.close()
+    with read_connection_for_path(dbs['anime']) as conn:
+        # メインのアニメデータ
+        anime_df = pd.read_sql_query("""
+            SELECT 
+                a.anilist_id, a.title_romaji, a.title_native, a.format, 
+                a.season, a.seasonYear, a.favorites, a.meanScore, 
+                a.popularity, a.source, a.episode
+            FROM anime a
+            WHERE a.title_romaji IS NOT NULL
+            ORDER BY a.meanScore DESC NULLS LAST
+        """, conn)
+    
+        # 選択肢用のリスト取得
+        titles = pd.read_sql_query("SELECT DISTINCT title_romaji FROM anime WHERE title_romaji IS NOT NULL ORDER BY title_romaji", conn)
+        voiceactors = pd.read_sql_query("SELECT DISTINCT voiceactor_name FROM voiceactors WHERE voiceactor_name IS NOT NULL ORDER BY voiceactor_name", conn)
+        studios = pd.read_sql_query("SELECT DISTINCT studios_name FROM studios WHERE studios_name IS NOT NULL ORDER BY studios_name", conn)
+        genres = pd.read_sql_query("SELECT DISTINCT genre_name FROM genres WHERE genre_name IS NOT NULL ORDER BY genre_name", conn)
+        staff = pd.read_sql_query("SELECT DISTINCT staff_name FROM staff WHERE staff_name IS NOT NULL ORDER BY staff_name", conn)
+        characters = pd.read_sql_query("SELECT DISTINCT chara_name FROM characters WHERE chara_name IS NOT NULL ORDER BY chara_name", conn)
     
     return (anime_df, 
             titles['title_romaji'].tolist(),
@@ -70,119 +86,78 @@ def load_anime_data():
             staff['staff_name'].tolist(),
             characters['chara_name'].tolist())
 
-@st.cache_data
-def load_manga_data():
+@build_cache(refresh=True)
+def load_manga_data(build_id=None):
     """マンガデータを読み込み"""
-    dbs = get_database_connection()
+    dbs = get_database_connection(build_id)
     if 'manga' not in dbs:
         return None, {}, {}
     
-    conn = sqlite3.connect(dbs['manga'])
-    
-    # メインのマンガデータ
-    manga_df = pd.read_sql_query("""
-        SELECT 
-            anilist_id, title_romaji, title_native, format, 
-            season, seasonYear, favorites, meanScore, 
-            popularity, source
-        FROM manga
-        WHERE title_romaji IS NOT NULL
-        ORDER BY meanScore DESC NULLS LAST
-    """, conn)
-    
-    # 選択肢用のリスト（マンガ用は限定的）
-    titles = pd.read_sql_query("SELECT DISTINCT title_romaji FROM manga WHERE title_romaji IS NOT NULL ORDER BY title_romaji", conn)
-    
-    conn.close()
+    with read_connection_for_path(dbs['manga']) as conn:
+        # メインのマンガデータ
+        manga_df = pd.read_sql_query("""
+            SELECT 
+                anilist_id, title_romaji, title_native, format, 
+                season, seasonYear, favorites, meanScore, 
+                popularity, source
+            FROM manga
+            WHERE title_romaji IS NOT NULL
+            ORDER BY meanScore DESC NULLS LAST
+        """, conn)
+    
+        # 選択肢用のリスト（マンガ用は限定的）
+        titles = pd.read_sql_query("SELECT DISTINCT title_romaji FROM manga WHERE title_romaji IS NOT NULL ORDER BY title_romaji", conn)
     
     return manga_df, titles['title_romaji'].tolist(), []
 
-@st.cache_data
+@build_cache
 def get_filtered_anime_data(selected_titles=None, selected_voiceactors=None, selected_studios=None, 
-                           selected_genres=None, selected_staff=None, selected_characters=None):
-    """フィルター条件に基づいてアニメデータを取得"""
-    dbs = get_database_connection()
-    if 'anime' not in dbs:
-        return pd.DataFrame()
+                           selected_genres=None, selected_staff=None, selected_characters=None,
+                           build_id=None, match_modes=None):
+    """フィルター条件に基づいてアニメデータを取得
     
-    conn = sqlite3.connect(dbs['anime'])
-    
-    # ベースクエリ
-    query = """
-        SELECT DISTINCT
-            a.anilist_id, a.title_romaji, a.title_native, a.format, 
-            a.season, a.seasonYear, a.favorites, a.meanScore, 
-            a.popularity, a.source, a.episode
-        FROM anime a
+    Args:
+        match_modes: 項目名 → MATCH_ANY（いずれかを含む）/ MATCH_ALL（すべてを含む）
     """
+    dbs = get_database_connection(build_id)
+    if 'anime' not in dbs:
+        return pd.DataFrame()
     
-    joins = []
-    conditions = ["a.title_romaji IS NOT NULL"]
-    
-    # フィルター条件の追加
-    if selected_titles:
-        conditions.append(f"a.title_romaji IN ({','.join(['?' for _ in selected_titles])})")
-    
-    if selected_voiceactors:
-        joins.append("LEFT JOIN voiceactors v ON a.anilist_id = v.anilist_id")
-        conditions.append(f"v.voiceactor_name IN ({','.join(['?' for _ in selected_voiceactors])})")
-    
-    if selected_studios:
-        joins.append("LEFT JOIN studios s ON a.anilist_id = s.anilist_id")
-        conditions.append(f"s.studios_name IN ({','.join(['?' for _ in selected_studios])})")
-    
-    if selected_genres:
-        joins.append("LEFT JOIN genres g ON a.anilist_id = g.anilist_id")
-        conditions.append(f"g.genre_name IN ({','.join(['?' for _ in selected_genres])})")
-    
-    if selected_staff:
-        joins.append("LEFT JOIN staff st ON a.anilist_id = st.anilist_id")
-        conditions.append(f"st.staff_name IN ({','.join(['?' for _ in selected_staff])})")
-    
-    if selected_characters:
-        joins.append("LEFT JOIN characters c ON a.anilist_id = c.anilist_id")
-        conditions.append(f"c.chara_name IN ({','.join(['?' for _ in selected_characters])})")
-    
-    # クエリ構築
-    if joins:
-        query += " " + " ".join(joins)
-    
-    if conditions:
-        query += " WHERE " + " AND ".join(conditions)
-    
-    query += " ORDER BY a.meanScore DESC NULLS LAST"
-    
-    # パラメータ準備
-    params = []
-    if selected_titles:
-        params.extend(selected_titles)
-    if selected_voiceactors:
-        params.extend(selected_voiceactors)
-    if selected_studios:
-        params.extend(selected_studios)
-    if selected_genres:
-        params.extend(selected_genres)
-    if selected_staff:
-        params.extend(selected_staff)
-    if selected_characters:
-        params.extend(selected_characters)
+    with read_connection_for_path(dbs['anime']) as conn:
+        # 選択された名前をIDに変換し、項目ごとの準結合としてクエリを作成
+        query, params = build_filter_query(
+            conn,
+            selected_titles,
+            {
+                'voiceactors': selected_voiceactors,
+                'studios': selected_studios,
+                'genres': selected_genres,
+                'staff': selected_staff,
+                'characters': selected_characters
+            },
+            match_modes
+        )
     
-    df = pd.read_sql_query(query, conn, params=params)
-    conn.close()
+        df = pd.read_sql_query(query, conn, params=params)
     
     return df
 
 def main():
     """メイン関数"""
+    # 新しいビルドの公開を監視し、キャッシュを切り替える（プロセスごとに1回だけ開始）
+    start_build_watcher()
+    
     st.title("📊 AniList ランキング分析")
     st.markdown("---")
     
-    # データ読み込み
-    anime_data, anime_titles, voiceactor_list, studio_list, genre_list, staff_list, character_list = load_anime_data()
-    manga_data, manga_titles, manga_staff_list = load_manga_data()
+    # データ読み込み（セッション中は同じビルドを参照する）
+    build_id = get_build_id()
+    anime_data, anime_titles, voiceactor_list, studio_list, genre_list, staff_list, character_list = load_anime_data(build_id)
+    manga_data, manga_titles, manga_staff_list = load_manga_data(build_id)
     
     # サイドバーでジャンル選択
     st.sidebar.title("🎯 フィルター設定")
+    show_build_status()
     genre = st.sidebar.selectbox("ジャンルを選択", ["アニメ", "漫画"])
     
     # ジャンルごとのフィルター項目
@@ -197,6 +172,18 @@ def main():
         selected_filters['staff'] = st.sidebar.multiselect("スタッフ", staff_list[:100], key="staff")  # 上位100件に制限
         selected_filters['characters'] = st.sidebar.multiselect("キャラクター", character_list[:100], key="characters")  # 上位100件に制限
         
+        # 複数選択した項目は「いずれかを含む / すべてを含む」を選べる
+        match_modes = {}
+        for facet, label in FACET_LABELS.items():
+            if len(selected_filters.get(facet) or []) > 1:
+                match_modes[facet] = st.sidebar.radio(
+                    f"{label}の条件",
+                    [MATCH_ANY, MATCH_ALL],
+                    format_func=lambda x: MATCH_MODE_LABELS[x],
+                    horizontal=True,
+                    key=f"{facet}_match_mode"
+                )
+        
         # フィルターされたデータを取得
         if any(selected_filters.values()):
             current_data = get_filtered_anime_data(
@@ -205,7 +192,9 @@ def main():
                 selected_filters.get('studios'),
                 selected_filters.get('genres'),
                 selected_filters.get('staff'),
-                selected_filters.get('characters')
+                selected_filters.get('characters'),
+                build_id,
+                match_modes
             )
         else:
             current_data = anime_data
@@ -223,6 +212,19 @@ def main():
         st.error("データベースファイルが見つかりません。")
         return
     
+    # キーワード検索（全文検索インデックスのあるDBのみ）
+    db_name = 'anime_data.db' if genre == "アニメ" else 'manga_data.db'
+    if has_search_index(db_name, build_id):
+        search_query = st.sidebar.text_input(
+            "🔎 キーワード検索",
+            key="search_query",
+            help="タイトル（ローマ字・日本語）・あらすじ・キャラクター・スタッフ・声優・スタジオ名を部分一致で検索"
+        ).strip()
+        if search_query:
+            matched_ids = search_media_ids(db_name, search_query, build_id=build_id)
+            current_data = current_data[current_data['anilist_id'].isin(matched_ids)]
+            show_search_results(db_name, search_query, build_id)
+    
     # データが空の場合
     if current_data is None or current_data.empty:
         st.warning("選択された条件に該当するデータがありません。")
@@ -243,6 +245,35 @@ def main():
     with tab4:
         show_scatter_tab(current_data, genre)
 
+def show_search_results(db_name, search_query, build_id):
+    """キーワード検索の結果を関連度順に表示（ページ送り付き）"""
+    with st.expander(f"🔎 「{search_query}」の検索結果", expanded=True):
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            selected_kinds = st.multiselect(
+                "検索対象", list(SEARCH_KINDS),
+                format_func=lambda x: SEARCH_KINDS[x],
+                key="search_kinds"
+            )
+        page_size = 20
+        kinds = tuple(selected_kinds) if selected_kinds else None
+        _, total = search_entities(db_name, search_query, kinds, 1, 1, build_id)
+        page_count = max((total + page_size - 1) // page_size, 1)
+        with col2:
+            page = st.number_input("ページ", min_value=1, max_value=page_count, value=1, key="search_page")
+        
+        if total == 0:
+            st.info("一致する結果がありません。")
+            return
+        
+        results, _ = search_entities(db_name, search_query, kinds, int(page), page_size, build_id)
+        st.caption(f"{total:,}件中 {(page - 1) * page_size + 1:,}〜{min(page * page_size, total):,}件目")
+        display_df = results.rename(columns={
+            'kind': '種類', 'name': '名前', 'name_native': '名前（日本語）',
+            'snippet': 'あらすじ（抜粋）', 'score': '関連度'
+        })[['種類', '名前', '名前（日本語）', 'あらすじ（抜粋）', '関連度']]
+        st.dataframe(display_df, use_container_width=True)
+
 def show_ranking_tab(data, genre):
     """ランキングタブの内容"""
     st.header(f"🏆 {genre}ランキング")
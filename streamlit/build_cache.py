@@ -0,0 +1,217 @@
+import functools
+import inspect
+import threading
+
+import streamlit as st
+
+from cache_warmup import get_cache_warmup
+from db_connection import get_connection_pool, is_published_build
+from db_snapshot import (BUILDS_DIR_NAME, DB_FILE_NAMES, MANIFEST_FILE_NAME, current_build_id, get_db_dir,
+                         is_legacy_build)
+from genre_index import load_genre_index
+from metric_store import load_metric_store
+from shared_cache import remove_shared_cache, shared_tier
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    # watchdog がない環境ではビルドの監視をせず、キャッシュはビルドIDのキーだけで切り替える
+    FileSystemEventHandler = object
+    Observer = None
+
+# ETLの書き込みでイベントがまとめて届くため、最後のイベントからこの秒数待ってから更新する
+DEBOUNCE_SECONDS = 5.0
+
+# 更新の対象にするイベント（マニフェストの読み込みで届く opened / closed_no_write は無視する。
+# 無視しないと、マニフェストを読むたびに待ち時間が延びて更新されなくなる）
+WRITE_EVENT_TYPES = ('created', 'modified', 'moved', 'deleted', 'closed')
+
+
+class BuildCacheRegistry:
+    """ビルドIDを引数に持つキャッシュ関数の呼び出しの記録（プロセス全体で共有）
+
+    ビルドごとに呼び出しの引数を記録し、ビルドが使われなくなったときに
+    そのビルドのキャッシュだけを削除し（cached.clear(**引数)）、
+    新しいビルドが公開されたときに同じ呼び出しをビルドIDだけ変えて再実行する。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}  # ビルドID → {呼び出しのキー: (キャッシュ関数, 引数, 再読み込みするか)}
+
+    def record(self, build_id, name, cached, arguments, refresh, max_entries=None):
+        """呼び出しを記録（cached は build_cache() の関数。再実行時も記録されるように）
+
+        max_entries（st.cache_data の件数の上限）がある関数は、キャッシュと同じく
+        関数ごとに直近の呼び出しだけを記録する。
+        """
+        # アプリのスクリプトは再実行のたびにキャッシュ関数を作り直すため、関数名で同じ呼び出しをまとめる
+        key = (name, repr(arguments))
+        with self._lock:
+            calls = self._calls.setdefault(build_id, {})
+            calls.pop(key, None)
+            calls[key] = (cached, arguments, refresh)
+            if max_entries is not None:
+                keys = [call_key for call_key in calls if call_key[0] == name]
+                for call_key in keys[:-max_entries]:
+                    del calls[call_key]
+
+    def build_ids(self):
+        with self._lock:
+            return list(self._calls)
+
+    def refresh_calls(self, build_id):
+        """ビルドの再読み込み対象の呼び出し（キャッシュ関数, 引数）のリスト"""
+        with self._lock:
+            calls = self._calls.get(build_id, {}).values()
+            return [(cached, arguments) for cached, arguments, refresh in calls if refresh]
+
+    def retire(self, build_id):
+        """ビルドの全てのキャッシュを削除して記録を消す"""
+        with self._lock:
+            calls = self._calls.pop(build_id, {}).values()
+        for cached, arguments, _ in calls:
+            cached.clear(**arguments)
+        clear_build_resources(build_id)
+
+
+@st.cache_resource
+def get_build_cache_registry():
+    return BuildCacheRegistry()
+
+
+def build_cache(func=None, *, refresh=False, shared=False, **cache_kwargs):
+    """ビルドIDごとに無効化できる st.cache_data
+
+    関数の引数 build_id をキャッシュのキーに含めたうえで、呼び出しをビルドごとに記録する。
+
+    Args:
+        refresh: 新しいビルドが公開されたときに、同じ引数で先に読み込んでおくか
+            （読み込み関数は True、ページ・検索条件ごとのクエリは False）
+        shared: プロセスのキャッシュにない場合に、他のプロセスと共有するディスクのキャッシュ
+            （shared_cache.py）を確認するか（データフレームを返す読み込み関数のみ）
+        cache_kwargs: st.cache_data の引数
+    """
+    if func is None:
+        return functools.partial(build_cache, refresh=refresh, shared=shared, **cache_kwargs)
+
+    cached = st.cache_data(shared_tier(func) if shared else func, **cache_kwargs)
+    signature = inspect.signature(func)
+    name = f"{func.__module__}.{func.__qualname__}"
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        # キャッシュのキーは引数の順序に依存するため、削除・再実行と同じく常に引数名・定義順で呼ぶ
+        arguments = dict(signature.bind(*args, **kwargs).arguments)
+        build_id = arguments.get('build_id')
+        if build_id is not None:
+            get_build_cache_registry().record(build_id, name, wrapper, arguments, refresh,
+                                              cache_kwargs.get('max_entries'))
+        return cached(**arguments)
+
+    wrapper.clear = cached.clear
+    return wrapper
+
+
+def build_db_path(build_id, db_name):
+    """ビルドのデータベースのパス（削除済みのビルドでも求められるよう、存在は確認しない）"""
+    if is_legacy_build(build_id):
+        return get_db_dir() / db_name
+    return get_db_dir() / BUILDS_DIR_NAME / build_id / db_name
+
+
+def clear_build_resources(build_id):
+    """データベースのパス・ビルドIDごとの共有リソース（接続・ジャンル索引・列ストア・共有キャッシュ）を削除"""
+    remove_shared_cache(build_id)
+    for db_name in DB_FILE_NAMES:
+        db_path = build_db_path(build_id, db_name)
+        get_connection_pool.clear(str(db_path), is_published_build(db_path))
+        load_genre_index.clear(str(db_path))
+        load_metric_store.clear(db_name, build_id)
+
+
+class BuildWatcher(FileSystemEventHandler):
+    """db/ を監視し、公開中のビルドが変わったらキャッシュを切り替える
+
+    - 新しいビルド: メニューのデータ（cache_warmup.py）と、直前のビルドで読み込まれたデータを
+      新しいビルドで先に読み込む
+    - アトミックビルド未使用時の古いビルド（書き換え前のデータベース）: すぐに削除
+    - 削除されたビルド（db_builds.py が古いビルドを削除した後）: 削除
+    公開済みのビルドは書き換えられないため、ビルドが残っている間はキャッシュも残す
+    （そのビルドに固定中のセッションが使い続ける）。
+    """
+
+    def __init__(self, registry):
+        self.registry = registry
+        self.build_id = current_build_id()
+        self._lock = threading.Lock()
+        self._timer = None
+        self._observer = None
+
+    def start(self):
+        if Observer is None:
+            return self
+        self._observer = Observer()
+        self._observer.daemon = True
+        # 公開（current_build.json の置き換え）・データベースの直接の書き換えと、古いビルドの削除を監視する
+        # （ビルド内のファイルは作成中に大量に書き込まれるため監視しない）
+        self._observer.schedule(self, str(get_db_dir()), recursive=False)
+        builds_dir = get_db_dir() / BUILDS_DIR_NAME
+        if builds_dir.exists():
+            self._observer.schedule(self, str(builds_dir), recursive=False)
+        self._observer.start()
+        return self
+
+    def stop(self):
+        if self._observer is not None:
+            self._observer.stop()
+
+    def on_any_event(self, event):
+        if event.event_type not in WRITE_EVENT_TYPES:
+            return
+        if event.is_directory:
+            if event.event_type not in ('deleted', 'moved'):
+                return
+        else:
+            paths = [str(getattr(event, 'src_path', '')), str(getattr(event, 'dest_path', ''))]
+            if not any(path.endswith((MANIFEST_FILE_NAME, *DB_FILE_NAMES)) for path in paths):
+                return
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(DEBOUNCE_SECONDS, self.refresh)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def refresh(self):
+        """新しいビルドのデータを読み込み、使われなくなったビルドのキャッシュを削除"""
+        new_build_id = current_build_id()
+        with self._lock:
+            previous_build_id = self.build_id
+            self.build_id = new_build_id
+        refresh_calls = self.registry.refresh_calls(previous_build_id) if new_build_id != previous_build_id else []
+
+        # 書き換え前のデータベースの接続・索引を先に削除してから新しいビルドで読み込む
+        builds_dir = get_db_dir() / BUILDS_DIR_NAME
+        for build_id in self.registry.build_ids():
+            if build_id == new_build_id:
+                continue
+            if is_legacy_build(build_id) or not (builds_dir / build_id).exists():
+                self.registry.retire(build_id)
+
+        # メニューのデータを並列で読み込んでから、それ以外の呼び出し（前のビルドで読み込まれたもの）を再実行する
+        if new_build_id != previous_build_id:
+            get_cache_warmup().start_all(new_build_id, wait_for_completion=True)
+
+        for cached, arguments in refresh_calls:
+            try:
+                cached(**{**arguments, 'build_id': new_build_id})
+            except Exception as e:
+                print(f"キャッシュの再読み込みに失敗しました: {e}")
+
+
+@st.cache_resource
+def start_build_watcher():
+    """ビルドの監視を開始（プロセスごとに1回）"""
+    return BuildWatcher(get_build_cache_registry()).start()
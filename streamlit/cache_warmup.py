@@ -0,0 +1,210 @@
+import atexit
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime
+
+import pandas as pd
+import streamlit as st
+
+from db_snapshot import current_build_id, ensure_db_import_path, get_db_dir
+
+# 状況ファイルの書き出しはETL（db/db_builds.py）と共通の実装を使う
+ensure_db_import_path()
+from db_builds import write_json_atomic
+
+
+# サーバーの起動時・新しいビルドの公開時に、メニューのデータをバックグラウンドで読み込むか
+WARMUP_ENABLED = True
+
+# 同時に読み込むデータの数（データベースごとの接続数 db_connection.POOL_SIZE を超えないように）
+WARMUP_MAX_WORKERS = 4
+
+# 読み込みの状況を書き出すディレクトリ（db/warmup/<アプリ名>-<プロセスID>.json）
+# ロードバランサーのヘルスチェックで "ready" が true のプロセスだけにアクセスを振り分ける
+WARMUP_STATUS_DIR_NAME = 'warmup'
+
+
+class CacheWarmup:
+    """メニューのデータをスレッドプールで読み込んでキャッシュに載せる（プロセス全体で共有）
+
+    読み込み関数は build_cache() の関数のため、読み込んだ結果はセッションの読み込みと
+    同じキャッシュに入る。読み込み中のデータをセッションが要求した場合は、
+    st.cache_data のキーごとのロックで読み込みの完了を待つ（二重には読み込まない）。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._datasets = {}  # アプリ名 → [(メニュー名, 読み込み関数, build_id 以外の引数)]
+        self._runs = {}  # アプリ名 → 直近の読み込みの状況
+        self._ready = {}  # アプリ名 → 全データの読み込みが終わった直近のビルドID
+        self._executor = ThreadPoolExecutor(max_workers=WARMUP_MAX_WORKERS, thread_name_prefix='cache-warmup')
+        atexit.register(self._remove_status_files)
+
+    def register(self, app_name, datasets):
+        """アプリのメニューのデータを登録（アプリのスクリプトの再実行のたびに最新の関数で置き換える）"""
+        with self._lock:
+            self._datasets[app_name] = list(datasets)
+
+    def apps(self):
+        with self._lock:
+            return list(self._datasets)
+
+    def start(self, app_name, build_id):
+        """アプリのメニューのデータをビルドで読み込み始める
+
+        同じビルドで開始済みの場合は新たに読み込まない。
+
+        Returns:
+            list: 読み込みの Future のリスト（開始済み・登録がない場合は空）
+        """
+        with self._lock:
+            datasets = self._datasets.get(app_name)
+            run = self._runs.get(app_name)
+            if not datasets or (run is not None and run['build_id'] == build_id):
+                return []
+            run = {
+                'build_id': build_id,
+                'started_at': datetime.now().isoformat(timespec='seconds'),
+                'finished_at': None,
+                'seconds': None,
+                'datasets': {
+                    label: {'state': 'pending', 'seconds': None, 'rows': None, 'error': None}
+                    for label, _, _ in datasets
+                }
+            }
+            self._runs[app_name] = run
+            self._write_status(app_name)
+        started = time.perf_counter()
+        return [
+            self._executor.submit(self._load, app_name, run, started, label, func, {**kwargs, 'build_id': build_id})
+            for label, func, kwargs in datasets
+        ]
+
+    def start_all(self, build_id, wait_for_completion=False):
+        """登録済みの全アプリのデータをビルドで読み込む（ビルドの監視から呼ぶ）"""
+        futures = [future for app_name in self.apps() for future in self.start(app_name, build_id)]
+        if wait_for_completion:
+            wait(futures)
+        return futures
+
+    def _load(self, app_name, run, started, label, func, arguments):
+        entry = run['datasets'][label]
+        with self._lock:
+            entry['state'] = 'running'
+        load_started = time.perf_counter()
+        try:
+            data = func(**arguments)
+            state = 'done' if data is not None else 'failed'
+            rows = len(data) if isinstance(data, pd.DataFrame) else None
+            error = None if data is not None else 'データを読み込めませんでした'
+        except Exception as e:
+            state, rows, error = 'failed', None, str(e)
+            print(f"キャッシュの事前読み込みに失敗しました（{app_name}: {label}）: {e}")
+
+        with self._lock:
+            entry.update({
+                'state': state,
+                'seconds': round(time.perf_counter() - load_started, 3),
+                'rows': rows,
+                'error': error
+            })
+            states = [item['state'] for item in run['datasets'].values()]
+            if all(state in ('done', 'failed') for state in states):
+                run['finished_at'] = datetime.now().isoformat(timespec='seconds')
+                run['seconds'] = round(time.perf_counter() - started, 3)
+                # 読み込みに失敗したデータがある場合は ready にしない（状況ファイルの failed に記録する）
+                if all(state == 'done' for state in states):
+                    self._ready[app_name] = run['build_id']
+            if self._runs.get(app_name) is run:
+                self._write_status(app_name)
+
+    def status(self, app_name):
+        """アプリの読み込みの状況（ready: 公開中のビルドで全データの読み込みに成功したか）"""
+        with self._lock:
+            return self._status(app_name)
+
+    def _status(self, app_name):
+        run = self._runs.get(app_name) or {}
+        datasets = run.get('datasets', {})
+        published_build_id = current_build_id()
+        return {
+            'app': app_name,
+            'pid': os.getpid(),
+            # 古いビルドの読み込みが終わっていても、新しいビルドの公開後はその読み込みが終わるまで false
+            'ready': self._ready.get(app_name) == published_build_id,
+            'ready_build_id': self._ready.get(app_name),
+            'published_build_id': published_build_id,
+            'build_id': run.get('build_id'),
+            'started_at': run.get('started_at'),
+            'finished_at': run.get('finished_at'),
+            'seconds': run.get('seconds'),
+            'done': sum(1 for item in datasets.values() if item['state'] == 'done'),
+            'failed': [label for label, item in datasets.items() if item['state'] == 'failed'],
+            'total': len(datasets),
+            'datasets': {label: dict(item) for label, item in datasets.items()}
+        }
+
+    def _status_path(self, app_name):
+        return get_db_dir() / WARMUP_STATUS_DIR_NAME / f"{app_name}-{os.getpid()}.json"
+
+    def _write_status(self, app_name):
+        path = self._status_path(app_name)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            write_json_atomic(path, self._status(app_name))
+        except OSError as e:
+            print(f"事前読み込みの状況を書き出せませんでした: {e}")
+
+    def _remove_status_files(self):
+        for app_name in self.apps():
+            self._status_path(app_name).unlink(missing_ok=True)
+
+
+@st.cache_resource
+def get_cache_warmup():
+    return CacheWarmup()
+
+
+def start_cache_warmup(app_name, datasets):
+    """アプリのメニューのデータを公開中のビルドでバックグラウンドで読み込み始める
+
+    アプリの main() の最初に呼ぶ。プロセスで最初のセッション（サーバーの起動直後）と、
+    新しいビルドの公開後の最初のセッションで読み込みを開始し、それ以外は何もしない
+    （watchdog がある場合は、ビルドの監視が公開時にセッションを待たずに開始する）。
+
+    Args:
+        app_name: アプリ名（状況ファイルの名前に使用）
+        datasets: [(メニュー名, 読み込み関数, build_id 以外の引数)] のリスト
+    """
+    if not WARMUP_ENABLED:
+        return
+    warmup = get_cache_warmup()
+    warmup.register(app_name, datasets)
+    warmup.start(app_name, current_build_id())
+
+
+def show_warmup_status(app_name):
+    """サイドバーに事前読み込みの状況と、データごとの読み込み時間を表示"""
+    if not WARMUP_ENABLED:
+        return
+    status = get_cache_warmup().status(app_name)
+    if not status['total']:
+        return
+    if status['finished_at'] is None:
+        st.sidebar.caption(f"🔥 データの事前読み込み中: {status['done'] + len(status['failed'])}/{status['total']}")
+        return
+    failed = f"（失敗: {len(status['failed'])}件）" if status['failed'] else ""
+    with st.sidebar.expander(f"🔥 データの事前読み込み: {status['seconds']:.1f}秒{failed}"):
+        report = pd.DataFrame([
+            {
+                'メニュー': label,
+                '状態': '完了' if item['state'] == 'done' else '失敗',
+                '件数': item['rows'],
+                '時間(秒)': item['seconds']
+            }
+            for label, item in status['datasets'].items()
+        ])
+        st.dataframe(report, hide_index=True, width='stretch')
+        st.caption(f"ビルド: {status['build_id']}（{status['finished_at']} 完了）")
@@ -0,0 +1,128 @@
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+import streamlit as st
+
+from db_snapshot import BUILDS_DIR_NAME, get_db_dir, get_db_path
+
+
+# 1つのデータベースファイルあたりの最大接続数（Streamlitのスクリプトスレッドで共有）
+POOL_SIZE = 4
+
+# 接続の取り出しを待つ最大秒数（全接続が使用中の場合）
+CHECKOUT_TIMEOUT = 30
+
+# 読み取り専用接続の設定
+MMAP_SIZE = 256 * 1024 * 1024   # メモリマップするサイズ（バイト）
+CACHE_SIZE_KB = 64 * 1024       # ページキャッシュのサイズ（KB）
+
+
+class ReadOnlyConnectionPool:
+    """1つのデータベースファイルに対する読み取り専用接続のプール
+
+    接続はプロセス全体で共有し、使用中の接続は1スレッドだけが持つ
+    （check_same_thread=False の接続をキューで受け渡す）。
+    """
+
+    def __init__(self, db_path, immutable=False, size=POOL_SIZE):
+        self.db_path = Path(db_path)
+        self.immutable = immutable
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        """読み取り専用で接続（公開済みビルドは変更されないため immutable で開く）"""
+        uri = f"{self.db_path.resolve().as_uri()}?mode=ro"
+        if self.immutable:
+            uri += "&immutable=1"
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        conn.execute(f"PRAGMA mmap_size = {MMAP_SIZE}")
+        conn.execute(f"PRAGMA cache_size = -{CACHE_SIZE_KB}")
+        conn.execute("PRAGMA query_only = 1")
+        return conn
+
+    def _checkout(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                create = True
+            else:
+                create = False
+        if create:
+            try:
+                return self._connect()
+            except sqlite3.Error:
+                with self._lock:
+                    self._created -= 1
+                raise
+        return self._idle.get(timeout=CHECKOUT_TIMEOUT)
+
+    @contextmanager
+    def connection(self):
+        """接続を取り出し、ブロックを抜けるとプールに戻す"""
+        conn = self._checkout()
+        try:
+            yield conn
+        finally:
+            # 読み取り中にエラーで抜けた場合も、未完了の文を残さず戻す
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.put(conn)
+
+
+def is_published_build(db_path):
+    """db/builds/<ビルドID>/ 以下のデータベースか（公開後のビルドは書き換えられない）"""
+    db_path = Path(db_path)
+    return db_path.parent.parent == get_db_dir() / BUILDS_DIR_NAME
+
+
+@st.cache_resource
+def get_connection_pool(db_path, immutable=False):
+    """データベースファイルごとの接続プール（プロセス全体で共有）"""
+    return ReadOnlyConnectionPool(db_path, immutable)
+
+
+@contextmanager
+def read_connection_for_path(db_path):
+    """データベースファイルのパスから共有の読み取り専用接続を取り出す"""
+    db_path = Path(db_path)
+    pool = get_connection_pool(str(db_path), is_published_build(db_path))
+    with pool.connection() as conn:
+        yield conn
+
+
+@contextmanager
+def read_connection(db_name, build_id=None):
+    """共有の読み取り専用接続を取り出す
+
+    Args:
+        db_name: データベースファイル名（例: 'anime_data.db'）
+        build_id: 参照するビルドID（省略時はセッションで固定中のビルド）
+
+    使用例:
+        with read_connection('anime_data.db', build_id) as conn:
+            df = pd.read_sql_query(query, conn)
+    """
+    with read_connection_for_path(get_db_path(db_name, build_id)) as conn:
+        yield conn
+
+
+def has_table(db_name, table_name, build_id=None):
+    """データベースにテーブルがあるか確認（ETLの追加テーブルがない古いDBの判定用）"""
+    db_path = get_db_path(db_name, build_id)
+    if not db_path.exists():
+        return False
+    with read_connection_for_path(db_path) as conn:
+        row = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table_name,)
+        ).fetchone()
+    return row is not None
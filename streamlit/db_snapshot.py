@@ -0,0 +1,123 @@
+import hashlib
+import json
+import sys
+from pathlib import Path
+
+import streamlit as st
+
+
+# 絶対パス（開発環境）→ 相対パスの順でdbディレクトリを探す
+ABSOLUTE_DB_DIR = Path(r'C:\Users\PC_User\Desktop\GitHub\public_anilist_data_rank_and_analysis\db')
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# ETL（db/）のモジュールのディレクトリ（filter_query, snapshot_export など Streamlit側と共通の実装）
+DB_MODULE_DIR = str(PROJECT_ROOT / 'db')
+
+# db/db_builds.py と同じファイル名
+MANIFEST_FILE_NAME = 'current_build.json'
+BUILDS_DIR_NAME = 'builds'
+DB_FILE_NAMES = ['anime_data.db', 'manga_data.db']
+
+# アトミックビルド未使用時（db/ のデータベースを直接書き換える場合）のビルドIDの接頭辞
+LEGACY_BUILD_PREFIX = 'legacy-'
+
+
+def ensure_db_import_path():
+    """ETL（db/）と共通の実装を import できるよう sys.path に db/ を追加（db/ のモジュールを import する前に呼ぶ）"""
+    if DB_MODULE_DIR not in sys.path:
+        sys.path.append(DB_MODULE_DIR)
+
+
+def get_db_dir():
+    """dbディレクトリを取得"""
+    if ABSOLUTE_DB_DIR.exists():
+        return ABSOLUTE_DB_DIR
+    return PROJECT_ROOT / 'db'
+
+
+def read_current_manifest():
+    """公開中のビルドのマニフェストを取得（アトミックビルド未使用ならNone）"""
+    manifest_file = get_db_dir() / MANIFEST_FILE_NAME
+    if not manifest_file.exists():
+        return None
+    try:
+        with open(manifest_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (json.JSONDecodeError, OSError):
+        return None
+
+
+def legacy_build_id():
+    """アトミックビルド未使用時のビルドID（db/ のデータベースのサイズ・更新時刻から作成）
+
+    ETLがデータベースを書き換えると値が変わるため、キャッシュのキーに使うと
+    書き換え前のデータを返さない。
+    """
+    parts = []
+    for db_name in DB_FILE_NAMES:
+        db_path = get_db_dir() / db_name
+        if db_path.exists():
+            stat = db_path.stat()
+            parts.append(f"{db_name}:{stat.st_size}:{stat.st_mtime_ns}")
+    return LEGACY_BUILD_PREFIX + hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest()[:12]
+
+
+def is_legacy_build(build_id):
+    """アトミックビルド未使用時のビルドIDか（None を含む）"""
+    return not build_id or build_id.startswith(LEGACY_BUILD_PREFIX)
+
+
+def current_build_id():
+    """公開中のビルドID（アトミックビルド未使用なら db/ のデータベースから作成したビルドID）"""
+    manifest = read_current_manifest()
+    return manifest['build_id'] if manifest else legacy_build_id()
+
+
+def get_build_id():
+    """このセッションで参照するビルドIDを取得
+
+    セッションの最初に公開中のビルドに固定し、ユーザーが切り替えるまで
+    再ビルドが公開されても同じビルドを読み続ける。
+    アトミックビルド未使用時はデータベースが直接書き換えられるため固定せず、
+    毎回現在のデータベースから求める。
+    """
+    build_id = st.session_state.get('db_build_id')
+    if is_legacy_build(build_id):
+        build_id = current_build_id()
+    elif not (get_db_dir() / BUILDS_DIR_NAME / build_id).exists():
+        # 固定中のビルドが削除された場合は公開中のビルドに切り替える
+        build_id = current_build_id()
+    st.session_state['db_build_id'] = build_id
+    return build_id
+
+
+def get_db_path(db_name, build_id=None):
+    """データベースパスを取得
+
+    Args:
+        db_name: データベースファイル名（例: 'anime_data.db'）
+        build_id: 参照するビルドID（省略時はセッションで固定中のビルド）
+    """
+    db_dir = get_db_dir()
+    if build_id is None:
+        build_id = get_build_id()
+    if not is_legacy_build(build_id):
+        build_path = db_dir / BUILDS_DIR_NAME / build_id / db_name
+        if build_path.exists():
+            return build_path
+    return db_dir / db_name
+
+
+def show_build_status():
+    """サイドバーにビルド情報を表示し、新しいビルドがあれば切り替えボタンを出す"""
+    build_id = get_build_id()
+    manifest = read_current_manifest()
+    if not manifest:
+        return
+
+    st.sidebar.caption(f"🗄️ データビルド: {build_id}")
+    if manifest['build_id'] != build_id:
+        st.sidebar.info(f"🆕 新しいデータが公開されています（{manifest['created_at']}）")
+        if st.sidebar.button("最新データに切り替え", key="switch_db_build"):
+            st.session_state['db_build_id'] = manifest['build_id']
+            st.rerun()
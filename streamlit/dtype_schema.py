@@ -0,0 +1,124 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+try:
+    import pyarrow  # noqa: F401
+    TEXT_DTYPE = pd.StringDtype('pyarrow')
+except ImportError:
+    # pyarrow がない環境では文字列列はそのまま（object 型）
+    TEXT_DTYPE = None
+
+
+# 列の種類
+CATEGORY = 'category'  # 値の種類が少ない文字列（カテゴリ型）
+TEXT = 'text'          # 名前・タイトル（Arrow の文字列型）
+ID = 'id'              # ID（int32。NULLを含む場合は Int32）
+COUNT = 'count'        # 整数の指標（int32。NULLを含む場合は NaN を保つため float32）
+REAL = 'real'          # 小数・NULLを含む指標（float32）
+
+# テーブルごとの列の型（クエリの別名を含む。ここにない列は変換しない）
+TABLE_SCHEMAS = {
+    'anime': {
+        'anilist_id': ID, 'title_romaji': TEXT, 'title_native': TEXT,
+        'format': CATEGORY, 'season': CATEGORY, 'source': CATEGORY,
+        'seasonYear': REAL, 'meanScore': REAL, 'episode': COUNT,
+        'favorites': COUNT, 'popularity': COUNT,
+        'anime_favorites': COUNT, 'anime_popularity': COUNT
+    },
+    'manga': {
+        'startYear': REAL, 'chapters': COUNT, 'volumes': COUNT,
+        'manga_favorites': COUNT, 'manga_popularity': COUNT
+    },
+    'characters': {
+        'chara_id': ID, 'chara_name': TEXT, 'char_favorites': COUNT
+    },
+    'voiceactors': {
+        'voiceactor_id': ID, 'voiceactor_name': TEXT, 'va_favorites': COUNT,
+        'voiceactor_count': COUNT
+    },
+    'staff': {
+        'staff_id': ID, 'staff_name': TEXT, 'role': CATEGORY, 'roles': CATEGORY, 'staff_favorites': COUNT,
+        'staff_count': COUNT, 'count_per_year': REAL, 'first_year': COUNT, 'year_range': COUNT
+    },
+    'studios': {
+        'studios_id': ID, 'studios_name': CATEGORY, 'studios_count': COUNT
+    },
+    'genres': {
+        'genre_name': CATEGORY
+    }
+}
+
+# 列名 → 種類（全テーブルの定義をまとめたもの）
+COLUMN_KINDS = {column: kind for schema in TABLE_SCHEMAS.values() for column, kind in schema.items()}
+
+
+def _compact_column(series, kind):
+    """1列を種類に応じた省メモリの型に変換"""
+    if kind == CATEGORY:
+        return series.astype('category')
+    if kind == TEXT:
+        return series.astype(TEXT_DTYPE) if TEXT_DTYPE is not None else series
+    if not pd.api.types.is_numeric_dtype(series):
+        return series
+    if kind == REAL:
+        return series.astype(np.float32)
+    has_null = series.isna().any()
+    if has_null:
+        return series.astype('Int32' if kind == ID else np.float32)
+    return series.astype(np.int32)
+
+
+@st.cache_resource
+def _memory_registry():
+    """データセット名 → メモリ使用量（プロセス全体で共有）"""
+    return {}
+
+
+def compact_frame(data, dataset):
+    """読み込んだデータを列の型定義（TABLE_SCHEMAS）に従って省メモリの型に変換
+
+    変換前後のメモリ使用量をデータセット名で記録する（show_memory_report() で表示）。
+
+    Args:
+        data: pd.read_sql_query() の結果
+        dataset: データセット名（メモリ使用量の表示に使用）
+    """
+    if data is None:
+        return data
+    before = int(data.memory_usage(deep=True).sum())
+    for column in data.columns:
+        kind = COLUMN_KINDS.get(column)
+        if kind is not None and data[column].dtype != 'category':
+            data[column] = _compact_column(data[column], kind)
+    _memory_registry()[dataset] = {
+        'rows': len(data),
+        'before': before,
+        'after': int(data.memory_usage(deep=True).sum())
+    }
+    return data
+
+
+def memory_report():
+    """読み込み済みデータセットのメモリ使用量の表"""
+    rows = [
+        {
+            'データセット': dataset,
+            '行数': entry['rows'],
+            '変換前(MB)': round(entry['before'] / 1024 / 1024, 2),
+            '変換後(MB)': round(entry['after'] / 1024 / 1024, 2),
+            '削減率': f"{1 - entry['after'] / entry['before']:.0%}" if entry['before'] else '-'
+        }
+        for dataset, entry in sorted(_memory_registry().items())
+    ]
+    return pd.DataFrame(rows)
+
+
+def show_memory_report():
+    """サイドバーにデータセットごとのメモリ使用量を表示"""
+    report = memory_report()
+    if report.empty:
+        return
+    with st.sidebar.expander("🧠 データセットのメモリ使用量"):
+        st.dataframe(report, hide_index=True, width='stretch')
+        st.caption(f"合計: {report['変換後(MB)'].sum():,.1f} MB（変換前 {report['変換前(MB)'].sum():,.1f} MB）")
@@ -0,0 +1,117 @@
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from genre_index import MATCH_ANY, genre_mask
+
+
+# filters のうち列の条件ではないキー（ジャンル索引で処理）
+GENRE_FILTER_KEYS = ('genre', 'genre_match')
+
+# 処理時間の履歴として保持する件数（セッションごと）
+LATENCY_HISTORY_SIZE = 50
+
+
+def _is_active(value):
+    """未選択（None・空・"全て"）の条件は無視する"""
+    if isinstance(value, (list, tuple)):
+        return len(value) > 0
+    return bool(value) and value != "全て"
+
+
+def _category_codes(series, values):
+    """値のリストをカテゴリのコードに変換（カテゴリにない値は除く）"""
+    categories = series.cat.categories
+    return [categories.get_loc(value) for value in values if value in categories]
+
+
+def column_mask(series, value):
+    """1列の条件の真偽値配列
+
+    Args:
+        series: 対象の列
+        value: 値（一致）、リスト（いずれかに一致）、(下限, 上限) のタプル（範囲、両端を含む）
+    """
+    if isinstance(value, tuple):
+        start, end = value
+        values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+        return (values >= start) & (values <= end)
+
+    values = value if isinstance(value, list) else [value]
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes = series.cat.codes.to_numpy()
+        targets = _category_codes(series, values)
+        if len(targets) == 1:
+            return codes == targets[0]
+        return np.isin(codes, targets)
+    if len(values) == 1:
+        return series.eq(values[0]).to_numpy(dtype=bool, na_value=False)
+    return series.isin(values).to_numpy(dtype=bool, na_value=False)
+
+
+def filter_positions(data, filters, db_path=None):
+    """全ての条件を1つのマスクにまとめ、該当する行の位置を返す
+
+    Args:
+        data: データフレーム
+        filters: 列名 → 条件（column_mask() を参照）。'genre' はジャンル索引で判定し、
+            'genre_match' で複数ジャンルの AND/OR を指定する
+        db_path: genres テーブルを持つデータベースのパス（ジャンル条件に使用）
+
+    Returns:
+        np.ndarray: 条件に一致する行の位置（昇順）
+    """
+    mask = np.ones(len(data), dtype=bool)
+
+    genres = filters.get('genre')
+    if _is_active(genres) and db_path:
+        try:
+            mask &= genre_mask(data, db_path, genres, filters.get('genre_match', MATCH_ANY))
+        except Exception as e:
+            st.error(f"ジャンルフィルター適用エラー: {e}")
+
+    for key, value in filters.items():
+        if key in GENRE_FILTER_KEYS or key not in data.columns or not _is_active(value):
+            continue
+        mask &= column_mask(data[key], value)
+
+    return np.flatnonzero(mask)
+
+
+def record_filter_latency(rows, matched, seconds):
+    """フィルター処理時間をセッションの履歴に記録"""
+    if 'filter_latency' not in st.session_state:
+        st.session_state['filter_latency'] = deque(maxlen=LATENCY_HISTORY_SIZE)
+    st.session_state['filter_latency'].append({'rows': rows, 'matched': matched, 'ms': seconds * 1000})
+
+
+def filter_data(data, filters, db_path=None):
+    """フィルター条件に基づいてデータを絞り込み
+
+    条件を1つのマスクにまとめてから該当行を1回だけ取り出す。全行が該当する
+    （条件がない）場合はコピーせず元のデータフレームをそのまま返す。
+
+    Returns:
+        フィルター適用後のデータフレーム
+    """
+    start = time.perf_counter()
+    positions = filter_positions(data, filters, db_path)
+    filtered_data = data if len(positions) == len(data) else data.take(positions)
+    record_filter_latency(len(data), len(filtered_data), time.perf_counter() - start)
+    return filtered_data
+
+
+def show_filter_latency():
+    """サイドバーにフィルター処理時間を表示（直近の値と履歴の中央値）"""
+    history = st.session_state.get('filter_latency')
+    if not history:
+        return
+    last = history[-1]
+    median_ms = float(np.median([entry['ms'] for entry in history]))
+    st.sidebar.caption(
+        f"⏱️ フィルター処理: {last['ms']:.1f} ms（{last['rows']:,} → {last['matched']:,}件）"
+        f" / 直近{len(history)}回の中央値: {median_ms:.1f} ms"
+    )
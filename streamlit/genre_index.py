@@ -0,0 +1,146 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from db_connection import read_connection_for_path
+from db_snapshot import ensure_db_import_path
+
+# 複数ジャンル選択時の条件はフィルタークエリ（db/）と共通の定数を使う
+ensure_db_import_path()
+from filter_query import MATCH_ALL, MATCH_ANY
+from genre_bits import genre_bits_mask
+
+# 複数ジャンル選択時の条件の表示名
+GENRE_MATCH_LABELS = {
+    MATCH_ANY: 'いずれかを含む',
+    MATCH_ALL: 'すべてを含む'
+}
+
+
+class GenreBitmapIndex:
+    """ジャンル → 作品のビットマップ索引
+
+    作品ID（昇順）の位置をビット位置とし、ジャンルごとに np.packbits で詰めた
+    ビット列を持つ。複数ジャンルの AND/OR はビット列のビット演算で求め、
+    データフレームの行へは作品IDの位置を引いて対応させる。
+    作品ごとのジャンルは整数のビット集合（ジャンルのコードの位置のビット）でも持ち、
+    行がビット集合の列を持っていれば作品IDを引かずに判定できる。
+    """
+
+    def __init__(self, media_ids, genre_bits, genres):
+        """
+        Args:
+            media_ids: 作品ID（重複なし・昇順）
+            genre_bits: 作品ごとのジャンルのビット集合（int64）
+            genres: ジャンル名のリスト（位置がビット位置＝ジャンルのコード）
+        """
+        self.media_ids = np.asarray(media_ids, dtype=np.int64)
+        self.genre_bits = np.asarray(genre_bits, dtype=np.int64)
+        self.genre_ids = {genre: genre_id for genre_id, genre in enumerate(genres)}
+        self.genres = sorted(self.genre_ids)
+        self._bitmaps = {
+            genre: np.packbits((self.genre_bits >> genre_id) & 1 == 1)
+            for genre, genre_id in self.genre_ids.items()
+        }
+
+    @classmethod
+    def from_genre_rows(cls, media_ids, genre_names):
+        """genres テーブルの行（作品ID, ジャンル名）から作成（ETLのビット集合がない古いDB用）
+
+        ジャンルのコードはETL（db/genre_bits.py）と同じくジャンル名順の位置。
+        """
+        media_ids = np.asarray(media_ids, dtype=np.int64)
+        genres, genre_codes = np.unique(np.asarray(genre_names, dtype=object), return_inverse=True)
+        unique_ids, positions = np.unique(media_ids, return_inverse=True)
+        genre_bits = np.zeros(len(unique_ids), dtype=np.int64)
+        np.bitwise_or.at(genre_bits, positions, np.left_shift(1, genre_codes.astype(np.int64)))
+        return cls(unique_ids, genre_bits, list(genres))
+
+    def selected_bits(self, genres, mode=MATCH_ANY):
+        """選択ジャンルのマスク（整数）。該当するジャンルがない場合は None"""
+        genre_ids = [self.genre_ids[genre] for genre in genres if genre in self.genre_ids]
+        if not genre_ids or (mode == MATCH_ALL and len(genre_ids) < len(set(genres))):
+            return None
+        return genre_bits_mask(genre_ids)
+
+    def bits_mask(self, row_bits, genres, mode=MATCH_ANY):
+        """行ごとのジャンルのビット集合が選択ジャンルに該当するかの真偽値配列"""
+        row_bits = np.asarray(row_bits, dtype=np.int64)
+        selected = self.selected_bits(genres, mode)
+        if selected is None:
+            return np.zeros(len(row_bits), dtype=bool)
+        matched = row_bits & selected
+        return matched == selected if mode == MATCH_ALL else matched != 0
+
+    def media_bitmap(self, genres, mode=MATCH_ANY):
+        """選択ジャンルを含む作品のビット列（packbits 形式）
+
+        Args:
+            genres: ジャンル名のリスト
+            mode: MATCH_ANY（いずれかを含む）または MATCH_ALL（すべてを含む）
+        """
+        empty = np.zeros((len(self.media_ids) + 7) // 8, dtype=np.uint8)
+        bitmaps = [self._bitmaps.get(genre, empty) for genre in genres]
+        if not bitmaps:
+            return empty
+        combine = np.bitwise_and if mode == MATCH_ALL else np.bitwise_or
+        return combine.reduce(bitmaps)
+
+    def row_mask(self, row_ids, genres, mode=MATCH_ANY):
+        """データの各行（作品ID）が選択ジャンルに該当するかの真偽値配列"""
+        row_ids = np.asarray(row_ids, dtype=np.float64)
+        media_mask = np.unpackbits(self.media_bitmap(genres, mode), count=len(self.media_ids)).astype(bool)
+        mask = np.zeros(len(row_ids), dtype=bool)
+        if not len(self.media_ids):
+            return mask
+        valid = ~np.isnan(row_ids)
+        ids = row_ids[valid].astype(np.int64)
+        positions = np.minimum(np.searchsorted(self.media_ids, ids), len(self.media_ids) - 1)
+        mask[valid] = (self.media_ids[positions] == ids) & media_mask[positions]
+        return mask
+
+
+@st.cache_resource
+def load_genre_index(db_path):
+    """データベースのジャンル索引（ビルドごとに1回だけ作成し、全セッションで共有）
+
+    Args:
+        db_path: データベースファイルのパス（ビルドIDを含むため、ビルドごとに別の索引になる）
+    """
+    with read_connection_for_path(db_path) as conn:
+        has_genre_bits = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'media_genre_bits'"
+        ).fetchone() is not None
+        if has_genre_bits:
+            # ETLで作成済みのビット集合をそのまま使う（ジャンル名の比較が不要）
+            genre_codes = pd.read_sql_query("SELECT genre_id, genre_name FROM genre_codes ORDER BY genre_id", conn)
+            bits_data = pd.read_sql_query(
+                "SELECT anilist_id, genre_bits FROM media_genre_bits ORDER BY anilist_id", conn
+            )
+            return GenreBitmapIndex(bits_data['anilist_id'].to_numpy(), bits_data['genre_bits'].to_numpy(),
+                                    genre_codes['genre_name'].tolist())
+        genres_data = pd.read_sql_query(
+            "SELECT anilist_id, genre_name FROM genres WHERE genre_name IS NOT NULL", conn
+        )
+    return GenreBitmapIndex.from_genre_rows(genres_data['anilist_id'].to_numpy(), genres_data['genre_name'].to_numpy())
+
+
+def genre_mask(data, db_path, genres, mode=MATCH_ANY, id_column='anilist_id'):
+    """データの行ごとに、選択ジャンルに該当するかの真偽値配列を取得
+
+    データがジャンルのビット集合の列（genre_bits）を持っていれば、作品IDを引かずに
+    ビット演算だけで判定する。
+
+    Args:
+        data: 作品ID列（またはジャンルのビット集合の列）を持つデータフレーム
+        db_path: genres テーブルを持つデータベースのパス
+        genres: ジャンル名、またはジャンル名のリスト
+        mode: MATCH_ANY（いずれかを含む）または MATCH_ALL（すべてを含む）
+    """
+    if isinstance(genres, str):
+        genres = [genres]
+    index = load_genre_index(str(db_path))
+    if 'genre_bits' in data.columns:
+        return index.bits_mask(data['genre_bits'].to_numpy(dtype=np.int64, na_value=0), genres, mode)
+    row_ids = pd.to_numeric(data[id_column], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+    return index.row_mask(row_ids, genres, mode)
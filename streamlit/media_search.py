@@ -0,0 +1,48 @@
+import pandas as pd
+
+from build_cache import build_cache
+from db_connection import has_table, read_connection
+from db_snapshot import ensure_db_import_path
+
+# 検索処理はETL（db/）の検索インデックスと共通の実装を使う
+ensure_db_import_path()
+import search_index
+from search_index import SEARCH_KINDS
+
+
+def has_search_index(db_name, build_id=None):
+    """全文検索インデックスがあるか（インデックスのない古いDBでは検索欄を出さない）"""
+    return has_table(db_name, 'search_index', build_id)
+
+
+@build_cache
+def search_entities(db_name, query, kinds=None, page=1, page_size=20, build_id=None):
+    """全文検索の結果を関連度順に1ページ分取得
+
+    Args:
+        db_name: データベースファイル名（例: 'anime_data.db'）
+        query: 検索語（空白区切りで AND、部分一致）
+        kinds: 対象の種類（SEARCH_KINDS のキー）のタプル。None なら全て
+        page: ページ番号（1始まり）
+        page_size: 1ページの件数
+
+    Returns:
+        tuple: (結果のDataFrame, 総件数)
+    """
+    with read_connection(db_name, build_id) as conn:
+        results, total = search_index.search(
+            conn, query, list(kinds) if kinds else None,
+            limit=page_size, offset=(max(page, 1) - 1) * page_size
+        )
+
+    result_df = pd.DataFrame(results, columns=['kind', 'entity_id', 'name', 'name_native', 'snippet',
+                                               'weight', 'score'])
+    result_df['kind'] = result_df['kind'].map(SEARCH_KINDS)
+    return result_df, total
+
+
+@build_cache
+def search_media_ids(db_name, query, kinds=None, build_id=None):
+    """検索語に一致する作品IDの一覧（人物・スタジオの一致は関連作品に展開）"""
+    with read_connection(db_name, build_id) as conn:
+        return sorted(search_index.search_media_ids(conn, query, list(kinds) if kinds else None))
@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from db_snapshot import ensure_db_import_path, get_db_path
+
+# 列ストアの定義・マニフェストはETL（db/column_store.py）と共通の実装を使う
+ensure_db_import_path()
+from column_store import (COLUMN_STORE_FORMAT_VERSION, COLUMN_STORES, ROW_INDEX_COLUMN, column_path,
+                          read_column_store_manifest)
+from db_builds import source_fingerprint
+
+
+class MetricStore:
+    """作品ID順に並んだ数値の列（.npy）をメモリマップで開いたもの
+
+    配列はファイルのページをそのまま参照するため、同じビルドを開いている全プロセスで
+    OSのページキャッシュを共有し、読み込み時の変換もない。
+    """
+
+    def __init__(self, files, columns):
+        """
+        Args:
+            files: 列名 → .npy のパス（行の索引の列を含む）
+            columns: 数値の列名のリスト
+        """
+        self.ids = np.load(files[ROW_INDEX_COLUMN], mmap_mode='r')
+        self.columns = {column: np.load(files[column], mmap_mode='r') for column in columns}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def column(self, name):
+        """1列の配列（メモリマップのまま。読み取り専用）"""
+        return self.columns[name]
+
+    def positions(self, row_ids):
+        """作品IDの行位置と、列ストアにある作品かの真偽値配列"""
+        row_ids = pd.to_numeric(pd.Series(row_ids), errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+        valid = ~np.isnan(row_ids)
+        ids = np.where(valid, row_ids, 0).astype(np.int64)
+        positions = np.minimum(np.searchsorted(self.ids, ids), max(len(self.ids) - 1, 0))
+        found = valid & (self.ids[positions] == ids) if len(self.ids) else np.zeros(len(ids), dtype=bool)
+        return positions, found
+
+    def take(self, name, row_ids):
+        """作品IDの並びに合わせた1列の値（列ストアにない作品は NaN）"""
+        positions, found = self.positions(row_ids)
+        values = self.columns[name][positions].astype(np.float32, copy=False)
+        values[~found] = np.nan
+        return values
+
+
+@st.cache_resource
+def load_metric_store(db_name, build_id=None):
+    """ビルドの数値の列ストア（ない・古い場合は None。ビルドごとに1回だけ開き、全セッションで共有）
+
+    マニフェストの形式のバージョンと、記録された元のデータベースのサイズ・更新時刻が
+    現在のデータベースと一致する場合だけ使う。
+    """
+    media = next((media for media, definition in COLUMN_STORES.items() if definition['db'] == db_name), None)
+    db_path = get_db_path(db_name, build_id)
+    if media is None or not db_path.exists():
+        return None
+    manifest = read_column_store_manifest(db_path.parent, media)
+    if manifest.get('format_version') != COLUMN_STORE_FORMAT_VERSION:
+        return None
+    if manifest.get('source') != source_fingerprint(db_path):
+        return None
+    columns = list(manifest['columns'])
+    files = {column: column_path(db_path.parent, media, column) for column in [ROW_INDEX_COLUMN] + columns}
+    if not all(path.exists() for path in files.values()):
+        return None
+    return MetricStore(files, columns)
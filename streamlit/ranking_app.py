@@ -5,7 +5,22 @@ import plotly.express as px
 import plotly.graph_objects as go
 import numpy as np
 import os
-from pathlib import Path
+
+from db_connection import has_table, read_connection, read_connection_for_path
+from build_cache import build_cache, start_build_watcher
+from cache_warmup import show_warmup_status, start_cache_warmup
+from db_snapshot import ensure_db_import_path, get_build_id, get_db_path, show_build_status
+from dtype_schema import compact_frame, show_memory_report
+from filter_engine import filter_data, show_filter_latency
+from genre_index import GENRE_MATCH_LABELS, MATCH_ALL, MATCH_ANY, load_genre_index
+from metric_store import load_metric_store
+from snapshot_store import read_snapshot
+
+# ランキングのSQL（絞り込み・並び替え・ページ）はETL（db/）と共通の実装を使う
+ensure_db_import_path()
+from create_rank_table import build_rank_lookup_query, scope_for_filters
+from ranking_query import (HELPER_COLUMNS, MEDIA_FILTER_COLUMNS, PAGE_SIZES,
+                           build_ranking_count_query, build_ranking_page_query)
 
 # ページ設定
 st.set_page_config(
@@ -17,44 +32,39 @@ st.set_page_config(
 
 # ==================== 共通ユーティリティ関数 ====================
 
-def get_db_path(db_name):
-    """データベースパスを取得（絶対パス→相対パスの順で試行）"""
-    # 絶対パス
-    db_path = Path(rf'C:\Users\PC_User\Desktop\GitHub\public_anilist_data_rank_and_analysis\db\{db_name}')
-    
-    # 相対パス（バックアップ）
-    if not db_path.exists():
-        current_file = Path(__file__).resolve()
-        project_root = current_file.parent.parent
-        db_path = project_root / 'db' / db_name
-    
-    return db_path
-
-@st.cache_data
-def load_data_from_db(db_name, query, success_message):
+@build_cache(shared=True)
+def load_data_from_db(db_name, query, success_message, build_id=None, dataset=None, snapshot=None):
     """データベースからデータを読み込む汎用関数
     
     Args:
         db_name: データベースファイル名（例: 'anime_data.db'）
         query: SQL クエリ文字列
         success_message: 成功時のメッセージ
+        build_id: 参照するビルドID（キャッシュキーを兼ねる）
+        dataset: データセット名（メモリ使用量の表示用。省略時はDB名）
+        snapshot: (スナップショット名, 列の対応) — 使用できればSQLの代わりに読み込む
     
     Returns:
         pd.DataFrame または None
     """
     try:
-        db_path = get_db_path(db_name)
+        db_path = get_db_path(db_name, build_id)
         
         if not db_path.exists():
             st.error(f"❌ {db_name} が見つかりません")
             st.error(f"確認した場所: {db_path}")
             return None
         
-        st.info(f"📂 データベース接続: {db_path}")
-        
-        conn = sqlite3.connect(str(db_path))
-        data = pd.read_sql_query(query, conn)
-        conn.close()
+        data = None
+        if snapshot is not None:
+            data = read_snapshot(db_name, snapshot[0], snapshot[1], dataset or db_name, build_id)
+            if data is not None:
+                st.info(f"📦 スナップショット読み込み: {snapshot[0]}")
+        if data is None:
+            st.info(f"📂 データベース接続: {db_path}")
+            
+            with read_connection_for_path(db_path) as conn:
+                data = compact_frame(pd.read_sql_query(query, conn), dataset or db_name)
         
         st.success(f"✅ {success_message}: {len(data):,}件")
         return data
@@ -228,10 +238,18 @@ def create_filter_ui(data, key_prefix, db_type='anime', show_metric=False, custo
                 if col_name == 'genre':
                     # ジャンル選択（データベースから取得）
                     available_genres = get_genres_data(db_path)
-                    genres_options = ["全て"] + available_genres
-                    selected_genre = st.selectbox(label, genres_options, key=f"{key_prefix}_genre")
-                    if selected_genre != "全て":
-                        filters['genre'] = selected_genre
+                    selected_genres = st.multiselect(label, available_genres, placeholder="全て",
+                                                     key=f"{key_prefix}_genre")
+                    if selected_genres:
+                        filters['genre'] = selected_genres
+                    if len(selected_genres) > 1:
+                        filters['genre_match'] = st.radio(
+                            f"{label}の条件",
+                            [MATCH_ANY, MATCH_ALL],
+                            format_func=lambda x: GENRE_MATCH_LABELS[x],
+                            horizontal=True,
+                            key=f"{key_prefix}_genre_match"
+                        )
                 elif col_name in data.columns:
                     options = ["全て"] + get_unique_values(data, col_name)
                     selected = st.selectbox(label, options, key=f"{key_prefix}_{col_name}")
@@ -257,6 +275,112 @@ def apply_filters_to_data(data, filters, db_type='anime'):
     db_path = get_db_path(db_name)
     return filter_data(data, filters, db_path if db_path.exists() else None)
 
+# ランキングのクエリ・順位の取得結果のキャッシュの上限（条件・ページごとに増えるため件数と保持時間を制限する）
+RANKING_QUERY_CACHE_ENTRIES = 256
+RANKING_QUERY_CACHE_TTL = 3600
+
+@build_cache(max_entries=RANKING_QUERY_CACHE_ENTRIES, ttl=RANKING_QUERY_CACHE_TTL)
+def query_ranking(db_name, build_id, query, params):
+    """ランキングのクエリ（件数・1ページ分）を実行（ビルド・条件ごとにキャッシュ）"""
+    with read_connection(db_name, build_id) as conn:
+        return pd.read_sql_query(query, conn, params=list(params))
+
+def use_sql_ranking(source, filters, db_type):
+    """ランキングをSQLで取得できるか（取得元の定義があり、条件がすべてSQLに変換できる場合）"""
+    if not source:
+        return False
+    db_name = 'anime_data.db' if db_type == 'anime' else 'manga_data.db'
+    supported = set(MEDIA_FILTER_COLUMNS) | {'genre', 'genre_match'}
+    return get_db_path(db_name).exists() and set(filters) <= supported
+
+def count_sql_ranking(source, filters, db_type):
+    """SQLで絞り込み後の件数を取得（COUNTのみ）"""
+    db_name = 'anime_data.db' if db_type == 'anime' else 'manga_data.db'
+    query, params = build_ranking_count_query(source, filters)
+    return int(query_ranking(db_name, get_build_id(), query, tuple(params)).iloc[0, 0])
+
+def fetch_sql_ranking(source, filters, db_type, limit, offset, sort=None):
+    """SQLでランキングの1ページ分を取得（並び替え・件数の制限はSQLで行う）"""
+    db_name = 'anime_data.db' if db_type == 'anime' else 'manga_data.db'
+    if source.get('roles_agg_table') and not has_table(db_name, source['roles_agg_table'], get_build_id()):
+        # 役割の集約テーブルがない古いDBではクエリ内で集約する
+        source = {key: value for key, value in source.items() if key != 'roles_agg_table'}
+    query, params = build_ranking_page_query(source, filters, limit, offset, sort)
+    page_data = query_ranking(db_name, get_build_id(), query, tuple(params))
+    return page_data.drop(columns=HELPER_COLUMNS, errors='ignore')
+
+def ranking_page_controls(total_count, key_prefix):
+    """表示件数・ページ番号の選択UI
+    
+    Returns:
+        tuple: (1ページの件数, 先頭から読み飛ばす件数)
+    """
+    col1, col2 = st.columns([1, 3])
+    with col1:
+        page_size = st.selectbox("表示件数", PAGE_SIZES, key=f"{key_prefix}_page_size")
+    page_count = max(1, -(-total_count // page_size))
+    page_key = f"{key_prefix}_page"
+    # 絞り込みでページ数が減った場合は最終ページに合わせる
+    if st.session_state.get(page_key, 1) > page_count:
+        st.session_state[page_key] = page_count
+    with col2:
+        page = st.number_input(f"ページ（全{page_count:,}ページ）", min_value=1, max_value=page_count,
+                               step=1, key=page_key)
+    offset = (int(page) - 1) * page_size
+    st.caption(f"{offset + 1:,}〜{min(offset + page_size, total_count):,}位を表示")
+    return page_size, offset
+
+# ETLの順位テーブルから追加する列 → 表示名（条件内は年度・季節・フォーマットで絞り込んだ範囲内の順位）
+RANK_COLUMN_LABELS = {
+    'overall_rank': '全体順位',
+    'overall_percentile': '全体上位(%)',
+    'scope_rank': '条件内順位',
+    'scope_percentile': '条件内上位(%)'
+}
+
+@build_cache(max_entries=RANKING_QUERY_CACHE_ENTRIES, ttl=RANKING_QUERY_CACHE_TTL)
+def load_ranks(db_name, build_id, entity, metric, entity_ids, scope='all', scope_key=''):
+    """指定した対象の順位を順位テーブルから取得（テーブルのない古いDBではNone）"""
+    if not entity_ids or not has_table(db_name, 'ranks', build_id):
+        return None
+    query, params = build_rank_lookup_query(entity, metric, entity_ids, scope, scope_key)
+    with read_connection(db_name, build_id) as conn:
+        return pd.read_sql_query(query, conn, params=params)
+
+def add_ranks(page_data, db_type, rank_config, filters=None):
+    """表示するページの行に全体順位・上位パーセントを追加（並び替えはせず主キーで引く）
+    
+    年度・季節・フォーマットの絞り込みが順位テーブルの範囲（create_rank_table.RANK_SCOPES）に
+    対応する場合は、その範囲内の順位・上位パーセントも追加する。
+    
+    Args:
+        page_data: 表示するページのデータ
+        db_type: 'anime' or 'manga'
+        rank_config: {'entity': 順位テーブルの対象, 'metric': 指標, 'id_col': ID列} or None
+        filters: 画面のフィルター（create_filter_ui() の戻り値）or None
+    """
+    if not rank_config or page_data.empty or rank_config['id_col'] not in page_data.columns:
+        return page_data
+    db_name = 'anime_data.db' if db_type == 'anime' else 'manga_data.db'
+    entity_ids = tuple(sorted(int(entity_id) for entity_id in page_data[rank_config['id_col']].dropna().unique()))
+    ids = pd.to_numeric(page_data[rank_config['id_col']], errors='coerce')
+    
+    scopes = [('overall', 'all', '')]
+    scope = scope_for_filters(filters or {})
+    if scope is not None:
+        scopes.append(('scope', *scope))
+    for prefix, scope_name, scope_key in scopes:
+        ranks = load_ranks(db_name, get_build_id(), rank_config['entity'], rank_config['metric'], entity_ids,
+                           scope_name, scope_key)
+        if ranks is None or ranks.empty:
+            continue
+        ranks = ranks.set_index('entity_id')
+        page_data = page_data.assign(**{
+            f"{prefix}_rank": ids.map(ranks['rank']),
+            f"{prefix}_percentile": (ids.map(ranks['percent_rank']) * 100).round(1)
+        })
+    return page_data
+
 def show_ranking_template(data, config):
     """ランキング表示の汎用テンプレート
     
@@ -270,8 +394,13 @@ def show_ranking_template(data, config):
             'sort_by': ソート列名,
             'display_columns': 表示列リスト,
             'column_mapping': 列名マッピング辞書,
-            'chart_config': {'x': X軸列, 'y': Y軸列, 'title': タイトル, 'labels': ラベル辞書, 'hover_data': ホバーデータリスト}
+            'chart_config': {'x': X軸列, 'y': Y軸列, 'title': タイトル, 'labels': ラベル辞書, 'hover_data': ホバーデータリスト},
+            'sql_source': ランキングの取得元（ranking_query.build_ranking_conditions() を参照）or None,
+            'rank_config': 順位の対象（add_ranks() を参照）or None
         }
+    
+    sql_source があればランキングの件数・表示ページ・トップ10だけをSQLで取得し、
+    なければ読み込み済みのデータを絞り込んで並び替える。
     """
     st.header(config['title'])
     
@@ -281,38 +410,35 @@ def show_ranking_template(data, config):
     
     # フィルター設定
     filters = create_filter_ui(data, config['key_prefix'], db_type=config['db_type'])
-    filtered_data = apply_filters_to_data(data, filters, config['db_type'])
     
-    if filtered_data.empty:
-        st.warning("選択された条件に一致するデータがありません。")
-        return
-    
-    # 重複削除処理
-    if config.get('dedup_config'):
-        dedup = config['dedup_config']
-        if 'role_aggregate' in dedup and dedup['role_aggregate']:
-            # スタッフの役割集約
-            filtered_data['roles'] = filtered_data.groupby([dedup['id_col'], dedup['sort_col']])['role'].transform(
-                lambda x: ', '.join(sorted(set(x.dropna())))
-            )
-            filtered_data = filtered_data.drop_duplicates(subset=[dedup['id_col'], dedup['sort_col']], keep='first')
+    if use_sql_ranking(config.get('sql_source'), filters, config['db_type']):
+        filtered_count = count_sql_ranking(config['sql_source'], filters, config['db_type'])
+        if filtered_count == 0:
+            st.warning("選択された条件に一致するデータがありません。")
+            return
         
-        filtered_data = filtered_data.sort_values(
-            [dedup['id_col'], dedup['sort_by']], 
-            ascending=[True, False]
-        ).groupby(dedup['id_col']).first().reset_index()
-    
-    # フィルター適用後のデータ件数
-    filtered_count = len(filtered_data)
-    
-    # ランキング表示
-    st.subheader(f"📋 ランキング結果 ({filtered_count:,}件）")
-    
-    # ソート
-    sorted_data = filtered_data.sort_values(config['sort_by'], ascending=False).reset_index(drop=True)
+        # ランキング表示
+        st.subheader(f"📋 ランキング結果 ({filtered_count:,}件）")
+        limit, offset = ranking_page_controls(filtered_count, config['key_prefix'])
+        sorted_data = fetch_sql_ranking(config['sql_source'], filters, config['db_type'], limit, offset)
+        top10_data = (sorted_data.head(10) if offset == 0 else
+                      fetch_sql_ranking(config['sql_source'], filters, config['db_type'], 10, 0))
+    else:
+        sorted_data, filtered_count = rank_loaded_data(data, filters, config)
+        if sorted_data is None:
+            st.warning("選択された条件に一致するデータがありません。")
+            return
+        
+        # ランキング表示
+        st.subheader(f"📋 ランキング結果 ({filtered_count:,}件）")
+        limit, offset = ranking_page_controls(filtered_count, config['key_prefix'])
+        top10_data = sorted_data.head(10)
+        sorted_data = sorted_data.iloc[offset:offset + limit]
     
-    # 表示用データフレーム準備
-    available_columns = [col for col in config['display_columns'] if col in sorted_data.columns]
+    # 表示用データフレーム準備（全体・条件内の順位は表示するページの行だけ順位テーブルから引く）
+    sorted_data = add_ranks(sorted_data, config['db_type'], config.get('rank_config'), filters)
+    available_columns = [col for col in list(RANK_COLUMN_LABELS) + config['display_columns']
+                         if col in sorted_data.columns]
     display_data = sorted_data[available_columns].copy()
     
     # 数値型変換
@@ -320,19 +446,18 @@ def show_ranking_template(data, config):
     display_data = apply_numeric_conversion(display_data, numeric_columns)
     
     # カラム名変更
-    display_data = display_data.rename(columns=config['column_mapping'])
+    display_data = display_data.rename(columns={**RANK_COLUMN_LABELS, **config['column_mapping']})
     
     # インデックスを順位に設定
-    display_data.index = range(1, len(display_data) + 1)
+    display_data.index = range(offset + 1, offset + len(display_data) + 1)
     display_data.index.name = "順位"
     
     # 表示
     st.dataframe(display_data, width='stretch', height=400)
     
     # トップ10チャート
-    if len(sorted_data) >= 1 and config.get('chart_config'):
+    if len(top10_data) >= 1 and config.get('chart_config'):
         st.subheader("📊 トップ10チャート")
-        top10_data = sorted_data.head(10)
         
         if not top10_data.empty:
             chart = config['chart_config']
@@ -348,10 +473,49 @@ def show_ranking_template(data, config):
             fig.update_layout(height=500)
             st.plotly_chart(fig, width='stretch')
 
+def aggregate_staff_roles(data, id_col='staff_id', media_col='anilist_id'):
+    """スタッフ×作品ごとに役割をまとめて1行にする
+    
+    読み込み時にETLの staff_roles_agg から roles 列を取得していればそのまま使い、
+    集約テーブルのない古いDBの場合だけ groupby で役割を集約する。
+    """
+    if 'roles' not in data.columns:
+        data = data.assign(roles=data.groupby([id_col, media_col])['role'].transform(
+            lambda x: ', '.join(sorted(set(x.dropna())))
+        ))
+    return data.drop_duplicates(subset=[id_col, media_col], keep='first')
+
+def rank_loaded_data(data, filters, config):
+    """読み込み済みのデータを絞り込み・重複削除して並び替える（SQLを使えない場合）
+    
+    Returns:
+        tuple: (並び替え後のデータ or None（該当なし）, 件数)
+    """
+    filtered_data = apply_filters_to_data(data, filters, config['db_type'])
+    
+    if filtered_data.empty:
+        return None, 0
+    
+    # 重複削除処理
+    if config.get('dedup_config'):
+        dedup = config['dedup_config']
+        if 'role_aggregate' in dedup and dedup['role_aggregate']:
+            # スタッフの役割集約
+            filtered_data = aggregate_staff_roles(filtered_data, dedup['id_col'], dedup['sort_col'])
+        
+        filtered_data = filtered_data.sort_values(
+            [dedup['id_col'], dedup['sort_by']], 
+            ascending=[True, False]
+        ).groupby(dedup['id_col']).first().reset_index()
+    
+    # ソート
+    sorted_data = filtered_data.sort_values(config['sort_by'], ascending=False).reset_index(drop=True)
+    return sorted_data, len(sorted_data)
+
 # ==================== データロード関数（既存） ====================
 
-@st.cache_data
-def load_anime_data():
+@build_cache(refresh=True)
+def load_anime_data(build_id=None):
     """アニメデータの読み込み"""
     query = """
         SELECT 
@@ -362,24 +526,41 @@ def load_anime_data():
         WHERE a.title_romaji IS NOT NULL
         ORDER BY a.meanScore DESC NULLS LAST
     """
-    return load_data_from_db('anime_data.db', query, 'アニメデータ読み込み成功')
+    return load_data_from_db('anime_data.db', query, 'アニメデータ読み込み成功', build_id, dataset='anime')
 
-@st.cache_data
 def get_genres_data(db_path):
-    """データベースからジャンルデータを取得"""
+    """データベースからジャンルデータを取得（ジャンル索引のジャンル一覧）"""
     try:
-        conn = sqlite3.connect(str(db_path))
-        cursor = conn.cursor()
-        cursor.execute("SELECT DISTINCT genre_name FROM genres ORDER BY genre_name")
-        genres = [row[0] for row in cursor.fetchall()]
-        conn.close()
-        return genres
+        return load_genre_index(str(db_path)).genres
     except Exception as e:
         st.error(f"❌ ジャンルデータ取得エラー: {e}")
         return []
 
-@st.cache_data
-def load_character_data():
+# スナップショット（db/snapshot_export.py）の列 → 読み込み関数の列（SQLの別名に合わせる）
+MEDIA_SNAPSHOT_COLUMNS = {
+    'anilist_id': 'anilist_id', 'title_romaji': 'title_romaji', 'title_native': 'title_native',
+    'season': 'season', 'seasonYear': 'seasonYear', 'favorites': 'anime_favorites',
+    'meanScore': 'meanScore', 'format': 'format', 'source': 'source'
+}
+CHARACTER_SNAPSHOT_COLUMNS = {
+    'chara_id': 'chara_id', 'chara_name': 'chara_name', 'char_favorites': 'char_favorites',
+    **MEDIA_SNAPSHOT_COLUMNS, 'popularity': 'anime_popularity'
+}
+VOICEACTOR_SNAPSHOT_COLUMNS = {
+    'voiceactor_id': 'voiceactor_id', 'voiceactor_name': 'voiceactor_name', 'va_favorites': 'va_favorites',
+    **MEDIA_SNAPSHOT_COLUMNS, 'voiceactor_count': 'voiceactor_count', 'count_per_year': 'count_per_year'
+}
+STAFF_SNAPSHOT_COLUMNS = {
+    'staff_id': 'staff_id', 'staff_name': 'staff_name', 'role': 'role', 'staff_favorites': 'staff_favorites',
+    **MEDIA_SNAPSHOT_COLUMNS, 'staff_count': 'staff_count', 'count_per_year': 'count_per_year', 'roles': 'roles'
+}
+STUDIOS_SNAPSHOT_COLUMNS = {
+    'studios_id': 'studios_id', 'studios_name': 'studios_name',
+    **MEDIA_SNAPSHOT_COLUMNS, 'studios_count': 'studios_count', 'count_per_year': 'count_per_year'
+}
+
+@build_cache(refresh=True)
+def load_character_data(build_id=None):
     """キャラクターデータの読み込み"""
     query = """
         SELECT 
@@ -393,10 +574,11 @@ def load_character_data():
         WHERE c.chara_name IS NOT NULL
         ORDER BY c.favorites DESC NULLS LAST
     """
-    return load_data_from_db('anime_data.db', query, 'キャラクターデータ読み込み成功')
+    return load_data_from_db('anime_data.db', query, 'キャラクターデータ読み込み成功', build_id, dataset='character',
+                             snapshot=('anime_characters', CHARACTER_SNAPSHOT_COLUMNS))
 
-@st.cache_data
-def load_voiceactor_data():
+@build_cache(refresh=True)
+def load_voiceactor_data(build_id=None):
     """声優データの読み込み"""
     query = """
         SELECT 
@@ -411,66 +593,88 @@ def load_voiceactor_data():
         WHERE v.voiceactor_name IS NOT NULL
         ORDER BY v.favorites DESC NULLS LAST
     """
-    return load_data_from_db('anime_data.db', query, '声優データ読み込み成功')
+    return load_data_from_db('anime_data.db', query, '声優データ読み込み成功', build_id, dataset='voiceactor',
+                             snapshot=('anime_voiceactors', VOICEACTOR_SNAPSHOT_COLUMNS))
 
-@st.cache_data
-def load_staff_data():
-    """スタッフデータの読み込み"""
-    query = """
+def staff_roles_agg_sql(db_name, build_id, staff_alias):
+    """staff_roles_agg（スタッフ×作品ごとの集約済みの役割）を結合するSQLの断片
+    
+    Returns:
+        tuple: (SELECT に追加する列, 追加する JOIN)。テーブルのない古いDBでは空文字列
+    """
+    if not has_table(db_name, 'staff_roles_agg', build_id):
+        return '', ''
+    return (
+        ", COALESCE(ra.roles, '') as roles",
+        f"""
+        LEFT JOIN staff_roles_agg ra
+            ON ra.staff_id = {staff_alias}.staff_id AND ra.anilist_id = {staff_alias}.anilist_id"""
+    )
+
+@build_cache(refresh=True)
+def load_staff_data(build_id=None):
+    """スタッフデータの読み込み（役割の集約テーブルがあれば集約済みの役割も取得）"""
+    roles_select, roles_join = staff_roles_agg_sql('anime_data.db', build_id, 's')
+    query = f"""
         SELECT 
             s.staff_id, s.staff_name, s.role, s.favorites as staff_favorites,
             a.anilist_id, a.title_romaji, a.title_native, 
             a.season, a.seasonYear, a.favorites as anime_favorites, 
             a.meanScore, a.format, a.source,
-            sb.staff_count, sb.count_per_year
+            sb.staff_count, sb.count_per_year{roles_select}
         FROM staff s
         JOIN anime a ON s.anilist_id = a.anilist_id
-        LEFT JOIN staff_basic sb ON s.staff_id = sb.staff_id
+        LEFT JOIN staff_basic sb ON s.staff_id = sb.staff_id{roles_join}
         WHERE s.staff_name IS NOT NULL
         ORDER BY s.favorites DESC NULLS LAST
     """
-    return load_data_from_db('anime_data.db', query, 'スタッフデータ読み込み成功')
+    return load_data_from_db('anime_data.db', query, 'スタッフデータ読み込み成功', build_id, dataset='staff',
+                             snapshot=('anime_staff', STAFF_SNAPSHOT_COLUMNS))
 
-@st.cache_data
-def load_studios_data():
+@build_cache(refresh=True, shared=True)
+def load_studios_data(build_id=None):
     """スタジオデータの読み込み（統計データ付き）"""
     try:
-        db_path = get_db_path('anime_data.db')
+        db_path = get_db_path('anime_data.db', build_id)
         
         if not db_path.exists():
             st.error(f"❌ anime_data.db が見つかりません")
             st.error(f"確認した場所: {db_path}")
             return None
         
-        st.info(f"📂 データベース接続: {db_path}")
+        data = read_snapshot('anime_data.db', 'anime_studios', STUDIOS_SNAPSHOT_COLUMNS, 'studios', build_id)
+        if data is not None:
+            st.info("📦 スナップショット読み込み: anime_studios")
+        if data is None:
+            st.info(f"📂 データベース接続: {db_path}")
         
-        conn = sqlite3.connect(str(db_path))
-        query = """
-            SELECT 
-                s.studios_id, s.studios_name,
-                a.anilist_id, a.title_romaji, a.title_native, 
-                a.season, a.seasonYear, a.favorites as anime_favorites, 
-                a.meanScore, a.format, a.source,
-                sb.studios_count, sb.count_per_year
-            FROM studios s
-            JOIN anime a ON s.anilist_id = a.anilist_id
-            LEFT JOIN studios_basic sb ON s.studios_id = sb.studios_id
-            WHERE s.studios_name IS NOT NULL
-            ORDER BY sb.studios_count DESC NULLS LAST
-        """
-        data = pd.read_sql_query(query, conn)
-        
-        # studios_statsテーブルから統計データを取得
-        stats_query = """
-            SELECT 
-                studios_id,
-                stat_type,
-                total,
-                avg_value
-            FROM studios_stats
-        """
-        stats_data = pd.read_sql_query(stats_query, conn)
-        conn.close()
+        with read_connection_for_path(db_path) as conn:
+            query = """
+                SELECT 
+                    s.studios_id, s.studios_name,
+                    a.anilist_id, a.title_romaji, a.title_native, 
+                    a.season, a.seasonYear, a.favorites as anime_favorites, 
+                    a.meanScore, a.format, a.source,
+                    sb.studios_count, sb.count_per_year
+                FROM studios s
+                JOIN anime a ON s.anilist_id = a.anilist_id
+                LEFT JOIN studios_basic sb ON s.studios_id = sb.studios_id
+                WHERE s.studios_name IS NOT NULL
+                ORDER BY sb.studios_count DESC NULLS LAST
+            """
+            if data is None:
+                data = compact_frame(pd.read_sql_query(query, conn), 'studios')
+        
+            # studios_statsテーブルから統計データを取得
+            stats_query = """
+                SELECT 
+                    studios_id,
+                    stat_type,
+                    total,
+                    avg_value
+                FROM studios_stats
+            """
+            stats_data = pd.read_sql_query(stats_query, conn)
         
         # 統計データをピボットして各studios_idに対して横展開
         if not stats_data.empty:
@@ -495,28 +699,35 @@ def load_studios_data():
         st.error(f"❌ エラー: {e}")
         return None
 
-@st.cache_data
-def load_source_data():
-    """原作データの読み込み（CTE使用）"""
+# 集計テーブル（db/create_dashboard_stats.py）がない古いデータベース用の同等のCTE
+ANIME_SOURCE_STATS_CTE = """
+    WITH source_stats AS (
+        SELECT 
+            source,
+            COUNT(DISTINCT anilist_id) as source_count,
+            MIN(seasonYear) as first_year,
+            MAX(seasonYear) as last_year,
+            MAX(seasonYear) - MIN(seasonYear) + 1 as year_range,
+            CAST(COUNT(DISTINCT anilist_id) AS FLOAT) / 
+                NULLIF(MAX(seasonYear) - MIN(seasonYear) + 1, 0) as count_per_year,
+            AVG(meanScore) as avg_mean_score,
+            SUM(favorites) as total_favorites,
+            AVG(favorites) as avg_favorites,
+            SUM(popularity) as total_popularity,
+            AVG(popularity) as avg_popularity
+        FROM anime
+        WHERE source IS NOT NULL AND seasonYear IS NOT NULL
+        GROUP BY source
+    )
+"""
+
+# 原作・ジャンルのタブは年度・季節・フォーマットのフィルターを作品ごとに適用し、条件に合う作品の
+# うちお気に入り数が最も多い作品をキーの代表として表示するため、作品ごとの行を読み込む。
+# キーごとの集計値だけを集計テーブル（source_stats / genre_stats）から結合する。
+@build_cache(refresh=True)
+def load_source_data(build_id=None):
+    """原作データの読み込み（ETLの集計テーブル source_stats を使用）"""
     query = """
-        WITH source_stats AS (
-            SELECT 
-                source,
-                COUNT(DISTINCT anilist_id) as source_count,
-                MIN(seasonYear) as first_year,
-                MAX(seasonYear) as last_year,
-                MAX(seasonYear) - MIN(seasonYear) + 1 as year_range,
-                CAST(COUNT(DISTINCT anilist_id) AS FLOAT) / 
-                    NULLIF(MAX(seasonYear) - MIN(seasonYear) + 1, 0) as count_per_year,
-                AVG(meanScore) as avg_mean_score,
-                SUM(favorites) as total_favorites,
-                AVG(favorites) as avg_favorites,
-                SUM(popularity) as total_popularity,
-                AVG(popularity) as avg_popularity
-            FROM anime
-            WHERE source IS NOT NULL AND seasonYear IS NOT NULL
-            GROUP BY source
-        )
         SELECT 
             a.anilist_id,
             a.title_romaji,
@@ -542,31 +753,37 @@ def load_source_data():
         WHERE a.source IS NOT NULL
         ORDER BY ss.source_count DESC, a.favorites DESC
     """
-    return load_data_from_db('anime_data.db', query, '原作データ読み込み成功')
+    if not has_table('anime_data.db', 'source_stats', build_id):
+        # 集計テーブルがない古いデータベースではその場で集計する
+        query = ANIME_SOURCE_STATS_CTE + query
+    return load_data_from_db('anime_data.db', query, '原作データ読み込み成功', build_id, dataset='source')
+
+ANIME_GENRE_STATS_CTE = """
+    WITH genre_stats AS (
+        SELECT 
+            g.genre_name,
+            COUNT(DISTINCT g.anilist_id) as genre_count,
+            MIN(a.seasonYear) as first_year,
+            MAX(a.seasonYear) as last_year,
+            MAX(a.seasonYear) - MIN(a.seasonYear) + 1 as year_range,
+            CAST(COUNT(DISTINCT g.anilist_id) AS FLOAT) / 
+                NULLIF(MAX(a.seasonYear) - MIN(a.seasonYear) + 1, 0) as count_per_year,
+            AVG(a.meanScore) as avg_mean_score,
+            SUM(a.favorites) as total_favorites,
+            AVG(a.favorites) as avg_favorites,
+            SUM(a.popularity) as total_popularity,
+            AVG(a.popularity) as avg_popularity
+        FROM genres g
+        JOIN anime a ON g.anilist_id = a.anilist_id
+        WHERE g.genre_name IS NOT NULL AND a.seasonYear IS NOT NULL
+        GROUP BY g.genre_name
+    )
+"""
 
-@st.cache_data
-def load_genre_data():
-    """ジャンルデータの読み込み（CTE使用）"""
+@build_cache(refresh=True)
+def load_genre_data(build_id=None):
+    """ジャンルデータの読み込み（ETLの集計テーブル genre_stats を使用）"""
     query = """
-        WITH genre_stats AS (
-            SELECT 
-                g.genre_name,
-                COUNT(DISTINCT g.anilist_id) as genre_count,
-                MIN(a.seasonYear) as first_year,
-                MAX(a.seasonYear) as last_year,
-                MAX(a.seasonYear) - MIN(a.seasonYear) + 1 as year_range,
-                CAST(COUNT(DISTINCT g.anilist_id) AS FLOAT) / 
-                    NULLIF(MAX(a.seasonYear) - MIN(a.seasonYear) + 1, 0) as count_per_year,
-                AVG(a.meanScore) as avg_mean_score,
-                SUM(a.favorites) as total_favorites,
-                AVG(a.favorites) as avg_favorites,
-                SUM(a.popularity) as total_popularity,
-                AVG(a.popularity) as avg_popularity
-            FROM genres g
-            JOIN anime a ON g.anilist_id = a.anilist_id
-            WHERE g.genre_name IS NOT NULL AND a.seasonYear IS NOT NULL
-            GROUP BY g.genre_name
-        )
         SELECT 
             a.anilist_id,
             a.title_romaji,
@@ -593,31 +810,37 @@ def load_genre_data():
         WHERE g.genre_name IS NOT NULL
         ORDER BY gs.genre_count DESC, a.favorites DESC
     """
-    return load_data_from_db('anime_data.db', query, 'ジャンルデータ読み込み成功')
+    if not has_table('anime_data.db', 'genre_stats', build_id):
+        # 集計テーブルがない古いデータベースではその場で集計する
+        query = ANIME_GENRE_STATS_CTE + query
+    return load_data_from_db('anime_data.db', query, 'ジャンルデータ読み込み成功', build_id, dataset='genre')
+
+MANGA_GENRE_STATS_CTE = """
+    WITH genre_stats AS (
+        SELECT 
+            g.genre_name,
+            COUNT(DISTINCT g.anilist_id) as genre_count,
+            MIN(m.seasonYear) as first_year,
+            MAX(m.seasonYear) as last_year,
+            MAX(m.seasonYear) - MIN(m.seasonYear) + 1 as year_range,
+            CAST(COUNT(DISTINCT g.anilist_id) AS FLOAT) / 
+                NULLIF(MAX(m.seasonYear) - MIN(m.seasonYear) + 1, 0) as count_per_year,
+            AVG(m.meanScore) as avg_mean_score,
+            SUM(m.favorites) as total_favorites,
+            AVG(m.favorites) as avg_favorites,
+            SUM(m.popularity) as total_popularity,
+            AVG(m.popularity) as avg_popularity
+        FROM genres g
+        JOIN manga m ON g.anilist_id = m.anilist_id
+        WHERE g.genre_name IS NOT NULL AND m.seasonYear IS NOT NULL
+        GROUP BY g.genre_name
+    )
+"""
 
-@st.cache_data
-def load_manga_genre_data():
-    """マンガジャンルデータの読み込み（CTE使用）"""
+@build_cache(refresh=True)
+def load_manga_genre_data(build_id=None):
+    """マンガジャンルデータの読み込み（ETLの集計テーブル genre_stats を使用）"""
     query = """
-        WITH genre_stats AS (
-            SELECT 
-                g.genre_name,
-                COUNT(DISTINCT g.anilist_id) as genre_count,
-                MIN(m.seasonYear) as first_year,
-                MAX(m.seasonYear) as last_year,
-                MAX(m.seasonYear) - MIN(m.seasonYear) + 1 as year_range,
-                CAST(COUNT(DISTINCT g.anilist_id) AS FLOAT) / 
-                    NULLIF(MAX(m.seasonYear) - MIN(m.seasonYear) + 1, 0) as count_per_year,
-                AVG(m.meanScore) as avg_mean_score,
-                SUM(m.favorites) as total_favorites,
-                AVG(m.favorites) as avg_favorites,
-                SUM(m.popularity) as total_popularity,
-                AVG(m.popularity) as avg_popularity
-            FROM genres g
-            JOIN manga m ON g.anilist_id = m.anilist_id
-            WHERE g.genre_name IS NOT NULL AND m.seasonYear IS NOT NULL
-            GROUP BY g.genre_name
-        )
         SELECT 
             m.anilist_id,
             m.title_romaji,
@@ -645,13 +868,16 @@ def load_manga_genre_data():
         WHERE g.genre_name IS NOT NULL
         ORDER BY gs.genre_count DESC, m.favorites DESC
     """
-    return load_data_from_db('manga_data.db', query, 'マンガジャンルデータ読み込み成功')
+    if not has_table('manga_data.db', 'genre_stats', build_id):
+        # 集計テーブルがない古いデータベースではその場で集計する
+        query = MANGA_GENRE_STATS_CTE + query
+    return load_data_from_db('manga_data.db', query, 'マンガジャンルデータ読み込み成功', build_id, dataset='manga_genre')
 
-@st.cache_data
-def load_manga_character_data():
+@build_cache(refresh=True, shared=True)
+def load_manga_character_data(build_id=None):
     """マンガキャラクターデータの読み込み（テーブル存在確認付き）"""
     try:
-        db_path = get_db_path('manga_data.db')
+        db_path = get_db_path('manga_data.db', build_id)
         
         if not db_path.exists():
             st.error(f"❌ manga_data.db が見つかりません")
@@ -660,29 +886,27 @@ def load_manga_character_data():
         st.info(f"📂 データベース接続: {db_path}")
         
         # テーブル存在確認
-        conn = sqlite3.connect(str(db_path))
-        cursor = conn.cursor()
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='characters'")
+        with read_connection_for_path(db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='characters'")
         
-        if not cursor.fetchone():
-            conn.close()
-            st.warning("⚠️ manga_data.dbにcharactersテーブルが存在しません。")
-            return None
+            if not cursor.fetchone():
+                st.warning("⚠️ manga_data.dbにcharactersテーブルが存在しません。")
+                return None
         
-        query = """
-            SELECT 
-                c.chara_id, c.chara_name, c.favorites as char_favorites,
-                m.anilist_id, m.title_romaji, m.title_native, 
-                m.season, m.seasonYear, m.favorites as manga_favorites, 
-                m.popularity as manga_popularity,
-                m.meanScore, m.format, m.source
-            FROM characters c
-            JOIN manga m ON c.anilist_id = m.anilist_id
-            WHERE c.chara_name IS NOT NULL
-            ORDER BY c.favorites DESC NULLS LAST
-        """
-        data = pd.read_sql_query(query, conn)
-        conn.close()
+            query = """
+                SELECT 
+                    c.chara_id, c.chara_name, c.favorites as char_favorites,
+                    m.anilist_id, m.title_romaji, m.title_native, 
+                    m.season, m.seasonYear, m.favorites as manga_favorites, 
+                    m.popularity as manga_popularity,
+                    m.meanScore, m.format, m.source
+                FROM characters c
+                JOIN manga m ON c.anilist_id = m.anilist_id
+                WHERE c.chara_name IS NOT NULL
+                ORDER BY c.favorites DESC NULLS LAST
+            """
+            data = compact_frame(pd.read_sql_query(query, conn), 'manga_character')
         st.success(f"✅ マンガキャラクターデータ読み込み成功: {len(data):,}件")
         return data
         
@@ -690,11 +914,11 @@ def load_manga_character_data():
         st.error(f"❌ エラー: {e}")
         return None
 
-@st.cache_data
-def load_manga_staff_data():
+@build_cache(refresh=True, shared=True)
+def load_manga_staff_data(build_id=None):
     """マンガスタッフデータの読み込み（条件分岐付き）"""
     try:
-        db_path = get_db_path('manga_data.db')
+        db_path = get_db_path('manga_data.db', build_id)
         
         if not db_path.exists():
             st.error(f"❌ manga_data.db が見つかりません")
@@ -702,51 +926,50 @@ def load_manga_staff_data():
         
         st.info(f"📂 データベース接続: {db_path}")
         
-        conn = sqlite3.connect(str(db_path))
-        cursor = conn.cursor()
-        
-        # staffテーブル存在確認
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='staff'")
-        if not cursor.fetchone():
-            conn.close()
-            st.warning("⚠️ manga_data.dbにstaffテーブルが存在しません。")
-            return None
-        
-        # staff_basic_enhancedテーブルの存在確認
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='staff_basic_enhanced'")
-        has_enhanced = cursor.fetchone() is not None
-        
-        if has_enhanced:
-            query = """
-                SELECT 
-                    s.staff_id, s.staff_name, s.role,
-                    m.anilist_id, m.title_romaji, m.title_native, 
-                    m.season, m.seasonYear, m.favorites as manga_favorites, 
-                    m.meanScore, m.format, m.source,
-                    sbe.favorites as staff_favorites,
-                    sbe.total_count as staff_count,
-                    sbe.count_per_year
-                FROM staff s
-                JOIN manga m ON s.anilist_id = m.anilist_id
-                LEFT JOIN staff_basic_enhanced sbe ON s.staff_id = sbe.staff_id
-                WHERE s.staff_name IS NOT NULL
-                ORDER BY sbe.favorites DESC NULLS LAST
-            """
-        else:
-            query = """
-                SELECT 
-                    s.staff_id, s.staff_name, s.role, s.favorites as staff_favorites,
-                    m.anilist_id, m.title_romaji, m.title_native, 
-                    m.season, m.seasonYear, m.favorites as manga_favorites, 
-                    m.meanScore, m.format, m.source
-                FROM staff s
-                JOIN manga m ON s.anilist_id = m.anilist_id
-                WHERE s.staff_name IS NOT NULL
-                ORDER BY s.favorites DESC NULLS LAST
-            """
+        with read_connection_for_path(db_path) as conn:
+            cursor = conn.cursor()
         
-        data = pd.read_sql_query(query, conn)
-        conn.close()
+            # staffテーブル存在確認
+            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='staff'")
+            if not cursor.fetchone():
+                st.warning("⚠️ manga_data.dbにstaffテーブルが存在しません。")
+                return None
+        
+            # staff_basic_enhancedテーブルの存在確認
+            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='staff_basic_enhanced'")
+            has_enhanced = cursor.fetchone() is not None
+            roles_select, roles_join = staff_roles_agg_sql('manga_data.db', build_id, 's')
+        
+            if has_enhanced:
+                query = f"""
+                    SELECT 
+                        s.staff_id, s.staff_name, s.role,
+                        m.anilist_id, m.title_romaji, m.title_native, 
+                        m.season, m.seasonYear, m.favorites as manga_favorites, 
+                        m.meanScore, m.format, m.source,
+                        sbe.favorites as staff_favorites,
+                        sbe.total_count as staff_count,
+                        sbe.count_per_year{roles_select}
+                    FROM staff s
+                    JOIN manga m ON s.anilist_id = m.anilist_id
+                    LEFT JOIN staff_basic_enhanced sbe ON s.staff_id = sbe.staff_id{roles_join}
+                    WHERE s.staff_name IS NOT NULL
+                    ORDER BY sbe.favorites DESC NULLS LAST
+                """
+            else:
+                query = f"""
+                    SELECT 
+                        s.staff_id, s.staff_name, s.role, s.favorites as staff_favorites,
+                        m.anilist_id, m.title_romaji, m.title_native, 
+                        m.season, m.seasonYear, m.favorites as manga_favorites, 
+                        m.meanScore, m.format, m.source{roles_select}
+                    FROM staff s
+                    JOIN manga m ON s.anilist_id = m.anilist_id{roles_join}
+                    WHERE s.staff_name IS NOT NULL
+                    ORDER BY s.favorites DESC NULLS LAST
+                """
+        
+            data = compact_frame(pd.read_sql_query(query, conn), 'manga_staff')
         st.success(f"✅ マンガスタッフデータ読み込み成功: {len(data):,}件")
         return data
         
@@ -754,8 +977,8 @@ def load_manga_staff_data():
         st.error(f"❌ エラー: {e}")
         return None
 
-@st.cache_data
-def load_manga_data():
+@build_cache(refresh=True)
+def load_manga_data(build_id=None):
     """マンガデータの読み込み"""
     query = """
         SELECT 
@@ -765,7 +988,7 @@ def load_manga_data():
         WHERE m.title_romaji IS NOT NULL
         ORDER BY m.meanScore DESC NULLS LAST
     """
-    return load_data_from_db('manga_data.db', query, 'マンガデータ読み込み成功')
+    return load_data_from_db('manga_data.db', query, 'マンガデータ読み込み成功', build_id, dataset='manga')
 
 def get_unique_values(data, column):
     """指定されたカラムのユニークな値を取得"""
@@ -778,37 +1001,26 @@ def get_unique_values(data, column):
             return sorted(unique_vals)
     return []
 
-def filter_data(data, filters, db_path=None):
-    """フィルター条件に基づいてデータを絞り込み"""
-    filtered_data = data.copy()
-    
-    # ジャンルフィルターの処理
-    if 'genre' in filters and filters['genre'] and filters['genre'] != "全て" and db_path:
-        try:
-            conn = sqlite3.connect(str(db_path))
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT DISTINCT anilist_id 
-                FROM genres 
-                WHERE genre_name = ?
-            """, (filters['genre'],))
-            genre_anime_ids = [row[0] for row in cursor.fetchall()]
-            conn.close()
-            
-            if genre_anime_ids:
-                filtered_data = filtered_data[filtered_data['anilist_id'].isin(genre_anime_ids)]
-            else:
-                # 該当するジャンルのアニメがない場合は空のDataFrameを返す
-                filtered_data = filtered_data.iloc[0:0]
-        except Exception as e:
-            st.error(f"ジャンルフィルター適用エラー: {e}")
-    
-    # その他のフィルターの処理
-    for key, value in filters.items():
-        if key != 'genre' and value and value != "全て" and key in filtered_data.columns:
-            filtered_data = filtered_data[filtered_data[key] == value]
-    
-    return filtered_data
+# タイトルランキングの取得元（作品テーブルの別名は a。列は load_anime_data() / load_manga_data() と同じ）
+TITLE_RANKING_SOURCES = {
+    'anime': {
+        'from': 'anime a',
+        'where': 'a.title_romaji IS NOT NULL',
+        'columns': '''
+            a.anilist_id, a.title_romaji, a.title_native, a.format,
+            a.season, a.seasonYear, a.favorites, a.meanScore,
+            a.popularity, a.source
+        '''
+    },
+    'manga': {
+        'from': 'manga a',
+        'where': 'a.title_romaji IS NOT NULL',
+        'columns': '''
+            a.anilist_id, a.title_romaji, a.title_native, a.format,
+            a.season, a.seasonYear, a.meanScore, a.favorites, a.popularity, a.source
+        '''
+    }
+}
 
 def show_ranking_tab(data, genre):
     """ランキングタブの表示"""
@@ -820,27 +1032,51 @@ def show_ranking_tab(data, genre):
     
     # フィルター設定（共通化）
     db_type = 'anime' if genre == "アニメ" else 'manga'
-    filters, selected_metric = create_filter_ui(data, f"ranking_{genre}", db_type, show_metric=True)
-    
-    # フィルター適用
-    filtered_data = apply_filters_to_data(data, filters, db_type)
-    
-    if filtered_data.empty:
-        st.warning("選択された条件に一致するデータがありません。")
-        return
-    
-    # フィルター適用後のデータ件数を取得
-    filtered_count = len(filtered_data)
-    
-    # ランキング表示
-    st.subheader(f"📋 ランキング結果 ({filtered_count:,}件)")
+    key_prefix = f"ranking_{genre}"
+    filters, selected_metric = create_filter_ui(data, key_prefix, db_type, show_metric=True)
+    source = TITLE_RANKING_SOURCES[db_type]
+    
+    if use_sql_ranking(source, filters, db_type):
+        # 件数・表示ページ・トップ10だけをSQLで取得
+        filtered_count = count_sql_ranking(source, filters, db_type)
+        if filtered_count == 0:
+            st.warning("選択された条件に一致するデータがありません。")
+            return
+        
+        # ランキング表示
+        st.subheader(f"📋 ランキング結果 ({filtered_count:,}件)")
+        limit, offset = ranking_page_controls(filtered_count, key_prefix)
+        sort = f"a.{selected_metric}"
+        sorted_data = fetch_sql_ranking(source, filters, db_type, limit, offset, sort)
+        top10_data = (sorted_data.head(10) if offset == 0 else
+                      fetch_sql_ranking(source, filters, db_type, 10, 0, sort))
+    else:
+        # フィルター適用
+        filtered_data = apply_filters_to_data(data, filters, db_type)
+        
+        if filtered_data.empty:
+            st.warning("選択された条件に一致するデータがありません。")
+            return
+        
+        # フィルター適用後のデータ件数を取得
+        filtered_count = len(filtered_data)
+        
+        # ランキング表示
+        st.subheader(f"📋 ランキング結果 ({filtered_count:,}件)")
+        limit, offset = ranking_page_controls(filtered_count, key_prefix)
+        
+        # データをソート
+        ranked_data = filtered_data.sort_values(selected_metric, ascending=False).reset_index(drop=True)
+        top10_data = ranked_data.head(10)
+        sorted_data = ranked_data.iloc[offset:offset + limit]
     
-    # データをソート
-    sorted_data = filtered_data.sort_values(selected_metric, ascending=False).reset_index(drop=True)
+    # 全体・条件内の順位（表示するページの行だけ順位テーブルから引く）
+    sorted_data = add_ranks(sorted_data, db_type,
+                            {'entity': 'media', 'metric': selected_metric, 'id_col': 'anilist_id'}, filters)
     
     # 表示用データフレーム準備
     if genre == "アニメ":
-        display_columns = ['title_native', 'season', 'seasonYear', 'favorites', 'meanScore', 'popularity']
+        display_columns = list(RANK_COLUMN_LABELS) + ['title_native', 'season', 'seasonYear', 'favorites', 'meanScore', 'popularity']
         available_columns = [col for col in display_columns if col in sorted_data.columns]
         display_data = sorted_data[available_columns].copy()
         
@@ -855,7 +1091,7 @@ def show_ranking_tab(data, genre):
         }
         
     else:  # マンガ
-        display_columns = ['title_native', 'season', 'seasonYear', 'favorites', 'meanScore', 'popularity']
+        display_columns = list(RANK_COLUMN_LABELS) + ['title_native', 'season', 'seasonYear', 'favorites', 'meanScore', 'popularity']
         available_columns = [col for col in display_columns if col in sorted_data.columns]
         display_data = sorted_data[available_columns].copy()
         
@@ -882,17 +1118,17 @@ def show_ranking_tab(data, genre):
         display_data['seasonYear'] = pd.to_numeric(display_data['seasonYear'], errors='coerce')
     
     # カラム名を変更
-    display_data = display_data.rename(columns=column_mapping)
+    display_data = display_data.rename(columns={**RANK_COLUMN_LABELS, **column_mapping})
     
     # インデックスを順位に設定
-    display_data.index = range(1, len(display_data) + 1)
+    display_data.index = range(offset + 1, offset + len(display_data) + 1)
     display_data.index.name = "順位"
     
     # 表示
     st.dataframe(display_data, width='stretch', height=400)
     
     # トップ10のチャート表示
-    if len(sorted_data) >= 1:
+    if len(top10_data) >= 1:
         st.subheader("📊 トップ10チャート")
         
         # メトリックラベル定義
@@ -902,8 +1138,6 @@ def show_ranking_tab(data, genre):
             "popularity": "人気度"
         }
         
-        top10_data = sorted_data.head(10)
-        
         if not top10_data.empty:
             fig = px.bar(
                 top10_data,
@@ -946,7 +1180,22 @@ def show_character_ranking_tab(data):
             'title': 'トップ10 - キャラクターお気に入り数',
             'labels': {'chara_name': 'キャラクター名', 'char_favorites': 'お気に入り数'},
             'hover_data': ['title_native', 'seasonYear', 'season']
-        }
+        },
+        'sql_source': {
+            'from': 'characters c JOIN anime a ON c.anilist_id = a.anilist_id',
+            'where': 'c.chara_name IS NOT NULL',
+            'columns': '''
+                c.chara_id, c.chara_name, c.favorites as char_favorites,
+                a.anilist_id, a.title_romaji, a.title_native,
+                a.season, a.seasonYear, a.favorites as anime_favorites,
+                a.popularity as anime_popularity,
+                a.meanScore, a.format, a.source
+            ''',
+            'entity_id': 'c.chara_id',
+            'sort': 'c.favorites',
+            'media_sort': 'a.favorites'
+        },
+        'rank_config': {'entity': 'characters', 'metric': 'favorites', 'id_col': 'chara_id'}
     }
     show_ranking_template(data, config)
 
@@ -976,7 +1225,22 @@ def show_manga_character_ranking_tab(data):
             'title': 'トップ10 - キャラクターお気に入り数',
             'labels': {'chara_name': 'キャラクター名', 'char_favorites': 'お気に入り数'},
             'hover_data': ['title_native', 'seasonYear', 'season']
-        }
+        },
+        'sql_source': {
+            'from': 'characters c JOIN manga a ON c.anilist_id = a.anilist_id',
+            'where': 'c.chara_name IS NOT NULL',
+            'columns': '''
+                c.chara_id, c.chara_name, c.favorites as char_favorites,
+                a.anilist_id, a.title_romaji, a.title_native,
+                a.season, a.seasonYear, a.favorites as manga_favorites,
+                a.popularity as manga_popularity,
+                a.meanScore, a.format, a.source
+            ''',
+            'entity_id': 'c.chara_id',
+            'sort': 'c.favorites',
+            'media_sort': 'a.favorites'
+        },
+        'rank_config': {'entity': 'characters', 'metric': 'favorites', 'id_col': 'chara_id'}
     }
     show_ranking_template(data, config)
 
@@ -1007,7 +1271,24 @@ def show_voiceactor_ranking_tab(data):
             'title': 'トップ10 - 声優お気に入り数',
             'labels': {'voiceactor_name': '声優名', 'va_favorites': 'お気に入り数'},
             'hover_data': ['title_native', 'seasonYear', 'season']
-        }
+        },
+        'sql_source': {
+            'from': '''voiceactors v
+                JOIN anime a ON v.anilist_id = a.anilist_id
+                LEFT JOIN voiceactor_basic vb ON v.voiceactor_id = vb.voiceactor_id''',
+            'where': 'v.voiceactor_name IS NOT NULL',
+            'columns': '''
+                v.voiceactor_id, v.voiceactor_name, v.favorites as va_favorites,
+                a.anilist_id, a.title_romaji, a.title_native,
+                a.season, a.seasonYear, a.favorites as anime_favorites,
+                a.meanScore, a.format, a.source,
+                vb.voiceactor_count, vb.count_per_year
+            ''',
+            'entity_id': 'v.voiceactor_id',
+            'sort': 'v.favorites',
+            'media_sort': 'a.favorites'
+        },
+        'rank_config': {'entity': 'voiceactors', 'metric': 'favorites', 'id_col': 'voiceactor_id'}
     }
     show_ranking_template(data, config)
 
@@ -1039,7 +1320,26 @@ def show_staff_ranking_tab(data):
             'title': 'トップ10 - スタッフお気に入り数',
             'labels': {'staff_name': 'スタッフ名', 'staff_favorites': 'お気に入り数'},
             'hover_data': ['title_native', 'seasonYear', 'season', 'roles']
-        }
+        },
+        'sql_source': {
+            'from': '''staff s
+                JOIN anime a ON s.anilist_id = a.anilist_id
+                LEFT JOIN staff_basic sb ON s.staff_id = sb.staff_id''',
+            'where': 's.staff_name IS NOT NULL',
+            'columns': '''
+                s.staff_id, s.staff_name, s.favorites as staff_favorites,
+                a.anilist_id, a.title_romaji, a.title_native,
+                a.season, a.seasonYear, a.favorites as anime_favorites,
+                a.meanScore, a.format, a.source,
+                sb.staff_count, sb.count_per_year
+            ''',
+            'entity_id': 's.staff_id',
+            'sort': 's.favorites',
+            'media_sort': 'a.favorites',
+            'roles_table': 'staff',
+            'roles_agg_table': 'staff_roles_agg'
+        },
+        'rank_config': {'entity': 'staff', 'metric': 'favorites', 'id_col': 'staff_id'}
     }
     show_ranking_template(data, config)
 
@@ -1167,7 +1467,7 @@ def show_source_ranking_tab(data):
     filtered_count = len(filtered_data)
     
     # 原作タイプが重複している場合、アニメのfavoritesが最も多いものだけを残す
-    filtered_data = filtered_data.sort_values(['source', 'anime_favorites'], ascending=[True, False]).groupby('source').first().reset_index()
+    filtered_data = filtered_data.sort_values(['source', 'anime_favorites'], ascending=[True, False]).groupby('source', observed=True).first().reset_index()
     
     # ランキング表示
     st.subheader(f"📋 ランキング結果 ({filtered_count:,}件）")
@@ -1265,14 +1565,10 @@ def show_genre_ranking_tab(data):
     filters = create_filter_ui(data, "genre", db_type='anime')
     
     # genreランキングの特殊フィルター適用（genre_nameを直接フィルター）
-    filtered_data = data.copy()
-    if 'genre' in filters and filters['genre']:
-        filtered_data = filtered_data[filtered_data['genre_name'] == filters['genre']]
-    
-    # その他のフィルター処理
-    for key, value in filters.items():
-        if key != 'genre' and value and key in filtered_data.columns:
-            filtered_data = filtered_data[filtered_data[key] == value]
+    filters = {key: value for key, value in filters.items() if key != 'genre_match'}
+    if 'genre' in filters:
+        filters['genre_name'] = filters.pop('genre')
+    filtered_data = filter_data(data, filters)
     
     if filtered_data.empty:
         st.warning("選択された条件に一致するデータがありません。")
@@ -1282,7 +1578,7 @@ def show_genre_ranking_tab(data):
     filtered_count = len(filtered_data)
     
     # ジャンルが重複している場合、アニメのfavoritesが最も多いものだけを残す
-    filtered_data = filtered_data.sort_values(['genre_name', 'anime_favorites'], ascending=[True, False]).groupby('genre_name').first().reset_index()
+    filtered_data = filtered_data.sort_values(['genre_name', 'anime_favorites'], ascending=[True, False]).groupby('genre_name', observed=True).first().reset_index()
     
     # ランキング表示
     st.subheader(f"📋 ランキング結果 ({filtered_count:,}件）")
@@ -1401,119 +1697,67 @@ def show_genre_ranking_tab(data):
         fig.update_layout(height=400, yaxis={'categoryorder': 'total ascending'})
         st.plotly_chart(fig, width='stretch')
 
+def manga_staff_sql_source(build_id):
+    """マンガスタッフランキングの取得元（load_manga_staff_data() と同じく、staff_basic_enhanced が
+    あればスタッフのお気に入り数・カウント数をそこから取得する）"""
+    if has_table('manga_data.db', 'staff_basic_enhanced', build_id):
+        staff_join = '\n                LEFT JOIN staff_basic_enhanced sbe ON s.staff_id = sbe.staff_id'
+        staff_columns = 'sbe.favorites as staff_favorites, sbe.total_count as staff_count, sbe.count_per_year'
+        sort = 'sbe.favorites'
+    else:
+        staff_join = ''
+        staff_columns = 's.favorites as staff_favorites'
+        sort = 's.favorites'
+    return {
+        'from': f'''staff s
+                JOIN manga a ON s.anilist_id = a.anilist_id{staff_join}''',
+        'where': 's.staff_name IS NOT NULL',
+        'columns': f'''
+                s.staff_id, s.staff_name, {staff_columns},
+                a.anilist_id, a.title_romaji, a.title_native,
+                a.season, a.seasonYear, a.favorites as manga_favorites,
+                a.meanScore, a.format, a.source
+            ''',
+        'entity_id': 's.staff_id',
+        'sort': sort,
+        'media_sort': 'a.favorites',
+        'roles_table': 'staff',
+        'roles_agg_table': 'staff_roles_agg'
+    }
+
 def show_manga_staff_ranking_tab(data):
     """マンガスタッフランキングタブの表示"""
-    st.header("📚 マンガスタッフ ランキング")
-    
-    if data is None or data.empty:
-        st.warning("データが利用できません。")
-        return
-    
-    # フィルター設定（共通化）
-    filters = create_filter_ui(data, "manga_staff", db_type='manga')
-    filtered_data = apply_filters_to_data(data, filters, 'manga')
-    
-    if filtered_data.empty:
-        st.warning("フィルター条件に一致するデータがありません。")
-        return
-    
-    # フィルター適用後のデータ件数を取得
-    filtered_count = len(filtered_data)
-    
-    # スタッフIDが重複している場合、マンガのfavoritesが最も多いものだけを残す
-    # まず、staff_idとanilist_idの組み合わせでroleを集約
-    filtered_data['roles'] = filtered_data.groupby(['staff_id', 'anilist_id'])['role'].transform(lambda x: ', '.join(sorted(set(x.dropna()))))
-    
-    # 重複を削除（staff_idとanilist_idの組み合わせで最初の行を保持）
-    filtered_data = filtered_data.drop_duplicates(subset=['staff_id', 'anilist_id'], keep='first')
-    
-    # staff_idごとにマンガfavoritesが最大のものを選択
-    filtered_data = filtered_data.sort_values(['staff_id', 'manga_favorites'], ascending=[True, False]).groupby('staff_id').first().reset_index()
-    
-    # ランキング表示
-    st.subheader(f"📋 ランキング結果 ({filtered_count:,}件）")
-    
-    # データをスタッフのお気に入り数でソート
-    sorted_data = filtered_data.sort_values('staff_favorites', ascending=False).reset_index(drop=True)
-    
-    # 表示用データフレーム準備
-    if 'staff_count' in sorted_data.columns and 'count_per_year' in sorted_data.columns:
-        display_columns = ['staff_name', 'roles', 'title_native', 'seasonYear', 'season', 
-                          'staff_count', 'count_per_year', 'staff_favorites', 'manga_favorites', 'meanScore']
-    else:
-        display_columns = ['staff_name', 'roles', 'title_native', 'seasonYear', 'season', 
-                          'staff_favorites', 'manga_favorites', 'meanScore']
-    
-    available_columns = [col for col in display_columns if col in sorted_data.columns]
-    display_data = sorted_data[available_columns].copy()
-    
-    # カラム名を日本語に変更
-    column_mapping = {
-        'staff_name': 'スタッフ名',
-        'roles': '役割',
-        'title_native': 'マンガタイトル',
-        'seasonYear': '年度',
-        'season': '季節',
-        'staff_count': 'スタッフカウント数',
-        'count_per_year': 'スタッフ年平均カウント数',
-        'staff_favorites': 'スタッフお気に入り数',
-        'manga_favorites': 'マンガお気に入り数',
-        'meanScore': 'マンガ平均スコア'
+    config = {
+        'title': '📚 マンガスタッフ ランキング',
+        'key_prefix': 'manga_staff',
+        'db_type': 'manga',
+        'dedup_config': {'id_col': 'staff_id', 'sort_col': 'anilist_id', 'sort_by': 'manga_favorites', 'role_aggregate': True},
+        'sort_by': 'staff_favorites',
+        'display_columns': ['staff_name', 'roles', 'title_native', 'seasonYear', 'season', 
+                          'staff_count', 'count_per_year', 'staff_favorites', 'manga_favorites', 'meanScore'],
+        'column_mapping': {
+            'staff_name': 'スタッフ名',
+            'roles': '役割',
+            'title_native': 'マンガタイトル',
+            'seasonYear': '年度',
+            'season': '季節',
+            'staff_count': 'スタッフカウント数',
+            'count_per_year': 'スタッフ年平均カウント数',
+            'staff_favorites': 'スタッフお気に入り数',
+            'manga_favorites': 'マンガお気に入り数',
+            'meanScore': 'マンガ平均スコア'
+        },
+        'chart_config': {
+            'x': 'staff_name',
+            'y': 'staff_favorites',
+            'title': 'トップ10 - スタッフお気に入り数',
+            'labels': {'staff_name': 'スタッフ名', 'staff_favorites': 'お気に入り数'},
+            'hover_data': ['title_native', 'seasonYear', 'season', 'roles']
+        },
+        'sql_source': manga_staff_sql_source(get_build_id()),
+        'rank_config': {'entity': 'staff', 'metric': 'favorites', 'id_col': 'staff_id'}
     }
-    
-    # 数値フォーマット - 数値型を維持
-    if 'staff_count' in display_data.columns:
-        display_data['staff_count'] = pd.to_numeric(display_data['staff_count'], errors='coerce')
-    if 'count_per_year' in display_data.columns:
-        display_data['count_per_year'] = pd.to_numeric(display_data['count_per_year'], errors='coerce')
-    if 'staff_favorites' in display_data.columns:
-        display_data['staff_favorites'] = pd.to_numeric(display_data['staff_favorites'], errors='coerce')
-    if 'manga_favorites' in display_data.columns:
-        display_data['manga_favorites'] = pd.to_numeric(display_data['manga_favorites'], errors='coerce')
-    if 'meanScore' in display_data.columns:
-        display_data['meanScore'] = pd.to_numeric(display_data['meanScore'], errors='coerce')
-    if 'seasonYear' in display_data.columns:
-        display_data['seasonYear'] = pd.to_numeric(display_data['seasonYear'], errors='coerce')
-    
-    # カラム名を変更
-    display_data = display_data.rename(columns=column_mapping)
-    
-    # インデックスを順位に設定
-    display_data.index = range(1, len(display_data) + 1)
-    display_data.index.name = "順位"
-    
-    # 表示
-    st.dataframe(display_data, width='stretch', height=400)
-    
-    # トップ10のチャート表示
-    if len(sorted_data) >= 1:
-        st.subheader("📊 トップ10スタッフ")
-        
-        top_n = min(10, len(sorted_data))
-        top_data = sorted_data.head(top_n)
-        
-        fig = px.bar(
-            top_data,
-            x='staff_favorites',
-            y='staff_name',
-            orientation='h',
-            title=f"トップ{top_n}スタッフ（お気に入り数順）",
-            labels={
-                'staff_favorites': 'スタッフお気に入り数',
-                'staff_name': 'スタッフ名'
-            },
-            hover_data={
-                'staff_name': True,
-                'roles': True,
-                'title_native': True,
-                'staff_favorites': True,
-                'manga_favorites': True,
-                'meanScore': ':.1f'
-            }
-        )
-        
-        fig.update_layout(height=400, yaxis={'categoryorder': 'total ascending'})
-        st.plotly_chart(fig, width='stretch')
+    show_ranking_template(data, config)
 
 def show_manga_genre_ranking_tab(data):
     """マンガジャンルランキングタブの表示"""
@@ -1527,12 +1771,7 @@ def show_manga_genre_ranking_tab(data):
     filters = create_filter_ui(data, "manga_genre", db_type='manga')
     
     # フィルター適用
-    filtered_data = data.copy()
-    
-    # その他のフィルター処理
-    for key, value in filters.items():
-        if value and key in filtered_data.columns:
-            filtered_data = filtered_data[filtered_data[key] == value]
+    filtered_data = filter_data(data, filters)
     
     if filtered_data.empty:
         st.warning("フィルター条件に一致するデータがありません。")
@@ -1545,7 +1784,7 @@ def show_manga_genre_ranking_tab(data):
     st.subheader(f"📋 ランキング結果 ({filtered_count:,}件）")
     
     # ジャンルごとにマンガfavoritesが最大のものを選択
-    filtered_data = filtered_data.sort_values(['genre_name', 'manga_favorites'], ascending=[True, False]).groupby('genre_name').first().reset_index()
+    filtered_data = filtered_data.sort_values(['genre_name', 'manga_favorites'], ascending=[True, False]).groupby('genre_name', observed=True).first().reset_index()
     
     # データをジャンルカウント数でソート
     sorted_data = filtered_data.sort_values('genre_count', ascending=False).reset_index(drop=True)
@@ -2060,11 +2299,8 @@ def show_staff_statistics_tab(data):
         return
     
     # スタッフIDが重複している場合、アニメのfavoritesが最も多いものだけを残す
-    # まず、staff_idとanilist_idの組み合わせでroleを集約
-    filtered_data['roles'] = filtered_data.groupby(['staff_id', 'anilist_id'])['role'].transform(lambda x: ', '.join(sorted(set(x.dropna()))))
-    
-    # 重複を削除（staff_idとanilist_idの組み合わせで最初の行を保持）
-    filtered_data = filtered_data.drop_duplicates(subset=['staff_id', 'anilist_id'], keep='first')
+    # まず、staff_idとanilist_idの組み合わせでroleを集約して1行にする
+    filtered_data = aggregate_staff_roles(filtered_data)
     
     # staff_idごとにアニメfavoritesが最大のものを選択
     filtered_data = filtered_data.sort_values(['staff_id', 'anime_favorites'], ascending=[True, False]).groupby('staff_id').first().reset_index()
@@ -2116,8 +2352,6 @@ def show_staff_statistics_tab(data):
     
     try:
         db_path = get_db_path('anime_data.db')
-        conn = sqlite3.connect(str(db_path))
-        
         # フィルタリングされたstaff_idのリストを取得
         staff_ids = filtered_data['staff_id'].unique().tolist()
         
@@ -2136,9 +2370,10 @@ def show_staff_statistics_tab(data):
                 FROM staff_basic
                 WHERE staff_id IN ({placeholders})
             """
-            
-            staff_basic_df = pd.read_sql_query(query, conn, params=staff_ids)
-            
+        
+            with read_connection_for_path(db_path) as conn:
+                staff_basic_df = pd.read_sql_query(query, conn, params=staff_ids)
+        
             if not staff_basic_df.empty:
                 # 各カラムの統計を計算
                 basic_stats = {
@@ -2152,7 +2387,7 @@ def show_staff_statistics_tab(data):
                     "最新の年度": int(staff_basic_df['first_year'].max()),
                     "年間平均作品数（平均）": float(staff_basic_df['count_per_year'].mean())
                 }
-                
+            
                 basic_stats_df = pd.DataFrame(
                     [(key, value) for key, value in basic_stats.items()],
                     columns=["統計項目", "値"]
@@ -2163,8 +2398,6 @@ def show_staff_statistics_tab(data):
         else:
             st.warning("フィルタリング後のスタッフIDがありません。")
         
-        conn.close()
-        
     except Exception as e:
         st.error(f"staff_basicテーブル読み込みエラー: {e}")
     
@@ -2353,8 +2586,8 @@ def show_statistics_tab(data, genre):
     with col6:
         # ジャンル選択（データベースから取得）
         if genre == "アニメ":
-            # 絶対パスでデータベースの場所を指定
-            db_path = Path(r'C:\Users\PC_User\Desktop\GitHub\public_anilist_data_rank_and_analysis\db\anime_data.db')
+            # データベースの場所を取得（公開中のビルドを優先）
+            db_path = get_db_path('anime_data.db')
             
             if db_path.exists():
                 available_genres = get_genres_data(db_path)
@@ -2390,11 +2623,11 @@ def show_statistics_tab(data, genre):
     if selected_genre_filter != "全て":
         filters['genre'] = selected_genre_filter
     
-    # データベースパスを絶対パスで指定
+    # データベースパスを取得（公開中のビルドを優先）
     if genre == "アニメ":
-        db_path = Path(r'C:\Users\PC_User\Desktop\GitHub\public_anilist_data_rank_and_analysis\db\anime_data.db')
+        db_path = get_db_path('anime_data.db')
     else:
-        db_path = Path(r'C:\Users\PC_User\Desktop\GitHub\public_anilist_data_rank_and_analysis\db\manga_data.db')
+        db_path = get_db_path('manga_data.db')
     
     filtered_data = filter_data(data, filters, db_path if db_path.exists() else None)
     
@@ -2481,26 +2714,34 @@ def show_scatter_tab(data, genre):
         st.warning("データが利用できません。")
         return
     
-    # エピソード数カラムをクエリに追加する必要があるため、データベースから再取得
-    try:
-        if genre == "アニメ":
-            db_path = Path(r'C:\Users\PC_User\Desktop\GitHub\public_anilist_data_rank_and_analysis\db\anime_data.db')
-            conn = sqlite3.connect(str(db_path))
-            query = """
-                SELECT 
-                    a.anilist_id, a.title_romaji, a.title_native, a.format, 
-                    a.season, a.seasonYear, a.favorites, a.meanScore, 
-                    a.popularity, a.source, a.episode
-                FROM anime a
-                WHERE a.title_romaji IS NOT NULL
-            """
-            extended_data = pd.read_sql_query(query, conn)
-            conn.close()
-        else:
+    # エピソード数は作品データにないため、数値の列ストア（作品ID順の .npy をメモリマップ）から
+    # 作品IDで引いて追加する。列ストアがない古いビルドではデータベースから再取得
+    db_name = 'anime_data.db' if genre == "アニメ" else 'manga_data.db'
+    metric_store = load_metric_store(db_name, get_build_id())
+    if metric_store is not None:
+        db_path = get_db_path(db_name)
+        extended_data = data.assign(episode=metric_store.take('episode', data['anilist_id']))
+    else:
+        try:
+            if genre == "アニメ":
+                db_path = get_db_path('anime_data.db')
+                with read_connection_for_path(db_path) as conn:
+                    query = """
+                        SELECT 
+                            a.anilist_id, a.title_romaji, a.title_native, a.format, 
+                            a.season, a.seasonYear, a.favorites, a.meanScore, 
+                            a.popularity, a.source, a.episode
+                        FROM anime a
+                        WHERE a.title_romaji IS NOT NULL
+                    """
+                    extended_data = compact_frame(pd.read_sql_query(query, conn), 'scatter')
+            else:
+                db_path = get_db_path('manga_data.db')
+                extended_data = data.copy()
+        except Exception as e:
+            st.error(f"データ取得エラー: {e}")
+            db_path = get_db_path('anime_data.db' if genre == "アニメ" else 'manga_data.db')
             extended_data = data.copy()
-    except Exception as e:
-        st.error(f"データ取得エラー: {e}")
-        extended_data = data.copy()
     
     # 選択肢の定義
     categorical_options = {
@@ -2891,13 +3132,36 @@ def show_multiple_correlation(data, selected_vars, numerical_options):
     correlation_df = correlation_df.sort_values('相関係数', key=lambda x: x.astype(float).abs(), ascending=False)
     st.dataframe(correlation_df, width='stretch', height=300)
 
+# 起動時・新しいビルドの公開時にバックグラウンドで読み込むメニューのデータ（cache_warmup.py）
+# （メニュー名, 読み込み関数, build_id 以外の引数）
+WARMUP_DATASETS = [
+    ("🎬 アニメ - タイトル", load_anime_data, {}),
+    ("🎬 アニメ - キャラ", load_character_data, {}),
+    ("🎬 アニメ - 声優", load_voiceactor_data, {}),
+    ("🎬 アニメ - スタッフ", load_staff_data, {}),
+    ("🎬 アニメ - スタジオ", load_studios_data, {}),
+    ("🎬 アニメ - 原作", load_source_data, {}),
+    ("🎬 アニメ - ジャンル", load_genre_data, {}),
+    ("📚 マンガ - タイトル", load_manga_data, {}),
+    ("📚 マンガ - キャラ", load_manga_character_data, {}),
+    ("📚 マンガ - スタッフ", load_manga_staff_data, {}),
+    ("📚 マンガ - ジャンル", load_manga_genre_data, {})
+]
+
 def main():
     """メイン関数"""
+    # 新しいビルドの公開を監視し、キャッシュを切り替える（プロセスごとに1回だけ開始）
+    start_build_watcher()
+    # メニューのデータをバックグラウンドで読み込み始める（サーバーの起動後・新しいビルドの公開後の最初の1回だけ）
+    start_cache_warmup('ranking_app', WARMUP_DATASETS)
+    
     st.title("📊 AniList ランキング分析")
     st.markdown("---")
     
     # サイドバーメニュー
     st.sidebar.title("📋 メニュー")
+    show_build_status()
+    show_warmup_status('ranking_app')
     
     # 統合メニュー
     menu = st.sidebar.radio(
@@ -2923,7 +3187,7 @@ def main():
     # 選択されたメニューに応じて処理を分岐
     if menu == "🎬 アニメ - タイトル":
         # アニメタイトル分析（ランキングのみ）
-        data = load_anime_data()
+        data = load_anime_data(get_build_id())
         if data is None:
             st.error("アニメデータを読み込めませんでした。")
             st.info("データベースファイルが存在することを確認してください。")
@@ -2934,7 +3198,7 @@ def main():
     
     elif menu == "🎬 アニメ - キャラ":
         # キャラクター分析
-        data = load_character_data()
+        data = load_character_data(get_build_id())
         if data is None:
             st.error("キャラクターデータを読み込めませんでした。")
             st.info("データベースファイルが存在することを確認してください。")
@@ -2945,7 +3209,7 @@ def main():
     
     elif menu == "🎬 アニメ - 声優":
         # 声優分析
-        data = load_voiceactor_data()
+        data = load_voiceactor_data(get_build_id())
         if data is None:
             st.error("声優データを読み込めませんでした。")
             st.info("データベースファイルが存在することを確認してください。")
@@ -2956,7 +3220,7 @@ def main():
     
     elif menu == "🎬 アニメ - スタッフ":
         # スタッフ分析
-        data = load_staff_data()
+        data = load_staff_data(get_build_id())
         if data is None:
             st.error("スタッフデータを読み込めませんでした。")
             st.info("データベースファイルが存在することを確認してください。")
@@ -2967,7 +3231,7 @@ def main():
     
     elif menu == "🎬 アニメ - スタジオ":
         # スタジオ分析
-        data = load_studios_data()
+        data = load_studios_data(get_build_id())
         if data is None:
             st.error("スタジオデータを読み込めませんでした。")
             st.info("データベースファイルが存在することを確認してください。")
@@ -2978,7 +3242,7 @@ def main():
     
     elif menu == "🎬 アニメ - 原作":
         # 原作分析
-        data = load_source_data()
+        data = load_source_data(get_build_id())
         if data is None:
             st.error("原作データを読み込めませんでした。")
             st.info("データベースファイルが存在することを確認してください。")
@@ -2989,7 +3253,7 @@ def main():
     
     elif menu == "🎬 アニメ - ジャンル":
         # ジャンル分析
-        data = load_genre_data()
+        data = load_genre_data(get_build_id())
         if data is None:
             st.error("ジャンルデータを読み込めませんでした。")
             st.info("データベースファイルが存在することを確認してください。")
@@ -3000,7 +3264,7 @@ def main():
     
     elif menu == "📚 マンガ - タイトル":
         # マンガタイトル分析
-        data = load_manga_data()
+        data = load_manga_data(get_build_id())
         if data is None:
             st.error("マンガデータを読み込めませんでした。")
             st.info("データベースファイルが存在することを確認してください。")
@@ -3020,7 +3284,7 @@ def main():
     
     elif menu == "📚 マンガ - キャラ":
         # マンガキャラクター分析
-        data = load_manga_character_data()
+        data = load_manga_character_data(get_build_id())
         if data is None:
             st.error("マンガキャラクターデータを読み込めませんでした。")
             st.info("データベースファイルが存在することを確認してください。")
@@ -3031,7 +3295,7 @@ def main():
     
     elif menu == "📚 マンガ - スタッフ":
         # マンガスタッフ分析
-        data = load_manga_staff_data()
+        data = load_manga_staff_data(get_build_id())
         if data is None:
             st.error("マンガスタッフデータを読み込めませんでした。")
             st.info("データベースファイルが存在することを確認してください。")
@@ -3042,7 +3306,7 @@ def main():
     
     elif menu == "📚 マンガ - ジャンル":
         # マンガジャンル分析
-        data = load_manga_genre_data()
+        data = load_manga_genre_data(get_build_id())
         if data is None:
             st.error("マンガジャンルデータを読み込めませんでした。")
             st.info("データベースファイルが存在することを確認してください。")
@@ -3057,4 +3321,7 @@ def main():
         st.info("この機能は今後実装予定です。")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
+    # 描画後に、直近のフィルター処理時間とデータセットのメモリ使用量をサイドバーに表示
+    show_filter_latency()
+    show_memory_report()
@@ -0,0 +1,236 @@
+import functools
+import hashlib
+import inspect
+import json
+import os
+import secrets
+import shutil
+import threading
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from db_snapshot import DB_MODULE_DIR, get_db_dir
+from dtype_schema import TEXT_DTYPE
+
+try:
+    import pyarrow as pa
+except ImportError:
+    # pyarrow がない環境では共有キャッシュを使わず、プロセスごとのキャッシュだけを使う
+    pa = None
+
+
+# 複数のStreamlitプロセスで読み込み結果を共有するか（db/shared_cache/<ビルドID>/*.arrow）
+SHARED_CACHE_ENABLED = True
+SHARED_CACHE_DIR_NAME = 'shared_cache'
+
+# キャッシュファイルの形式・復元処理を変更した場合はこの値を上げると全ての共有キャッシュを作り直す
+SHARED_CACHE_VERSION = '1'
+
+# 読み込み関数が共通で使う処理（型の変換・スナップショットの読み込み・このモジュールの書き出し形式）。
+# いずれかのソースが変わった場合も別のキャッシュファイルになる
+KEY_SOURCE_FILES = [
+    Path(__file__).resolve().parent / 'dtype_schema.py',
+    Path(__file__).resolve().parent / 'snapshot_store.py',
+    Path(DB_MODULE_DIR) / 'snapshot_export.py',
+    Path(__file__).resolve()
+]
+
+# 読み込み中のプロセスはロックファイルの更新時刻をこの間隔で更新する
+LOCK_HEARTBEAT_SECONDS = 5
+# この秒数更新されていないロックは、読み込み中に異常終了したプロセスの残りとみなして削除する
+LOCK_STALE_SECONDS = 30
+# 他のプロセスの読み込みを待つ最大秒数（超えた場合はロックを削除せずに自分でも読み込む）
+LOCK_WAIT_SECONDS = 600
+LOCK_POLL_SECONDS = 0.2
+
+
+def source_digest(paths):
+    """ファイルの内容のハッシュ（読み込めないファイルは名前だけを使う）"""
+    digest = hashlib.sha1()
+    for path in paths:
+        digest.update(str(Path(path).name).encode('utf-8'))
+        try:
+            digest.update(Path(path).read_bytes())
+        except OSError:
+            pass
+    return digest.hexdigest()
+
+
+def shared_cache_dir(build_id):
+    return get_db_dir() / SHARED_CACHE_DIR_NAME / build_id
+
+
+def remove_shared_cache(build_id):
+    """ビルドの共有キャッシュを削除（読み込み中の他のプロセスはファイルを開いたまま読める）"""
+    shutil.rmtree(shared_cache_dir(build_id), ignore_errors=True)
+
+
+def read_frame(path):
+    """共有キャッシュのファイル（Arrow IPC）をメモリマップで読み込む（ない・壊れている場合は None）"""
+    if not path.exists():
+        return None
+    try:
+        with pa.memory_map(str(path)) as source:
+            table = pa.ipc.open_file(source).read_all()
+        data = table.to_pandas()
+    except (OSError, pa.ArrowException):
+        return None
+    # pandas のメタデータには文字列型の保存形式が残らないため、読み込み時と同じ pyarrow の文字列型に戻す
+    metadata = json.loads((table.schema.metadata or {}).get(b'pandas', b'{}'))
+    if TEXT_DTYPE is not None:
+        for column in metadata.get('columns', []):
+            if column.get('numpy_type') == 'string' and column.get('name') in data.columns:
+                data[column['name']] = data[column['name']].astype(TEXT_DTYPE)
+    return data
+
+
+def write_frame(data, path):
+    """データを Arrow IPC で書き出す（一時ファイルに書いてから置き換える。列の型は pandas のメタデータで保つ）"""
+    table = pa.Table.from_pandas(data)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with pa.OSFile(str(tmp_path), 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, path)
+
+
+class LoadLock:
+    """共有キャッシュの読み込みのロック（プロセス間）
+
+    ロックファイルには所有者のトークン（プロセスID + 乱数）を書き、読み込み中は
+    ハートビートのスレッドが更新時刻を更新し続ける。削除するのは自分のトークンが
+    書かれている場合だけのため、他のプロセスが取り直したロックを消さない。
+    """
+
+    def __init__(self, lock_path):
+        self.lock_path = lock_path
+        self.token = f"{os.getpid()}-{secrets.token_hex(8)}"
+        self._stop = threading.Event()
+        self._heartbeat = None
+
+    def acquire(self, result_path):
+        """ロックを取る（他のプロセスが先に結果を書き出した場合・待ち時間切れは False）
+
+        他のプロセスのロックは、ハートビートが続いている間は待ち、LOCK_STALE_SECONDS の間
+        更新がない場合だけ削除して取り直す。
+        """
+        deadline = time.monotonic() + LOCK_WAIT_SECONDS
+        while True:
+            if self._create():
+                self._heartbeat = threading.Thread(target=self._beat, name='shared-cache-lock', daemon=True)
+                self._heartbeat.start()
+                return True
+            if result_path.exists() or time.monotonic() > deadline:
+                return False
+            self._break_if_stale()
+            time.sleep(LOCK_POLL_SECONDS)
+
+    def release(self):
+        """ハートビートを止め、ロックが自分のものなら削除"""
+        self._stop.set()
+        if self._heartbeat is not None:
+            self._heartbeat.join()
+        if self._read_token() == self.token:
+            self.lock_path.unlink(missing_ok=True)
+
+    def _create(self):
+        try:
+            fd = os.open(self.lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(self.token)
+        return True
+
+    def _read_token(self):
+        try:
+            return self.lock_path.read_text(encoding='utf-8')
+        except OSError:
+            return None
+
+    def _beat(self):
+        while not self._stop.wait(LOCK_HEARTBEAT_SECONDS):
+            if self._read_token() != self.token:
+                return
+            try:
+                os.utime(self.lock_path)
+            except OSError:
+                return
+
+    def _break_if_stale(self):
+        try:
+            if time.time() - self.lock_path.stat().st_mtime <= LOCK_STALE_SECONDS:
+                return
+        except FileNotFoundError:
+            return
+        stale_token = self._read_token()
+        # 削除の直前にも同じ所有者のロックか確認する（他の待ち手が取り直したロックは消さない）
+        try:
+            if (self._read_token() == stale_token
+                    and time.time() - self.lock_path.stat().st_mtime > LOCK_STALE_SECONDS):
+                print(f"更新の止まった共有キャッシュのロックを削除します: {self.lock_path}（{stale_token}）")
+                self.lock_path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def shared_tier(func):
+    """読み込み関数の結果（データフレーム）をビルドごとにディスクで共有する
+
+    キャッシュのファイル名は SHARED_CACHE_VERSION・共通処理のソース・関数名・関数を定義した
+    モジュールのソース（列の対応やSQLの定数を含む）・ビルドID以外の引数から作るため、
+    コードを変更した場合やビルドが変わった場合は別のファイルになる。
+    読み込み関数は st.cache_data の中で実行されるため、ここでは画面に表示せずログだけを出す。
+    同じデータを複数のプロセスが同時に読み込まないよう、最初のプロセスだけがロックを取って
+    データベースから読み込み、他のプロセスは書き出された結果を読む。
+    """
+    if not SHARED_CACHE_ENABLED or pa is None:
+        return func
+
+    signature = inspect.signature(func)
+    try:
+        module_file = inspect.getsourcefile(func)
+    except TypeError:
+        module_file = None
+    source = source_digest(KEY_SOURCE_FILES + ([module_file] if module_file else []))
+    name = f"{func.__module__}.{func.__qualname__}"
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        arguments = signature.bind(*args, **kwargs).arguments
+        build_id = arguments.get('build_id')
+        if not build_id:
+            return func(*args, **kwargs)
+
+        key_arguments = {key: value for key, value in arguments.items() if key != 'build_id'}
+        key = hashlib.sha1(
+            f"{SHARED_CACHE_VERSION}|{name}|{source}|{key_arguments!r}".encode('utf-8')
+        ).hexdigest()
+        cache_dir = shared_cache_dir(build_id)
+        path = cache_dir / f"{key}.arrow"
+
+        data = read_frame(path)
+        if data is not None:
+            return data
+
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        lock = LoadLock(cache_dir / f"{key}.lock")
+        locked = lock.acquire(path)
+        try:
+            data = read_frame(path)
+            if data is not None:
+                return data
+            data = func(*args, **kwargs)
+            if locked and isinstance(data, pd.DataFrame):
+                try:
+                    write_frame(data, path)
+                except (OSError, pa.ArrowException) as e:
+                    print(f"共有キャッシュに書き出せませんでした（{name}）: {e}")
+            return data
+        finally:
+            if locked:
+                lock.release()
+
+    return wrapper
@@ -0,0 +1,70 @@
+from db_snapshot import ensure_db_import_path, get_db_path
+from dtype_schema import compact_frame
+
+# スナップショットの定義・マニフェストはETL（db/snapshot_export.py）と共通の実装を使う
+ensure_db_import_path()
+try:
+    import pyarrow.parquet as pq
+    from snapshot_export import (SNAPSHOT_FORMAT_VERSION, SNAPSHOTS, read_snapshot_manifest,
+                                 snapshot_path, source_fingerprint)
+except ImportError:
+    # pyarrow がない環境ではスナップショットを使わず、常にSQLiteから読み込む
+    pq = None
+
+
+def current_snapshot_path(db_name, name, build_id=None):
+    """使用できるスナップショットのパス（ない・古い場合は None）
+
+    マニフェストの形式のバージョンと、記録された元のデータベースのサイズ・更新時刻が
+    現在のデータベースと一致する場合だけ使う（スナップショットの作成後にETLを一部だけ
+    再実行した場合などはSQLiteから読み込む）。
+    """
+    if pq is None or name not in SNAPSHOTS:
+        return None
+    db_path = get_db_path(db_name, build_id)
+    path = snapshot_path(db_path.parent, name)
+    if not db_path.exists() or not path.exists():
+        return None
+    manifest = read_snapshot_manifest(db_path.parent)
+    entry = manifest.get('snapshots', {}).get(name)
+    if manifest.get('format_version') != SNAPSHOT_FORMAT_VERSION or not entry:
+        return None
+    if entry['db'] != db_name or entry['source'] != source_fingerprint(db_path):
+        return None
+    return path
+
+
+def read_snapshot(db_name, name, columns, dataset, build_id=None):
+    """スナップショットから必要な列だけを読み込む（使用できない場合は None）
+
+    列の選択は Parquet のファイル内で行い、ファイルはメモリマップで開く。辞書エンコードした列は
+    カテゴリ型として直接読み込み、Arrow から pandas への変換では列ごとのブロックのまま
+    変換済みの Arrow のバッファを解放する。
+    読み込み関数のキャッシュ（事前読み込みのスレッドを含む）から呼ばれるため画面には表示せず、
+    読み込めなかった場合はログだけを出す（表示は呼び出し側のページで行う）。
+
+    Args:
+        db_name: データベースファイル名（例: 'anime_data.db'）
+        name: スナップショット名（snapshot_export.SNAPSHOTS のキー）
+        columns: スナップショットの列 → 読み込み後の列名（読み込み関数のSQLの別名に合わせる）
+        dataset: データセット名（dtype_schema.compact_frame() を参照）
+        build_id: 参照するビルドID
+    """
+    path = current_snapshot_path(db_name, name, build_id)
+    if path is None:
+        return None
+    try:
+        table = pq.read_table(
+            path,
+            columns=list(columns),
+            memory_map=True,
+            read_dictionary=[column for column in SNAPSHOTS[name]['dictionary'] if column in columns]
+        )
+    except (OSError, ValueError) as e:
+        # 壊れた・列の足りないスナップショットはSQLiteから読み込む
+        print(f"スナップショットを読み込めませんでした（SQLiteから読み込みます）: {path}: {e}")
+        return None
+    table = table.rename_columns([columns[column] for column in table.column_names])
+    data = table.to_pandas(split_blocks=True, self_destruct=True)
+    del table
+    return compact_frame(data, dataset)
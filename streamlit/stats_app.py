@@ -5,7 +5,22 @@ import plotly.express as px
 import plotly.graph_objects as go
 import numpy as np
 import os
-from pathlib import Path
+
+from db_connection import read_connection_for_path
+from build_cache import build_cache, start_build_watcher
+from cache_warmup import show_warmup_status, start_cache_warmup
+from db_snapshot import ensure_db_import_path, get_build_id, get_db_path, show_build_status
+from dtype_schema import compact_frame, show_memory_report
+from filter_engine import filter_data, show_filter_latency
+from genre_index import GENRE_MATCH_LABELS, MATCH_ALL, MATCH_ANY, load_genre_index
+from metric_store import load_metric_store
+from snapshot_store import read_snapshot
+from stats_cube import (STAT_COLUMNS, filter_stats_cube, load_stats_cube, load_studios_sketch,
+                        query_stats_cube, rollup_summaries, summary_statistics)
+
+# グループ別の基礎統計はベンチマーク（db/）と共通の実装を使う
+ensure_db_import_path()
+from grouped_stats import grouped_statistics, period_statistics, period_statistics_arrays
 
 # ページ設定
 st.set_page_config(
@@ -15,18 +30,39 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-@st.cache_data
-def load_anime_data():
+# スナップショット（db/snapshot_export.py）の列 → 読み込み関数の列（SQLの別名に合わせる）
+MEDIA_SNAPSHOT_COLUMNS = {
+    'anilist_id': 'anilist_id', 'title_romaji': 'title_romaji', 'title_native': 'title_native',
+    'season': 'season', 'seasonYear': 'seasonYear', 'favorites': 'favorites',
+    'meanScore': 'meanScore', 'popularity': 'popularity', 'format': 'format', 'source': 'source'
+}
+CHARACTER_SNAPSHOT_COLUMNS = {
+    'chara_id': 'chara_id', 'chara_name': 'chara_name', 'char_favorites': 'char_favorites',
+    **MEDIA_SNAPSHOT_COLUMNS
+}
+VOICEACTOR_SNAPSHOT_COLUMNS = {
+    'voiceactor_id': 'voiceactor_id', 'voiceactor_name': 'voiceactor_name', 'va_favorites': 'va_favorites',
+    **MEDIA_SNAPSHOT_COLUMNS, 'voiceactor_count': 'voiceactor_count', 'count_per_year': 'count_per_year'
+}
+STAFF_SNAPSHOT_COLUMNS = {
+    'staff_id': 'staff_id', 'staff_name': 'staff_name', 'role': 'role', 'staff_favorites': 'staff_favorites',
+    **MEDIA_SNAPSHOT_COLUMNS, 'staff_count': 'staff_count', 'count_per_year': 'count_per_year'
+}
+STUDIOS_SNAPSHOT_COLUMNS = {
+    'studios_id': 'studios_id', 'studios_name': 'studios_name',
+    'anilist_id': 'anilist_id', 'title_romaji': 'title_romaji', 'title_native': 'title_native',
+    'season': 'season', 'seasonYear': 'seasonYear', 'favorites': 'anime_favorites',
+    'meanScore': 'meanScore', 'format': 'format', 'source': 'source',
+    'studios_count': 'studios_count', 'count_per_year': 'count_per_year'
+}
+STUDIO_SNAPSHOT_COLUMNS = {'studios_name': 'studios_name', **MEDIA_SNAPSHOT_COLUMNS, 'genre_bits': 'genre_bits'}
+GENRE_SNAPSHOT_COLUMNS = {'genre_name': 'genre_name', **MEDIA_SNAPSHOT_COLUMNS}
+
+@build_cache(refresh=True, shared=True)
+def load_anime_data(build_id=None):
     """アニメデータの読み込み"""
     try:
-        # 絶対パスでデータベースの場所を指定
-        db_path = Path(r'C:\Users\PC_User\Desktop\GitHub\public_anilist_data_rank_and_analysis\db\anime_data.db')
-        
-        # バックアップ: 相対パスでも試行
-        if not db_path.exists():
-            current_file = Path(__file__).resolve()
-            project_root = current_file.parent.parent
-            db_path = project_root / 'db' / 'anime_data.db'
+        db_path = get_db_path('anime_data.db', build_id)
         
         if not db_path.exists():
             st.error(f"❌ anime_data.db が見つかりません")
@@ -35,18 +71,17 @@ def load_anime_data():
         
         st.info(f"📂 データベース接続: {db_path}")
         
-        conn = sqlite3.connect(str(db_path))
-        query = """
-            SELECT 
-                a.anilist_id, a.title_romaji, a.title_native, a.format, 
-                a.season, a.seasonYear, a.favorites, a.meanScore, 
-                a.popularity, a.source
-            FROM anime a
-            WHERE a.title_romaji IS NOT NULL
-            ORDER BY a.meanScore DESC NULLS LAST
-        """
-        data = pd.read_sql_query(query, conn)
-        conn.close()
+        with read_connection_for_path(db_path) as conn:
+            query = """
+                SELECT 
+                    a.anilist_id, a.title_romaji, a.title_native, a.format, 
+                    a.season, a.seasonYear, a.favorites, a.meanScore, 
+                    a.popularity, a.source
+                FROM anime a
+                WHERE a.title_romaji IS NOT NULL
+                ORDER BY a.meanScore DESC NULLS LAST
+            """
+            data = compact_frame(pd.read_sql_query(query, conn), 'anime')
         st.success(f"✅ アニメデータ読み込み成功: {len(data):,}件")
         return data
         
@@ -57,17 +92,10 @@ def load_anime_data():
         st.error(f"❌ 予期しないエラー: {e}")
         return None
 
-@st.cache_data
 def get_genres_data(db_path):
-    """データベースからジャンルデータを取得"""
+    """データベースからジャンルデータを取得（ジャンル索引のジャンル一覧）"""
     try:
-        conn = sqlite3.connect(str(db_path))
-        query = "SELECT DISTINCT genre_name FROM genres ORDER BY genre_name"
-        cursor = conn.cursor()
-        cursor.execute(query)
-        genres = [row[0] for row in cursor.fetchall()]
-        conn.close()
-        return genres
+        return load_genre_index(str(db_path)).genres
     except sqlite3.Error as e:
         st.error(f"❌ ジャンルデータ取得エラー: {e}")
         return []
@@ -75,40 +103,36 @@ def get_genres_data(db_path):
         st.error(f"❌ 予期しないエラー: {e}")
         return []
 
-@st.cache_data
-def load_character_data():
+@build_cache(refresh=True, shared=True)
+def load_character_data(build_id=None):
     """キャラクターデータの読み込み"""
     try:
-        # 絶対パスでデータベースの場所を指定
-        db_path = Path(r'C:\Users\PC_User\Desktop\GitHub\public_anilist_data_rank_and_analysis\db\anime_data.db')
-        
-        # バックアップ: 相対パスでも試行
-        if not db_path.exists():
-            current_file = Path(__file__).resolve()
-            project_root = current_file.parent.parent
-            db_path = project_root / 'db' / 'anime_data.db'
+        db_path = get_db_path('anime_data.db', build_id)
         
         if not db_path.exists():
             st.error(f"❌ anime_data.db が見つかりません")
             st.error(f"確認した場所: {db_path}")
             return None
         
-        st.info(f"📂 データベース接続: {db_path}")
-        
-        conn = sqlite3.connect(str(db_path))
-        query = """
-            SELECT 
-                c.chara_id, c.chara_name, c.favorites as char_favorites,
-                a.anilist_id, a.title_romaji, a.title_native, 
-                a.season, a.seasonYear, a.favorites, 
-                a.meanScore, a.popularity, a.format, a.source
-            FROM characters c
-            JOIN anime a ON c.anilist_id = a.anilist_id
-            WHERE c.chara_name IS NOT NULL
-            ORDER BY c.favorites DESC NULLS LAST
-        """
-        data = pd.read_sql_query(query, conn)
-        conn.close()
+        data = read_snapshot('anime_data.db', 'anime_characters', CHARACTER_SNAPSHOT_COLUMNS, 'character', build_id)
+        if data is not None:
+            st.info("📦 スナップショット読み込み: anime_characters")
+        if data is None:
+            st.info(f"📂 データベース接続: {db_path}")
+        
+            with read_connection_for_path(db_path) as conn:
+                query = """
+                    SELECT 
+                        c.chara_id, c.chara_name, c.favorites as char_favorites,
+                        a.anilist_id, a.title_romaji, a.title_native, 
+                        a.season, a.seasonYear, a.favorites, 
+                        a.meanScore, a.popularity, a.format, a.source
+                    FROM characters c
+                    JOIN anime a ON c.anilist_id = a.anilist_id
+                    WHERE c.chara_name IS NOT NULL
+                    ORDER BY c.favorites DESC NULLS LAST
+                """
+                data = compact_frame(pd.read_sql_query(query, conn), 'character')
         st.success(f"✅ キャラクターデータ読み込み成功: {len(data):,}件")
         return data
         
@@ -119,42 +143,38 @@ def load_character_data():
         st.error(f"❌ 予期しないエラー: {e}")
         return None
 
-@st.cache_data
-def load_voiceactor_data():
+@build_cache(refresh=True, shared=True)
+def load_voiceactor_data(build_id=None):
     """声優データの読み込み"""
     try:
-        # 絶対パスでデータベースの場所を指定
-        db_path = Path(r'C:\Users\PC_User\Desktop\GitHub\public_anilist_data_rank_and_analysis\db\anime_data.db')
-        
-        # バックアップ: 相対パスでも試行
-        if not db_path.exists():
-            current_file = Path(__file__).resolve()
-            project_root = current_file.parent.parent
-            db_path = project_root / 'db' / 'anime_data.db'
+        db_path = get_db_path('anime_data.db', build_id)
         
         if not db_path.exists():
             st.error(f"❌ anime_data.db が見つかりません")
             st.error(f"確認した場所: {db_path}")
             return None
         
-        st.info(f"📂 データベース接続: {db_path}")
-        
-        conn = sqlite3.connect(str(db_path))
-        query = """
-            SELECT 
-                v.voiceactor_id, v.voiceactor_name, v.favorites as va_favorites,
-                a.anilist_id, a.title_romaji, a.title_native, 
-                a.season, a.seasonYear, a.favorites, 
-                a.meanScore, a.popularity, a.format, a.source,
-                vb.voiceactor_count, vb.count_per_year
-            FROM voiceactors v
-            JOIN anime a ON v.anilist_id = a.anilist_id
-            LEFT JOIN voiceactor_basic vb ON v.voiceactor_id = vb.voiceactor_id
-            WHERE v.voiceactor_name IS NOT NULL
-            ORDER BY v.favorites DESC NULLS LAST
-        """
-        data = pd.read_sql_query(query, conn)
-        conn.close()
+        data = read_snapshot('anime_data.db', 'anime_voiceactors', VOICEACTOR_SNAPSHOT_COLUMNS, 'voiceactor', build_id)
+        if data is not None:
+            st.info("📦 スナップショット読み込み: anime_voiceactors")
+        if data is None:
+            st.info(f"📂 データベース接続: {db_path}")
+        
+            with read_connection_for_path(db_path) as conn:
+                query = """
+                    SELECT 
+                        v.voiceactor_id, v.voiceactor_name, v.favorites as va_favorites,
+                        a.anilist_id, a.title_romaji, a.title_native, 
+                        a.season, a.seasonYear, a.favorites, 
+                        a.meanScore, a.popularity, a.format, a.source,
+                        vb.voiceactor_count, vb.count_per_year
+                    FROM voiceactors v
+                    JOIN anime a ON v.anilist_id = a.anilist_id
+                    LEFT JOIN voiceactor_basic vb ON v.voiceactor_id = vb.voiceactor_id
+                    WHERE v.voiceactor_name IS NOT NULL
+                    ORDER BY v.favorites DESC NULLS LAST
+                """
+                data = compact_frame(pd.read_sql_query(query, conn), 'voiceactor')
         st.success(f"✅ 声優データ読み込み成功: {len(data):,}件")
         return data
         
@@ -165,42 +185,38 @@ def load_voiceactor_data():
         st.error(f"❌ 予期しないエラー: {e}")
         return None
 
-@st.cache_data
-def load_staff_data():
+@build_cache(refresh=True, shared=True)
+def load_staff_data(build_id=None):
     """スタッフデータの読み込み"""
     try:
-        # 絶対パスでデータベースの場所を指定
-        db_path = Path(r'C:\Users\PC_User\Desktop\GitHub\public_anilist_data_rank_and_analysis\db\anime_data.db')
-        
-        # バックアップ: 相対パスでも試行
-        if not db_path.exists():
-            current_file = Path(__file__).resolve()
-            project_root = current_file.parent.parent
-            db_path = project_root / 'db' / 'anime_data.db'
+        db_path = get_db_path('anime_data.db', build_id)
         
         if not db_path.exists():
             st.error(f"❌ anime_data.db が見つかりません")
             st.error(f"確認した場所: {db_path}")
             return None
         
-        st.info(f"📂 データベース接続: {db_path}")
-        
-        conn = sqlite3.connect(str(db_path))
-        query = """
-            SELECT 
-                s.staff_id, s.staff_name, s.role, s.favorites as staff_favorites,
-                a.anilist_id, a.title_romaji, a.title_native, 
-                a.season, a.seasonYear, a.favorites, 
-                a.meanScore, a.popularity, a.format, a.source,
-                sb.staff_count, sb.count_per_year
-            FROM staff s
-            JOIN anime a ON s.anilist_id = a.anilist_id
-            LEFT JOIN staff_basic sb ON s.staff_id = sb.staff_id
-            WHERE s.staff_name IS NOT NULL
-            ORDER BY s.favorites DESC NULLS LAST
-        """
-        data = pd.read_sql_query(query, conn)
-        conn.close()
+        data = read_snapshot('anime_data.db', 'anime_staff', STAFF_SNAPSHOT_COLUMNS, 'staff', build_id)
+        if data is not None:
+            st.info("📦 スナップショット読み込み: anime_staff")
+        if data is None:
+            st.info(f"📂 データベース接続: {db_path}")
+        
+            with read_connection_for_path(db_path) as conn:
+                query = """
+                    SELECT 
+                        s.staff_id, s.staff_name, s.role, s.favorites as staff_favorites,
+                        a.anilist_id, a.title_romaji, a.title_native, 
+                        a.season, a.seasonYear, a.favorites, 
+                        a.meanScore, a.popularity, a.format, a.source,
+                        sb.staff_count, sb.count_per_year
+                    FROM staff s
+                    JOIN anime a ON s.anilist_id = a.anilist_id
+                    LEFT JOIN staff_basic sb ON s.staff_id = sb.staff_id
+                    WHERE s.staff_name IS NOT NULL
+                    ORDER BY s.favorites DESC NULLS LAST
+                """
+                data = compact_frame(pd.read_sql_query(query, conn), 'staff')
         st.success(f"✅ スタッフデータ読み込み成功: {len(data):,}件")
         return data
         
@@ -211,53 +227,50 @@ def load_staff_data():
         st.error(f"❌ 予期しないエラー: {e}")
         return None
 
-@st.cache_data
-def load_studios_data():
+@build_cache(refresh=True, shared=True)
+def load_studios_data(build_id=None):
     """スタジオデータの読み込み"""
     try:
-        # 絶対パスでデータベースの場所を指定
-        db_path = Path(r'C:\Users\PC_User\Desktop\GitHub\public_anilist_data_rank_and_analysis\db\anime_data.db')
-        
-        # バックアップ: 相対パスでも試行
-        if not db_path.exists():
-            current_file = Path(__file__).resolve()
-            project_root = current_file.parent.parent
-            db_path = project_root / 'db' / 'anime_data.db'
+        db_path = get_db_path('anime_data.db', build_id)
         
         if not db_path.exists():
             st.error(f"❌ anime_data.db が見つかりません")
             st.error(f"確認した場所: {db_path}")
             return None
         
-        st.info(f"📂 データベース接続: {db_path}")
+        data = read_snapshot('anime_data.db', 'anime_studios', STUDIOS_SNAPSHOT_COLUMNS, 'studios', build_id)
+        if data is not None:
+            st.info("📦 スナップショット読み込み: anime_studios")
+        if data is None:
+            st.info(f"📂 データベース接続: {db_path}")
+        
+        with read_connection_for_path(db_path) as conn:
+            query = """
+                SELECT 
+                    s.studios_id, s.studios_name,
+                    a.anilist_id, a.title_romaji, a.title_native, 
+                    a.season, a.seasonYear, a.favorites as anime_favorites, 
+                    a.meanScore, a.format, a.source,
+                    sb.studios_count, sb.count_per_year
+                FROM studios s
+                JOIN anime a ON s.anilist_id = a.anilist_id
+                LEFT JOIN studios_basic sb ON s.studios_id = sb.studios_id
+                WHERE s.studios_name IS NOT NULL
+                ORDER BY sb.studios_count DESC NULLS LAST
+            """
+            if data is None:
+                data = compact_frame(pd.read_sql_query(query, conn), 'studios')
         
-        conn = sqlite3.connect(str(db_path))
-        query = """
-            SELECT 
-                s.studios_id, s.studios_name,
-                a.anilist_id, a.title_romaji, a.title_native, 
-                a.season, a.seasonYear, a.favorites as anime_favorites, 
-                a.meanScore, a.format, a.source,
-                sb.studios_count, sb.count_per_year
-            FROM studios s
-            JOIN anime a ON s.anilist_id = a.anilist_id
-            LEFT JOIN studios_basic sb ON s.studios_id = sb.studios_id
-            WHERE s.studios_name IS NOT NULL
-            ORDER BY sb.studios_count DESC NULLS LAST
-        """
-        data = pd.read_sql_query(query, conn)
-        
-        # studios_statsテーブルから統計データを取得
-        stats_query = """
-            SELECT 
-                studios_id,
-                stat_type,
-                total,
-                avg_value
-            FROM studios_stats
-        """
-        stats_data = pd.read_sql_query(stats_query, conn)
-        conn.close()
+            # studios_statsテーブルから統計データを取得
+            stats_query = """
+                SELECT 
+                    studios_id,
+                    stat_type,
+                    total,
+                    avg_value
+                FROM studios_stats
+            """
+            stats_data = pd.read_sql_query(stats_query, conn)
         
         # 統計データをピボットして各studios_idに対して横展開
         if not stats_data.empty:
@@ -285,40 +298,36 @@ def load_studios_data():
         st.error(f"❌ 予期しないエラー: {e}")
         return None
 
-@st.cache_data
-def load_genre_data():
+@build_cache(refresh=True, shared=True)
+def load_genre_data(build_id=None):
     """アニメジャンルデータの読み込み"""
     try:
-        # 絶対パスでデータベースの場所を指定
-        db_path = Path(r'C:\Users\PC_User\Desktop\GitHub\public_anilist_data_rank_and_analysis\db\anime_data.db')
-        
-        # バックアップ: 相対パスでも試行
-        if not db_path.exists():
-            current_file = Path(__file__).resolve()
-            project_root = current_file.parent.parent
-            db_path = project_root / 'db' / 'anime_data.db'
+        db_path = get_db_path('anime_data.db', build_id)
         
         if not db_path.exists():
             st.error(f"❌ anime_data.db が見つかりません")
             st.error(f"確認した場所: {db_path}")
             return None
         
-        st.info(f"📂 データベース接続: {db_path}")
-        
-        conn = sqlite3.connect(str(db_path))
-        query = """
-            SELECT 
-                g.genre_name,
-                a.anilist_id, a.title_romaji, a.title_native, 
-                a.season, a.seasonYear, a.favorites, 
-                a.meanScore, a.popularity, a.format, a.source
-            FROM genres g
-            JOIN anime a ON g.anilist_id = a.anilist_id
-            WHERE g.genre_name IS NOT NULL AND a.title_romaji IS NOT NULL
-            ORDER BY a.favorites DESC NULLS LAST
-        """
-        data = pd.read_sql_query(query, conn)
-        conn.close()
+        data = read_snapshot('anime_data.db', 'anime_genres', GENRE_SNAPSHOT_COLUMNS, 'genre', build_id)
+        if data is not None:
+            st.info("📦 スナップショット読み込み: anime_genres")
+        if data is None:
+            st.info(f"📂 データベース接続: {db_path}")
+        
+            with read_connection_for_path(db_path) as conn:
+                query = """
+                    SELECT 
+                        g.genre_name,
+                        a.anilist_id, a.title_romaji, a.title_native, 
+                        a.season, a.seasonYear, a.favorites, 
+                        a.meanScore, a.popularity, a.format, a.source
+                    FROM genres g
+                    JOIN anime a ON g.anilist_id = a.anilist_id
+                    WHERE g.genre_name IS NOT NULL AND a.title_romaji IS NOT NULL
+                    ORDER BY a.favorites DESC NULLS LAST
+                """
+                data = compact_frame(pd.read_sql_query(query, conn), 'genre')
         st.success(f"✅ ジャンルデータ読み込み成功: {len(data):,}件")
         return data
         
@@ -329,18 +338,11 @@ def load_genre_data():
         st.error(f"❌ 予期しないエラー: {e}")
         return None
 
-@st.cache_data
-def load_source_data():
+@build_cache(refresh=True, shared=True)
+def load_source_data(build_id=None):
     """アニメ原作データの読み込み"""
     try:
-        # 絶対パスでデータベースの場所を指定
-        db_path = Path(r'C:\Users\PC_User\Desktop\GitHub\public_anilist_data_rank_and_analysis\db\anime_data.db')
-        
-        # バックアップ: 相対パスでも試行
-        if not db_path.exists():
-            current_file = Path(__file__).resolve()
-            project_root = current_file.parent.parent
-            db_path = project_root / 'db' / 'anime_data.db'
+        db_path = get_db_path('anime_data.db', build_id)
         
         if not db_path.exists():
             st.error(f"❌ anime_data.db が見つかりません")
@@ -349,19 +351,18 @@ def load_source_data():
         
         st.info(f"📂 データベース接続: {db_path}")
         
-        conn = sqlite3.connect(str(db_path))
-        query = """
-            SELECT 
-                a.source,
-                a.anilist_id, a.title_romaji, a.title_native, 
-                a.season, a.seasonYear, a.favorites, 
-                a.meanScore, a.popularity, a.format
-            FROM anime a
-            WHERE a.source IS NOT NULL AND a.title_romaji IS NOT NULL
-            ORDER BY a.favorites DESC NULLS LAST
-        """
-        data = pd.read_sql_query(query, conn)
-        conn.close()
+        with read_connection_for_path(db_path) as conn:
+            query = """
+                SELECT 
+                    a.source,
+                    a.anilist_id, a.title_romaji, a.title_native, 
+                    a.season, a.seasonYear, a.favorites, 
+                    a.meanScore, a.popularity, a.format
+                FROM anime a
+                WHERE a.source IS NOT NULL AND a.title_romaji IS NOT NULL
+                ORDER BY a.favorites DESC NULLS LAST
+            """
+            data = compact_frame(pd.read_sql_query(query, conn), 'source')
         st.success(f"✅ 原作データ読み込み成功: {len(data):,}件")
         return data
         
@@ -372,58 +373,52 @@ def load_source_data():
         st.error(f"❌ 予期しないエラー: {e}")
         return None
 
-@st.cache_data
-def load_studio_data():
+@build_cache(refresh=True, shared=True)
+def load_studio_data(build_id=None):
     """アニメスタジオデータの読み込み（ジャンル情報含む）"""
     try:
-        # 絶対パスでデータベースの場所を指定
-        db_path = Path(r'C:\Users\PC_User\Desktop\GitHub\public_anilist_data_rank_and_analysis\db\anime_data.db')
-        
-        # バックアップ: 相対パスでも試行
-        if not db_path.exists():
-            current_file = Path(__file__).resolve()
-            project_root = current_file.parent.parent
-            db_path = project_root / 'db' / 'anime_data.db'
+        db_path = get_db_path('anime_data.db', build_id)
         
         if not db_path.exists():
             st.error(f"❌ anime_data.db が見つかりません")
             st.error(f"確認した場所: {db_path}")
             return None
         
-        st.info(f"📂 データベース接続: {db_path}")
-        
-        conn = sqlite3.connect(str(db_path))
-        
-        # スタジオとアニメの基本情報を取得
-        query_studio = """
-            SELECT 
-                s.studios_name,
-                a.anilist_id, a.title_romaji, a.title_native, 
-                a.season, a.seasonYear, a.favorites, 
-                a.meanScore, a.popularity, a.format, a.source
-            FROM studios s
-            JOIN anime a ON s.anilist_id = a.anilist_id
-            WHERE s.studios_name IS NOT NULL AND a.title_romaji IS NOT NULL
-            ORDER BY a.favorites DESC NULLS LAST
-        """
-        studio_data = pd.read_sql_query(query_studio, conn)
-        
-        # ジャンル情報を取得
-        query_genres = """
-            SELECT anilist_id, genre_name
-            FROM genres
-            WHERE genre_name IS NOT NULL
-        """
-        genres_data = pd.read_sql_query(query_genres, conn)
-        conn.close()
-        
-        # ジャンルを集約（複数ジャンルをカンマ区切りで結合）
-        genres_agg = genres_data.groupby('anilist_id')['genre_name'].apply(lambda x: ', '.join(sorted(set(x)))).reset_index()
-        genres_agg.columns = ['anilist_id', 'genres']
-        
-        # スタジオデータとジャンルをマージ
-        data = studio_data.merge(genres_agg, on='anilist_id', how='left')
-        data['genres'] = data['genres'].fillna('Unknown')
+        data = read_snapshot('anime_data.db', 'anime_studios', STUDIO_SNAPSHOT_COLUMNS, 'studio', build_id)
+        if data is not None:
+            st.info("📦 スナップショット読み込み: anime_studios")
+            # スナップショットはスタジオの作品数順のため、SQLと同じく作品のお気に入り数順に並べ直す
+            data = data[data['title_romaji'].notna()]
+            data = data.sort_values('favorites', ascending=False, na_position='last', kind='stable')
+            data = data.reset_index(drop=True)
+        else:
+            st.info(f"📂 データベース接続: {db_path}")
+        
+            with read_connection_for_path(db_path) as conn:
+                # 作品ごとのジャンルのビット集合（ETLで作成）があれば一緒に取得する
+                has_genre_bits = conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'media_genre_bits'"
+                ).fetchone() is not None
+                genre_bits_select = ", COALESCE(gb.genre_bits, 0) as genre_bits" if has_genre_bits else ""
+                genre_bits_join = "LEFT JOIN media_genre_bits gb ON gb.anilist_id = a.anilist_id" if has_genre_bits else ""
+            
+                # スタジオとアニメの基本情報を取得
+                query_studio = f"""
+                    SELECT 
+                        s.studios_name,
+                        a.anilist_id, a.title_romaji, a.title_native, 
+                        a.season, a.seasonYear, a.favorites, 
+                        a.meanScore, a.popularity, a.format, a.source{genre_bits_select}
+                    FROM studios s
+                    JOIN anime a ON s.anilist_id = a.anilist_id
+                    {genre_bits_join}
+                    WHERE s.studios_name IS NOT NULL AND a.title_romaji IS NOT NULL
+                    ORDER BY a.favorites DESC NULLS LAST
+                """
+                data = compact_frame(pd.read_sql_query(query_studio, conn), 'studio')
+        
+        # ジャンルでの絞り込みは genre_bits 列のビット演算（古いDBではジャンル索引）で行うため、
+        # ジャンル名の文字列は結合しない
         
         st.success(f"✅ スタジオデータ読み込み成功: {len(data):,}件")
         return data
@@ -435,18 +430,11 @@ def load_studio_data():
         st.error(f"❌ 予期しないエラー: {e}")
         return None
 
-@st.cache_data
-def load_manga_data():
+@build_cache(refresh=True, shared=True)
+def load_manga_data(build_id=None):
     """マンガデータの読み込み"""
     try:
-        # 絶対パスでデータベースの場所を指定
-        db_path = Path(r'C:\Users\PC_User\Desktop\GitHub\public_anilist_data_rank_and_analysis\db\manga_data.db')
-        
-        # バックアップ: 相対パスでも試行
-        if not db_path.exists():
-            current_file = Path(__file__).resolve()
-            project_root = current_file.parent.parent
-            db_path = project_root / 'db' / 'manga_data.db'
+        db_path = get_db_path('manga_data.db', build_id)
         
         if not db_path.exists():
             st.error(f"❌ manga_data.db が見つかりません")
@@ -455,17 +443,16 @@ def load_manga_data():
         
         st.info(f"📂 データベース接続: {db_path}")
         
-        conn = sqlite3.connect(str(db_path))
-        query = """
-            SELECT 
-                m.anilist_id, m.title_romaji, m.title_native, m.format,
-                m.seasonYear, m.meanScore, m.favorites, m.popularity
-            FROM manga m
-            WHERE m.title_romaji IS NOT NULL
-            ORDER BY m.meanScore DESC NULLS LAST
-        """
-        data = pd.read_sql_query(query, conn)
-        conn.close()
+        with read_connection_for_path(db_path) as conn:
+            query = """
+                SELECT 
+                    m.anilist_id, m.title_romaji, m.title_native, m.format,
+                    m.seasonYear, m.meanScore, m.favorites, m.popularity
+                FROM manga m
+                WHERE m.title_romaji IS NOT NULL
+                ORDER BY m.meanScore DESC NULLS LAST
+            """
+            data = compact_frame(pd.read_sql_query(query, conn), 'manga')
         st.success(f"✅ マンガデータ読み込み成功: {len(data):,}件")
         return data
         
@@ -476,18 +463,11 @@ def load_manga_data():
         st.error(f"❌ 予期しないエラー: {e}")
         return None
 
-@st.cache_data
-def load_manga_genre_data():
+@build_cache(refresh=True, shared=True)
+def load_manga_genre_data(build_id=None):
     """マンガジャンルデータの読み込み"""
     try:
-        # 絶対パスでデータベースの場所を指定
-        db_path = Path(r'C:\Users\PC_User\Desktop\GitHub\public_anilist_data_rank_and_analysis\db\manga_data.db')
-        
-        # バックアップ: 相対パスでも試行
-        if not db_path.exists():
-            current_file = Path(__file__).resolve()
-            project_root = current_file.parent.parent
-            db_path = project_root / 'db' / 'manga_data.db'
+        db_path = get_db_path('manga_data.db', build_id)
         
         if not db_path.exists():
             st.error(f"❌ manga_data.db が見つかりません")
@@ -496,20 +476,19 @@ def load_manga_genre_data():
         
         st.info(f"📂 データベース接続: {db_path}")
         
-        conn = sqlite3.connect(str(db_path))
-        query = """
-            SELECT 
-                g.genre_name,
-                m.anilist_id, m.title_romaji, m.title_native, 
-                m.seasonYear, m.favorites, 
-                m.meanScore, m.popularity, m.format
-            FROM genres g
-            JOIN manga m ON g.anilist_id = m.anilist_id
-            WHERE g.genre_name IS NOT NULL AND m.title_romaji IS NOT NULL
-            ORDER BY m.favorites DESC NULLS LAST
-        """
-        data = pd.read_sql_query(query, conn)
-        conn.close()
+        with read_connection_for_path(db_path) as conn:
+            query = """
+                SELECT 
+                    g.genre_name,
+                    m.anilist_id, m.title_romaji, m.title_native, 
+                    m.seasonYear, m.favorites, 
+                    m.meanScore, m.popularity, m.format
+                FROM genres g
+                JOIN manga m ON g.anilist_id = m.anilist_id
+                WHERE g.genre_name IS NOT NULL AND m.title_romaji IS NOT NULL
+                ORDER BY m.favorites DESC NULLS LAST
+            """
+            data = compact_frame(pd.read_sql_query(query, conn), 'manga_genre')
         st.success(f"✅ マンガジャンルデータ読み込み成功: {len(data):,}件")
         return data
         
@@ -520,18 +499,11 @@ def load_manga_genre_data():
         st.error(f"❌ 予期しないエラー: {e}")
         return None
 
-@st.cache_data
-def load_manga_character_data():
+@build_cache(refresh=True, shared=True)
+def load_manga_character_data(build_id=None):
     """マンガキャラクターデータの読み込み"""
     try:
-        # 絶対パスでデータベースの場所を指定
-        db_path = Path(r'C:\Users\PC_User\Desktop\GitHub\public_anilist_data_rank_and_analysis\db\manga_data.db')
-        
-        # バックアップ: 相対パスでも試行
-        if not db_path.exists():
-            current_file = Path(__file__).resolve()
-            project_root = current_file.parent.parent
-            db_path = project_root / 'db' / 'manga_data.db'
+        db_path = get_db_path('manga_data.db', build_id)
         
         if not db_path.exists():
             st.error(f"❌ manga_data.db が見つかりません")
@@ -540,20 +512,19 @@ def load_manga_character_data():
         
         st.info(f"📂 データベース接続: {db_path}")
         
-        conn = sqlite3.connect(str(db_path))
-        query = """
-            SELECT 
-                c.chara_id, c.chara_name, c.favorites as char_favorites,
-                m.anilist_id, m.title_romaji, m.title_native, 
-                m.seasonYear, m.favorites, 
-                m.meanScore, m.popularity, m.format, m.source
-            FROM characters c
-            JOIN manga m ON c.anilist_id = m.anilist_id
-            WHERE c.chara_name IS NOT NULL
-            ORDER BY c.favorites DESC NULLS LAST
-        """
-        data = pd.read_sql_query(query, conn)
-        conn.close()
+        with read_connection_for_path(db_path) as conn:
+            query = """
+                SELECT 
+                    c.chara_id, c.chara_name, c.favorites as char_favorites,
+                    m.anilist_id, m.title_romaji, m.title_native, 
+                    m.seasonYear, m.favorites, 
+                    m.meanScore, m.popularity, m.format, m.source
+                FROM characters c
+                JOIN manga m ON c.anilist_id = m.anilist_id
+                WHERE c.chara_name IS NOT NULL
+                ORDER BY c.favorites DESC NULLS LAST
+            """
+            data = compact_frame(pd.read_sql_query(query, conn), 'manga_character')
         st.success(f"✅ マンガキャラクターデータ読み込み成功: {len(data):,}件")
         return data
         
@@ -564,16 +535,11 @@ def load_manga_character_data():
         st.error(f"❌ 予期しないエラー: {e}")
         return None
 
-@st.cache_data
-def load_manga_staff_data():
+@build_cache(refresh=True, shared=True)
+def load_manga_staff_data(build_id=None):
     """マンガスタッフデータの読み込み"""
     try:
-        db_path = Path(r'C:\Users\PC_User\Desktop\GitHub\public_anilist_data_rank_and_analysis\db\manga_data.db')
-        
-        if not db_path.exists():
-            current_file = Path(__file__).resolve()
-            project_root = current_file.parent.parent
-            db_path = project_root / 'db' / 'manga_data.db'
+        db_path = get_db_path('manga_data.db', build_id)
         
         if not db_path.exists():
             st.error(f"❌ manga_data.db が見つかりません")
@@ -581,51 +547,49 @@ def load_manga_staff_data():
         
         st.info(f"📂 データベース接続: {db_path}")
         
-        conn = sqlite3.connect(str(db_path))
-        cursor = conn.cursor()
-        
-        # staffテーブル存在確認
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='staff'")
-        if not cursor.fetchone():
-            conn.close()
-            st.warning("⚠️ manga_data.dbにstaffテーブルが存在しません。")
-            return None
-        
-        # staff_basic_enhancedテーブルの存在確認
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='staff_basic_enhanced'")
-        has_enhanced = cursor.fetchone() is not None
+        with read_connection_for_path(db_path) as conn:
+            cursor = conn.cursor()
         
-        if has_enhanced:
-            query = """
-                SELECT 
-                    s.staff_id, s.staff_name, s.role,
-                    m.anilist_id, m.title_romaji, m.title_native, 
-                    m.seasonYear, m.favorites as manga_favorites, 
-                    m.meanScore, m.format, m.source,
-                    sbe.favorites as staff_favorites,
-                    sbe.total_count as staff_count,
-                    sbe.count_per_year
-                FROM staff s
-                JOIN manga m ON s.anilist_id = m.anilist_id
-                LEFT JOIN staff_basic_enhanced sbe ON s.staff_id = sbe.staff_id
-                WHERE s.staff_name IS NOT NULL
-                ORDER BY sbe.favorites DESC NULLS LAST
-            """
-        else:
-            query = """
-                SELECT 
-                    s.staff_id, s.staff_name, s.role, s.favorites as staff_favorites,
-                    m.anilist_id, m.title_romaji, m.title_native, 
-                    m.seasonYear, m.favorites as manga_favorites, 
-                    m.meanScore, m.format, m.source
-                FROM staff s
-                JOIN manga m ON s.anilist_id = m.anilist_id
-                WHERE s.staff_name IS NOT NULL
-                ORDER BY s.favorites DESC NULLS LAST
-            """
+            # staffテーブル存在確認
+            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='staff'")
+            if not cursor.fetchone():
+                st.warning("⚠️ manga_data.dbにstaffテーブルが存在しません。")
+                return None
         
-        data = pd.read_sql_query(query, conn)
-        conn.close()
+            # staff_basic_enhancedテーブルの存在確認
+            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='staff_basic_enhanced'")
+            has_enhanced = cursor.fetchone() is not None
+        
+            if has_enhanced:
+                query = """
+                    SELECT 
+                        s.staff_id, s.staff_name, s.role,
+                        m.anilist_id, m.title_romaji, m.title_native, 
+                        m.seasonYear, m.favorites as manga_favorites, 
+                        m.meanScore, m.format, m.source,
+                        sbe.favorites as staff_favorites,
+                        sbe.total_count as staff_count,
+                        sbe.count_per_year
+                    FROM staff s
+                    JOIN manga m ON s.anilist_id = m.anilist_id
+                    LEFT JOIN staff_basic_enhanced sbe ON s.staff_id = sbe.staff_id
+                    WHERE s.staff_name IS NOT NULL
+                    ORDER BY sbe.favorites DESC NULLS LAST
+                """
+            else:
+                query = """
+                    SELECT 
+                        s.staff_id, s.staff_name, s.role, s.favorites as staff_favorites,
+                        m.anilist_id, m.title_romaji, m.title_native, 
+                        m.seasonYear, m.favorites as manga_favorites, 
+                        m.meanScore, m.format, m.source
+                    FROM staff s
+                    JOIN manga m ON s.anilist_id = m.anilist_id
+                    WHERE s.staff_name IS NOT NULL
+                    ORDER BY s.favorites DESC NULLS LAST
+                """
+        
+            data = compact_frame(pd.read_sql_query(query, conn), 'manga_staff')
         st.success(f"✅ マンガスタッフデータ読み込み成功: {len(data):,}件")
         return data
         
@@ -644,6 +608,17 @@ def get_unique_values(data, column):
             return sorted(unique_vals)
     return []
 
+# 統計キューブ使用時の注記
+CUBE_QUANTILE_NOTE = "※ 中央値・分位点は件数の多い集計ではETLで作成した分位点スケッチによる近似値です"
+
+# 年代フィルターの範囲
+DECADE_RANGES = {
+    "1900年代": (1900, 1999),
+    "2000年代": (2000, 2009),
+    "2010年代": (2010, 2019),
+    "2020年代": (2020, 2029)
+}
+
 def create_decade_filter(data, selected_decade, year_column='seasonYear'):
     """年代フィルターを適用してデータを絞り込む
     
@@ -658,20 +633,83 @@ def create_decade_filter(data, selected_decade, year_column='seasonYear'):
     if selected_decade == "全期間" or year_column not in data.columns:
         return data
     
-    # 年代の範囲を定義
-    decade_ranges = {
-        "1900年代": (1900, 1999),
-        "2000年代": (2000, 2009),
-        "2010年代": (2010, 2019),
-        "2020年代": (2020, 2029)
-    }
-    
-    if selected_decade in decade_ranges:
-        start_year, end_year = decade_ranges[selected_decade]
+    if selected_decade in DECADE_RANGES:
+        start_year, end_year = DECADE_RANGES[selected_decade]
         return data[(data[year_column] >= start_year) & (data[year_column] <= end_year)]
     
     return data
 
+# 期間別統計をまとめて計算する指標（基礎統計タブの選択肢）
+PERIOD_METRICS = ['meanScore', 'favorites', 'popularity']
+
+def period_stats_result(tables):
+    """period_statistics() の1指標分の表を期間別統計の結果の形式に変換"""
+    def to_stats_dict(row):
+        stats = {col: float(row[col]) for col in STAT_COLUMNS}
+        stats['カウント'] = int(row['カウント'])
+        # データ数が1件の場合は標準偏差・分散を0とする
+        if stats['カウント'] <= 1:
+            stats['標準偏差'] = 0.0
+            stats['分散'] = 0.0
+        return stats
+    
+    overall_stats = to_stats_dict(tables['overall'].iloc[0])
+    # 年度は降順
+    year_column = tables['yearly'].columns[0]
+    yearly_df = pd.DataFrame(
+        [{'年度': int(row[year_column]), **to_stats_dict(row)} for row in tables['yearly'].iloc[::-1].to_dict('records')],
+        columns=['年度'] + STAT_COLUMNS
+    )
+    decade_df = pd.DataFrame(
+        [{'年代': str(row['年代']), **to_stats_dict(row)} for row in tables['decade'].to_dict('records')],
+        columns=['年代'] + STAT_COLUMNS
+    )
+    return {
+        'overall': overall_stats,
+        'period_total': overall_stats.copy(),
+        'yearly': yearly_df,
+        'decade': decade_df
+    }
+
+def calculate_period_statistics(data, metric_cols, year_column='seasonYear', metric_store=None):
+    """複数の指標の期間別統計をまとめて計算
+    
+    年度別・年代別の表は全ての指標を1回の集計で求める（年度・年代ごとにデータを切り出さない）。
+    列ストア（metric_store）に指標・年度の列があり、全ての行の作品が列ストアにある場合は、
+    データフレームの列を変換せずにメモリマップの配列を行位置で読む。
+    
+    Returns:
+        dict: 指標名 → calculate_statistics_by_period() の結果（値のない指標は含まない）
+    """
+    if year_column not in data.columns:
+        return {}
+    metric_cols = [col for col in metric_cols if col in data.columns]
+    tables = None
+    if (metric_store is not None and 'anilist_id' in data.columns
+            and all(col in metric_store.columns for col in metric_cols + [year_column])):
+        positions, found = metric_store.positions(data['anilist_id'])
+        if found.all():
+            tables = period_statistics_arrays(
+                {col: metric_store.column(col) for col in metric_cols},
+                metric_store.column(year_column), year_column, DECADE_RANGES, positions
+            )
+    if tables is None:
+        tables = period_statistics(data, metric_cols, year_column, DECADE_RANGES)
+    return {metric: period_stats_result(metric_tables) for metric, metric_tables in tables.items()}
+
+@st.cache_data(max_entries=64)
+def cached_period_statistics(_data, dataset_version, filter_key, year_column='seasonYear', _metric_store=None):
+    """基礎統計タブの全指標の期間別統計（データセットのバージョンと絞り込み条件ごとにキャッシュ）
+    
+    Args:
+        _data: 絞り込み済みのデータフレーム（キャッシュのキーには含めない）
+        dataset_version: (データベース名, ビルドID)
+        filter_key: 絞り込み条件のタプル（_data を決める全ての条件）
+        year_column: 年度を表す列名
+        _metric_store: ビルドの数値の列ストア or None（キャッシュのキーには含めない）
+    """
+    return calculate_period_statistics(_data, PERIOD_METRICS, year_column, _metric_store)
+
 def calculate_statistics_by_period(data, metric_col='favorites', year_column='seasonYear'):
     """期間別統計を計算する汎用関数
     
@@ -690,144 +728,136 @@ def calculate_statistics_by_period(data, metric_col='favorites', year_column='se
     """
     if metric_col not in data.columns or year_column not in data.columns:
         return None
+    return calculate_period_statistics(data, [metric_col], year_column).get(metric_col)
+
+def decade_labels(years):
+    """年度の列を年代名（DECADE_RANGES のキー）に変換（どの年代にも入らない年度は欠損）"""
+    conditions = [years.between(start_year, end_year) for start_year, end_year in DECADE_RANGES.values()]
+    return pd.Series(np.select(conditions, list(DECADE_RANGES), default=None), index=years.index)
+
+def grouped_stats_records(data, metric_col, group_labels):
+    """データからグループ別の基礎統計を1回の集計で計算（cube_stats_records() と同じ形式）
     
-    # メトリック列のデータ取得
-    metric_data = data[metric_col].dropna()
-    
-    # 全期間統計（10項目）
-    overall_stats = {
-        '合計': float(metric_data.sum()),
-        'カウント': len(metric_data),
-        '最大': float(metric_data.max()),
-        '最小': float(metric_data.min()),
-        '平均': float(metric_data.mean()),
-        '中央値': float(metric_data.median()),
-        '1/4分位': float(metric_data.quantile(0.25)),
-        '3/4分位': float(metric_data.quantile(0.75))
-    }
+    Args:
+        data: 絞り込み済みのデータフレーム
+        metric_col: 統計を計算する列名
+        group_labels: データの列名 → 表の列名（例: {'seasonYear': '年度', 'genre_name': 'ジャンル'}）
+    """
+    stats_df = grouped_statistics(data, metric_col, list(group_labels))
+    if 'seasonYear' in group_labels and not stats_df.empty:
+        # 年度は降順（同じ年度内はキーの昇順）
+        stats_df['seasonYear'] = stats_df['seasonYear'].astype(int)
+        stats_df = stats_df.sort_values('seasonYear', ascending=False, kind='stable')
+    return stats_df.rename(columns=group_labels).to_dict('records')
+
+def cube_stats_records(cube, metric_col, group_labels, selected_format, selected_decade):
+    """統計キューブからグループ別の基礎統計を計算（表用のdictのリスト）
     
-    # 標準偏差と分散（データ数が2以上の場合のみ計算）
-    if len(metric_data) > 1:
-        overall_stats['標準偏差'] = float(metric_data.std())
-        overall_stats['分散'] = float(metric_data.var())
-    else:
-        overall_stats['標準偏差'] = 0.0
-        overall_stats['分散'] = 0.0
+    Args:
+        cube: load_stats_cube() の結果
+        metric_col: 統計を計算する列名
+        group_labels: キューブの列名 → 表の列名（例: {'genre_name': 'ジャンル'}）
+        selected_format: 選択されたフォーマット（'全て' なら絞り込まない）
+        selected_decade: 選択された年代
+    """
+    media_format = None if selected_format == "全て" else selected_format
+    stats_df = query_stats_cube(cube, metric_col, list(group_labels), media_format,
+                                DECADE_RANGES.get(selected_decade))
+    if 'seasonYear' in group_labels and not stats_df.empty:
+        # 年度は降順（同じ年度内はキーの昇順）
+        stats_df['seasonYear'] = stats_df['seasonYear'].astype(int)
+        stats_df = stats_df.sort_values('seasonYear', ascending=False, kind='stable')
+    return stats_df.rename(columns=group_labels).to_dict('records')
+
+def calculate_statistics_by_period_from_cube(cube, metric_col, selected_format, selected_decade):
+    """calculate_statistics_by_period() と同じ形式の結果を統計キューブから計算
     
-    # 選択期間合計統計（全期間と同じ）
-    period_total_stats = overall_stats.copy()
+    セルを年度ごとに1回だけ結合し、年代別・全期間の統計は年度ごとの要約を
+    さらに結合して求める（生データやセルを年代ごとに切り出し直さない）。
+    """
+    def to_stats_dict(row):
+        stats = {col: float(row[col]) for col in STAT_COLUMNS}
+        stats['カウント'] = int(row['カウント'])
+        # データ数が1件の場合は標準偏差・分散を0とする
+        if stats['カウント'] <= 1:
+            stats['標準偏差'] = 0.0
+            stats['分散'] = 0.0
+        return stats
     
-    # 年別統計（10項目）
-    yearly_data = []
-    for year in sorted(data[year_column].dropna().unique(), reverse=True):
-        year_data = data[data[year_column] == year]
-        year_metric = year_data[metric_col].dropna()
-        
-        if len(year_metric) == 0:
-            continue
-        
-        year_stats = {
-            '年度': int(year),
-            '合計': float(year_metric.sum()),
-            'カウント': len(year_metric),
-            '最大': float(year_metric.max()),
-            '最小': float(year_metric.min()),
-            '平均': float(year_metric.mean()),
-            '中央値': float(year_metric.median()),
-            '1/4分位': float(year_metric.quantile(0.25)),
-            '3/4分位': float(year_metric.quantile(0.75))
-        }
-        
-        # 標準偏差と分散
-        if len(year_metric) > 1:
-            year_stats['標準偏差'] = float(year_metric.std())
-            year_stats['分散'] = float(year_metric.var())
-        else:
-            year_stats['標準偏差'] = 0.0
-            year_stats['分散'] = 0.0
-        
-        yearly_data.append(year_stats)
+    media_format = None if selected_format == "全て" else selected_format
+    year_range = DECADE_RANGES.get(selected_decade)
     
-    yearly_df = pd.DataFrame(yearly_data)
+    cells = filter_stats_cube(cube, metric_col, media_format=media_format, year_range=year_range)
+    if cells.empty:
+        return None
+    # 年度ごとの要約（年度不明の作品も全期間の統計には含めるため残す）
+    yearly_summaries = rollup_summaries(cells, ['seasonYear'])
     
-    # 年代別統計（10項目）
-    decade_data = []
-    decade_ranges = {
-        "1900年代": (1900, 1999),
-        "2000年代": (2000, 2009),
-        "2010年代": (2010, 2019),
-        "2020年代": (2020, 2029)
-    }
+    overall = summary_statistics(rollup_summaries(yearly_summaries))
+    overall_stats = to_stats_dict(overall.iloc[0])
     
-    for decade_name, (start_year, end_year) in decade_ranges.items():
-        decade_filtered = data[(data[year_column] >= start_year) & (data[year_column] <= end_year)]
-        decade_metric = decade_filtered[metric_col].dropna()
-        
-        if len(decade_metric) == 0:
-            continue
-        
-        decade_stats = {
-            '年代': decade_name,
-            '合計': float(decade_metric.sum()),
-            'カウント': len(decade_metric),
-            '最大': float(decade_metric.max()),
-            '最小': float(decade_metric.min()),
-            '平均': float(decade_metric.mean()),
-            '中央値': float(decade_metric.median()),
-            '1/4分位': float(decade_metric.quantile(0.25)),
-            '3/4分位': float(decade_metric.quantile(0.75))
-        }
-        
-        # 標準偏差と分散
-        if len(decade_metric) > 1:
-            decade_stats['標準偏差'] = float(decade_metric.std())
-            decade_stats['分散'] = float(decade_metric.var())
-        else:
-            decade_stats['標準偏差'] = 0.0
-            decade_stats['分散'] = 0.0
-        
-        decade_data.append(decade_stats)
+    known_years = yearly_summaries[yearly_summaries['seasonYear'].notna()]
+    yearly = summary_statistics(known_years, ['seasonYear'])
+    yearly_df = pd.DataFrame([
+        {'年度': int(row['seasonYear']), **to_stats_dict(row)}
+        for _, row in yearly.sort_values('seasonYear', ascending=False).iterrows()
+    ])
     
+    decade_data = []
+    for decade_name, (start_year, end_year) in DECADE_RANGES.items():
+        decade_years = known_years[known_years['seasonYear'].between(start_year, end_year)]
+        if decade_years.empty:
+            continue
+        decade = summary_statistics(rollup_summaries(decade_years))
+        decade_data.append({'年代': decade_name, **to_stats_dict(decade.iloc[0])})
     decade_df = pd.DataFrame(decade_data)
     
     return {
         'overall': overall_stats,
-        'period_total': period_total_stats,
+        'period_total': overall_stats.copy(),
         'yearly': yearly_df,
         'decade': decade_df
     }
 
-def filter_data(data, filters, db_path=None):
-    """フィルター条件に基づいてデータを絞り込み"""
-    filtered_data = data.copy()
+def calculate_studio_metric_stats(filtered_data, studios_sketch, metric_col, selected_decade):
+    """スタジオ別の指標の基礎統計を計算
     
-    # ジャンルフィルターの処理
-    if 'genre' in filters and filters['genre'] and filters['genre'] != "全て" and db_path:
-        try:
-            conn = sqlite3.connect(str(db_path))
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT DISTINCT anilist_id 
-                FROM genres 
-                WHERE genre_name = ?
-            """, (filters['genre'],))
-            genre_anime_ids = [row[0] for row in cursor.fetchall()]
-            conn.close()
-            
-            if genre_anime_ids:
-                filtered_data = filtered_data[filtered_data['anilist_id'].isin(genre_anime_ids)]
-            else:
-                # 該当するジャンルのアニメがない場合は空のDataFrameを返す
-                filtered_data = filtered_data.iloc[0:0]
-        except Exception as e:
-            st.error(f"ジャンルフィルター適用エラー: {e}")
+    studios_sketch（スタジオ×年度の要約）があれば該当年度の要約を結合して求め、
+    なければ絞り込み済みのデータから直接計算する。
     
-    # その他のフィルターの処理
-    for key, value in filters.items():
-        if key != 'genre' and value and value != "全て" and key in filtered_data.columns:
-            filtered_data = filtered_data[filtered_data[key] == value]
+    Args:
+        filtered_data: 絞り込み済みのスタジオデータ（studios_sketch がない場合に使用）
+        studios_sketch: load_studios_sketch() の結果（None可）
+        metric_col: 統計を計算する列名
+        selected_decade: 選択された年代
     
-    return filtered_data
+    Returns:
+        pd.DataFrame: スタジオ + STAT_COLUMNS（作品数の多い順）
+    """
+    if studios_sketch is not None:
+        cells = studios_sketch[studios_sketch['metric'] == metric_col]
+        if selected_decade in DECADE_RANGES:
+            start_year, end_year = DECADE_RANGES[selected_decade]
+            cells = cells[cells['seasonYear'].between(start_year, end_year)]
+        if cells.empty:
+            return pd.DataFrame(columns=['スタジオ'] + STAT_COLUMNS)
+        stats_df = summary_statistics(rollup_summaries(cells, ['studios_name']), ['studios_name'])
+    else:
+        grouped = filtered_data.dropna(subset=[metric_col]).groupby('studios_name', observed=True)[metric_col]
+        stats_df = pd.DataFrame({
+            '合計': grouped.sum(),
+            'カウント': grouped.size(),
+            '最大': grouped.max(),
+            '最小': grouped.min(),
+            '平均': grouped.mean(),
+            '中央値': grouped.median(),
+            '1/4分位': grouped.quantile(0.25),
+            '3/4分位': grouped.quantile(0.75),
+            '標準偏差': grouped.std(),
+            '分散': grouped.var()
+        }).reset_index()
+    stats_df = stats_df.rename(columns={'studios_name': 'スタジオ'})
+    return stats_df.sort_values(['カウント', 'スタジオ'], ascending=[False, True]).reset_index(drop=True)
 
 def show_studios_ranking_tab(data):
     """スタジオランキングタブの表示"""
@@ -878,7 +908,7 @@ def show_studios_ranking_tab(data):
     
     with col5:
         # ジャンル選択（データベースから取得）
-        db_path = Path(r'C:\Users\PC_User\Desktop\GitHub\public_anilist_data_rank_and_analysis\db\anime_data.db')
+        db_path = get_db_path('anime_data.db')
         
         if db_path.exists():
             available_genres = get_genres_data(db_path)
@@ -904,32 +934,7 @@ def show_studios_ranking_tab(data):
         filters['genre'] = selected_genre_filter
     
     # フィルター適用（ジャンルフィルターはanilist_idベースで処理）
-    filtered_data = data.copy()
-    
-    # ジャンルフィルターの処理
-    if 'genre' in filters and filters['genre']:
-        try:
-            conn = sqlite3.connect(str(db_path))
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT DISTINCT anilist_id 
-                FROM genres 
-                WHERE genre_name = ?
-            """, (filters['genre'],))
-            genre_anime_ids = [row[0] for row in cursor.fetchall()]
-            conn.close()
-            
-            if genre_anime_ids:
-                filtered_data = filtered_data[filtered_data['anilist_id'].isin(genre_anime_ids)]
-            else:
-                filtered_data = filtered_data.iloc[0:0]
-        except Exception as e:
-            st.error(f"ジャンルフィルター適用エラー: {e}")
-    
-    # その他のフィルター処理
-    for key, value in filters.items():
-        if key != 'genre' and value and key in filtered_data.columns:
-            filtered_data = filtered_data[filtered_data[key] == value]
+    filtered_data = filter_data(data, filters, db_path)
     
     if filtered_data.empty:
         st.warning("選択された条件に一致するデータがありません。")
@@ -1071,7 +1076,7 @@ def show_studios_statistics_tab(data):
     
     with col5:
         # ジャンル選択（データベースから取得）
-        db_path = Path(r'C:\Users\PC_User\Desktop\GitHub\public_anilist_data_rank_and_analysis\db\anime_data.db')
+        db_path = get_db_path('anime_data.db')
         
         if db_path.exists():
             available_genres = get_genres_data(db_path)
@@ -1097,32 +1102,7 @@ def show_studios_statistics_tab(data):
         filters['genre'] = selected_genre_filter
     
     # フィルター適用（ジャンルフィルターはanilist_idベースで処理）
-    filtered_data = data.copy()
-    
-    # ジャンルフィルターの処理
-    if 'genre' in filters and filters['genre']:
-        try:
-            conn = sqlite3.connect(str(db_path))
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT DISTINCT anilist_id 
-                FROM genres 
-                WHERE genre_name = ?
-            """, (filters['genre'],))
-            genre_anime_ids = [row[0] for row in cursor.fetchall()]
-            conn.close()
-            
-            if genre_anime_ids:
-                filtered_data = filtered_data[filtered_data['anilist_id'].isin(genre_anime_ids)]
-            else:
-                filtered_data = filtered_data.iloc[0:0]
-        except Exception as e:
-            st.error(f"ジャンルフィルター適用エラー: {e}")
-    
-    # その他のフィルター処理
-    for key, value in filters.items():
-        if key != 'genre' and value and key in filtered_data.columns:
-            filtered_data = filtered_data[filtered_data[key] == value]
+    filtered_data = filter_data(data, filters, db_path)
     
     if filtered_data.empty:
         st.warning("選択された条件に一致するデータがありません。")
@@ -1406,7 +1386,7 @@ def show_voiceactor_statistics_tab(data):
     
     with col4:
         # ジャンル選択
-        db_path = Path(r'C:\Users\PC_User\Desktop\GitHub\public_anilist_data_rank_and_analysis\db\anime_data.db')
+        db_path = get_db_path('anime_data.db')
         if db_path.exists():
             available_genres = get_genres_data(db_path)
             genre_options = ["全て"] + available_genres
@@ -1547,7 +1527,7 @@ def show_staff_statistics_tab(data):
     
     with col5:
         # ジャンル選択
-        db_path = Path(r'C:\Users\PC_User\Desktop\GitHub\public_anilist_data_rank_and_analysis\db\anime_data.db')
+        db_path = get_db_path('anime_data.db')
         if db_path.exists():
             available_genres = get_genres_data(db_path)
             genre_options = ["全て"] + available_genres
@@ -1562,14 +1542,7 @@ def show_staff_statistics_tab(data):
     data['seasonYear'] = pd.to_numeric(data['seasonYear'], errors='coerce')
     
     # フィルター適用
-    filtered_data = data.copy()
-    
-    # 役割フィルター
-    if selected_role != "全て":
-        filtered_data = filtered_data[filtered_data['role'] == selected_role]
-    
-    # その他のフィルター
-    filters = {}
+    filters = {'role': selected_role}
     if selected_format != "全て":
         filters['format'] = selected_format
     if selected_source != "全て":
@@ -1577,11 +1550,10 @@ def show_staff_statistics_tab(data):
     if selected_genre != "全て":
         filters['genre'] = selected_genre
     
-    filtered_data = filter_data(filtered_data, filters, db_path=db_path)
+    if selected_decade in DECADE_RANGES:
+        filters['seasonYear'] = DECADE_RANGES[selected_decade]
     
-    # 年代フィルター適用
-    if selected_decade != "全期間":
-        filtered_data = create_decade_filter(filtered_data, selected_decade, year_column='seasonYear')
+    filtered_data = filter_data(data, filters, db_path=db_path)
     
     if filtered_data.empty:
         st.warning("選択された条件に一致するデータがありません。")
@@ -1769,11 +1741,11 @@ def show_statistics_tab(data, genre):
     if selected_format != "全て":
         filters['format'] = selected_format
     
-    # データベースパスを絶対パスで指定
+    # データベースパスを取得（公開中のビルドを優先）
     if genre == "アニメ":
-        db_path = Path(r'C:\Users\PC_User\Desktop\GitHub\public_anilist_data_rank_and_analysis\db\anime_data.db')
+        db_path = get_db_path('anime_data.db')
     else:
-        db_path = Path(r'C:\Users\PC_User\Desktop\GitHub\public_anilist_data_rank_and_analysis\db\manga_data.db')
+        db_path = get_db_path('manga_data.db')
     
     # 通常のフィルター適用
     filtered_data = filter_data(data, filters, db_path if db_path.exists() else None)
@@ -1793,8 +1765,19 @@ def show_statistics_tab(data, genre):
     st.subheader(f"📈 統計分析結果 ({filtered_count:,}件)")
     st.markdown(f"**選択年代**: {selected_decade} | **選択フォーマット**: {selected_format}")
     
-    # 期間別統計を計算
-    stats_result = calculate_statistics_by_period(filtered_data, selected_metric, year_column)
+    # 期間別統計を計算（統計キューブがあればセルの結合で求める）
+    cube = load_stats_cube('anime_data.db' if genre == "アニメ" else 'manga_data.db', get_build_id())
+    if cube is not None:
+        stats_result = calculate_statistics_by_period_from_cube(cube, selected_metric, selected_format, selected_decade)
+        st.caption(CUBE_QUANTILE_NOTE)
+    else:
+        # 全指標の表を1回で計算し、同じビルド・条件の再実行ではキャッシュを使う
+        dataset_version = ('anime_data.db' if genre == "アニメ" else 'manga_data.db', get_build_id())
+        period_stats = cached_period_statistics(
+            filtered_data, dataset_version, (selected_format, selected_decade), year_column,
+            load_metric_store(*dataset_version)
+        )
+        stats_result = period_stats.get(selected_metric)
     
     if stats_result is None:
         st.error(f"選択された条件では{metric_labels.get(selected_metric, selected_metric)}のデータが存在しません。")
@@ -1991,12 +1974,10 @@ def show_genre_statistics_tab(data):
             selected_format = "全て"
     
     # フォーマットフィルター適用
-    filtered_data = data.copy()
-    if selected_format != "全て":
-        filtered_data = filtered_data[filtered_data['format'] == selected_format]
-    
-    # 年代フィルター適用
-    filtered_data = create_decade_filter(filtered_data, selected_decade, 'seasonYear')
+    filtered_data = filter_data(data, {
+        'format': selected_format,
+        'seasonYear': DECADE_RANGES.get(selected_decade)
+    })
     
     if filtered_data.empty:
         st.warning("選択された条件に一致するデータがありません。")
@@ -2014,36 +1995,16 @@ def show_genre_statistics_tab(data):
     st.markdown(f"**選択年代**: {selected_decade} | **選択フォーマット**: {selected_format} | **ジャンル数**: {len(unique_genres)}種類")
     
     # 各ジャンルの統計を計算
-    genre_stats_list = []
-    
-    for genre in unique_genres:
-        genre_data = filtered_data[filtered_data['genre_name'] == genre].copy()
-        
-        if genre_data.empty:
-            continue
-        
-        # 指標の値を取得
-        metric_values = pd.to_numeric(genre_data[selected_metric], errors='coerce').dropna()
-        
-        if len(metric_values) == 0:
-            continue
+    cube = load_stats_cube('anime_data.db', get_build_id())
+    if cube is not None:
+        # 統計キューブのセルを結合して計算
+        genre_stats_list = cube_stats_records(
+            cube, selected_metric, {'genre_name': 'ジャンル'}, selected_format, selected_decade
+        )
+        st.caption(CUBE_QUANTILE_NOTE)
+    else:
+        genre_stats_list = grouped_stats_records(filtered_data, selected_metric, {'genre_name': 'ジャンル'})
         
-        # 統計を計算
-        stats = {
-            'ジャンル': genre,
-            '合計': metric_values.sum(),
-            'カウント': len(metric_values),
-            '最大': metric_values.max(),
-            '最小': metric_values.min(),
-            '平均': metric_values.mean(),
-            '中央値': metric_values.median(),
-            '1/4分位': metric_values.quantile(0.25),
-            '3/4分位': metric_values.quantile(0.75),
-            '標準偏差': metric_values.std(),
-            '分散': metric_values.var()
-        }
-        genre_stats_list.append(stats)
-    
     if not genre_stats_list:
         st.warning("選択された条件に一致する統計データがありません。")
         return
@@ -2069,42 +2030,17 @@ def show_genre_statistics_tab(data):
         
         # 年度ごとにジャンル別統計を計算
         if 'seasonYear' in filtered_data.columns:
-            # 年度のユニークリストを取得（降順）
-            years = sorted(filtered_data['seasonYear'].dropna().unique(), reverse=True)
-            
             # 各年度の統計を計算
-            yearly_genre_stats = []
-            
-            for year in years:
-                year_data = filtered_data[filtered_data['seasonYear'] == year]
+            if cube is not None:
+                yearly_genre_stats = cube_stats_records(
+                    cube, selected_metric, {'seasonYear': '年度', 'genre_name': 'ジャンル'},
+                    selected_format, selected_decade
+                )
+            else:
+                yearly_genre_stats = grouped_stats_records(
+                    filtered_data, selected_metric, {'seasonYear': '年度', 'genre_name': 'ジャンル'}
+                )
                 
-                for genre in unique_genres:
-                    genre_year_data = year_data[year_data['genre_name'] == genre]
-                    
-                    if genre_year_data.empty:
-                        continue
-                    
-                    metric_values = pd.to_numeric(genre_year_data[selected_metric], errors='coerce').dropna()
-                    
-                    if len(metric_values) == 0:
-                        continue
-                    
-                    stats = {
-                        '年度': int(year),
-                        'ジャンル': genre,
-                        '合計': metric_values.sum(),
-                        'カウント': len(metric_values),
-                        '最大': metric_values.max(),
-                        '最小': metric_values.min(),
-                        '平均': metric_values.mean(),
-                        '中央値': metric_values.median(),
-                        '1/4分位': metric_values.quantile(0.25),
-                        '3/4分位': metric_values.quantile(0.75),
-                        '標準偏差': metric_values.std(),
-                        '分散': metric_values.var()
-                    }
-                    yearly_genre_stats.append(stats)
-            
             if yearly_genre_stats:
                 yearly_genre_df = pd.DataFrame(yearly_genre_stats)
                 
@@ -2313,15 +2249,10 @@ def show_manga_staff_statistics_tab(data):
     
     with col4:
         # ジャンル選択
-        db_path = Path(r'C:\Users\PC_User\Desktop\GitHub\public_anilist_data_rank_and_analysis\db\manga_data.db')
+        db_path = get_db_path('manga_data.db')
         if db_path.exists():
             try:
-                conn = sqlite3.connect(str(db_path))
-                cursor = conn.cursor()
-                cursor.execute("SELECT DISTINCT genre_name FROM genres ORDER BY genre_name")
-                available_genres = [row[0] for row in cursor.fetchall()]
-                conn.close()
-                genre_options = ["全て"] + available_genres
+                genre_options = ["全て"] + get_genres_data(db_path)
             except:
                 genre_options = ["全て"]
         else:
@@ -2339,37 +2270,12 @@ def show_manga_staff_statistics_tab(data):
         data['count_per_year'] = pd.to_numeric(data['count_per_year'], errors='coerce')
     
     # フィルター適用
-    filtered_data = data.copy()
-    
-    if selected_role != "全て":
-        filtered_data = filtered_data[filtered_data['role'] == selected_role]
-    
-    if selected_format != "全て":
-        filtered_data = filtered_data[filtered_data['format'] == selected_format]
-    
-    # ジャンルフィルター
-    if selected_genre != "全て":
-        try:
-            conn = sqlite3.connect(str(db_path))
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT DISTINCT anilist_id 
-                FROM genres 
-                WHERE genre_name = ?
-            """, (selected_genre,))
-            genre_manga_ids = [row[0] for row in cursor.fetchall()]
-            conn.close()
-            
-            if genre_manga_ids:
-                filtered_data = filtered_data[filtered_data['anilist_id'].isin(genre_manga_ids)]
-            else:
-                filtered_data = filtered_data.iloc[0:0]
-        except Exception as e:
-            st.error(f"ジャンルフィルター適用エラー: {e}")
-    
-    # 年代フィルター適用
-    if selected_decade != "全期間":
-        filtered_data = create_decade_filter(filtered_data, selected_decade, year_column='seasonYear')
+    filtered_data = filter_data(data, {
+        'role': selected_role,
+        'format': selected_format,
+        'genre': selected_genre,
+        'seasonYear': DECADE_RANGES.get(selected_decade)
+    }, db_path)
     
     if filtered_data.empty:
         st.warning("選択された条件に一致するデータがありません。")
@@ -2570,12 +2476,10 @@ def show_manga_genre_statistics_tab(data):
             selected_format = "全て"
     
     # フォーマットフィルター適用
-    filtered_data = data.copy()
-    if selected_format != "全て":
-        filtered_data = filtered_data[filtered_data['format'] == selected_format]
-    
-    # 年代フィルター適用
-    filtered_data = create_decade_filter(filtered_data, selected_decade, 'seasonYear')
+    filtered_data = filter_data(data, {
+        'format': selected_format,
+        'seasonYear': DECADE_RANGES.get(selected_decade)
+    })
     
     if filtered_data.empty:
         st.warning("選択された条件に一致するデータがありません。")
@@ -2593,36 +2497,16 @@ def show_manga_genre_statistics_tab(data):
     st.markdown(f"**選択年代**: {selected_decade} | **選択フォーマット**: {selected_format} | **ジャンル数**: {len(unique_genres)}種類")
     
     # 各ジャンルの統計を計算
-    genre_stats_list = []
-    
-    for genre in unique_genres:
-        genre_data = filtered_data[filtered_data['genre_name'] == genre].copy()
-        
-        if genre_data.empty:
-            continue
-        
-        # 指標の値を取得
-        metric_values = pd.to_numeric(genre_data[selected_metric], errors='coerce').dropna()
-        
-        if len(metric_values) == 0:
-            continue
+    cube = load_stats_cube('manga_data.db', get_build_id())
+    if cube is not None:
+        # 統計キューブのセルを結合して計算
+        genre_stats_list = cube_stats_records(
+            cube, selected_metric, {'genre_name': 'ジャンル'}, selected_format, selected_decade
+        )
+        st.caption(CUBE_QUANTILE_NOTE)
+    else:
+        genre_stats_list = grouped_stats_records(filtered_data, selected_metric, {'genre_name': 'ジャンル'})
         
-        # 統計を計算
-        stats = {
-            'ジャンル': genre,
-            '合計': metric_values.sum(),
-            'カウント': len(metric_values),
-            '最大': metric_values.max(),
-            '最小': metric_values.min(),
-            '平均': metric_values.mean(),
-            '中央値': metric_values.median(),
-            '1/4分位': metric_values.quantile(0.25),
-            '3/4分位': metric_values.quantile(0.75),
-            '標準偏差': metric_values.std(),
-            '分散': metric_values.var()
-        }
-        genre_stats_list.append(stats)
-    
     if not genre_stats_list:
         st.warning("選択された条件に一致する統計データがありません。")
         return
@@ -2648,42 +2532,17 @@ def show_manga_genre_statistics_tab(data):
         
         # 年度ごとにジャンル別統計を計算
         if 'seasonYear' in filtered_data.columns:
-            # 年度のユニークリストを取得（降順）
-            years = sorted(filtered_data['seasonYear'].dropna().unique(), reverse=True)
-            
             # 各年度の統計を計算
-            yearly_genre_stats = []
-            
-            for year in years:
-                year_data = filtered_data[filtered_data['seasonYear'] == year]
+            if cube is not None:
+                yearly_genre_stats = cube_stats_records(
+                    cube, selected_metric, {'seasonYear': '年度', 'genre_name': 'ジャンル'},
+                    selected_format, selected_decade
+                )
+            else:
+                yearly_genre_stats = grouped_stats_records(
+                    filtered_data, selected_metric, {'seasonYear': '年度', 'genre_name': 'ジャンル'}
+                )
                 
-                for genre in unique_genres:
-                    genre_year_data = year_data[year_data['genre_name'] == genre]
-                    
-                    if genre_year_data.empty:
-                        continue
-                    
-                    metric_values = pd.to_numeric(genre_year_data[selected_metric], errors='coerce').dropna()
-                    
-                    if len(metric_values) == 0:
-                        continue
-                    
-                    stats = {
-                        '年度': int(year),
-                        'ジャンル': genre,
-                        '合計': metric_values.sum(),
-                        'カウント': len(metric_values),
-                        '最大': metric_values.max(),
-                        '最小': metric_values.min(),
-                        '平均': metric_values.mean(),
-                        '中央値': metric_values.median(),
-                        '1/4分位': metric_values.quantile(0.25),
-                        '3/4分位': metric_values.quantile(0.75),
-                        '標準偏差': metric_values.std(),
-                        '分散': metric_values.var()
-                    }
-                    yearly_genre_stats.append(stats)
-            
             if yearly_genre_stats:
                 yearly_genre_df = pd.DataFrame(yearly_genre_stats)
                 
@@ -2869,12 +2728,10 @@ def show_source_statistics_tab(data):
             selected_format = "全て"
     
     # フォーマットフィルター適用
-    filtered_data = data.copy()
-    if selected_format != "全て":
-        filtered_data = filtered_data[filtered_data['format'] == selected_format]
-    
-    # 年代フィルター適用
-    filtered_data = create_decade_filter(filtered_data, selected_decade, 'seasonYear')
+    filtered_data = filter_data(data, {
+        'format': selected_format,
+        'seasonYear': DECADE_RANGES.get(selected_decade)
+    })
     
     if filtered_data.empty:
         st.warning("選択された条件に一致するデータがありません。")
@@ -2892,36 +2749,16 @@ def show_source_statistics_tab(data):
     st.markdown(f"**選択年代**: {selected_decade} | **選択フォーマット**: {selected_format} | **原作タイプ数**: {len(unique_sources)}種類")
     
     # 各原作タイプの統計を計算
-    source_stats_list = []
-    
-    for source in unique_sources:
-        source_data = filtered_data[filtered_data['source'] == source].copy()
-        
-        if source_data.empty:
-            continue
-        
-        # 指標の値を取得
-        metric_values = pd.to_numeric(source_data[selected_metric], errors='coerce').dropna()
-        
-        if len(metric_values) == 0:
-            continue
+    cube = load_stats_cube('anime_data.db', get_build_id())
+    if cube is not None:
+        # 統計キューブのセルを結合して計算
+        source_stats_list = cube_stats_records(
+            cube, selected_metric, {'source': '原作'}, selected_format, selected_decade
+        )
+        st.caption(CUBE_QUANTILE_NOTE)
+    else:
+        source_stats_list = grouped_stats_records(filtered_data, selected_metric, {'source': '原作'})
         
-        # 統計を計算
-        stats = {
-            '原作': source,
-            '合計': metric_values.sum(),
-            'カウント': len(metric_values),
-            '最大': metric_values.max(),
-            '最小': metric_values.min(),
-            '平均': metric_values.mean(),
-            '中央値': metric_values.median(),
-            '1/4分位': metric_values.quantile(0.25),
-            '3/4分位': metric_values.quantile(0.75),
-            '標準偏差': metric_values.std(),
-            '分散': metric_values.var()
-        }
-        source_stats_list.append(stats)
-    
     if not source_stats_list:
         st.warning("選択された条件に一致する統計データがありません。")
         return
@@ -2947,42 +2784,17 @@ def show_source_statistics_tab(data):
         
         # 年度ごとに原作別統計を計算
         if 'seasonYear' in filtered_data.columns:
-            # 年度のユニークリストを取得（降順）
-            years = sorted(filtered_data['seasonYear'].dropna().unique(), reverse=True)
-            
             # 各年度の統計を計算
-            yearly_source_stats = []
-            
-            for year in years:
-                year_data = filtered_data[filtered_data['seasonYear'] == year]
+            if cube is not None:
+                yearly_source_stats = cube_stats_records(
+                    cube, selected_metric, {'seasonYear': '年度', 'source': '原作'},
+                    selected_format, selected_decade
+                )
+            else:
+                yearly_source_stats = grouped_stats_records(
+                    filtered_data, selected_metric, {'seasonYear': '年度', 'source': '原作'}
+                )
                 
-                for source in unique_sources:
-                    source_year_data = year_data[year_data['source'] == source]
-                    
-                    if source_year_data.empty:
-                        continue
-                    
-                    metric_values = pd.to_numeric(source_year_data[selected_metric], errors='coerce').dropna()
-                    
-                    if len(metric_values) == 0:
-                        continue
-                    
-                    stats = {
-                        '年度': int(year),
-                        '原作': source,
-                        '合計': metric_values.sum(),
-                        'カウント': len(metric_values),
-                        '最大': metric_values.max(),
-                        '最小': metric_values.min(),
-                        '平均': metric_values.mean(),
-                        '中央値': metric_values.median(),
-                        '1/4分位': metric_values.quantile(0.25),
-                        '3/4分位': metric_values.quantile(0.75),
-                        '標準偏差': metric_values.std(),
-                        '分散': metric_values.var()
-                    }
-                    yearly_source_stats.append(stats)
-            
             if yearly_source_stats:
                 yearly_source_df = pd.DataFrame(yearly_source_stats)
                 
@@ -3038,51 +2850,10 @@ def show_source_statistics_tab(data):
         st.markdown("---")
         st.subheader("📊 表2: 年代別の原作別統計")
         
-        # 年代定義
-        decade_ranges = {
-            "1900年代": (1900, 1999),
-            "2000年代": (2000, 2009),
-            "2010年代": (2010, 2019),
-            "2020年代": (2020, 2029)
-        }
-        
-        decade_source_stats = []
-        
-        for decade_name, (start_year, end_year) in decade_ranges.items():
-            decade_data = filtered_data[
-                (filtered_data['seasonYear'] >= start_year) & 
-                (filtered_data['seasonYear'] <= end_year)
-            ]
-            
-            if decade_data.empty:
-                continue
-            
-            for source in unique_sources:
-                source_decade_data = decade_data[decade_data['source'] == source]
-                
-                if source_decade_data.empty:
-                    continue
-                
-                metric_values = pd.to_numeric(source_decade_data[selected_metric], errors='coerce').dropna()
-                
-                if len(metric_values) == 0:
-                    continue
-                
-                stats = {
-                    '年代': decade_name,
-                    '原作': source,
-                    '合計': metric_values.sum(),
-                    'カウント': len(metric_values),
-                    '最大': metric_values.max(),
-                    '最小': metric_values.min(),
-                    '平均': metric_values.mean(),
-                    '中央値': metric_values.median(),
-                    '1/4分位': metric_values.quantile(0.25),
-                    '3/4分位': metric_values.quantile(0.75),
-                    '標準偏差': metric_values.std(),
-                    '分散': metric_values.var()
-                }
-                decade_source_stats.append(stats)
+        decade_source_stats = grouped_stats_records(
+            filtered_data.assign(年代=decade_labels(filtered_data['seasonYear'])),
+            selected_metric, {'年代': '年代', 'source': '原作'}
+        )
         
         if decade_source_stats:
             decade_source_df = pd.DataFrame(decade_source_stats)
@@ -3197,34 +2968,32 @@ def show_studio_statistics_tab(data):
             selected_source = "全て"
     
     with col4:
-        # ジャンル選択（複数ジャンルを持つ作品があるため、単一ジャンルでフィルタ）
-        if 'genres' in data.columns:
-            # 全ジャンルを抽出
-            all_genres = set()
-            for genres_str in data['genres'].dropna():
-                if genres_str != 'Unknown':
-                    all_genres.update([g.strip() for g in genres_str.split(',')])
-            unique_genres = sorted(list(all_genres))
-            genres = ["全て"] + unique_genres
-            selected_genre = st.selectbox("ジャンル", genres, key="studio_stats_genre")
+        # ジャンル選択（作品ごとのジャンルはジャンル索引で判定）
+        db_path = get_db_path('anime_data.db')
+        if db_path.exists():
+            selected_genres = st.multiselect("ジャンル", get_genres_data(db_path), placeholder="全て",
+                                             key="studio_stats_genre")
+        else:
+            selected_genres = []
+        if len(selected_genres) > 1:
+            genre_match = st.radio(
+                "ジャンルの条件",
+                [MATCH_ANY, MATCH_ALL],
+                format_func=lambda x: GENRE_MATCH_LABELS[x],
+                horizontal=True,
+                key="studio_stats_genre_match"
+            )
         else:
-            selected_genre = "全て"
+            genre_match = MATCH_ANY
     
     # フィルター適用
-    filtered_data = data.copy()
-    
-    if selected_format != "全て":
-        filtered_data = filtered_data[filtered_data['format'] == selected_format]
-    
-    if selected_source != "全て":
-        filtered_data = filtered_data[filtered_data['source'] == selected_source]
-    
-    if selected_genre != "全て":
-        # ジャンルが含まれている作品をフィルタ
-        filtered_data = filtered_data[filtered_data['genres'].str.contains(selected_genre, na=False)]
-    
-    # 年代フィルター適用
-    filtered_data = create_decade_filter(filtered_data, selected_decade, 'seasonYear')
+    filtered_data = filter_data(data, {
+        'format': selected_format,
+        'source': selected_source,
+        'genre': selected_genres,
+        'genre_match': genre_match,
+        'seasonYear': DECADE_RANGES.get(selected_decade)
+    }, db_path)
     
     if filtered_data.empty:
         st.warning("選択された条件に一致するデータがありません。")
@@ -3236,7 +3005,7 @@ def show_studio_statistics_tab(data):
         return
     
     # 各スタジオの作品数をカウント
-    studio_counts = filtered_data.groupby('studios_name').size().reset_index(name='作品数')
+    studio_counts = filtered_data.groupby('studios_name', observed=True).size().reset_index(name='作品数')
     
     # 基礎統計を計算
     def calculate_basic_stats(series):
@@ -3279,6 +3048,31 @@ def show_studio_statistics_tab(data):
         st.dataframe(count_df, use_container_width=True, height=400)
     else:
         st.warning("作品数のデータがありません")
+    
+    # スタジオ別の指標統計
+    st.markdown("### 🏢 スタジオ別の指標の基礎統計")
+    metric_labels = {
+        "meanScore": "平均スコア",
+        "favorites": "お気に入り数",
+        "popularity": "人気度"
+    }
+    selected_metric = st.selectbox(
+        "指標",
+        list(metric_labels),
+        format_func=lambda x: metric_labels.get(x, x),
+        key="studio_stats_metric"
+    )
+    # スタジオ×年度の要約は年代でのみ絞り込めるため、他のフィルター選択時は直接計算する
+    studios_sketch = None
+    if selected_format == "全て" and selected_source == "全て" and not selected_genres:
+        studios_sketch = load_studios_sketch(get_build_id())
+    studio_metric_df = calculate_studio_metric_stats(filtered_data, studios_sketch, selected_metric, selected_decade)
+    if studio_metric_df.empty:
+        st.warning(f"{metric_labels[selected_metric]}のデータがありません")
+    else:
+        if studios_sketch is not None:
+            st.caption(CUBE_QUANTILE_NOTE)
+        st.dataframe(studio_metric_df, use_container_width=True, height=400)
 
 
 def show_scatter_tab(data, genre):
@@ -3290,31 +3084,37 @@ def show_scatter_tab(data, genre):
         st.warning("データが利用できません。")
         return
     
-    # エピソード数カラムをクエリに追加する必要があるため、データベースから再取得
-    try:
-        if genre == "アニメ":
-            db_path = Path(r'C:\Users\PC_User\Desktop\GitHub\public_anilist_data_rank_and_analysis\db\anime_data.db')
-            conn = sqlite3.connect(str(db_path))
-            query = """
-                SELECT 
-                    a.anilist_id, a.title_romaji, a.title_native, a.format, 
-                    a.season, a.seasonYear, a.favorites, a.meanScore, 
-                    a.popularity, a.source, a.episode
-                FROM anime a
-                WHERE a.title_romaji IS NOT NULL
-            """
-            extended_data = pd.read_sql_query(query, conn)
-            conn.close()
-        else:
-            db_path = Path(r'C:\Users\PC_User\Desktop\GitHub\public_anilist_data_rank_and_analysis\db\manga_data.db')
+    # エピソード数は作品データにないため、数値の列ストア（作品ID順の .npy をメモリマップ）から
+    # 作品IDで引いて追加する。列ストアがない古いビルドではデータベースから再取得
+    db_name = 'anime_data.db' if genre == "アニメ" else 'manga_data.db'
+    metric_store = load_metric_store(db_name, get_build_id())
+    if metric_store is not None:
+        db_path = get_db_path(db_name)
+        extended_data = data.assign(episode=metric_store.take('episode', data['anilist_id']))
+    else:
+        try:
+            if genre == "アニメ":
+                db_path = get_db_path('anime_data.db')
+                with read_connection_for_path(db_path) as conn:
+                    query = """
+                        SELECT 
+                            a.anilist_id, a.title_romaji, a.title_native, a.format, 
+                            a.season, a.seasonYear, a.favorites, a.meanScore, 
+                            a.popularity, a.source, a.episode
+                        FROM anime a
+                        WHERE a.title_romaji IS NOT NULL
+                    """
+                    extended_data = compact_frame(pd.read_sql_query(query, conn), 'scatter')
+            else:
+                db_path = get_db_path('manga_data.db')
+                extended_data = data.copy()
+        except Exception as e:
+            st.error(f"データ取得エラー: {e}")
+            if genre == "アニメ":
+                db_path = get_db_path('anime_data.db')
+            else:
+                db_path = get_db_path('manga_data.db')
             extended_data = data.copy()
-    except Exception as e:
-        st.error(f"データ取得エラー: {e}")
-        if genre == "アニメ":
-            db_path = Path(r'C:\Users\PC_User\Desktop\GitHub\public_anilist_data_rank_and_analysis\db\anime_data.db')
-        else:
-            db_path = Path(r'C:\Users\PC_User\Desktop\GitHub\public_anilist_data_rank_and_analysis\db\manga_data.db')
-        extended_data = data.copy()
     
     # 選択肢の定義
     categorical_options = {
@@ -3705,13 +3505,40 @@ def show_multiple_correlation(data, selected_vars, numerical_options):
     correlation_df = correlation_df.sort_values('相関係数', key=lambda x: x.astype(float).abs(), ascending=False)
     st.dataframe(correlation_df, width='stretch', height=300)
 
+# 起動時・新しいビルドの公開時にバックグラウンドで読み込むメニューのデータ（cache_warmup.py）
+# （メニュー名, 読み込み関数, build_id 以外の引数）
+WARMUP_DATASETS = [
+    ("🎬 アニメ - タイトル", load_anime_data, {}),
+    ("🎬 アニメ - キャラ", load_character_data, {}),
+    ("🎬 アニメ - 声優", load_voiceactor_data, {}),
+    ("🎬 アニメ - スタッフ", load_staff_data, {}),
+    ("🎬 アニメ - スタジオ", load_studio_data, {}),
+    ("🎬 アニメ - 原作", load_source_data, {}),
+    ("🎬 アニメ - ジャンル", load_genre_data, {}),
+    ("📚 マンガ - タイトル", load_manga_data, {}),
+    ("📚 マンガ - キャラ", load_manga_character_data, {}),
+    ("📚 マンガ - スタッフ", load_manga_staff_data, {}),
+    ("📚 マンガ - ジャンル", load_manga_genre_data, {}),
+    # 基礎統計・ジャンル・原作・スタジオの集計で使う統計キューブ・スタジオの指標要約
+    ("🎬 アニメ - 統計キューブ", load_stats_cube, {'db_name': 'anime_data.db'}),
+    ("📚 マンガ - 統計キューブ", load_stats_cube, {'db_name': 'manga_data.db'}),
+    ("🎬 アニメ - スタジオ指標要約", load_studios_sketch, {})
+]
+
 def main():
     """メイン関数"""
+    # 新しいビルドの公開を監視し、キャッシュを切り替える（プロセスごとに1回だけ開始）
+    start_build_watcher()
+    # メニューのデータをバックグラウンドで読み込み始める（サーバーの起動後・新しいビルドの公開後の最初の1回だけ）
+    start_cache_warmup('stats_app', WARMUP_DATASETS)
+    
     st.title("📊 AniList ランキング分析")
     st.markdown("---")
     
     # サイドバーメニュー
     st.sidebar.title("📋 メニュー")
+    show_build_status()
+    show_warmup_status('stats_app')
     
     # 統合メニュー（アニメとマンガを1つのラジオボタンに）
     menu_options = [
@@ -3739,7 +3566,7 @@ def main():
     # 選択されたメニューに応じて処理を分岐
     if selected_menu == "🎬 アニメ - タイトル":
         # 既存のアニメタイトル分析（ランキング、基礎統計、相関分析）
-        data = load_anime_data()
+        data = load_anime_data(get_build_id())
         if data is None:
             st.error("アニメデータを読み込めませんでした。")
             st.info("データベースファイルが存在することを確認してください。")
@@ -3756,7 +3583,7 @@ def main():
     
     elif selected_menu == "🎬 アニメ - キャラ":
         # キャラクター分析
-        data = load_character_data()
+        data = load_character_data(get_build_id())
         if data is None:
             st.error("キャラクターデータを読み込めませんでした。")
             st.info("データベースファイルが存在することを確認してください。")
@@ -3767,7 +3594,7 @@ def main():
     
     elif selected_menu == "🎬 アニメ - 声優":
         # 声優分析
-        data = load_voiceactor_data()
+        data = load_voiceactor_data(get_build_id())
         if data is None:
             st.error("声優データを読み込めませんでした。")
             st.info("データベースファイルが存在することを確認してください。")
@@ -3778,7 +3605,7 @@ def main():
     
     elif selected_menu == "🎬 アニメ - スタッフ":
         # スタッフ分析
-        data = load_staff_data()
+        data = load_staff_data(get_build_id())
         if data is None:
             st.error("スタッフデータを読み込めませんでした。")
             st.info("データベースファイルが存在することを確認してください。")
@@ -3789,7 +3616,7 @@ def main():
     
     elif selected_menu == "🎬 アニメ - スタジオ":
         # スタジオ分析
-        data = load_studio_data()
+        data = load_studio_data(get_build_id())
         if data is None:
             st.error("スタジオデータを読み込めませんでした。")
             st.info("データベースファイルが存在することを確認してください。")
@@ -3800,7 +3627,7 @@ def main():
     
     elif selected_menu == "🎬 アニメ - ジャンル":
         # ジャンル分析
-        data = load_genre_data()
+        data = load_genre_data(get_build_id())
         if data is None:
             st.error("ジャンルデータを読み込めませんでした。")
             st.info("データベースファイルが存在することを確認してください。")
@@ -3811,7 +3638,7 @@ def main():
     
     elif selected_menu == "🎬 アニメ - 原作":
         # 原作分析
-        data = load_source_data()
+        data = load_source_data(get_build_id())
         if data is None:
             st.error("原作データを読み込めませんでした。")
             st.info("データベースファイルが存在することを確認してください。")
@@ -3822,7 +3649,7 @@ def main():
     
     elif selected_menu == "📚 マンガ - タイトル":
         # マンガタイトル分析
-        data = load_manga_data()
+        data = load_manga_data(get_build_id())
         if data is None:
             st.error("マンガデータを読み込めませんでした。")
             st.info("データベースファイルが存在することを確認してください。")
@@ -3839,7 +3666,7 @@ def main():
     
     elif selected_menu == "📚 マンガ - キャラ":
         # マンガキャラクター分析
-        data = load_manga_character_data()
+        data = load_manga_character_data(get_build_id())
         if data is None:
             st.error("マンガキャラクターデータを読み込めませんでした。")
             st.info("データベースファイルが存在することを確認してください。")
@@ -3850,7 +3677,7 @@ def main():
     
     elif selected_menu == "📚 マンガ - スタッフ":
         # マンガスタッフ分析
-        data = load_manga_staff_data()
+        data = load_manga_staff_data(get_build_id())
         if data is None:
             st.error("マンガスタッフデータを読み込めませんでした。")
             st.info("データベースファイルが存在することを確認してください。")
@@ -3861,7 +3688,7 @@ def main():
     
     elif selected_menu == "📚 マンガ - ジャンル":
         # マンガジャンル分析
-        data = load_manga_genre_data()
+        data = load_manga_genre_data(get_build_id())
         if data is None:
             st.error("マンガジャンルデータを読み込めませんでした。")
             st.info("データベースファイルが存在することを確認してください。")
@@ -3882,4 +3709,7 @@ def main():
             st.info("選択された機能は今後実装予定です。")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
+    # 描画後に、直近のフィルター処理時間とデータセットのメモリ使用量をサイドバーに表示
+    show_filter_latency()
+    show_memory_report()
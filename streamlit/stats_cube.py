@@ -0,0 +1,143 @@
+import numpy as np
+import pandas as pd
+
+from build_cache import build_cache
+from db_connection import has_table, read_connection
+from db_snapshot import ensure_db_import_path
+
+# 分位点スケッチ・統計表の列はETL（db/）と共通の実装を使う
+ensure_db_import_path()
+from grouped_stats import STAT_COLUMNS
+from quantile_sketch import QuantileSketch
+
+
+# 結合可能な要約の列（stats_cube / studios_sketch テーブル共通）
+SUMMARY_COLUMNS = ['count', 'total', 'm2', 'min_value', 'max_value', 'sketch']
+
+
+def _load_table(db_name, table_name, build_id):
+    if not has_table(db_name, table_name, build_id):
+        return None
+    with read_connection(db_name, build_id) as conn:
+        return pd.read_sql_query(f'SELECT * FROM {table_name}', conn)
+
+
+@build_cache(refresh=True)
+def load_stats_cube(db_name, build_id=None):
+    """ETLで作成した統計キューブを読み込む（キューブのない古いDBではNone）"""
+    return _load_table(db_name, 'stats_cube', build_id)
+
+
+@build_cache(refresh=True)
+def load_studios_sketch(build_id=None):
+    """ETLで作成したスタジオ×年度の指標要約を読み込む（ない場合はNone）"""
+    return _load_table('anime_data.db', 'studios_sketch', build_id)
+
+
+def _as_sketch(value):
+    """DBのBLOBまたは結合済みのスケッチをQuantileSketchとして取得"""
+    return value if isinstance(value, QuantileSketch) else QuantileSketch.from_bytes(value)
+
+
+def rollup_summaries(summaries, keys=None):
+    """要約（セル）をキーごとに結合
+
+    要約の結合結果も同じ列を持つ要約なので、年別 → 年代別 → 全期間のように
+    段階的に結合できる。
+
+    Args:
+        summaries: SUMMARY_COLUMNS を持つDataFrame（sketch はBLOBまたはQuantileSketch）
+        keys: 結合のキー（None/空なら全体を1つに結合）。キーの欠損値も1グループとして扱う
+
+    Returns:
+        pd.DataFrame: keys + SUMMARY_COLUMNS（sketch はQuantileSketch）
+    """
+    keys = list(keys or [])
+    group_keys = keys or ['_all']
+    summaries = summaries.assign(_all=0)
+    grouped = summaries.groupby(group_keys, sort=True, dropna=False)
+    result = grouped.agg(
+        count=('count', 'sum'),
+        total=('total', 'sum'),
+        min_value=('min_value', 'min'),
+        max_value=('max_value', 'max')
+    )
+
+    # 偏差平方和の結合（Chanの式）: Σm2 + Σn·(セル平均 − 全体平均)²
+    group_mean = grouped['total'].transform('sum') / grouped['count'].transform('sum')
+    cell_mean = summaries['total'] / summaries['count']
+    summaries = summaries.assign(_m2=summaries['m2'] + summaries['count'] * (cell_mean - group_mean) ** 2)
+    result['m2'] = summaries.groupby(group_keys, sort=True, dropna=False)['_m2'].sum()
+
+    # 分位点スケッチはグループ内のものを結合する（件数が少なければ厳密値のまま）
+    result['sketch'] = [
+        QuantileSketch.merge_all([_as_sketch(value) for value in values])
+        for _, values in grouped['sketch']
+    ]
+
+    result = result.reset_index()
+    if not keys:
+        result = result.drop(columns=['_all'])
+    return result[keys + SUMMARY_COLUMNS]
+
+
+def summary_statistics(summaries, keys=None):
+    """要約から基礎統計（STAT_COLUMNS）を計算"""
+    keys = list(keys or [])
+    count = summaries['count']
+    variance = np.where(count > 1, summaries['m2'] / (count - 1).clip(lower=1), np.nan)
+    sketches = summaries['sketch'].map(_as_sketch)
+    stats_df = summaries[keys].copy()
+    stats_df['合計'] = summaries['total']
+    stats_df['カウント'] = count.astype(int)
+    stats_df['最大'] = summaries['max_value']
+    stats_df['最小'] = summaries['min_value']
+    stats_df['平均'] = summaries['total'] / count
+    stats_df['中央値'] = sketches.map(lambda sketch: sketch.quantile(0.5))
+    stats_df['1/4分位'] = sketches.map(lambda sketch: sketch.quantile(0.25))
+    stats_df['3/4分位'] = sketches.map(lambda sketch: sketch.quantile(0.75))
+    stats_df['標準偏差'] = np.sqrt(variance)
+    stats_df['分散'] = variance
+    return stats_df
+
+
+def filter_stats_cube(cube, metric, by_genre=False, media_format=None, year_range=None):
+    """キューブから条件に合うセルを取り出す
+
+    Args:
+        cube: load_stats_cube() の結果
+        metric: 指標（'favorites', 'meanScore', 'popularity'）
+        by_genre: Trueならジャンル別のセル、Falseならジャンルを問わないセル
+        media_format: フォーマットで絞り込む場合の値
+        year_range: (開始年, 終了年) で絞り込む場合の範囲
+    """
+    cells = cube[cube['metric'] == metric]
+    if by_genre:
+        cells = cells[cells['genre_name'].notna()]
+    else:
+        cells = cells[cells['genre_name'].isna()]
+    if media_format is not None:
+        cells = cells[cells['format'] == media_format]
+    if year_range is not None:
+        start_year, end_year = year_range
+        cells = cells[(cells['seasonYear'] >= start_year) & (cells['seasonYear'] <= end_year)]
+    return cells
+
+
+def query_stats_cube(cube, metric, group_by=None, media_format=None, year_range=None):
+    """キューブのセルを結合して基礎統計を計算
+
+    Args:
+        group_by: 集計キーの列名リスト（'genre_name' を含む場合はジャンル別のセルを使う）
+        その他の引数は filter_stats_cube() と同じ
+
+    Returns:
+        pd.DataFrame: 集計キー + STAT_COLUMNS（該当データがなければ空）
+    """
+    group_by = list(group_by or [])
+    cells = filter_stats_cube(cube, metric, 'genre_name' in group_by, media_format, year_range)
+    if group_by:
+        cells = cells.dropna(subset=group_by)
+    if cells.empty:
+        return pd.DataFrame(columns=group_by + STAT_COLUMNS)
+    return summary_statistics(rollup_summaries(cells, group_by), group_by)